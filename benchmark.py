@@ -0,0 +1,337 @@
+""" Headless benchmarks for the bot's game machinery.
+
+Usage: python benchmark.py roles [--mode MODE]... [--players N]... [--iterations N] [--seed SEED]
+       python benchmark.py containers [--players N] [--iterations N]
+       python benchmark.py replay JOURNAL... [--profile]
+
+The roles benchmark runs the role attribution part of !start for every game mode and every player count
+the mode allows, using fake users in a fake channel and a game RNG seeded deterministically from --seed,
+so that two runs with the same arguments attribute exactly the same roles (provided PYTHONHASHSEED is
+also fixed, as some modes pick roles out of sets). For each mode and player count it reports the time
+taken per attribution, the number of role compositions tracked for !stats, and the peak memory allocated
+by a single attribution. For modes with a ROLE_GUIDE, it also checks that the roles handed out agree with
+the guide: counts for fixed roles must be exact, and roles drawn from role sets must stay within the
+possible bounds with a mean close to the expected one. The exit status is 1 if any check failed, so it
+can be used in CI.
+
+The containers benchmark plays out the user container churn of a game with every role loaded: the
+game state and the per-role sets are created, players are spread over many role sets and per-player
+mappings, some players are swapped out for other users, and everything is torn down again. It reports
+the time taken per game and the number of containers each player was in, and checks that no player is
+still tracked by any container afterwards.
+
+The replay benchmark plays games recorded to journals (see the journal section of the configuration) again,
+as fast as possible. For each journal it reports the number of records, the time taken to replay it and
+whether the replayed game matched the recorded one; if not, it shows the first record where they diverged.
+With --profile, the replays are run under cProfile and the functions taking the most time are listed. The
+exit status is 1 if any replay diverged.
+"""
+
+import argparse
+import cProfile
+import math
+import pstats
+import random as py_random
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from typing import Optional
+
+import src # bootstrap the bot; this loads config, roles and game modes
+from src import channels, config, journal
+from src.cats import All
+from src.containers import DefaultUserDict, UserDict, UserSet
+from src.dispatcher import MessageDispatcher
+from src.events import Event
+from src.gamemodes import GAME_MODES, GameMode
+from src.gamestate import GameState, PregameState
+from src.headless import configure_headless, derive_seed, make_mode
+from src.pregame import attribute_roles, get_guide_roles
+from src.random import random
+from src.rolestats import multiset_bounds
+from src.users import FakeUser, User
+
+# Maximum number of standard errors the observed mean count of a drawn role may stray from its expected value
+TOLERANCE = 4.0
+
+def expected_counts(mode: GameMode, num_players: int) -> Optional[dict[str, tuple[int, int, float, float]]]:
+    """ Work out the distribution of each role's count that ROLE_GUIDE calls for.
+
+    :param mode: Game mode, which must have been started up
+    :param num_players: Number of players in the game
+    :return: Mapping of role to (min count, max count, mean count, count variance),
+        or None if the mode does not use ROLE_GUIDE at this player count
+    """
+    guide = get_guide_roles(mode, num_players)
+    if not guide:
+        return None
+    expected = defaultdict(lambda: [0, 0, 0.0, 0.0])
+    for role, amt in guide.items():
+        if role not in mode.ROLE_SETS:
+            for i in range(3):
+                expected[role][i] += amt
+            continue
+        rs = Counter(mode.ROLE_SETS[role])
+        total = sum(rs.values())
+        for r, (low, high) in multiset_bounds(rs, amt).items():
+            # the number of copies of r drawn is hypergeometrically distributed
+            p = rs[r] / total
+            expected[r][0] += low
+            expected[r][1] += high
+            expected[r][2] += amt * p
+            if total > 1:
+                expected[r][3] += amt * p * (1 - p) * (total - amt) / (total - 1)
+    return {role: tuple(x) for role, x in expected.items()}
+
+def check_counts(expected: dict[str, tuple[int, int, float, float]], counts: dict[str, list[int]], iterations: int,
+                 default_role: str) -> list[str]:
+    """ Compare the role counts seen across every attribution against what ROLE_GUIDE calls for.
+
+    :return: Description of each discrepancy found
+    """
+    problems = []
+    for role, (low, high, mean, var) in sorted(expected.items()):
+        # the default role makes up the remainder, which depends on every other role
+        if role == default_role:
+            continue
+        seen = counts.get(role, [0] * iterations)
+        if min(seen) < low or max(seen) > high:
+            problems.append(f"{role}: counts {min(seen)}..{max(seen)} outside {low}..{high}")
+            continue
+        error = TOLERANCE * math.sqrt(var / iterations) + 1e-9
+        if abs(statistics.fmean(seen) - mean) > error:
+            problems.append(f"{role}: mean count {statistics.fmean(seen):.3f}, expected {mean:.3f}")
+    return problems
+
+def bench_roles(mode_name: str, num_players: int, iterations: int, seed: str, players: list[FakeUser],
+                wrapper: MessageDispatcher) -> dict | str:
+    """ Attribute roles repeatedly for one mode and player count.
+
+    :return: Measurements, or a string explaining why the mode can't be played with this many players
+    """
+    timings = []
+    compositions = []
+    counts: dict[str, list[int]] = defaultdict(lambda: [0] * iterations)
+    expected = None
+    default_role = None
+    peak = 0
+    aborted = 0
+    # the first run is not timed, and instead measures memory use
+    for i in range(-1, iterations):
+        mode = make_mode(mode_name)
+        if mode.ROLE_GUIDE and not get_guide_roles(mode, num_players):
+            # !start would refuse to start the game
+            mode.teardown()
+            return "no roles defined in ROLE_GUIDE"
+        if expected is None:
+            expected = expected_counts(mode, num_players) or {}
+        pregame_state = PregameState()
+        pregame_state.players.extend(players[:num_players])
+        pregame_state.current_mode = mode
+        var = GameState(pregame_state)
+        var.rng_seed = derive_seed(seed, mode_name, num_players, i)
+        random.seed(var.rng_seed, buffer_size=var.rng_buffer_size)
+        if i < 0:
+            tracemalloc.start()
+            ok = attribute_roles(wrapper, var, var.players)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            start = time.perf_counter_ns()
+            ok = attribute_roles(wrapper, var, var.players)
+            timings.append(time.perf_counter_ns() - start)
+        if ok:
+            if i >= 0:
+                compositions.append(len(var.get_role_stats()))
+                default_role = var.default_role
+                for role, users in var.roles.items():
+                    if users:
+                        counts[role][i] = len(users)
+            # tear everything down as the end of a game would, without touching any channel modes
+            Event("reset", {}).dispatch(var)
+            var.teardown()
+        elif i >= 0:
+            # attribute_roles stopped the game, which has already reset it
+            aborted += 1
+        pregame_state.players.clear()
+
+    problems = []
+    if expected:
+        if aborted:
+            problems.append(f"{aborted} attributions were aborted")
+        else:
+            problems = check_counts(expected, counts, iterations, default_role)
+    return {
+        "timings": timings,
+        "compositions": compositions or [0],
+        "peak": peak,
+        "aborted": aborted,
+        "checked": bool(expected),
+        "problems": problems,
+    }
+
+def run_roles(args) -> int:
+    configure_headless()
+    channel = channels.add("benchmark", None) # not a channel name, so this is a FakeChannel
+    channels.add_game_channel(channel, primary=True)
+    wrapper = MessageDispatcher(FakeUser.from_nick("benchmark"), channel)
+    modes = args.mode or sorted(GAME_MODES)
+    max_players = max(GAME_MODES[m][2] for m in modes)
+    players = [FakeUser.from_nick(f"player{i}") for i in range(1, max_players + 1)]
+
+    status = 0
+    print(f"{'mode':<14} {'players':>7} {'mean ms':>9} {'max ms':>9} {'comps':>7} {'max':>7} {'peak KiB':>9} {'aborted':>7}  check")
+    for mode_name in modes:
+        _, min_players, max_players = GAME_MODES[mode_name]
+        mode = make_mode(mode_name)
+        if mode is None:
+            print(f"{mode_name:<14} {'':>7} skipped: mode requires arguments")
+            continue
+        mode.teardown()
+        for num_players in range(min_players, max_players + 1):
+            if args.players and num_players not in args.players:
+                continue
+            result = bench_roles(mode_name, num_players, args.iterations, args.seed, players, wrapper)
+            if isinstance(result, str):
+                print(f"{mode_name:<14} {num_players:>7} skipped: {result}")
+                continue
+            if result["problems"]:
+                check = "FAIL"
+                status = 1
+            elif result["checked"]:
+                check = "ok"
+            else:
+                check = "n/a"
+            timings = result["timings"] or [0]
+            print(f"{mode_name:<14} {num_players:>7} {statistics.fmean(timings) / 1e6:>9.3f} {max(timings) / 1e6:>9.3f} "
+                  f"{statistics.fmean(result['compositions']):>7.1f} {max(result['compositions']):>7} "
+                  f"{result['peak'] / 1024:>9.1f} {result['aborted']:>7}  {check}")
+            for problem in result["problems"]:
+                print(f"    {problem}")
+    return status
+
+def container_refs(user: FakeUser) -> int:
+    return len(user.sets) + len(user.lists) + len(user.dict_keys) + len(user.dict_values)
+
+def bench_containers(num_players: int, iterations: int) -> dict:
+    """ Play out the user container churn of a number of games.
+
+    :return: Measurements
+    """
+    rng = py_random.Random(num_players)
+    roles = sorted(All)
+    timings = []
+    refs = []
+    leaked = 0
+    players = [FakeUser.from_nick(f"player{i}") for i in range(num_players)]
+    for i in range(iterations):
+        pregame_state = PregameState()
+        pregame_state.current_mode = make_mode("default")
+        start = time.perf_counter_ns()
+        pregame_state.players.extend(players)
+        var = GameState(pregame_state)
+        var.begin_setup()
+        # a main role each, plus a handful of players in every other role's set
+        for player in players:
+            var.main_roles[player] = rng.choice(roles)
+            var.roles[var.main_roles[player]].add(player)
+        for role in roles:
+            var.roles[role].update(rng.sample(players, 5))
+        targets: DefaultUserDict[User, UserSet] = DefaultUserDict(UserSet)
+        votes: UserDict[User, User] = UserDict()
+        for player in players:
+            targets[player].update(rng.sample(players, 3))
+            votes[player] = rng.choice(players)
+        refs.append(statistics.fmean(container_refs(p) for p in players))
+        # players leaving, dying and changing roles
+        for player in rng.sample(players, 5):
+            for role in roles:
+                var.roles[role].discard(player)
+            targets[player].clear()
+        for role in roles:
+            var.roles[role].difference_update(players[:10])
+        # swap players out for new users, as happens when they change nick or account
+        for j in rng.sample(range(num_players), 5):
+            new = FakeUser.from_nick(f"player{j}.{i}")
+            players[j].swap(new)
+            players[j] = new
+        targets.clear()
+        votes.clear()
+        var.teardown()
+        var.main_roles.clear()
+        pregame_state.players.clear()
+        timings.append(time.perf_counter_ns() - start)
+        leaked += sum(1 for p in players if container_refs(p))
+    return {"timings": timings, "refs": refs, "leaked": leaked}
+
+def run_containers(args) -> int:
+    configure_headless()
+    result = bench_containers(args.players, args.iterations)
+    timings = result["timings"]
+    print(f"{'players':>7} {'roles':>5} {'mean ms':>9} {'max ms':>9} {'refs':>7}  check")
+    print(f"{args.players:>7} {len(All):>5} {statistics.fmean(timings) / 1e6:>9.3f} {max(timings) / 1e6:>9.3f} "
+          f"{statistics.fmean(result['refs']):>7.1f}  {'LEAK' if result['leaked'] else 'ok'}")
+    return 1 if result["leaked"] else 0
+
+def run_replay(args) -> int:
+    configure_headless()
+    # replays run on the loop of this channel, which is where the profiler needs to be enabled
+    channel = channels.add("replay", None)
+    channels.add_game_channel(channel, primary=True)
+    profiler = cProfile.Profile() if args.profile else None
+    status = 0
+    print(f"{'journal':<40} {'records':>7} {'seconds':>9}  check")
+    for path in args.journal:
+        with open(path, "rb") as f:
+            records = list(journal.read(f))
+        if profiler is not None:
+            channel.loop.run(profiler.enable)
+        result = journal.replay(records)
+        if profiler is not None:
+            channel.loop.run(profiler.disable)
+        check = "ok"
+        if result.divergence is not None:
+            check = "DIVERGED"
+            status = 1
+        print(f"{path:<40} {len(records):>7} {result.elapsed:>9.3f}  {check}")
+        if result.divergence is not None:
+            i = result.divergence
+            print(f"    recorded: {records[i] if i < len(records) else 'end of journal'}")
+            print(f"    replayed: {result.records[i] if i < len(result.records) else 'end of game'}")
+    if profiler is not None:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(30)
+    return status
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Headless benchmarks for the bot's game machinery.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    roles = subparsers.add_parser("roles", help="Benchmark role attribution across game modes")
+    roles.add_argument("--mode", action="append", choices=sorted(GAME_MODES),
+                       help="Game mode to benchmark; may be given multiple times (default: every mode)")
+    roles.add_argument("--players", action="append", type=int,
+                       help="Player count to benchmark; may be given multiple times (default: every legal count)")
+    roles.add_argument("--iterations", type=int, default=1000,
+                       help="Number of attributions per mode and player count (default: %(default)s)")
+    roles.add_argument("--seed", default="benchmark", help="Seed for the game RNG (default: %(default)s)")
+    containers = subparsers.add_parser("containers", help="Benchmark user containers in games with every role loaded")
+    containers.add_argument("--players", type=int, default=50, help="Number of players (default: %(default)s)")
+    containers.add_argument("--iterations", type=int, default=1000,
+                            help="Number of games to play out (default: %(default)s)")
+    replay = subparsers.add_parser("replay", help="Replay games recorded to journals")
+    replay.add_argument("journal", nargs="+", help="Journal file to replay")
+    replay.add_argument("--profile", action="store_true", help="Profile the replays and list the slowest functions")
+    args = parser.parse_args(argv)
+    if args.benchmark == "replay":
+        return run_replay(args)
+    if args.iterations < 1:
+        parser.error("--iterations must be at least 1")
+    if args.benchmark == "containers":
+        if args.players < 10:
+            parser.error("--players must be at least 10")
+        return run_containers(args)
+    return run_roles(args)
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
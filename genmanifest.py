@@ -0,0 +1,8 @@
+# Regenerates the manifests of the builtin roles and game modes, which let the bot start without importing them.
+# Run this after adding, removing or renaming a role or game mode, or after changing role categories or commands.
+from src import gamemodes, roles
+
+if __name__ == "__main__":
+    roles.write_manifest()
+    gamemodes.write_manifest()
+    print("Wrote {0}\nWrote {1}".format(roles.MANIFEST, gamemodes.MANIFEST))
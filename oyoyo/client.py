@@ -28,6 +28,17 @@ import hmac
 from oyoyo.parse import parse_raw_irc_command
 
 
+class _RawLine(object):
+    """Wraps a raw line for logging, so that it's only decoded if the line is actually logged."""
+    __slots__ = ("line",)
+
+    def __init__(self, line):
+        self.line = line
+
+    def __str__(self):
+        return str(self.line)[1:]
+
+
 # Adapted from http://code.activestate.com/recipes/511490-implementation-of-the-token-bucket-algorithm/
 class TokenBucket(object):
     """An implementation of the token bucket algorithm.
@@ -111,9 +122,11 @@ class IRCClient:
         self.cipher_list = None
         self.server_pass = None
         self.lock = threading.RLock()
-        self.stream_handler = lambda output, level=None: print(output)
+        self.stream_handler = lambda output, *args, level=None: print(output.format(*args))
 
         self.tokenbucket = TokenBucket(23, 1.73)
+        # called with the number of seconds a line waited on the token bucket, whenever it had to wait
+        self.throttle_handler = None
 
         self.__dict__.update(kwargs)
         self.command_handler = cmd_handler
@@ -156,11 +169,14 @@ class IRCClient:
                                                                    for arg in args]), i))
 
             msg = bytes(" ", "utf_8").join(bargs)
-            logmsg = kwargs.get("log") or str(msg)[1:]
-            self.stream_handler('---> send {0}'.format(logmsg), level="debug")
-
-            while not self.tokenbucket.consume(1):
-                time.sleep(0.3)
+            self.stream_handler('---> send {0}', kwargs.get("log") or _RawLine(msg), level="debug")
+
+            if not self.tokenbucket.consume(1):
+                started = time.monotonic()
+                while not self.tokenbucket.consume(1):
+                    time.sleep(0.3)
+                if self.throttle_handler is not None:
+                    self.throttle_handler(time.monotonic() - started)
             self.socket.send(msg + bytes("\r\n", "utf_8"))
 
     def connect(self):
@@ -309,7 +325,7 @@ class IRCClient:
                             largs = list(args)
                             if prefix is not None:
                                 prefix = prefix.decode(enc)
-                            self.stream_handler("<--- receive {0} {1} ({2})".format(prefix, command, ", ".join(fargs)), level="debug")
+                            self.stream_handler("<--- receive {0} {1} ({2})", prefix, command, ", ".join(fargs), level="debug")
                             # for i,arg in enumerate(largs):
                                 # if arg is not None: largs[i] = arg.decode(enc)
                             if command in self.command_handler:
@@ -0,0 +1,268 @@
+""" Headless game simulator for balance testing.
+
+Usage: python simulate.py [--mode MODE]... [--players N]... [--games N] [--policy POLICY]... [--workers N] [--seed SEED]
+
+Plays full games of every given game mode and player count without connecting anywhere, and reports how often
+each team won, in the shape of the !gamestats command. Players are fake users following a scripted policy:
+
+  random  votes for a random other player during the day; wolves kill a random non-wolf at night
+  wolf    like random, but villagers always vote for a wolf if there is one alive to vote for
+  idle    never does anything, so phases end when they time out
+
+Each player picks one of the given policies at random when the game starts, so repeating a policy weights it
+(--policy random --policy random --policy idle makes a third of the players idle). Roles other than wolves do
+not use their night actions.
+
+Games run against a virtual clock: once every player has acted, the clock skips straight to the next timer,
+so a game takes as long as its logic does. Games are spread over a process pool with one bot per process.
+The game RNG and the policies are seeded deterministically from --seed, the mode, the player count and
+the number of the game, so that two runs with the same arguments play the same games (provided
+PYTHONHASHSEED is also fixed, as some modes pick roles out of sets). Games which neither end nor have a timer
+left to wait for, or which run for more than MAX_STEPS timers, are stopped and reported as stalled.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import random as py_random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+import src # bootstrap the bot; this loads config, roles and game modes
+from src import channels, config, handler, journal, timers, users
+from src import random as game_random
+from src.cats import Wolf, Wolfteam
+from src.dispatcher import MessageDispatcher
+from src.functions import get_main_role, get_players
+from src.gamemodes import GAME_MODES
+from src.gamestate import GameState, PregameState, set_gamemode
+from src.headless import configure_headless, derive_seed, make_mode
+from src.messages import messages
+from src.pregame import get_guide_roles, start
+from src.trans import stop_game
+from src.users import FakeUser, User
+
+# Maximum number of timers a single game may run through before it is stopped as stalled
+MAX_STEPS = 500
+# Number of games each task handed to the process pool plays
+CHUNK_SIZE = 25
+# Teams in the order !gamestats lists them; other teams follow in alphabetical order
+TEAM_ORDER = ("Villager", "Village", "Wolfteam", "Vampire Team")
+
+def random_voter(var: GameState, player: User, rng: py_random.Random) -> Optional[tuple[str, User]]:
+    """ Vote for a random player during the day, and kill a random non-wolf at night as a wolf. """
+    if var.current_phase == "day":
+        targets = [p for p in get_players(var) if p is not player]
+        return ("vote", rng.choice(targets)) if targets else None
+    if var.current_phase == "night" and get_main_role(var, player) in Wolf:
+        targets = [p for p in get_players(var) if get_main_role(var, p) not in Wolfteam]
+        return ("kill", rng.choice(targets)) if targets else None
+    return None
+
+def wolf_voter(var: GameState, player: User, rng: py_random.Random) -> Optional[tuple[str, User]]:
+    """ Vote for a wolf during the day if not one, otherwise act like random_voter. """
+    if var.current_phase == "day" and get_main_role(var, player) not in Wolfteam:
+        wolves = [p for p in get_players(var, Wolf) if p is not player]
+        if wolves:
+            return "vote", rng.choice(wolves)
+    return random_voter(var, player, rng)
+
+def idle(var: GameState, player: User, rng: py_random.Random) -> Optional[tuple[str, User]]:
+    """ Never act. """
+    return None
+
+POLICIES: dict[str, Callable[[GameState, User, py_random.Random], Optional[tuple[str, User]]]] = {
+    "random": random_voter,
+    "wolf": wolf_voter,
+    "idle": idle,
+}
+
+_channel = None
+
+def init_worker() -> None:
+    """ Set up a process of the pool to play games headlessly. """
+    global _channel
+    configure_headless()
+    logging.getLogger().setLevel(logging.ERROR)
+    # fake users never speak, so the reaper would take every idle policy for an idler
+    config.Main.set("reaper.enabled", False)
+    timers.set_clock(timers.ManualClock())
+    if users.Bot is None:
+        users.Bot = users.BotUser(None, "simulate", "simulate", "localhost", None)
+    _channel = channels.add("simulate", None) # not a channel name, so this is a FakeChannel
+    channels.add_game_channel(_channel, primary=True)
+
+def play_game(mode_name: str, players: list[FakeUser], game_seed: bytes, policies: list[str]) -> Optional[str]:
+    """ Play a single game to its end.
+
+    :param mode_name: Game mode to play
+    :param players: Players of the game
+    :param game_seed: Seed for the game RNG and the players' policies
+    :param policies: Names of the policies players pick from
+    :return: Name of the winning team, or None if the game stalled
+    """
+    chan = _channel
+    rng = py_random.Random(game_seed)
+    assigned = {player: POLICIES[rng.choice(policies)] for player in players}
+    # the end of the game in the journal tells us who won
+    record = chan.loop.journal = journal.Journal()
+
+    def begin():
+        pregame = chan.game_state = PregameState(chan.loop)
+        pregame.players.extend(players)
+        set_gamemode(pregame, mode_name)
+        seed_function = game_random.seed_function
+        game_random.seed_function = lambda size: game_seed
+        try:
+            start(MessageDispatcher(players[0], chan), forced=True)
+        finally:
+            game_random.seed_function = seed_function
+
+    acted = None
+
+    def act():
+        nonlocal acted
+        var = chan.game_state
+        phase = (var.current_phase, var.day_count, var.night_count)
+        if phase == acted:
+            return
+        acted = phase
+        for player in get_players(var):
+            # an earlier action (such as the deciding vote) may have ended the phase
+            if chan.game_state is not var or (var.current_phase, var.day_count, var.night_count) != phase:
+                break
+            action = assigned[player](var, player, rng)
+            if action is not None:
+                command, target = action
+                where = chan if command == "vote" else users.Bot
+                handler.parse_and_dispatch(MessageDispatcher(player, where), command, target.nick)
+
+    chan.loop.run(begin)
+    for _ in range(MAX_STEPS):
+        var = chan.game_state
+        if var is None or not var.in_game:
+            break
+        chan.loop.run(act)
+        delay = timers.next_due()
+        if delay is None:
+            break
+        timers.advance(delay)
+        # let the loop run whatever the timers posted to it
+        chan.loop.run(lambda: None)
+
+    var = chan.game_state
+    if var is not None and var.in_game:
+        chan.loop.run(stop_game, var, log=False)
+        return None
+    if var is not None:
+        # the game never started, such as when the mode has no roles for this many players
+        chan.loop.run(stop_game, var, abort=True, log=False)
+        return None
+    end = record.records[-1] if record.records else None
+    if end is None or end.kind is not journal.Kind.END:
+        return None
+    return end.fields[0]
+
+def play_games(mode_name: str, num_players: int, seed: str, first: int, count: int, policies: list[str]) -> dict:
+    """ Play a batch of games; this is what runs on the process pool.
+
+    :param mode_name: Game mode to play
+    :param num_players: Number of players per game
+    :param seed: Seed given on the command line
+    :param first: Number of the first game of the batch, for seeding
+    :param count: Number of games to play
+    :param policies: Names of the policies players pick from
+    :return: Number of wins per team and of stalled games
+    """
+    players = [FakeUser.from_nick(f"player{i}") for i in range(1, num_players + 1)]
+    wins: Counter[str] = Counter()
+    stalled = 0
+    for i in range(first, first + count):
+        winner = play_game(mode_name, players, derive_seed(seed, mode_name, num_players, i), policies)
+        if winner is None:
+            stalled += 1
+        else:
+            wins[winner] += 1
+    return {"mode": mode_name, "players": num_players, "wins": wins, "stalled": stalled}
+
+def team_order(team: str) -> tuple[int, str]:
+    return (TEAM_ORDER.index(team) if team in TEAM_ORDER else len(TEAM_ORDER), team)
+
+def team_name(team: str) -> str:
+    try:
+        return messages.raw("_role_categories", team)[0]
+    except KeyError:
+        return team
+
+def run(args) -> int:
+    configure_headless()
+    modes = args.mode or sorted(GAME_MODES)
+    tasks = []
+    for mode_name in modes:
+        _, min_players, max_players = GAME_MODES[mode_name]
+        mode = make_mode(mode_name)
+        if mode is None:
+            print(f"{mode_name}: skipped, mode requires arguments")
+            continue
+        for num_players in range(min_players, max_players + 1):
+            if args.players and num_players not in args.players:
+                continue
+            if mode.ROLE_GUIDE and not get_guide_roles(mode, num_players):
+                continue
+            for first in range(0, args.games, CHUNK_SIZE):
+                tasks.append((mode_name, num_players, args.seed, first, min(CHUNK_SIZE, args.games - first), args.policy))
+        mode.teardown()
+
+    results: dict[tuple[str, int], dict] = {}
+    began = time.perf_counter()
+    # each process bootstraps its own bot, so start them fresh rather than forking this one
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(args.workers, mp_context=context, initializer=init_worker) as pool:
+        for result in pool.map(play_games, *zip(*tasks)) if tasks else ():
+            key = (result["mode"], result["players"])
+            if key not in results:
+                results[key] = {"wins": Counter(), "stalled": 0}
+            results[key]["wins"] += result["wins"]
+            results[key]["stalled"] += result["stalled"]
+    elapsed = time.perf_counter() - began
+
+    total_games = 0
+    print(f"{'mode':<14} {'players':>7}  wins")
+    for (mode_name, num_players), result in results.items():
+        games = sum(result["wins"].values())
+        total_games += games + result["stalled"]
+        bits = [f"{team_name(team)} wins: {n} ({n / games:.0%})" for team, n in sorted(result["wins"].items(), key=lambda x: team_order(x[0]))]
+        bits.append(f"Total games: {games}")
+        if result["stalled"]:
+            bits.append(f"Stalled: {result['stalled']}")
+        print(f"{mode_name:<14} {num_players:>7}  {' | '.join(bits)}")
+    if elapsed > 0:
+        print(f"{total_games} games in {elapsed:.1f}s ({total_games / elapsed * 60:.0f} games per minute)")
+    return 0
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Headless game simulator for balance testing.")
+    parser.add_argument("--mode", action="append", choices=sorted(GAME_MODES),
+                        help="Game mode to simulate; may be given multiple times (default: every mode)")
+    parser.add_argument("--players", action="append", type=int,
+                        help="Player count to simulate; may be given multiple times (default: every legal count)")
+    parser.add_argument("--games", type=int, default=100,
+                        help="Number of games per mode and player count (default: %(default)s)")
+    parser.add_argument("--policy", action="append", choices=sorted(POLICIES),
+                        help="Policy players may follow; may be given multiple times (default: random)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of processes to play games on (default: one per core)")
+    parser.add_argument("--seed", default="simulate", help="Seed for the game RNG and policies (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if args.games < 1:
+        parser.error("--games must be at least 1")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    args.policy = args.policy or ["random"]
+    return run(args)
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -32,14 +32,15 @@ from src import gamecmds, wolfgame
 from src import roles, gamemodes
 
 # Import the user-defined roles, as well as builtins if custom roles don't exist or they want them
+# Builtins are registered from their manifest here, and only imported once a game needs them
 import roles as custom_roles # type: ignore
 if not getattr(custom_roles, "CUSTOM_ROLES_DEFINED", False):
-    roles.import_builtin_roles()
+    roles.register_builtin_roles()
 
 # Import the user-defined modes, as well as builtins if custom modes don't exist or they want them
 import gamemodes as custom_gamemodes # type: ignore
 if not getattr(custom_gamemodes, "CUSTOM_MODES_DEFINED", False):
-    gamemodes.import_builtin_modes()
+    gamemodes.register_builtin_modes()
 
 # Import user-defined hooks
 import hooks as custom_hooks # type: ignore
@@ -1,7 +1,10 @@
 import os
 import re
+import time
+from typing import Optional
 from dotenv import load_dotenv
 import google.generativeai as genai
+from src import metrics
 from src.users import FakeUser
 
 load_dotenv()
@@ -12,6 +15,9 @@ GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME")
 if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
 
+INFERENCE_SECONDS = metrics.histogram("agent_inference_seconds", "Time taken by agents to generate a response or a vote",
+                                      ("kind",), buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 60.0))
+
 PERSONALITIES = {
     "cautious": "You are a werewolf player. You must be cautious in your actions. If you are a wolf, you don't have to accuse people randomly, but you have to stay behind.",
     "aggressive": "You are a werewolf player. You must be aggressive in your actions. You are not afraid to accuse others, even with little evidence.",
@@ -35,6 +41,13 @@ class Agent:
         else:
             self._client = None
 
+    def _generate(self, contents, kind: str):
+        started = time.perf_counter()
+        try:
+            return self._client.generate_content(contents)
+        finally:
+            INFERENCE_SECONDS.observe(time.perf_counter() - started, kind)
+
     def generate_response(self, context: str) -> str:
         """
         Generates a response based on the given context.
@@ -59,36 +72,18 @@ class Agent:
                     "parts": [{"text": msg}]
                 })
 
-        response = self._client.generate_content(contents)
+        response = self._generate(contents, "response")
         return response.text
 
-    def generate_vote(self):
+    def generate_vote(self, player_names: list[str]) -> Optional[str]:
         """
-        Generates a vote for a player.
+        Generates a vote for one of the given players.
+        Returns the nick of the player to vote for, or None to skip voting.
         """
-        if not self._client:
-            return
-
-        from src.functions import get_players
-        from src.gamestate import GameState
-        from src.votes import VOTES
-        from src.dispatcher import MessageDispatcher
-        from src.handler import parse_and_dispatch
-        from src import channels, history
-
-        var = self.user.game_state
-        if not var or not isinstance(var, GameState):
-            return
-
-        if self.user in VOTES:
-            return
-
-        players = get_players(var)
-        if self.user in players:
-            players.remove(self.user)
+        if not self._client or not player_names:
+            return None
 
-        if not players:
-            return
+        from src import history
 
         context = history.get_history()
         messages = context.strip().split('\n')
@@ -108,16 +103,15 @@ class Agent:
                     "parts": [{"text": msg}]
                 })
 
-        player_names = [p.nick for p in players]
         prompt = f"Based on the conversation, who should you vote for? Please choose one of the following players: {', '.join(player_names)}. Only return the player's name. Write None to skip voting."
         contents.append({
             "role": "user",
             "parts": [{"text": prompt}]
         })
 
-        response = self._client.generate_content(contents)
+        response = self._generate(contents, "vote")
         player_to_vote = response.text.strip()
 
         if player_to_vote in player_names:
-            wrapper = MessageDispatcher(self.user, channels.Main)
-            parse_and_dispatch(wrapper, "vote", player_to_vote)
\ No newline at end of file
+            return player_to_vote
+        return None
\ No newline at end of file
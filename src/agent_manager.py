@@ -1,13 +1,14 @@
 from __future__ import annotations
 import random
-import threading
 import logging
 from typing import Optional
 
-from src import users, channels, history
+from src import users, channels, history, timers
 from src.agent import Agent, PERSONALITIES
 from src.dispatcher import MessageDispatcher
+from src.functions import get_players
 from src.gamejoin import join_player
+from src.gamestate import GameState
 from src.status import add_dying, kill_players
 from src.users import User, FakeUser
 
@@ -16,8 +17,8 @@ class AgentManager:
         logging.debug("Initializing AgentManager")
         self.agents: list[Agent] = []
         self._nick_counter = 0
-        self._speaking_timer: Optional[threading.Timer] = None
-        self._voting_timer: Optional[threading.Timer] = None
+        self._speaking_timer: Optional[timers.Timer] = None
+        self._voting_timer: Optional[timers.Timer] = None
         self.name_list : list[str] = ["jason", "alice", "bob", "jack", "michael", "sarah", "david", "laura", "chris", "emma"]
 
     def clear_agents(self):
@@ -84,13 +85,13 @@ class AgentManager:
                 return agent
         return None
 
-    def start_speaking(self):
-        """Starts the agent speaking timer."""
+    def start_speaking(self, var: GameState):
+        """Starts the agent speaking timer for the game whose day just began."""
         if self._speaking_timer is None:
-            print(f"Starting speaking timer SCHEDULER for agents.")
-            self._schedule_speaking()
+            logging.debug("Starting speaking timer for agents")
+            self._schedule_speaking(var)
         if self._voting_timer is None:
-            self._schedule_voting()
+            self._schedule_voting(var)
 
     def stop_speaking(self):
         """Stops the agent speaking timer."""
@@ -106,69 +107,91 @@ class AgentManager:
         if self._voting_timer:
             self._voting_timer.cancel()
             self._voting_timer = None
-        
 
-    def _schedule_voting(self):
+    # Scheduling happens on the game's loop. Ticks wait on the agent backend, so they run on a thread of
+    # their own instead of holding up the timer thread or the loop, and post anything acting on the game
+    # back to the loop of the game they were scheduled for.
+
+    def _schedule_voting(self, var: GameState):
         """Schedules the next voting event."""
-        if not channels.Main.game_state or channels.Main.game_state.current_phase != "day":
+        if not var.in_game or var.current_phase != "day":
             self.stop_voting()
             return
 
         interval = random.uniform(10, 20)
-        self._voting_timer = threading.Timer(interval, self._voting_tick)
-        self._voting_timer.daemon = True
-        self._voting_timer.start()
+        self._voting_timer = timers.schedule(interval, self._voting_tick, (var,), game_id=var.game_id, threaded=True)
 
-    def _voting_tick(self):
+    def _voting_tick(self, var: GameState):
         """Called by the timer to make an agent vote."""
-        print(f"Agent voting tick.")
+        logging.debug("Agent voting tick")
         if not self.agents:
             self.stop_voting()
             return
 
-        if self.agents:
-            voting_chance = 1 / len(self.agents)
-            for agent in self.agents:
-                if random.random() < voting_chance:
-                    agent.generate_vote()
-                    break
+        voting_chance = 1 / len(self.agents)
+        for agent in self.agents:
+            if random.random() < voting_chance:
+                candidates = var.loop.run(self._vote_candidates, var, agent)
+                if candidates:
+                    choice = agent.generate_vote(candidates)
+                    if choice is not None:
+                        var.loop.post(self._vote, var, agent, choice)
+                break
+
+        var.loop.post(self._schedule_voting, var)
+
+    def _vote_candidates(self, var: GameState, agent: Agent) -> list[str]:
+        """Returns the nicks of the players an agent may vote for."""
+        from src.votes import VOTES
+        if not var.in_game or var.current_phase != "day" or agent.user in VOTES:
+            return []
+        return [player.nick for player in get_players(var) if player is not agent.user]
 
-        self._schedule_voting()
+    def _vote(self, var: GameState, agent: Agent, nick: str):
+        """Makes an agent vote for a player, unless the day is over by now."""
+        if not var.in_game or var.current_phase != "day":
+            return
+        from src.handler import parse_and_dispatch
+        parse_and_dispatch(MessageDispatcher(agent.user, channels.Main), "vote", nick)
 
-    def _schedule_speaking(self):
+    def _schedule_speaking(self, var: GameState):
         """Schedules the next speaking event."""
-        if not channels.Main.game_state or channels.Main.game_state.current_phase != "day":
-            print(f"Stopping speaking timer for agents cause game is not in day phase or game is not active.")
+        if not var.in_game or var.current_phase != "day":
+            logging.debug("Stopping speaking timer for agents, game is no longer in the day phase")
             self.stop_speaking()
             return
 
         # num of players * 3
-        average_interval = int(len(channels.Main.game_state.players) * 3)
+        average_interval = int(len(var.players) * 3)
         interval = random.uniform(average_interval - 3, average_interval + 3)
-        self._speaking_timer = threading.Timer(interval, self._speaking_tick)
-        self._speaking_timer.daemon = True
-        self._speaking_timer.start()
-        print(f"Started speaking timer for agents.")
+        speaking_chance = 1 / len(var.players)
+        self._speaking_timer = timers.schedule(interval, self._speaking_tick, (var, speaking_chance),
+                                               game_id=var.game_id, threaded=True)
+        logging.debug("Started speaking timer for agents")
 
-    def _speaking_tick(self):
+    def _speaking_tick(self, var: GameState, speaking_chance: float):
         """Called by the timer to make an agent speak."""
-        print(f"Agent speaking tick.")
+        logging.debug("Agent speaking tick")
         if not self.agents:
             self.stop_speaking()
             return
 
-        if self.agents:
-            speaking_chance = 1 / len(channels.Main.game_state.players)
-            for agent in self.agents:
-                if random.random() < speaking_chance:
-                    context = history.get_history()
-                    response = agent.generate_response(context)
-                    if response:
-                        logging.info(f"Agent {agent.user.nick} says: {response}")
-                        channels.Main.send(f"<{agent.user.nick}> {response}")
-                    break
-
-        self._schedule_speaking()
+        for agent in self.agents:
+            if random.random() < speaking_chance:
+                context = history.get_history()
+                response = agent.generate_response(context)
+                if response:
+                    var.loop.post(self._speak, var, agent, response)
+                break
+
+        var.loop.post(self._schedule_speaking, var)
+
+    def _speak(self, var: GameState, agent: Agent, response: str):
+        """Sends what an agent said to the channel of its game, unless the day is over by now."""
+        if not var.in_game or var.current_phase != "day":
+            return
+        logging.info(f"Agent {agent.user.nick} says: {response}")
+        channels.Main.send(f"<{agent.user.nick}> {response}")
 
 # Singleton instance
 agent_manager = AgentManager()
@@ -30,7 +30,8 @@ from __future__ import annotations
 
 from collections import defaultdict
 import itertools
-from typing import Iterable, TYPE_CHECKING, Collection
+import operator
+from typing import Callable, Iterable, TYPE_CHECKING, Collection
 
 from src.events import Event, EventListener
 
@@ -38,7 +39,7 @@ if TYPE_CHECKING:
     from src.gamestate import GameState
 
 __all__ = [
-    "get", "get_team", "role_order", "all_cats", "all_roles", "all_teams", "Category",
+    "get", "get_team", "defer", "role_order", "all_cats", "all_roles", "all_teams", "Category",
     "Wolf", "Wolfchat", "Wolfteam", "Killer", "Village", "Nocturnal", "Neutral", "Win_Stealer", "Hidden", "Safe",
     "Spy", "Intuitive", "Cursed", "Innocent", "Team_Switcher", "Wolf_Objective", "Village_Objective",
     "Vampire", "Vampire_Team", "Vampire_Objective", "Hidden_Eligible", "All", "Nobody"
@@ -59,6 +60,17 @@ FROZEN = False
 ROLES: dict[str, Collection[str]] = {}
 TEAMS: set[Category] = set()
 
+# Once frozen, every role is given a bit, and each category is backed by a bitmask of its roles
+# so that combining categories is integer arithmetic rather than set operations
+_BITS: dict[str, int] = {}
+_BIT_ROLES: list[str] = []
+_ROLE_ORDER: tuple[str, ...] = ()
+_TEAM_OF: dict[str, Category] = {}
+
+# Categories defined by role modules which were registered ahead of the module being imported (see src.roles);
+# once categories are frozen, defining one of these again returns the registered category instead of a new one
+_DEFERRED: set[str] = set()
+
 def get(cat: str) -> Category:
     if not FROZEN:
         raise RuntimeError("Fatal: Role categories are not ready")
@@ -69,6 +81,9 @@ def get(cat: str) -> Category:
 def role_order() -> Iterable[str]:
     if not FROZEN:
         raise RuntimeError("Fatal: Role categories are not ready")
+    return _ROLE_ORDER
+
+def _compute_role_order() -> tuple[str, ...]:
     buckets = defaultdict(list)
     for role, tags in ROLES.items():
         for tag in ROLE_ORDER:
@@ -88,7 +103,7 @@ def role_order() -> Iterable[str]:
             if role in roles:
                 roles.remove(role)
                 roles.append(role)
-    return itertools.chain.from_iterable([buckets[tag] for tag in ROLE_ORDER])
+    return tuple(itertools.chain.from_iterable([buckets[tag] for tag in ROLE_ORDER]))
 
 def all_cats() -> dict[str, Category]:
     if not FROZEN:
@@ -122,11 +137,10 @@ def get_team(var: GameState, role: str) -> Category:
         raise RuntimeError("Fatal: Role categories are not ready")
     if Hidden in TEAMS and role in Hidden:
         role = var.hidden_role
-    for team in TEAMS:
-        if role in team:
-            return team
-    else:
-        raise RuntimeError(f"No team defined for role {role}")
+    try:
+        return _TEAM_OF[role]
+    except KeyError:
+        raise RuntimeError(f"No team defined for role {role}") from None
 
 def _register_roles(evt: Event):
     global FROZEN
@@ -151,25 +165,74 @@ def _register_roles(evt: Event):
             ROLE_CATS[cat].roles.add(role)
         All.roles.add(role)
 
+    for bit, role in enumerate(sorted(ROLES)):
+        _BITS[role] = bit
+        _BIT_ROLES.append(role)
     for cat in ROLE_CATS.values():
         cat.freeze()
     FROZEN = True
 
     for cat in teams:
         TEAMS.add(ROLE_CATS[cat])
+    for team in TEAMS:
+        for role in team:
+            _TEAM_OF[role] = team
+
+    global _ROLE_ORDER
+    _ROLE_ORDER = _compute_role_order()
+
+def defer(name: str) -> Category:
+    """Register a category defined by a role module which has not been imported yet.
+
+    :param name: Name of the category
+    :return: The category, which the role module will get when it defines it
+    """
+    if FROZEN:
+        raise RuntimeError("Fatal: Role categories have already been established")
+    _DEFERRED.add(name)
+    return Category(name)
+
+def _mask_of(roles: Iterable[str]) -> int:
+    mask = 0
+    for role in roles:
+        if role not in _BITS:
+            raise ValueError("{0!r} is not a role".format(role))
+        mask |= 1 << _BITS[role]
+    return mask
+
+def _roles_of(mask: int) -> frozenset[str]:
+    roles = []
+    while mask:
+        low = mask & -mask
+        roles.append(_BIT_ROLES[low.bit_length() - 1])
+        mask ^= low
+    return frozenset(roles)
+
+def _difference(first: int, second: int) -> int:
+    return first & ~second
 
 EventListener(_register_roles, priority=1).install("init")
 
 class Category:
     """Base class for role categories."""
 
+    def __new__(cls, name, *, alias=None):
+        if FROZEN and name in _DEFERRED:
+            return ROLE_CATS[name]
+        return super().__new__(cls)
+
     def __init__(self, name, *, alias=None):
+        if FROZEN and name in _DEFERRED:
+            # a role module defining a category registered from the manifest; keep the registered one as it is
+            _DEFERRED.discard(name)
+            return
         if not FROZEN:
             ROLE_CATS[name] = self
             if alias:
                 ROLE_CATS[alias] = self
         self.name = name
         self._roles = set()
+        self._mask = 0
 
     def __len__(self):
         if not FROZEN:
@@ -198,12 +261,13 @@ class Category:
 
     def freeze(self):
         self._roles = frozenset(self._roles)
+        self._mask = _mask_of(self._roles)
 
     def __eq__(self, other):
         if not FROZEN:
             raise RuntimeError("Fatal: Role categories are not ready")
         if isinstance(other, Category):
-            return self._roles == other._roles
+            return self._mask == other._mask
         if isinstance(other, (set, frozenset)):
             return self._roles == other
         if isinstance(other, str):
@@ -223,7 +287,7 @@ class Category:
         return "Role category: {0}".format(self.name)
 
     def __invert__(self):
-        new = self.from_combination(All, self, "", set.difference_update)
+        new = self.from_combination(All, self, "", _difference)
         if self.name in ROLE_CATS:
             name = "~{0}".format(self.name)
         else:
@@ -232,28 +296,24 @@ class Category:
         return new
 
     @classmethod
-    def from_combination(cls, first, second, op, func):
+    def from_combination(cls, first, second, op, func: Callable[[int, int], int]):
         if not FROZEN:
             raise RuntimeError("Fatal: Role categories are not ready")
         if isinstance(second, (Category, set, frozenset, _dict_keys)):
-            for cont in (first, second):
-                for role in cont:
-                    if role not in ROLES:
-                        raise ValueError("{0!r} is not a role".format(role))
+            masks = [cont._mask if isinstance(cont, Category) else _mask_of(cont) for cont in (first, second)]
             name = "{0} {1} {2}".format(first, op, second)
             self = cls(name)
-            self._roles.update(first)
-            func(self._roles, second)
-            self._roles = frozenset(self._roles)
+            self._mask = func(*masks)
+            self._roles = _roles_of(self._mask)
             return self
         return NotImplemented
 
-    __add__ = __radd__  = lambda self, other: self.from_combination(self, other, "+", set.update)
-    __or__  = __ror__   = lambda self, other: self.from_combination(self, other, "|", set.update)
-    __and__ = __rand__  = lambda self, other: self.from_combination(self, other, "&", set.intersection_update)
-    __xor__ = __rxor__  = lambda self, other: self.from_combination(self, other, "^", set.symmetric_difference_update)
-    __sub__             = lambda self, other: self.from_combination(self, other, "-", set.difference_update)
-    __rsub__            = lambda self, other: self.from_combination(other, self, "-", set.difference_update)
+    __add__ = __radd__  = lambda self, other: self.from_combination(self, other, "+", operator.or_)
+    __or__  = __ror__   = lambda self, other: self.from_combination(self, other, "|", operator.or_)
+    __and__ = __rand__  = lambda self, other: self.from_combination(self, other, "&", operator.and_)
+    __xor__ = __rxor__  = lambda self, other: self.from_combination(self, other, "^", operator.xor)
+    __sub__             = lambda self, other: self.from_combination(self, other, "-", _difference)
+    __rsub__            = lambda self, other: self.from_combination(other, self, "-", _difference)
 
 # For proper auto-completion support in IDEs, please do not try to "save space" by turning this into a loop
 # and dynamically creating globals.
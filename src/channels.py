@@ -8,18 +8,31 @@ import logging
 
 from src.context import IRCContext, Features, lower
 from src.events import Event, EventListener
-from src import users, config
+from src import users, config, metrics
 from src.debug import CheckedSet, CheckedDict
 from src.users import User, BotUser
 
 if TYPE_CHECKING:
     # gamestate depends on channels; can't turn this into a top-level import
     from src.gamestate import GameState
+    from src.gameloop import GameLoop
+    Main: Channel
 
-Main: Channel = None # type: ignore[assignment]
 Dummy: Channel = None # type: ignore[assignment]
 
 _channels: CheckedDict[str, Channel] = CheckedDict("channels._channels")
+_main: Optional[Channel] = None
+_game_channels: list[Channel] = []
+
+def __getattr__(name: str):
+    # Main is the channel of the game whose loop we're running on, or the primary game channel anywhere else
+    if name == "Main":
+        from src.gameloop import current
+        loop = current()
+        if loop is not None and loop.channel is not None:
+            return loop.channel
+        return _main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class _States(Enum):
     NotJoined = "not yet joined"
@@ -70,6 +83,37 @@ def add(name, cli, key="", prefix=""):
     chan.join(key=key)
     return chan
 
+def add_game_channel(chan: Channel, *, primary: bool = False):
+    """Allow games to be played in a channel.
+
+    Each game channel runs its games on a game loop of its own, so games in different channels
+    run independently of each other.
+
+    :param chan: Channel to allow games in
+    :param primary: Whether this is the main game channel, which is what Main refers to outside of game loops
+    """
+    global _main
+    if chan.loop is None:
+        from src.gameloop import GameLoop
+        chan.loop = GameLoop(chan.name, channel=chan)
+        _game_channels.append(chan)
+    if primary:
+        _main = chan
+
+def game_channels() -> list[Channel]:
+    """Return every channel games can be played in."""
+    return list(_game_channels)
+
+def _games_active() -> int:
+    return sum(1 for chan in _game_channels if chan.game_state is not None and chan.game_state.in_game)
+
+def _players_active() -> int:
+    # players who have joined a game which hasn't started yet count too; players who died don't
+    return sum(len(chan.game_state.players) for chan in _game_channels if chan.game_state is not None)
+
+metrics.gauge("games_active", "Games currently being played", callback=_games_active)
+metrics.gauge("players_active", "Players currently alive in a game, or waiting for one to start", callback=_players_active)
+
 def exists(name):
     """Return True if a channel by the name exists, False otherwise."""
     return _normalize(name) in _channels
@@ -96,6 +140,7 @@ class Channel(IRCContext):
         self.timestamp = None
         self.state = _States.NotJoined
         self.game_state: Optional[GameState] = None
+        self.loop: Optional[GameLoop] = None
         self._pending = []
         self._key = ""
 
@@ -115,7 +160,7 @@ class Channel(IRCContext):
         elif format_spec in ("for_tb", "for_tb_verbose"):
             channel_data_level = config.Main.get("telemetry.errors.channel_data_level")
             if channel_data_level == 0:
-                if self is Main:
+                if self is _main:
                     value = "Main"
                 elif self is Dummy:
                     value = "Dummy"
@@ -167,7 +167,10 @@ class Config:
                     meta = untagged[0]
                     meta_type = meta["_type"]
             if meta_type == "tagged":
-                new_meta = copy.deepcopy(meta["_tags"][cur["type"]])
+                # only _default is modified, so copying the two outer levels is enough;
+                # a deep copy of the tag's metadata would make every lookup below it expensive
+                new_meta = dict(meta["_tags"][cur["type"]])
+                new_meta["_default"] = dict(new_meta["_default"])
                 new_meta["_default"]["type"] = {"_type": "enum", "_values": list(meta["_tags"].keys())}
                 meta = new_meta
 
@@ -86,11 +86,12 @@ class Container(ABC):
         super(Container, self).clear()
 
 class UserList(Container, List[User]):
+    __slots__ = ()
+
     def __init__(self, iterable=()):
         super().__init__()
         try:
-            for item in iterable:
-                self.append(item)
+            self.extend(iterable)
         except:
             self.clear()
             raise
@@ -116,8 +117,7 @@ class UserList(Container, List[User]):
         if item not in self:
             item.lists.remove(self)
 
-        if self not in value.lists:
-            value.lists.append(self)
+        value.lists.add(self)
 
     def __delitem__(self, index):
         item = self[index]
@@ -131,21 +131,24 @@ class UserList(Container, List[User]):
         if not isinstance(item, User):
             raise TypeError("UserList may only contain User instances")
 
-        if self not in item.lists:
-            item.lists.append(self)
-
+        item.lists.add(self)
         super().append(item)
 
     def clear(self):
         for item in self:
-            if self in item.lists:
-                item.lists.remove(self)
+            item.lists.discard(self)
 
         super().clear()
 
     def extend(self, iterable):
-        for item in iterable:
-            self.append(item)
+        items = list(iterable)
+        for item in items:
+            if not isinstance(item, User):
+                raise TypeError("UserList may only contain User instances")
+
+        for item in items:
+            item.lists.add(self)
+        super().extend(items)
 
     def insert(self, index, item):
         if not isinstance(item, User):
@@ -155,8 +158,7 @@ class UserList(Container, List[User]):
 
         # If it didn't work, we don't get here
 
-        if self not in item.lists:
-            item.lists.append(self)
+        item.lists.add(self)
 
     def pop(self, index=-1):
         item = super().pop(index)
@@ -173,11 +175,12 @@ class UserList(Container, List[User]):
             item.lists.remove(self)
 
 class UserSet(Container, Set[User]):
+    __slots__ = ()
+
     def __init__(self, iterable=()):
         super().__init__()
         try:
-            for item in iterable:
-                self.add(item)
+            self.update(iterable)
         except:
             self.clear()
             raise
@@ -224,7 +227,7 @@ class UserSet(Container, Set[User]):
             if not isinstance(item, User):
                 raise TypeError("UserSet may only contain User instances")
 
-            item.sets.append(self)
+            item.sets.add(self)
             super().add(item)
 
     def clear(self):
@@ -237,23 +240,23 @@ class UserSet(Container, Set[User]):
         return type(self)(super().difference(iterable))
 
     def difference_update(self, iterable):
-        for item in iterable:
-            if item in self:
-                self.remove(item)
+        items = {item for item in iterable if item in self}
+        for item in items:
+            item.sets.remove(self)
+        super().difference_update(items)
 
     def discard(self, item):
         if item in self:
             item.sets.remove(self)
-
-        super().discard(item)
+            super().discard(item)
 
     def intersection(self, iterable):
         return type(self)(super().intersection(iterable))
 
     def intersection_update(self, iterable):
-        for item in set(self):
-            if item not in iterable:
-                self.remove(item)
+        if not isinstance(iterable, (set, frozenset)):
+            iterable = set(iterable)
+        self.difference_update([item for item in self if item not in iterable])
 
     def pop(self):
         item = super().pop()
@@ -279,11 +282,18 @@ class UserSet(Container, Set[User]):
         return type(self)(super().union(iterable))
 
     def update(self, iterable):
-        for item in iterable:
-            if item not in self:
-                self.add(item)
+        items = {item for item in iterable if item not in self}
+        for item in items:
+            if not isinstance(item, User):
+                raise TypeError("UserSet may only contain User instances")
+
+        for item in items:
+            item.sets.add(self)
+        super().update(items)
 
 class UserDict(Container, Dict[KT, VT], Generic[KT, VT]):
+    __slots__ = ()
+
     def __init__(self, _it=(), **kwargs):
         super().__init__()
         if hasattr(_it, "items"):
@@ -330,12 +340,10 @@ class UserDict(Container, Dict[KT, VT], Generic[KT, VT]):
                 old.dict_values.remove(self)
 
         if isinstance(item, User):
-            if self not in item.dict_keys:
-                item.dict_keys.append(self)
+            item.dict_keys.add(self)
 
         if isinstance(value, User):
-            if self not in value.dict_values:
-                value.dict_values.append(self)
+            value.dict_values.add(self)
 
     def __delitem__(self, item):
         if isinstance(item, slice): # special-case: delete if it exists, otherwise don't
@@ -361,8 +369,7 @@ class UserDict(Container, Dict[KT, VT], Generic[KT, VT]):
             if isinstance(key, User):
                 key.dict_keys.remove(self)
             if isinstance(value, User):
-                if self in value.dict_values:
-                    value.dict_values.remove(self)
+                value.dict_values.discard(self)
 
             if isinstance(value, (UserList, UserSet, UserDict)):
                 value.clear()
@@ -376,8 +383,7 @@ class UserDict(Container, Dict[KT, VT], Generic[KT, VT]):
     def pop(self, key, *default):
         value = super().pop(key, *default)
         if isinstance(key, User):
-            if self in key.dict_keys:
-                key.dict_keys.remove(self)
+            key.dict_keys.discard(self)
         if isinstance(value, User):
             if value not in self.values():
                 value.dict_values.remove(self)
@@ -404,6 +410,8 @@ class UserDict(Container, Dict[KT, VT], Generic[KT, VT]):
             self[key] = value
 
 class DefaultUserDict(UserDict[KT, VT], Generic[KT, VT]):
+    __slots__ = ("factory",)
+
     def __init__(self, _factory, _it=(), **kwargs):
         self.factory = _factory
         super().__init__(_it, **kwargs)
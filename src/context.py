@@ -6,7 +6,7 @@ from collections import defaultdict, OrderedDict
 from typing import Any, Optional
 
 from oyoyo.client import IRCClient
-from src import config
+from src import config, latency
 from src.messages.message import Message
 
 class _NotLoggedIn:
@@ -302,7 +302,12 @@ class IRCContext:
             first = ""
         if sep is None:
             sep = " "
-        _send(new, first, sep, self.client, send_type, name, send_chan)
+        recording = latency.track("irc")
+        try:
+            _send(new, first, sep, self.client, send_type, name, send_chan)
+        finally:
+            if recording is not None:
+                recording.pop()
 
     @property
     def prefix(self):
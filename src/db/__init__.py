@@ -1,5 +1,10 @@
 from __future__ import annotations
 
+import atexit
+import functools
+import itertools
+import logging
+import queue
 import sqlite3
 import os
 import json
@@ -8,24 +13,26 @@ import sys
 import time
 import threading
 from collections import defaultdict
+from concurrent.futures import Future, wait
 from datetime import datetime
+from typing import Optional
 
-from src import users
+from src import config, latency, metrics, users
 from src.messages import messages
 from src.cats import role_order
 
-__all__ = ["init_vars", "decrement_stasis", "set_stasis", "get_template", "get_templates", "update_template",
+__all__ = ["init_vars", "refresh_account", "refresh_sanctions", "refresh_access", "decrement_stasis", "set_stasis", "get_template", "get_templates", "update_template",
            "delete_template", "toggle_deadchat", "toggle_notice", "set_pingif", "set_warning", "set_primary_player",
            "set_pre_restart_state", "set_access", "get_pre_restart_state", "get_warning", "get_warning_points",
            "get_game_stats", "get_role_stats", "get_role_totals", "get_game_totals", "get_player_totals",
            "get_warning_sanctions", "get_player_stats", "add_warning", "add_warning_sanction", "acknowledge_warning",
            "add_game", "list_all_warnings", "list_warnings", "del_warning", "has_unacknowledged_warnings",
-           "expire_tempbans", "expire_stasis", "PREFER_NOTICE", "STASISED", "PING_IF_PREFS", "PING_IF_NUMS",
+           "expire_tempbans", "expire_stasis", "close", "flush", "check_stats", "rebuild_stats", "PREFER_NOTICE", "STASISED", "PING_IF_PREFS", "PING_IF_NUMS",
            "DEADCHAT_PREFS", "FLAGS", "DENY", "ALL_FLAGS"]
 
 # increment this whenever making a schema change so that the schema upgrade functions run on start
 # they do not run by default for performance reasons
-SCHEMA_VERSION = 12
+SCHEMA_VERSION = 14
 
 # Constant of all the flags that the bot uses
 # This is not meant to be modified
@@ -46,6 +53,54 @@ ALL_FLAGS = {
     "w": "control over waiting times",
 }
 
+# Summary tables maintained by add_game, along with the columns they hold and the query
+# that computes their full contents from the game tables (used to backfill and check them)
+_STATS_TABLES = {
+    "game_stats": ("gamemode, gamesize, winner, games",
+                   """SELECT gamemode, gamesize, winner, COUNT(1)
+                      FROM game
+                      GROUP BY gamemode, gamesize, winner"""),
+    "person_stats": ("person, games, counted_games, won_games",
+                     """SELECT
+                          pl.person,
+                          COUNT(DISTINCT gp.game),
+                          COUNT(DISTINCT CASE WHEN gp.count_game THEN gp.game END),
+                          SUM(gp.count_game AND (gp.team_win OR gp.indiv_win))
+                        FROM game_player gp
+                        JOIN player pl
+                          ON pl.id = gp.player
+                        GROUP BY pl.person"""),
+    "person_role_stats": ("person, role, team_wins, indiv_wins, overall_wins, counted, total",
+                          """SELECT
+                               pl.person,
+                               gpr.role,
+                               SUM(gp.count_game AND gp.team_win),
+                               SUM(gp.count_game AND gp.indiv_win),
+                               SUM(gp.count_game AND (gp.team_win OR gp.indiv_win)),
+                               SUM(gp.count_game),
+                               COUNT(1)
+                             FROM game_player gp
+                             JOIN player pl
+                               ON pl.id = gp.player
+                             JOIN game_player_role gpr
+                               ON gpr.game_player = gp.id
+                             GROUP BY pl.person, gpr.role"""),
+    "role_stats": ("role, gamemode, team_wins, indiv_wins, overall_wins, total",
+                   """SELECT
+                        gpr.role,
+                        g.gamemode,
+                        SUM(gp.team_win),
+                        SUM(gp.indiv_win),
+                        SUM(gp.team_win OR gp.indiv_win),
+                        COUNT(1)
+                      FROM game g
+                      JOIN game_player gp
+                        ON gp.game = g.id
+                      JOIN game_player_role gpr
+                        ON gpr.game_player = gp.id
+                      GROUP BY gpr.role, g.gamemode"""),
+}
+
 # variables accessible outside of the module that hold current db state
 # These track accounts by string account name instead of User instances because the latter can only track online users
 
@@ -57,74 +112,360 @@ DEADCHAT_PREFS: set[str] = set()
 FLAGS: defaultdict[str, str] = defaultdict(str)
 DENY: defaultdict[str, set[str]] = defaultdict(set)
 
+# Refreshes build new containers and then swap them in, each with a single assignment, so that other threads
+# never see them half loaded; this lock keeps refreshes from swapping in over each other's changes
+_prefs_lock = threading.Lock()
+
+# account name (as given) -> (person id, player id), so that repeat lookups skip the casemapping queries
+_IDS: dict[str, tuple[int, int]] = {}
+
 _ts = threading.local()
 
+# Writes are handed off to a single writer thread (see _write below), which commits whatever
+# has queued up since its last commit as one transaction
+_write_queue: queue.SimpleQueue = queue.SimpleQueue()
+_writer: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+_MAX_WRITE_BATCH = 100
+
+def _write(func):
+    """Decorator for functions that modify the database.
+
+    Calling the decorated function queues it to run on the writer thread and returns a Future
+    for its result, so the caller does not wait for the write to hit the disk. Callers which need
+    the result can wait on the Future. Reads made afterwards by the same thread will block until
+    that thread's queued writes have been committed, so they always see their own writes.
+
+    If write-behind is disabled in config (or we're already on the writer thread), the function
+    runs immediately and the returned Future is already completed.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        fut = Future()
+        recording = latency.track("db")
+        try:
+            if threading.current_thread() is _writer or not config.Main.get("database.write_behind"):
+                fut.set_running_or_notify_cancel()
+                fut.set_result(func(*args, **kwargs))
+                return fut
+
+            _start_writer()
+            _write_queue.put((fut, func, args, kwargs))
+            _ts.pending = fut
+            return fut
+        finally:
+            if recording is not None:
+                recording.pop()
+
+    return wrapper
+
+def _start_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_writer_loop, name="db-writer", daemon=True)
+            _writer.start()
+
+def _writer_loop():
+    conn = _conn()
+    stop = False
+    while not stop:
+        batch = [_write_queue.get()]
+        while len(batch) < _MAX_WRITE_BATCH:
+            try:
+                batch.append(_write_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        stop = None in batch
+        jobs = [item for item in batch if item is not None and item[0].set_running_or_notify_cancel()]
+        try:
+            _run_batch(conn, jobs)
+        except Exception as e:
+            # the batch as a whole failed (most likely on commit), so none of it was written
+            logging.getLogger("exception.{}".format(type(e).__name__)).exception("Database write failed")
+            if conn.in_transaction:
+                conn.rollback()
+            _IDS.clear()
+            for fut, *_ in jobs:
+                if not fut.done():
+                    fut.set_exception(e)
+
+    close()
+
+def _run_batch(conn, jobs):
+    done = []
+    conn.execute("BEGIN")
+    for fut, func, args, kwargs in jobs:
+        # each write gets its own savepoint so that a failure only discards that write
+        conn.execute("SAVEPOINT write")
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            logging.getLogger("exception.{}".format(type(e).__name__)).exception("Database write failed")
+            fut.set_exception(e)
+            # accounts created by the rolled back writes may be cached already
+            _IDS.clear()
+            if not conn.in_transaction:
+                # sqlite rolled back the entire transaction, so everything before this is gone too
+                for f, _ in done:
+                    f.set_exception(e)
+                done.clear()
+                conn.execute("BEGIN")
+                continue
+            conn.execute("ROLLBACK TO write")
+            conn.execute("RELEASE write")
+        else:
+            conn.execute("RELEASE write")
+            done.append((fut, result))
+
+    sqlite3.Connection.commit(conn)
+    for fut, result in done:
+        fut.set_result(result)
+
+QUERY_SECONDS = metrics.histogram("db_query_seconds", "Time taken to run database queries, by the kind of statement", ("statement",))
+
+def _metered(func):
+    @functools.wraps(func)
+    def wrapper(self, sql, *args):
+        if not metrics.enabled:
+            return func(self, sql, *args)
+        started = time.perf_counter()
+        try:
+            return func(self, sql, *args)
+        finally:
+            statement = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+            QUERY_SECONDS.observe(time.perf_counter() - started, statement)
+    return wrapper
+
+class _Cursor(sqlite3.Cursor):
+    execute = _metered(sqlite3.Cursor.execute)
+    executemany = _metered(sqlite3.Cursor.executemany)
+
+class _Connection(sqlite3.Connection):
+    # queries are timed for the metrics exporter, whichever of the connection or a cursor they are run through
+    execute = _metered(sqlite3.Connection.execute)
+    executemany = _metered(sqlite3.Connection.executemany)
+
+    def cursor(self, factory=_Cursor):
+        return super().cursor(factory)
+
+class _WriterConnection(_Connection):
+    # writes on the writer thread share a transaction which _writer_loop commits once per batch
+    def commit(self):
+        pass
+
+def flush(timeout: Optional[float] = None):
+    """Wait until every database write queued so far has been committed.
+
+    :param timeout: Maximum number of seconds to wait, or None to wait indefinitely
+    :raises TimeoutError: If the writes did not complete in time
+    """
+    if _writer is None or threading.current_thread() is _writer:
+        return
+    _write(lambda: None)().result(timeout)
+
+_PREFS_SQL = """SELECT
+                 pl.account_display,
+                 pe.notice,
+                 pe.deadchat,
+                 pe.pingif,
+                 pe.stasis_amount,
+                 pe.stasis_expires,
+                 COALESCE(at.flags, a.flags)
+               FROM person pe
+               JOIN player pl
+                 ON pl.person = pe.id
+               LEFT JOIN access a
+                 ON a.person = pe.id
+               LEFT JOIN access_template at
+                 ON at.id = a.template
+               WHERE pl.active = 1{0}"""
+
+_DENY_SQL = """SELECT
+                pl.account_display,
+                ws.data
+              FROM warning w
+              JOIN warning_sanction ws
+                ON ws.warning = w.id
+              JOIN person pe
+                ON pe.id = w.target
+              JOIN player pl
+                ON pl.person = pe.id
+              WHERE
+                ws.sanction = 'deny command'
+                AND w.deleted = 0
+                AND (
+                  w.expires IS NULL
+                  OR w.expires > datetime('now')
+                ){0}"""
+
 def init_vars():
-    from src.context import lower
+    """Reload every cached account from the database.
+
+    This reads the entire person table, so prefer refresh_account() (or refresh_sanctions()
+    and refresh_access()) when only some accounts or values are known to have changed.
+    """
     conn = _conn()
     c = conn.cursor()
-    c.execute("""SELECT
-                   pl.account_display,
-                   pe.notice,
-                   pe.deadchat,
-                   pe.pingif,
-                   pe.stasis_amount,
-                   pe.stasis_expires,
-                   COALESCE(at.flags, a.flags)
-                 FROM person pe
-                 JOIN player pl
-                   ON pl.person = pe.id
-                 LEFT JOIN access a
-                   ON a.person = pe.id
-                 LEFT JOIN access_template at
-                   ON at.id = a.template
-                 WHERE pl.active = 1""")
 
-    PREFER_NOTICE.clear()
-    STASISED.clear()
-    PING_IF_PREFS.clear()
-    PING_IF_NUMS.clear()
-    DEADCHAT_PREFS.clear()
-    FLAGS.clear()
-    DENY.clear()
+    prefs = _Prefs()
+    prefs.load(_fetch_prefs(c))
+    prefs.load_deny(_fetch_deny(c))
+    with _prefs_lock:
+        _IDS.clear()
+        prefs.publish()
 
-    for acc, notice, dc, pi, stasis, stasisexp, flags in c:
-        if acc is not None:
-            lacc = lower(acc)
-            if notice == 1:
-                PREFER_NOTICE.add(lacc)
-            if stasis > 0:
-                STASISED[lacc] = stasis
-            if pi is not None and pi > 0:
-                PING_IF_PREFS[lacc] = pi
-                PING_IF_NUMS[pi].add(lacc)
-            if dc == 1:
-                DEADCHAT_PREFS.add(lacc)
-            if flags:
-                FLAGS[lacc] = flags
+def refresh_account(acc):
+    """Reload the cached preferences of a single account.
 
-    c.execute("""SELECT
-                   pl.account_display,
-                   ws.data
-                 FROM warning w
-                 JOIN warning_sanction ws
-                   ON ws.warning = w.id
-                 JOIN person pe
-                   ON pe.id = w.target
+    Every account linked to the same person is refreshed alongside it.
+    """
+    peid, plid = _get_ids(acc)
+    if peid is not None:
+        _refresh_person(peid)
+
+def refresh_sanctions():
+    """Reload stasis and command denials, the cached values which lapse over time."""
+    global STASISED, DENY
+    from src.context import lower
+    conn = _conn()
+    c = conn.cursor()
+    c.execute("""SELECT pl.account_display, pe.stasis_amount
+                 FROM person pe
                  JOIN player pl
                    ON pl.person = pe.id
                  WHERE
-                   ws.sanction = 'deny command'
-                   AND w.deleted = 0
-                   AND (
-                     w.expires IS NULL
-                     OR w.expires > datetime('now')
-                   )""")
-    for acc, command in c:
+                   pl.active = 1
+                   AND pe.stasis_amount > 0""")
+    stasised = defaultdict(int)
+    for acc, stasis in c:
         if acc is not None:
-            lacc = lower(acc)
-            DENY[lacc].add(command)
+            stasised[lower(acc)] = stasis
+
+    prefs = _Prefs()
+    prefs.load_deny(_fetch_deny(c))
+    with _prefs_lock:
+        STASISED = stasised
+        DENY = prefs.deny
 
+def refresh_access():
+    """Reload the cached access flags of every account."""
+    global FLAGS
+    from src.context import lower
+    conn = _conn()
+    c = conn.cursor()
+    c.execute("""SELECT pl.account_display, COALESCE(at.flags, a.flags)
+                 FROM access a
+                 JOIN player pl
+                   ON pl.person = a.person
+                 LEFT JOIN access_template at
+                   ON at.id = a.template
+                 WHERE pl.active = 1""")
+    flags = defaultdict(str)
+    for acc, value in c:
+        if acc is not None and value:
+            flags[lower(acc)] = value
+    with _prefs_lock:
+        FLAGS = flags
+
+def _refresh_person(peid, old_accounts=()):
+    conn = _conn()
+    c = conn.cursor()
+    accounts = _person_accounts(c, peid)
+    rows = _fetch_prefs(c, " AND pe.id = ?", (peid,))
+    deny = _fetch_deny(c, " AND pe.id = ?", (peid,))
+    with _prefs_lock:
+        prefs = _Prefs.current()
+        for lacc in itertools.chain(accounts, old_accounts):
+            prefs.forget(lacc)
+        prefs.load(rows)
+        prefs.load_deny(deny)
+        prefs.publish()
+
+def _person_accounts(c, peid):
+    from src.context import lower
+    c.execute("SELECT account_display FROM player WHERE person = ?", (peid,))
+    return [lower(acc) for (acc,) in c.fetchall() if acc is not None]
+
+def _fetch_prefs(c, cond="", params=()):
+    c.execute(_PREFS_SQL.format(cond), params)
+    return c.fetchall()
+
+def _fetch_deny(c, cond="", params=()):
+    c.execute(_DENY_SQL.format(cond), params)
+    return c.fetchall()
+
+class _Prefs:
+    """A set of the cached account preferences, which publish() makes the current one."""
+    __slots__ = ("notice", "stasised", "pingif", "pingif_nums", "deadchat", "flags", "deny")
+
+    def __init__(self):
+        self.notice: set[str] = set()
+        self.stasised: defaultdict[str, int] = defaultdict(int)
+        self.pingif: defaultdict[str, int] = defaultdict(int)
+        self.pingif_nums: defaultdict[int, set[str]] = defaultdict(set)
+        self.deadchat: set[str] = set()
+        self.flags: defaultdict[str, str] = defaultdict(str)
+        self.deny: defaultdict[str, set[str]] = defaultdict(set)
+
+    @classmethod
+    def current(cls) -> _Prefs:
+        """Copy the current preferences, so that they can be changed without anyone seeing it until published."""
+        prefs = cls()
+        prefs.notice.update(PREFER_NOTICE)
+        prefs.stasised.update(STASISED)
+        prefs.pingif.update(PING_IF_PREFS)
+        prefs.pingif_nums.update((num, set(accs)) for num, accs in PING_IF_NUMS.items())
+        prefs.deadchat.update(DEADCHAT_PREFS)
+        prefs.flags.update(FLAGS)
+        prefs.deny.update((acc, set(commands)) for acc, commands in DENY.items())
+        return prefs
+
+    def publish(self):
+        global PREFER_NOTICE, STASISED, PING_IF_PREFS, PING_IF_NUMS, DEADCHAT_PREFS, FLAGS, DENY
+        PREFER_NOTICE = self.notice
+        STASISED = self.stasised
+        PING_IF_PREFS = self.pingif
+        PING_IF_NUMS = self.pingif_nums
+        DEADCHAT_PREFS = self.deadchat
+        FLAGS = self.flags
+        DENY = self.deny
+
+    def forget(self, lacc):
+        self.notice.discard(lacc)
+        self.stasised.pop(lacc, None)
+        pi = self.pingif.pop(lacc, None)
+        if pi is not None:
+            self.pingif_nums[pi].discard(lacc)
+        self.deadchat.discard(lacc)
+        self.flags.pop(lacc, None)
+        self.deny.pop(lacc, None)
+
+    def load(self, rows):
+        from src.context import lower
+        for acc, notice, dc, pi, stasis, stasisexp, flags in rows:
+            if acc is not None:
+                lacc = lower(acc)
+                if notice == 1:
+                    self.notice.add(lacc)
+                if stasis > 0:
+                    self.stasised[lacc] = stasis
+                if pi is not None and pi > 0:
+                    self.pingif[lacc] = pi
+                    self.pingif_nums[pi].add(lacc)
+                if dc == 1:
+                    self.deadchat.add(lacc)
+                if flags:
+                    self.flags[lacc] = flags
+
+    def load_deny(self, rows):
+        from src.context import lower
+        for acc, command in rows:
+            if acc is not None:
+                self.deny[lower(acc)].add(command)
+
+@_write
 def decrement_stasis(acc=None):
     peid, plid = _get_ids(acc)
     if acc is not None and peid is None:
@@ -140,6 +481,7 @@ def decrement_stasis(acc=None):
     c.execute(sql, params)
     conn.commit()
 
+@_write
 def set_stasis(newamt, acc=None, relative=False):
     peid, plid = _get_ids(acc, add=True)
     _set_stasis(int(newamt), peid, relative)
@@ -173,6 +515,7 @@ def _set_stasis(newamt, peid, relative=False):
 
     conn.commit()
 
+@_write
 def expire_stasis():
     conn = _conn()
     c = conn.cursor()
@@ -203,6 +546,7 @@ def get_templates():
         tpls.append((name, flags))
     return tpls
 
+@_write
 def update_template(name, flags):
     conn = _conn()
     tid, _ = get_template(name)
@@ -213,6 +557,7 @@ def update_template(name, flags):
         c.execute("UPDATE access_template SET flags = ? WHERE id = ?", (flags, tid))
     conn.commit()
 
+@_write
 def delete_template(name):
     conn = _conn()
     tid, _ = get_template(name)
@@ -222,6 +567,7 @@ def delete_template(name):
         c.execute("DELETE FROM access_template WHERE id = ?", (tid,))
     conn.commit()
 
+@_write
 def set_access(acc, flags=None, tid=None):
     peid, plid = _get_ids(acc, add=True)
     if peid is None:
@@ -241,15 +587,19 @@ def set_access(acc, flags=None, tid=None):
 
     conn.commit()
 
+@_write
 def toggle_notice(acc):
     _toggle_thing("notice", acc)
 
+@_write
 def toggle_deadchat(acc):
     _toggle_thing("deadchat", acc)
 
+@_write
 def set_pingif(val, acc):
     _set_thing("pingif", val, acc, raw=False)
 
+@_write
 def add_game(mode, size, started, finished, winner, players, options):
     """ Adds a game record to the database.
 
@@ -284,19 +634,98 @@ def add_game(mode, size, started, finished, winner, players, options):
     c.execute("""INSERT INTO game (gamemode, options, started, finished, gamesize, winner)
                  VALUES (?, ?, ?, ?, ?, ?)""", (mode, json.dumps(options), started, finished, size, str(winner)))
     gameid = c.lastrowid
-    for p in players:
-        c.execute("""INSERT INTO game_player (game, player, team_win, indiv_win, dced, count_game)
-                     VALUES (?, ?, ?, ?, ?, ?)""", (gameid, p["playerid"], p["team_win"], p["individual_win"], p["dced"], p["count_game"]))
-        gpid = c.lastrowid
-        for role in p["all_roles"]:
-            c.execute("""INSERT INTO game_player_role (game_player, role, special)
-                         VALUES (?, ?, 0)""", (gpid, role))
-        for sq in p["special"]:
-            c.execute("""INSERT INTO game_player_role (game_player, role, special)
-                         VALUES (?, ?, 1)""", (gpid, sq))
+    c.executemany("""INSERT INTO game_player (game, player, team_win, indiv_win, dced, count_game)
+                     VALUES (?, ?, ?, ?, ?, ?)""",
+                  [(gameid, p["playerid"], p["team_win"], p["individual_win"], p["dced"], p["count_game"]) for p in players])
+    # executemany doesn't expose per-row ids, so look them back up;
+    # new rowids are always allocated in increasing order, so these line up with players
+    c.execute("SELECT id FROM game_player WHERE game = ? ORDER BY id", (gameid,))
+    roles = []
+    for p, (gpid,) in zip(players, c.fetchall()):
+        roles.extend((gpid, role, 0) for role in p["all_roles"])
+        roles.extend((gpid, sq, 1) for sq in p["special"])
+    c.executemany("""INSERT INTO game_player_role (game_player, role, special)
+                     VALUES (?, ?, ?)""", roles)
+    _update_stats(c, mode, size, str(winner), players)
 
     conn.commit()
 
+def _update_stats(c, mode, size, winner, players):
+    # keep the summary tables in step with a newly-added game; see _STATS_TABLES for what each column means
+    c.execute("""INSERT INTO game_stats (gamemode, gamesize, winner, games)
+                 VALUES (?, ?, ?, 1)
+                 ON CONFLICT (gamemode, gamesize, winner) DO UPDATE SET games = games + 1""", (mode, size, winner))
+
+    person_totals = {}
+    person_roles = []
+    mode_roles = []
+    for p in players:
+        team = int(bool(p["team_win"]))
+        indiv = int(bool(p["individual_win"]))
+        overall = int(bool(p["team_win"] or p["individual_win"]))
+        counted = int(bool(p["count_game"]))
+        # a person may have played multiple accounts in the same game, but it's still one game for them
+        games, counted_games, won_games = person_totals.get(p["personid"], (1, 0, 0))
+        person_totals[p["personid"]] = (games, counted_games | counted, won_games + (counted and overall))
+        for role in itertools.chain(p["all_roles"], p["special"]):
+            person_roles.append((p["personid"], role, counted and team, counted and indiv, counted and overall, counted))
+            mode_roles.append((role, mode, team, indiv, overall))
+
+    c.executemany("""INSERT INTO person_stats (person, games, counted_games, won_games)
+                     VALUES (?, ?, ?, ?)
+                     ON CONFLICT (person) DO UPDATE SET
+                       games = games + excluded.games,
+                       counted_games = counted_games + excluded.counted_games,
+                       won_games = won_games + excluded.won_games""",
+                  [(peid,) + totals for peid, totals in person_totals.items()])
+    c.executemany("""INSERT INTO person_role_stats (person, role, team_wins, indiv_wins, overall_wins, counted, total)
+                     VALUES (?, ?, ?, ?, ?, ?, 1)
+                     ON CONFLICT (person, role) DO UPDATE SET
+                       team_wins = team_wins + excluded.team_wins,
+                       indiv_wins = indiv_wins + excluded.indiv_wins,
+                       overall_wins = overall_wins + excluded.overall_wins,
+                       counted = counted + excluded.counted,
+                       total = total + 1""", person_roles)
+    c.executemany("""INSERT INTO role_stats (role, gamemode, team_wins, indiv_wins, overall_wins, total)
+                     VALUES (?, ?, ?, ?, ?, 1)
+                     ON CONFLICT (role, gamemode) DO UPDATE SET
+                       team_wins = team_wins + excluded.team_wins,
+                       indiv_wins = indiv_wins + excluded.indiv_wins,
+                       overall_wins = overall_wins + excluded.overall_wins,
+                       total = total + 1""", mode_roles)
+
+@_write
+def rebuild_stats():
+    """Recompute the stats summary tables from scratch."""
+    conn = _conn()
+    c = conn.cursor()
+    _rebuild_stats(c)
+    conn.commit()
+
+def _rebuild_stats(c):
+    for table, (columns, query) in _STATS_TABLES.items():
+        c.execute("DELETE FROM {0}".format(table))
+        c.execute("INSERT INTO {0} ({1}) {2}".format(table, columns, query))
+
+def check_stats():
+    """Compare the stats summary tables against the raw game tables.
+
+    :returns: A list of summary table names which are out of sync. If everything
+        is consistent, the list is empty.
+    """
+    conn = _conn()
+    c = conn.cursor()
+    bad = []
+    for table, (columns, query) in _STATS_TABLES.items():
+        c.execute("SELECT COUNT(1) FROM (SELECT * FROM ({2}) EXCEPT SELECT {1} FROM {0})".format(table, columns, query))
+        missing = c.fetchone()[0]
+        c.execute("SELECT COUNT(1) FROM (SELECT {1} FROM {0} EXCEPT SELECT * FROM ({2}))".format(table, columns, query))
+        extra = c.fetchone()[0]
+        if missing or extra:
+            bad.append(table)
+    return bad
+
+
 def get_player_stats(acc, role):
     peid, plid = _get_ids(acc)
     if not _total_games(peid):
@@ -304,22 +733,16 @@ def get_player_stats(acc, role):
     conn = _conn()
     c = conn.cursor()
     c.execute("""SELECT
-                   gpr.role AS role,
-                   SUM(gp.count_game AND gp.team_win) AS team,
-                   SUM(gp.count_game AND gp.indiv_win) AS indiv,
-                   SUM(gp.count_game AND (gp.team_win OR gp.indiv_win)) AS overall,
-                   SUM(gp.count_game) AS count_total,
-                   COUNT(1) AS total
-                 FROM person pe
-                 JOIN player pl
-                   ON pl.person = pe.id
-                 JOIN game_player gp
-                   ON gp.player = pl.id
-                 JOIN game_player_role gpr
-                   ON gpr.game_player = gp.id
-                   AND gpr.role = ?
-                 WHERE pe.id = ?
-                 GROUP BY role""", (role, peid))
+                   role,
+                   team_wins,
+                   indiv_wins,
+                   overall_wins,
+                   counted,
+                   total
+                 FROM person_role_stats
+                 WHERE
+                   person = ?
+                   AND role = ?""", (peid, role))
     row = c.fetchone()
     name = _get_display_name(peid)
     if row:
@@ -341,37 +764,20 @@ def get_player_totals(acc):
         return messages["db_pstats_no_game"].format(acc), []
     conn = _conn()
     c = conn.cursor()
-    c.execute("""SELECT
-                   gpr.role AS role,
-                   COUNT(1) AS total,
-                   SUM(gp.count_game) AS count_total
-                 FROM person pe
-                 JOIN player pl
-                   ON pl.person = pe.id
-                 JOIN game_player gp
-                   ON gp.player = pl.id
-                 JOIN game_player_role gpr
-                   ON gpr.game_player = gp.id
-                 WHERE pe.id = ?
-                 GROUP BY role""", (peid,))
+    c.execute("""SELECT role, total, counted
+                 FROM person_role_stats
+                 WHERE person = ?""", (peid,))
     tmp = {}
     for row in c:
         tmp[row[0]] = (row[1], row[2])
-    c.execute("""SELECT SUM(gp.count_game AND (gp.team_win OR gp.indiv_win))
-                 FROM game_player gp
-                 JOIN player pl
-                   ON pl.id = gp.player
-                 JOIN person pe
-                   ON pe.id = pl.person
-                 WHERE pe.id = ?""", (peid,))
-    won_games = c.fetchone()[0]
+    c.execute("SELECT counted_games, won_games FROM person_stats WHERE person = ?", (peid,))
+    count_games, won_games = c.fetchone()
     order = list(role_order())
     name = _get_display_name(peid)
     # ordered role stats
     totals = [messages["db_role_games"].format(r, *tmp[r]) for r in order if r in tmp]
     # lover or any other special stats
     totals += [messages["db_role_games"].format(r, *t) for r, t in tmp.items() if r not in order]
-    count_games = _countable_games(peid)
     if count_games == 0:
         wonp = 1
     else:
@@ -383,9 +789,9 @@ def get_game_stats(mode, size):
     c = conn.cursor()
 
     if mode == "*":
-        c.execute("SELECT COUNT(1) FROM game WHERE gamesize = ?", (size,))
+        c.execute("SELECT COALESCE(SUM(games), 0) FROM game_stats WHERE gamesize = ?", (size,))
     else:
-        c.execute("SELECT COUNT(1) FROM game WHERE gamemode = ? AND gamesize = ?", (mode, size))
+        c.execute("SELECT COALESCE(SUM(games), 0) FROM game_stats WHERE gamemode = ? AND gamesize = ?", (mode, size))
 
     total_games = c.fetchone()[0]
     if not total_games:
@@ -394,13 +800,13 @@ def get_game_stats(mode, size):
     if mode == "*":
         c.execute("""SELECT
                        winner AS team,
-                       COUNT(1) AS games,
+                       SUM(games) AS games,
                        CASE winner
                          WHEN 'Villager' THEN 0
                          WHEN 'Wolfteam' THEN 1
                          WHEN 'Vampire Team' THEN 2
                          ELSE 3 END AS ord
-                     FROM game
+                     FROM game_stats
                      WHERE
                        gamesize = ?
                        AND winner IS NOT NULL
@@ -409,18 +815,17 @@ def get_game_stats(mode, size):
     else:
         c.execute("""SELECT
                        winner AS team,
-                       COUNT(1) AS games,
+                       games,
                        CASE winner
                          WHEN 'Villager' THEN 0
                          WHEN 'Wolfteam' THEN 1
                          WHEN 'Vampire Team' THEN 2
                          ELSE 3 END AS ord
-                     FROM game
+                     FROM game_stats
                      WHERE
                        gamemode = ?
                        AND gamesize = ?
                        AND winner IS NOT NULL
-                     GROUP BY team
                      ORDER BY ord, team""", (mode, size))
 
     key = "db_gstats_specific"
@@ -439,9 +844,9 @@ def get_game_totals(mode):
     c = conn.cursor()
 
     if mode == "*":
-        c.execute("SELECT COUNT(1) FROM game")
+        c.execute("SELECT COALESCE(SUM(games), 0) FROM game_stats")
     else:
-        c.execute("SELECT COUNT(1) FROM game WHERE gamemode = ?", (mode,))
+        c.execute("SELECT COALESCE(SUM(games), 0) FROM game_stats WHERE gamemode = ?", (mode,))
 
     total_games = c.fetchone()[0]
     if not total_games:
@@ -452,15 +857,15 @@ def get_game_totals(mode):
     if mode == "*":
         c.execute("""SELECT
                        gamesize,
-                       COUNT(1) AS games
-                     FROM game
+                       SUM(games) AS games
+                     FROM game_stats
                      GROUP BY gamesize
                      ORDER BY gamesize""")
     else:
         c.execute("""SELECT
                        gamesize,
-                       COUNT(1) AS games
-                     FROM game
+                       SUM(games) AS games
+                     FROM game_stats
                      WHERE gamemode = ?
                      GROUP BY gamesize
                      ORDER BY gamesize""", (mode,))
@@ -478,34 +883,25 @@ def get_role_stats(role, mode=None):
 
     if mode is None:
         c.execute("""SELECT
-                   gpr.role AS role,
-                   SUM(gp.team_win) AS team,
-                   SUM(gp.indiv_win) AS indiv,
-                   SUM(gp.team_win OR gp.indiv_win) AS overall,
-                   COUNT(1) AS total
-                 FROM game g
-                 JOIN game_player gp
-                   ON gp.game = g.id
-                 JOIN game_player_role gpr
-                   ON gpr.game_player = gp.id
+                   role,
+                   SUM(team_wins) AS team,
+                   SUM(indiv_wins) AS indiv,
+                   SUM(overall_wins) AS overall,
+                   SUM(total) AS total
+                 FROM role_stats
                  WHERE role = ?
                  GROUP BY role""", (role,))
     else:
         c.execute("""SELECT
-                   gpr.role AS role,
-                   SUM(gp.team_win) AS team,
-                   SUM(gp.indiv_win) AS indiv,
-                   SUM(gp.team_win OR gp.indiv_win) AS overall,
-                   COUNT(1) AS total,
-                   g.gamemode AS gamemode
-                 FROM game g
-                 JOIN game_player gp
-                   ON gp.game = g.id
-                 JOIN game_player_role gpr
-                   ON gpr.game_player = gp.id
+                   role,
+                   team_wins,
+                   indiv_wins,
+                   overall_wins,
+                   total,
+                   gamemode
+                 FROM role_stats
                  WHERE role = ?
-                   AND gamemode = ?
-                 GROUP BY role, gamemode""", (role, mode))
+                   AND gamemode = ?""", (role, mode))
 
     row = c.fetchone()
     if row:
@@ -524,9 +920,9 @@ def get_role_totals(mode=None):
     conn = _conn()
     c = conn.cursor()
     if mode is None:
-        c.execute("SELECT COUNT(1) FROM game")
+        c.execute("SELECT COALESCE(SUM(games), 0) FROM game_stats")
     else:
-        c.execute("SELECT COUNT(1) FROM game WHERE gamemode = ?", (mode,))
+        c.execute("SELECT COALESCE(SUM(games), 0) FROM game_stats WHERE gamemode = ?", (mode,))
     total_games = c.fetchone()[0]
     if not total_games:
         if mode is None:
@@ -535,22 +931,17 @@ def get_role_totals(mode=None):
 
     if mode is None:
         c.execute("""SELECT
-                   gpr.role AS role,
-                  COUNT(1) AS count
-                  FROM game_player_role gpr
+                   role,
+                  SUM(total) AS count
+                  FROM role_stats
                   GROUP BY role
                   ORDER BY count DESC""")
     else:
         c.execute("""SELECT
-                   gpr.role AS role,
-                  COUNT(1) AS count
-                  FROM game_player_role gpr
-                  JOIN game_player gp
-                    ON gp.id = gpr.game_player
-                  JOIN game g
-                    ON g.id = gp.game
-                  WHERE g.gamemode = ?
-                  GROUP BY role
+                   role,
+                  total AS count
+                  FROM role_stats
+                  WHERE gamemode = ?
                   ORDER BY count DESC""", (mode,))
 
     totals = []
@@ -560,6 +951,7 @@ def get_role_totals(mode=None):
         return messages["db_rstats_total"].format(total_games), totals
     return messages["db_rstats_total_mode"].format(mode, total_games), totals
 
+@_write
 def set_primary_player(acc):
     # set acc to be the primary player for the corresponding person
     peid, plid = _get_ids(acc)
@@ -797,6 +1189,7 @@ def get_warning_sanctions(warn_id):
 
     return sanctions
 
+@_write
 def add_warning(tacc, sacc, amount, reason, notes, expires):
     teid, tlid = _get_ids(tacc, add=True)
     seid, slid = _get_ids(sacc)
@@ -820,6 +1213,7 @@ def add_warning(tacc, sacc, amount, reason, notes, expires):
     conn.commit()
     return c.lastrowid
 
+@_write
 def add_warning_sanction(warning, sanction, data):
     conn = _conn()
     c = conn.cursor()
@@ -848,6 +1242,7 @@ def add_warning_sanction(warning, sanction, data):
             c.execute(sql, (plid, data))
         return acclist
 
+@_write
 def del_warning(warning, acc):
     peid, plid = _get_ids(acc)
     conn = _conn()
@@ -864,6 +1259,7 @@ def del_warning(warning, acc):
 
     conn.commit()
 
+@_write
 def set_warning(warning, expires, reason, notes):
     conn = _conn()
     c = conn.cursor()
@@ -873,12 +1269,14 @@ def set_warning(warning, expires, reason, notes):
 
     conn.commit()
 
+@_write
 def acknowledge_warning(warning):
     conn = _conn()
     c = conn.cursor()
     c.execute("UPDATE warning SET acknowledged = 1 WHERE id = ?", (warning,))
     conn.commit()
 
+@_write
 def expire_tempbans():
     conn = _conn()
     idlist = set()
@@ -934,6 +1332,7 @@ def get_data(acc, path=()):
         data = data[p]
     return data
 
+@_write
 def set_data(acc, path, key, value):
     conn = _conn()
     c = conn.cursor()
@@ -973,6 +1372,7 @@ def get_pre_restart_state():
     return players
 
 # noinspection SqlWithoutWhere
+@_write
 def set_pre_restart_state(players):
     if not players:
         return
@@ -987,6 +1387,7 @@ def _upgrade(oldversion):
     have_backup = False
     try:
         print("Creating database backup...", file=sys.stderr)
+        _checkpoint()
         shutil.copyfile("data.sqlite3", "data.sqlite3.bak")
         have_backup = True
         print("Database backup created at data.sqlite3.bak...", file=sys.stderr)
@@ -1058,6 +1459,17 @@ def _upgrade(oldversion):
             # v11 normalization accidentally had Villager instead of Village
             # it's been fixed above, but need to fix existing bots as well
             c.execute("UPDATE game SET winner = 'Village' WHERE winner = 'Villager'")
+        if oldversion < 13:
+            print("Upgrade from version 12 to 13...", file=sys.stderr)
+            # turn the indexes used by the stats commands into covering indexes
+            with open(os.path.join(dn, "upgrade13.sql"), "rt") as f:
+                c.executescript(f.read())
+        if oldversion < 14:
+            print("Upgrade from version 13 to 14...", file=sys.stderr)
+            # add summary tables for the stats commands and backfill them from existing games
+            with open(os.path.join(dn, "upgrade14.sql"), "rt") as f:
+                c.executescript(f.read())
+            _rebuild_stats(c)
 
         print("Rebuilding indexes...", file=sys.stderr)
         c.execute("REINDEX")
@@ -1072,8 +1484,15 @@ def _upgrade(oldversion):
               sep="\n", file=sys.stderr)
         if have_backup:
             try:
+                # the database may be in WAL mode, so close it and drop its WAL first;
+                # otherwise the frames the failed upgrade left there would be replayed onto the backup
+                conn.rollback()
+                close()
+                for suffix in ("-wal", "-shm"):
+                    if os.path.exists("data.sqlite3" + suffix):
+                        os.remove("data.sqlite3" + suffix)
                 shutil.copyfile("data.sqlite3.bak", "data.sqlite3")
-            except OSError:
+            except (OSError, sqlite3.Error):
                 print("An error has occurred while restoring your database backup.",
                       "You can manually move data.sqlite3.bak to data.sqlite3 to restore the original database.",
                       sep="\n", file=sys.stderr)
@@ -1082,6 +1501,7 @@ def _upgrade(oldversion):
 def _migrate():
     # try to make a backup copy of the database
     try:
+        _checkpoint()
         shutil.copyfile("data.sqlite3", "data.sqlite3.bak")
     except OSError:
         pass
@@ -1115,14 +1535,20 @@ def _install():
         c.execute("PRAGMA user_version = " + str(SCHEMA_VERSION))
         conn.commit()
 
-def _get_ids(acc, add=False, casemap="ascii"):
+def _get_ids(acc, add=False):
+    if acc == "*" or acc is None:
+        return None, None
+    ids = _IDS.get(acc)
+    if ids is None:
+        ids = _lookup_ids(acc, add)
+        if ids[0] is not None:
+            _IDS[acc] = ids
+    return ids
+
+def _lookup_ids(acc, add=False, casemap="ascii"):
     from src.context import lower
     conn = _conn()
     c = conn.cursor()
-    if acc == "*":
-        acc = None
-    if acc is None:
-        return None, None
 
     ascii_acc = lower(acc, casemapping="ascii")
     rfc1459_acc = lower(acc, casemapping="rfc1459")
@@ -1143,42 +1569,73 @@ def _get_ids(acc, add=False, casemap="ascii"):
         # Check in order of most restrictive to least restrictive
         # If all three casemappings fail to match, row will still be None
         if casemap == "ascii":
-            peid, plid = _get_ids(strict_acc, add=add, casemap="rfc1459_strict")
+            peid, plid = _lookup_ids(strict_acc, add=add, casemap="rfc1459_strict")
             row = peid, plid, None
         elif casemap == "rfc1459_strict":
-            peid, plid = _get_ids(rfc1459_acc, add=add, casemap="rfc1459")
+            peid, plid = _lookup_ids(rfc1459_acc, add=add, casemap="rfc1459")
             row = peid, plid, None
 
     if row:
         peid, plid, display_acc = row
-        if acc != display_acc:
+        if peid is not None and acc != display_acc:
             # normalize case in the db to what it should be
-            c.execute("""UPDATE player
-                         SET
-                           account_display=?,
-                           account_lower_ascii=?,
-                           account_lower_rfc1459=?,
-                           account_lower_rfc1459_strict=?
-                         WHERE id=?""",
-                      (acc, ascii_acc, rfc1459_acc, strict_acc, row[1]))
-
-            conn.commit()
-            # fix up our vars
-            init_vars()
+            _rename_account(acc, peid, plid).result()
     elif add:
-        c.execute("""INSERT INTO player
-                     (
-                       account_display,
-                       account_lower_ascii,
-                       account_lower_rfc1459,
-                       account_lower_rfc1459_strict
-                     )
-                     VALUES (?, ?, ?, ?)""", (acc, ascii_acc, rfc1459_acc, strict_acc))
-        plid = c.lastrowid
-        c.execute("INSERT INTO person (primary_player) VALUES (?)", (plid,))
-        peid = c.lastrowid
-        c.execute("UPDATE player SET person=? WHERE id=?", (peid, plid))
-        conn.commit()
+        peid, plid = _add_account(acc).result()
+    return peid, plid
+
+@_write
+def _rename_account(acc, peid, plid):
+    from src.context import lower
+    conn = _conn()
+    c = conn.cursor()
+    # the cached vars are keyed by the old name, so drop those along with the new ones
+    old_accounts = _person_accounts(c, peid)
+    c.execute("""UPDATE player
+                 SET
+                   account_display=?,
+                   account_lower_ascii=?,
+                   account_lower_rfc1459=?,
+                   account_lower_rfc1459_strict=?
+                 WHERE id=?""",
+              (acc, lower(acc, casemapping="ascii"), lower(acc, casemapping="rfc1459"),
+               lower(acc, casemapping="strict-rfc1459"), plid))
+    conn.commit()
+    # other spellings of this account are cached against the old display name
+    for key, ids in list(_IDS.items()):
+        if ids[1] == plid:
+            del _IDS[key]
+    # fix up our vars
+    _refresh_person(peid, old_accounts)
+
+@_write
+def _add_account(acc):
+    from src.context import lower
+    conn = _conn()
+    c = conn.cursor()
+    rfc1459_acc = lower(acc, casemapping="rfc1459")
+    # another thread may have added the account while this write was queued
+    c.execute("""SELECT person, id
+                 FROM player
+                 WHERE
+                   account_lower_rfc1459 = ?
+                   AND active = 1""", (rfc1459_acc,))
+    row = c.fetchone()
+    if row:
+        return row
+    c.execute("""INSERT INTO player
+                 (
+                   account_display,
+                   account_lower_ascii,
+                   account_lower_rfc1459,
+                   account_lower_rfc1459_strict
+                 )
+                 VALUES (?, ?, ?, ?)""", (acc, lower(acc, casemapping="ascii"), rfc1459_acc, lower(acc, casemapping="strict-rfc1459")))
+    plid = c.lastrowid
+    c.execute("INSERT INTO person (primary_player) VALUES (?)", (plid,))
+    peid = c.lastrowid
+    c.execute("UPDATE player SET person=? WHERE id=?", (peid, plid))
+    conn.commit()
     return peid, plid
 
 def _get_display_name(peid):
@@ -1198,35 +1655,9 @@ def _total_games(peid):
         return 0
     conn = _conn()
     c = conn.cursor()
-    c.execute("""SELECT COUNT(DISTINCT gp.game)
-                 FROM person pe
-                 JOIN player pl
-                   ON pl.person = pe.id
-                 JOIN game_player gp
-                   ON gp.player = pl.id
-                 WHERE
-                   pe.id = ?""", (peid,))
-    # aggregates without GROUP BY always have exactly one row,
-    # so no need to check for None here
-    return c.fetchone()[0]
-
-def _countable_games(peid):
-    if peid is None:
-        return 0
-    conn = _conn()
-    c = conn.cursor()
-    c.execute("""SELECT COUNT(DISTINCT gp.game)
-                 FROM person pe
-                 JOIN player pl
-                   ON pl.person = pe.id
-                 JOIN game_player gp
-                   ON gp.player = pl.id
-                 WHERE
-                   pe.id = ?
-                   AND gp.count_game = 1""", (peid,))
-    # aggregates without GROUP BY always have exactly one row,
-    # so no need to check for None here
-    return c.fetchone()[0]
+    c.execute("SELECT games FROM person_stats WHERE person = ?", (peid,))
+    row = c.fetchone()
+    return row[0] if row else 0
 
 def _set_thing(thing, val, acc, raw=False):
     conn = _conn()
@@ -1244,20 +1675,71 @@ def _toggle_thing(thing, acc):
     _set_thing(thing, "CASE {0} WHEN 1 THEN 0 ELSE 1 END".format(thing), acc, raw=True)
 
 def _conn():
+    pending = getattr(_ts, "pending", None)
+    if pending is not None:
+        # writes run in order, so once this thread's latest write is done all of its earlier ones are too
+        _ts.pending = None
+        recording = latency.track("db")
+        try:
+            wait((pending,))
+        finally:
+            if recording is not None:
+                recording.pop()
     try:
         return _ts.conn
     except AttributeError:
-        _ts.conn = sqlite3.connect("data.sqlite3")
-        c = _ts.conn.cursor()
-        c.execute("PRAGMA foreign_keys = ON")
-        _ts.conn.commit()
+        _ts.conn = _connect()
         return _ts.conn
 
+def _connect():
+    # Connections are per-thread; sqlite3 caches prepared statements on each connection,
+    # so the size of that cache is what determines how often we re-prepare our queries
+    conn = sqlite3.connect("data.sqlite3",
+                           timeout=config.Main.get("database.busy_timeout"),
+                           cached_statements=config.Main.get("database.cached_statements"),
+                           factory=_WriterConnection if threading.current_thread() is _writer else _Connection)
+    c = conn.cursor()
+    c.execute("PRAGMA foreign_keys = ON")
+    c.execute("PRAGMA synchronous = " + config.Main.get("database.synchronous").upper())
+    # negative cache_size is in KiB rather than pages
+    c.execute("PRAGMA cache_size = -" + str(int(config.Main.get("database.cache_size"))))
+    c.execute("PRAGMA mmap_size = " + str(int(config.Main.get("database.mmap_size")) * 1024))
+    c.close()
+    conn.commit()
+    return conn
+
+def _checkpoint():
+    # fold the WAL back into the main database file so that it can be safely copied
+    conn = _conn()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.commit()
+
+def close():
+    """Close the current thread's database connection, if it has one.
+
+    Threads that touch the database open a connection lazily; long-lived threads should call this
+    before exiting so the connection isn't left for the garbage collector. A new connection will be
+    opened if the thread uses the database again afterwards.
+    """
+    conn = getattr(_ts, "conn", None)
+    if conn is None:
+        return
+    del _ts.conn
+    try:
+        conn.execute("PRAGMA optimize")
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        # the database may be locked by another connection; optimizing is only worth it when it's cheap anyway
+        logging.getLogger("db").debug("Skipped optimizing the database on close: {0}", e)
+    finally:
+        conn.close()
+
 def _init():
     need_install = not os.path.isfile("data.sqlite3")
     conn = _conn()
     c = conn.cursor()
-    c.execute("PRAGMA foreign_keys = ON")
+    # journal_mode is persisted in the database file, so it only needs to be set once rather than per-connection
+    c.execute("PRAGMA journal_mode = " + ("WAL" if config.Main.get("database.wal") else "DELETE"))
     if need_install:
         _install()
     c.execute("PRAGMA user_version")
@@ -1278,3 +1760,10 @@ def _init():
 
 # run db initialization once module is loaded
 _init()
+
+@atexit.register
+def _shutdown():
+    if _writer is not None and _writer.is_alive():
+        _write_queue.put(None)
+        _writer.join()
+    close()
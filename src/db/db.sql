@@ -120,9 +120,7 @@ CREATE TABLE warning_sanction (
 );
 
 -- A running tally of all games played, game stats are aggregated from this table
--- This shouldn't be too horribly slow, but if it is some strategies can be employed to speed it up:
--- On startup, aggregate everything from this table and store in-memory, then increment those in-memory
--- counts as games are played.
+-- The stats commands read from the summary tables further below, which add_game keeps in sync.
 CREATE TABLE game (
     id INTEGER PRIMARY KEY,
     -- The gamemode played
@@ -141,8 +139,9 @@ CREATE TABLE game (
     winner TEXT COLLATE NOCASE
 );
 
-CREATE INDEX game_idx ON game (gamemode, gamesize);
-CREATE INDEX game_gamesize_idx ON game (gamesize);
+-- The winner columns let !gamestats be answered from the indexes alone
+CREATE INDEX game_idx ON game (gamemode, gamesize, winner);
+CREATE INDEX game_gamesize_idx ON game (gamesize, winner);
 
 -- List of people who played in each game
 CREATE TABLE game_player (
@@ -159,8 +158,9 @@ CREATE TABLE game_player (
     count_game BOOLEAN NOT NULL DEFAULT 1
 );
 
-CREATE INDEX game_player_game_idx ON game_player (game);
-CREATE INDEX game_player_player_idx ON game_player (player);
+-- These cover the columns used by !playerstats and !rolestats so those never need to visit the table
+CREATE INDEX game_player_game_idx ON game_player (game, team_win, indiv_win);
+CREATE INDEX game_player_player_idx ON game_player (player, game, count_game, team_win, indiv_win);
 
 -- List of all roles and other special qualities (e.g. lover, entranced, etc.) the player had in game
 CREATE TABLE game_player_role (
@@ -171,7 +171,57 @@ CREATE TABLE game_player_role (
     special BOOLEAN NOT NULL
 );
 
-CREATE INDEX game_player_role_idx ON game_player_role (game_player);
+CREATE INDEX game_player_role_idx ON game_player_role (game_player, role);
+CREATE INDEX game_player_role_role_idx ON game_player_role (role, game_player);
+
+-- Summary tables for the stats commands. These are updated alongside the game tables whenever
+-- a game is recorded and can be rebuilt from them at any time, so they never hold anything the
+-- game tables do not.
+
+-- Number of games played per mode, size, and winning team
+CREATE TABLE game_stats (
+    gamemode TEXT NOT NULL COLLATE NOCASE,
+    gamesize INTEGER NOT NULL,
+    -- Winning team (NULL if no winner)
+    winner TEXT COLLATE NOCASE,
+    games INTEGER NOT NULL,
+    PRIMARY KEY (gamemode, gamesize, winner)
+);
+
+-- Per-person game totals
+CREATE TABLE person_stats (
+    person INTEGER NOT NULL PRIMARY KEY REFERENCES person(id) DEFERRABLE INITIALLY DEFERRED,
+    -- Number of distinct games played
+    games INTEGER NOT NULL,
+    -- Number of distinct games that counted towards win statistics
+    counted_games INTEGER NOT NULL,
+    -- Number of counted games won (either a team or individual win)
+    won_games INTEGER NOT NULL
+);
+
+-- Per-person totals for each role or special quality they have had; only counted games
+-- contribute to the win columns
+CREATE TABLE person_role_stats (
+    person INTEGER NOT NULL REFERENCES person(id) DEFERRABLE INITIALLY DEFERRED,
+    role TEXT NOT NULL COLLATE NOCASE,
+    team_wins INTEGER NOT NULL,
+    indiv_wins INTEGER NOT NULL,
+    overall_wins INTEGER NOT NULL,
+    counted INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    PRIMARY KEY (person, role)
+);
+
+-- Totals for each role or special quality per game mode
+CREATE TABLE role_stats (
+    role TEXT NOT NULL COLLATE NOCASE,
+    gamemode TEXT NOT NULL COLLATE NOCASE,
+    team_wins INTEGER NOT NULL,
+    indiv_wins INTEGER NOT NULL,
+    overall_wins INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    PRIMARY KEY (role, gamemode)
+);
 
 -- Access templates; instead of manually specifying flags, a template can be used to add a group of
 -- flags simultaneously.
@@ -0,0 +1,18 @@
+-- upgrade script to migrate from version 12 to version 13
+-- widens the indexes used by the stats commands into covering indexes
+
+DROP INDEX game_idx;
+CREATE INDEX game_idx ON game (gamemode, gamesize, winner);
+
+DROP INDEX game_gamesize_idx;
+CREATE INDEX game_gamesize_idx ON game (gamesize, winner);
+
+DROP INDEX game_player_game_idx;
+CREATE INDEX game_player_game_idx ON game_player (game, team_win, indiv_win);
+
+DROP INDEX game_player_player_idx;
+CREATE INDEX game_player_player_idx ON game_player (player, game, count_game, team_win, indiv_win);
+
+DROP INDEX game_player_role_idx;
+CREATE INDEX game_player_role_idx ON game_player_role (game_player, role);
+CREATE INDEX game_player_role_role_idx ON game_player_role (role, game_player);
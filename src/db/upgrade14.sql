@@ -0,0 +1,47 @@
+-- upgrade script to migrate from version 13 to version 14
+-- adds the summary tables for the stats commands; these are populated by _rebuild_stats() afterwards
+
+-- Number of games played per mode, size, and winning team
+CREATE TABLE game_stats (
+    gamemode TEXT NOT NULL COLLATE NOCASE,
+    gamesize INTEGER NOT NULL,
+    -- Winning team (NULL if no winner)
+    winner TEXT COLLATE NOCASE,
+    games INTEGER NOT NULL,
+    PRIMARY KEY (gamemode, gamesize, winner)
+);
+
+-- Per-person game totals
+CREATE TABLE person_stats (
+    person INTEGER NOT NULL PRIMARY KEY REFERENCES person(id) DEFERRABLE INITIALLY DEFERRED,
+    -- Number of distinct games played
+    games INTEGER NOT NULL,
+    -- Number of distinct games that counted towards win statistics
+    counted_games INTEGER NOT NULL,
+    -- Number of counted games won (either a team or individual win)
+    won_games INTEGER NOT NULL
+);
+
+-- Per-person totals for each role or special quality they have had; only counted games
+-- contribute to the win columns
+CREATE TABLE person_role_stats (
+    person INTEGER NOT NULL REFERENCES person(id) DEFERRABLE INITIALLY DEFERRED,
+    role TEXT NOT NULL COLLATE NOCASE,
+    team_wins INTEGER NOT NULL,
+    indiv_wins INTEGER NOT NULL,
+    overall_wins INTEGER NOT NULL,
+    counted INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    PRIMARY KEY (person, role)
+);
+
+-- Totals for each role or special quality per game mode
+CREATE TABLE role_stats (
+    role TEXT NOT NULL COLLATE NOCASE,
+    gamemode TEXT NOT NULL COLLATE NOCASE,
+    team_wins INTEGER NOT NULL,
+    indiv_wins INTEGER NOT NULL,
+    overall_wins INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    PRIMARY KEY (role, gamemode)
+);
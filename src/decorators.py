@@ -7,7 +7,7 @@ from collections import defaultdict
 import src
 from src.functions import get_players
 from src.messages import messages
-from src import config, channels, db
+from src import config, channels, db, journal
 from src.users import User
 from src.dispatcher import MessageDispatcher
 from src.debug import handle_error
@@ -103,7 +103,7 @@ class command:
                 return # commands not allowed in alt channels
 
         if "" in self.commands:
-            self.func(wrapper, message)
+            self._on_game_loop(wrapper, self.func, wrapper, message)
             return
 
         if self.phases and (wrapper.game_state is None or wrapper.game_state.current_phase not in self.phases):
@@ -122,6 +122,22 @@ class command:
 
     @handle_error
     def _caller(self, wrapper: MessageDispatcher, message: str):
+        _ignore_locals_ = True
+        self._on_game_loop(wrapper, self._dispatch, wrapper, message)
+
+    @staticmethod
+    def _on_game_loop(wrapper: MessageDispatcher, func: Callable, *args):
+        # anything acting on a game runs on that game's loop, in order with everything else acting on it;
+        # commands in a game channel without a game (such as the join which starts one) use the channel's loop
+        var = wrapper.game_state
+        if var is not None:
+            var.loop.run(func, *args)
+        elif wrapper.public and wrapper.target.loop is not None:
+            wrapper.target.loop.run(func, *args)
+        else:
+            func(*args)
+
+    def _dispatch(self, wrapper: MessageDispatcher, message: str):
         _ignore_locals_ = True
         var = wrapper.game_state # FIXME
         from src import reaper
@@ -154,17 +170,13 @@ class command:
             return
 
         if self.playing or self.roles or self.users:
-            self.func(wrapper, message) # don't check restrictions for game commands
-            # Role commands might end the night if it's nighttime
-            if var.current_phase == "night":
-                from src.wolfgame import chk_nightdone
-                chk_nightdone(var)
+            self._run(wrapper, message) # don't check restrictions for game commands
             return
 
         if self.owner_only:
             if wrapper.source.is_owner():
                 logger.info(command_log_line, command_log_args)
-                self.func(wrapper, message)
+                self._run(wrapper, message)
                 return
 
             wrapper.pm(messages["not_owner"])
@@ -176,7 +188,8 @@ class command:
 
         if self.flag and (wrapper.source.is_admin() or wrapper.source.is_owner()):
             logger.info(command_log_line, command_log_args)
-            return self.func(wrapper, message)
+            self._run(wrapper, message)
+            return
 
         denied_commands = db.DENY[temp.account]
 
@@ -187,13 +200,24 @@ class command:
         if self.flag:
             if self.flag in flags:
                 logger.info(command_log_line, command_log_args)
-                self.func(wrapper, message)
+                self._run(wrapper, message)
                 return
 
             wrapper.pm(messages["not_an_admin"])
             return
 
+        self._run(wrapper, message)
+
+    def _run(self, wrapper: MessageDispatcher, message: str):
+        # Commands are journaled once they're known to be allowed, so that replaying a game
+        # runs them again without depending on who has access to what
+        var = wrapper.game_state
+        journal.record_command(var, self, wrapper, message)
         self.func(wrapper, message)
+        # Role commands might end the night if it's nighttime
+        if (self.playing or self.roles or self.users) and var.current_phase == "night":
+            from src.wolfgame import chk_nightdone
+            chk_nightdone(var)
 
 class hook:
     def __init__(self, name, hookid=-1):
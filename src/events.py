@@ -5,9 +5,11 @@ from collections import defaultdict
 from types import SimpleNamespace
 from typing import Callable, Optional, Any
 from src.debug import handle_error
+from src import latency, metrics
 
 __all__ = ["find_listener", "event_listener", "Event", "EventListener"]
 EVENT_CALLBACKS: dict[str, list[EventListener]] = defaultdict(list)
+EVENTS_TOTAL = metrics.counter("events_total", "Events dispatched", ("event",))
 
 class EventListener:
     # because type checker is dumb...
@@ -99,11 +101,18 @@ class Event:
     def dispatch(self, *args, **kwargs):
         self.stop_processing = False
         self.prevent_default = False
+        if metrics.enabled:
+            EVENTS_TOTAL.inc(self.name)
         listeners = list(EVENT_CALLBACKS[self.name])
         listeners.sort(key=lambda x: x.priority)
-        for listener in listeners:
-            listener(self, *args, **kwargs)
-            if self.stop_processing:
-                break
+        recording = latency.track("events")
+        try:
+            for listener in listeners:
+                listener(self, *args, **kwargs)
+                if self.stop_processing:
+                    break
+        finally:
+            if recording is not None:
+                recording.pop()
 
         return not self.prevent_default
@@ -31,20 +31,14 @@ def get_players(var: Optional[GameState | PregameState], roles=None, *, mainrole
             return []
         return list(var.players)
 
-    if mainroles is None:
-        mainroles = var.main_roles
+    if mainroles is None or mainroles is var.main_roles:
+        return [p for p in var.get_main_role_players(roles) if not is_dying(var, p)]
+
+    # we weren't given an actual player list (possibly),
+    # so the players found are not necessarily in var.players
     if roles is None:
-        roles = set(mainroles.values())
-    pl = set()
-    for user, role in mainroles.items():
-        if role in roles:
-            pl.add(user)
-
-    if mainroles is not var.main_roles:
-        # we weren't given an actual player list (possibly),
-        # so the elements of pl are not necessarily in var.players
-        return list(pl)
-    return [p for p in var.players if p in pl and not is_dying(var, p)]
+        return list(mainroles)
+    return [user for user, role in mainroles.items() if role in roles]
 
 def get_all_players(var: Optional[GameState | PregameState], roles=None, *, rolemap=None) -> set[User]:
     from src.status import is_dying
@@ -55,19 +49,12 @@ def get_all_players(var: Optional[GameState | PregameState], roles=None, *, role
             return set()
         return set(var.players)
 
-    if rolemap is None:
-        rolemap = var.roles
-    if roles is None:
-        roles = set(rolemap.keys())
-    pl = set()
-    for role in roles:
-        for user in rolemap[role]:
-            pl.add(user)
-
-    if rolemap is not var.roles:
-        return pl
+    if rolemap is None or rolemap is var.roles:
+        return {p for p in var.get_role_players(roles) if not is_dying(var, p)}
 
-    return {p for p in pl if not is_dying(var, p)}
+    if roles is None:
+        roles = rolemap.keys()
+    return set().union(*(rolemap[role] for role in roles))
 
 def get_participants(var: Optional[GameState | PregameState]) -> list[User]:
     """List all players who are still able to participate in the game."""
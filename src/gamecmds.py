@@ -1,9 +1,7 @@
 from __future__ import annotations
 
-from collections import Counter
 from datetime import datetime, timedelta
 from typing import Optional
-import time
 import sys
 import re
 
@@ -11,9 +9,10 @@ from src.decorators import command
 from src.containers import UserDict
 from src.functions import get_players, get_main_role
 from src.messages import messages
+from src.rolestats import RoleStats
 from src.events import Event, EventListener, event_listener
 from src.cats import Wolfteam, Neutral, role_order, Vampire_Team, all_teams
-from src import config, users, channels, pregame, trans
+from src import config, users, channels, pregame, trans, timers
 from src.dispatcher import MessageDispatcher
 from src.gamestate import GameState
 from src.users import User
@@ -82,14 +81,7 @@ def stats(wrapper: MessageDispatcher, message: str):
     # The events are fired off as part of transition_day and del_player, and are not calculated here
     if var.stats_type == "default":
         # Collapse the role stats into a dict[str, tuple[int, int]]
-        role_stats: dict[str, tuple[int, int]] = {}
-        for stat_set in var.get_role_stats():
-            for r, a in stat_set:
-                if r not in role_stats:
-                    role_stats[r] = (a, a)
-                else:
-                    mn, mx = role_stats[r]
-                    role_stats[r] = (min(mn, a), max(mx, a))
+        role_stats = var.get_role_stats().bounds()
         # remove any 0/0 entries if they weren't starting roles, otherwise we may have bad grammar in !stats
         role_stats = {r: v for r, v in role_stats.items() if r in start_roles or v != (0, 0)}
         order = [r for r in role_order() if r in role_stats]
@@ -170,7 +162,7 @@ def stats(wrapper: MessageDispatcher, message: str):
     wrapper.reply(messages["stats_reply"].format(var.current_phase, first_count, entries))
 
 @event_listener("reconfigure_stats")
-def on_reconfigure_stats(evt: Event, var: GameState, roleset: Counter, reason: str):
+def on_reconfigure_stats(evt: Event, var: GameState, stats: RoleStats, reason: str):
     global LAST_STATS
     LAST_STATS = None
 
@@ -190,7 +182,7 @@ def timeleft(wrapper: MessageDispatcher, message: str):
         LAST_TIME = datetime.now()
 
     if var.current_phase == "join":
-        dur = int((pregame.CAN_START_TIME - datetime.now()).total_seconds())
+        dur = int((pregame.WAIT.can_start_time - datetime.now()).total_seconds())
         if dur > 0:
             wrapper.reply(messages["start_timer"].format(dur))
 
@@ -208,7 +200,7 @@ def timeleft(wrapper: MessageDispatcher, message: str):
             what = "the end of the phase"
             name = var.current_phase if var.current_phase in trans.TIMERS else f"{var.current_phase}_limit"
 
-        remaining = int((trans.TIMERS[name][1] + trans.TIMERS[name][2]) - time.time())
+        remaining = int((trans.TIMERS[name][1] + trans.TIMERS[name][2]) - timers.now())
         msg = "There is \u0002{0[0]:0>2}:{0[1]:0>2}\u0002 remaining until {1}.".format(divmod(remaining, 60), what)
     else:
         msg = messages["timers_disabled"].format(var.current_phase.capitalize())
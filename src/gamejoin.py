@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import threading
 import time
 import re
 from datetime import datetime, timedelta
@@ -14,7 +13,7 @@ from src.messages import messages
 from src.status import add_dying, kill_players
 from src.events import Event, EventListener, event_listener
 from src.debug import handle_error
-from src import db, users, channels, locks, pregame, config, context, reaper, relay
+from src import db, users, channels, locks, pregame, config, context, reaper, relay, timers
 from src.dispatcher import MessageDispatcher
 from src.channels import Channel
 from src.users import User
@@ -93,11 +92,18 @@ def _join_player(wrapper: MessageDispatcher, who: Optional[User] = None, forced=
         wrapper.pm(messages["warn_unacked"])
         return False
 
+    # a user can only belong to one game at a time
+    for chan in channels.game_channels():
+        if chan is not channels.Main and chan.game_state is not None and wrapper.source in chan.game_state.players:
+            key = "you_playing_elsewhere" if who is wrapper.source else "other_playing_elsewhere"
+            who.send(messages[key].format(chan), notice=True)
+            return False
+
     cmodes = []
     if not wrapper.source.is_fake:
         cmodes.append(("+v", wrapper.source))
     if var is None:
-        channels.Main.game_state = var = PregameState()
+        channels.Main.game_state = var = PregameState(channels.Main.loop)
         if not wrapper.source.is_fake:
             toggle_modes = config.Main.get("transports[0].channels.main.auto_mode_toggle", ())
             for mode in set(toggle_modes) & wrapper.source.channels[channels.Main]:
@@ -107,18 +113,16 @@ def _join_player(wrapper: MessageDispatcher, who: Optional[User] = None, forced=
         if wrapper.source.account:
             trans.ORIGINAL_ACCOUNTS[wrapper.source] = wrapper.source.account
         if config.Main.get("timers.wait.enabled"):
-            pregame.CAN_START_TIME = datetime.now() + timedelta(seconds=config.Main.get("timers.wait.initial"))
+            pregame.WAIT.can_start_time = datetime.now() + timedelta(seconds=config.Main.get("timers.wait.initial"))
             with locks.wait:
-                pregame.WAIT_TOKENS = config.Main.get("timers.wait.command.tokenbucket.initial")
-                pregame.WAIT_LAST   = time.time()
+                pregame.WAIT.tokens = config.Main.get("timers.wait.command.tokenbucket.initial")
+                pregame.WAIT.last = time.time()
         wrapper.send(messages["new_game"].format(wrapper.source))
 
         # Set join timer
         if config.Main.get("timers.enabled") and config.Main.get("timers.join.enabled"):
-            t = threading.Timer(config.Main.get("timers.join.limit"), kill_join, [var, wrapper])
-            trans.TIMERS["join"] = (t, time.time(), config.Main.get("timers.join.limit"))
-            t.daemon = True
-            t.start()
+            t = var.loop.call_later(config.Main.get("timers.join.limit"), kill_join, (var, wrapper))
+            trans.TIMERS["join"] = (t, timers.now(), config.Main.get("timers.join.limit"))
 
     elif wrapper.source in pl:
         key = "you_already_playing" if who is wrapper.source else "other_already_playing"
@@ -157,17 +161,15 @@ def _join_player(wrapper: MessageDispatcher, who: Optional[User] = None, forced=
 
             if config.Main.get("timers.wait.enabled"):
                 # make sure there's at least wait.join seconds of wait time left, if not add them
-                if now + timedelta(seconds=config.Main.get("timers.wait.join")) > pregame.CAN_START_TIME:
-                    pregame.CAN_START_TIME = now + timedelta(seconds=config.Main.get("timers.wait.join"))
+                if now + timedelta(seconds=config.Main.get("timers.wait.join")) > pregame.WAIT.can_start_time:
+                    pregame.WAIT.can_start_time = now + timedelta(seconds=config.Main.get("timers.wait.join"))
 
     with locks.join_timer:
         if "join_pinger" in trans.TIMERS:
             trans.TIMERS["join_pinger"][0].cancel()
 
-        t = threading.Timer(10, join_timer_handler, (var,))
-        trans.TIMERS["join_pinger"] = (t, time.time(), 10)
-        t.daemon = True
-        t.start()
+        t = var.loop.call_later(10, join_timer_handler, (var,))
+        trans.TIMERS["join_pinger"] = (t, timers.now(), 10)
 
     if not wrapper.source.is_fake or not config.Main.get("debug.enabled"):
         channels.Main.mode(*cmodes)
@@ -184,11 +186,11 @@ def kill_join(var: GameState, wrapper: MessageDispatcher):
     wrapper.send(messages["game_idle_cancel"])
     # use this opportunity to expire pending stasis
     db.expire_stasis()
-    db.init_vars()
+    db.refresh_sanctions()
     expire_tempbans()
-    if trans.ENDGAME_COMMAND is not None:
-        trans.ENDGAME_COMMAND()
-        trans.ENDGAME_COMMAND = None
+    if trans.PHASES.endgame_command is not None:
+        trans.PHASES.endgame_command()
+        trans.PHASES.endgame_command = None
 
 @command("fjoin", flag="A")
 def fjoin(wrapper: MessageDispatcher, message: str):
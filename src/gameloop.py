@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import functools
+import logging
+import operator
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional, TYPE_CHECKING
+
+from src import timers
+
+if TYPE_CHECKING:
+    from src.channels import Channel
+    from src.journal import Journal
+
+__all__ = ["GameLoop", "GameScoped", "on_game_loop", "current"]
+
+_local = threading.local()
+
+def current() -> Optional[GameLoop]:
+    """Return the game loop the calling thread belongs to, if any."""
+    return getattr(_local, "loop", None)
+
+class GameLoop:
+    """Runs everything that touches a game's state on one thread, in the order it was submitted.
+
+    IRC commands, timers, the reaper and agents submit work to the loop of the game they act on
+    rather than taking a lock, so game logic never runs concurrently with itself. Work submitted from
+    the loop thread runs immediately, so functions which route themselves through the loop may freely
+    call each other.
+
+    Every game channel has a loop of its own which runs one game after another. Games created without
+    a channel (such as in tests) get a loop of their own, which is stopped once the game is over;
+    anything submitted to a stopped loop runs on the submitting thread.
+    """
+    def __init__(self, name: str, *, channel: Optional[Channel] = None):
+        self.name = name
+        self.channel = channel
+        # id of the game currently played on this loop; timers scheduled with call_later belong to it
+        self.game_id: Optional[float] = None
+        # journal of the game currently played on this loop, if it is being journaled
+        self.journal: Optional[Journal] = None
+        # per-loop instances of GameScoped containers
+        self.state: dict[GameScoped, Any] = {}
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopped = False
+
+    def in_loop(self) -> bool:
+        """Return whether the caller is running on this loop's thread."""
+        return threading.current_thread() is self._thread
+
+    def post(self, func: Callable, *args, **kwargs) -> Future:
+        """Queue func(*args, **kwargs) to run on the loop without waiting for it.
+
+        Exceptions raised by func are logged as well as set on the returned Future.
+
+        :param func: Function to run
+        :return: Future for the result of func
+        """
+        return self._submit(func, args, kwargs, True)
+
+    def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run func(*args, **kwargs) on the loop and wait for its result.
+
+        :param func: Function to run
+        :return: What func returned
+        :raises: Whatever func raised
+        """
+        if self.in_loop():
+            return func(*args, **kwargs)
+        return self._submit(func, args, kwargs, False).result()
+
+    def call_later(self, interval: float, func: Callable, args=(), kwargs: Optional[dict[str, Any]] = None, *,
+                   phase_id: Optional[float] = None) -> timers.Timer:
+        """Schedule func(*args, **kwargs) to be posted to the loop after interval seconds.
+
+        :param interval: Number of seconds to wait
+        :param func: Function to run
+        :param args: Positional arguments to pass to func
+        :param kwargs: Keyword arguments to pass to func
+        :param phase_id: Phase the timer belongs to, see timers.cancel()
+        :return: Timer handle
+        """
+        return timers.schedule(interval, self.post, (self._fire, func, tuple(args), kwargs or {}),
+                               game_id=self.game_id, phase_id=phase_id)
+
+    def _fire(self, func: Callable, args, kwargs):
+        if self.journal is not None:
+            self.journal.timer_fired(func)
+        return func(*args, **kwargs)
+
+    def end_game(self):
+        """Called once the game played on this loop is over; stops the loop unless it belongs to a channel."""
+        if self.channel is None:
+            self.stop()
+
+    def stop(self):
+        """Stop the loop once the work queued so far is done."""
+        with self._lock:
+            if not self._stopped:
+                self._stopped = True
+                if self._thread is not None:
+                    self._queue.put(None)
+
+    def _submit(self, func: Callable, args, kwargs, log: bool) -> Future:
+        fut = Future()
+        with self._lock:
+            if not self._stopped:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run_loop, name=f"game-{self.name}", daemon=True)
+                    self._thread.start()
+                self._queue.put((fut, func, args, kwargs, log))
+                return fut
+        self._call(fut, func, args, kwargs, log)
+        return fut
+
+    def _run_loop(self):
+        _local.loop = self
+        try:
+            while (item := self._queue.get()) is not None:
+                self._call(*item)
+        finally:
+            # don't leave the loop thread's db connection lying around once it's stopped
+            from src import db
+            db.close()
+
+    @staticmethod
+    def _call(fut: Future, func: Callable, args, kwargs, log: bool):
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            fut.set_result(func(*args, **kwargs))
+        except BaseException as e:
+            if log:
+                logging.getLogger("exception.{}".format(type(e).__name__)).exception("Error running {} on the game loop", func.__qualname__)
+            fut.set_exception(e)
+
+class GameScoped:
+    """Module-level container of which every game loop has its own instance.
+
+    The proxy forwards everything to the instance belonging to the game loop of the calling thread,
+    creating it with factory on first use, so module code keeps using it like the container itself
+    while several games run at once. Threads outside of any game loop share one instance.
+    Setting attributes on the proxy sets them on that instance, so it can also hold per-game values.
+    """
+    # everything defined here shadows the container's own attributes, so keep it to private names
+    __slots__ = ("_factory",)
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+
+    def _resolve(self):
+        """Return the instance for the calling thread's game loop."""
+        loop = current()
+        state = _UNSCOPED if loop is None else loop.state
+        try:
+            return state[self]
+        except KeyError:
+            return state.setdefault(self, self._factory())
+
+    def __getattr__(self, name: str):
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        if name in GameScoped.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._resolve(), name, value)
+
+    @property
+    def __class__(self):
+        # so that isinstance() checks see the container rather than the proxy
+        return type(self._resolve())
+
+    def __repr__(self):
+        return f"GameScoped({self._resolve()!r})"
+
+    def __iter__(self):
+        return iter(self._resolve())
+
+    def __len__(self):
+        return len(self._resolve())
+
+    def __bool__(self):
+        return bool(self._resolve())
+
+    __hash__ = object.__hash__
+
+def _forward(name: str):
+    def method(self, *args):
+        return getattr(self._resolve(), name)(*args)
+    method.__name__ = name
+    return method
+
+def _reflect(op: Callable):
+    def method(self, other):
+        return op(other, self._resolve())
+    return method
+
+for _name in ("__contains__", "__getitem__", "__setitem__", "__delitem__", "__eq__", "__ne__",
+              "__le__", "__lt__", "__ge__", "__gt__", "__str__", "__or__", "__and__", "__sub__", "__xor__"):
+    setattr(GameScoped, _name, _forward(_name))
+for _name, _op in (("__ror__", operator.or_), ("__rand__", operator.and_), ("__rsub__", operator.sub), ("__rxor__", operator.xor)):
+    setattr(GameScoped, _name, _reflect(_op))
+del _name, _op
+
+_UNSCOPED: dict[GameScoped, Any] = {}
+
+def on_game_loop(func):
+    """Decorator for functions taking a game state first, which makes them run on that game's loop.
+
+    The caller waits for the function to finish. Calls made without a game state run directly.
+    """
+    @functools.wraps(func)
+    def wrapper(var, *args, **kwargs):
+        if var is None:
+            return func(var, *args, **kwargs)
+        return var.loop.run(func, var, *args, **kwargs)
+
+    return wrapper
@@ -3,15 +3,27 @@ from __future__ import annotations
 import os.path
 import glob
 import importlib
-from typing import Optional, Type
+import json
+import logging
+import sys
+import threading
+from typing import Any, Optional, Type
 from src.messages import messages
 from src.events import Event, EventListener
 from src.users import User
 from src.cats import (All, Cursed, Wolf, Wolfchat, Innocent, Village, Neutral, Hidden, Team_Switcher,
                       Win_Stealer, Nocturnal, Killer, Vampire, Spy, Nobody)
 from src.gamestate import GameState
+from src.roles import load_builtin_roles
 
-__all__ = ["InvalidModeException", "game_mode", "import_builtin_modes", "GameMode", "GAME_MODES"]
+__all__ = ["InvalidModeException", "game_mode", "import_builtin_modes", "register_builtin_modes", "load_builtin_mode",
+           "build_manifest", "write_manifest", "GameMode", "GAME_MODES", "MANIFEST"]
+
+# Names, player limits and descriptions of the builtin game modes, so that they can be listed without importing them
+MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "manifest.json")
+
+_logger = logging.getLogger("gamemodes")
+_lock = threading.Lock()
 
 class InvalidModeException(Exception):
     pass
@@ -166,21 +178,96 @@ class CustomSettings:
     def night_time_warn(self, value: int):
         self._night_time_warn = value
 
-def import_builtin_modes():
+def _builtin_modules() -> list[str]:
     path = os.path.dirname(os.path.abspath(__file__))
     search = os.path.join(path, "*.py")
 
+    modules = []
     for f in glob.iglob(search):
         f = os.path.basename(f)
         n, _ = os.path.splitext(f)
         if f.startswith("_"):
             continue
+        modules.append(n)
+    return sorted(modules)
+
+def import_builtin_modes():
+    # game modes may use the roles directly, so they are imported after all of them
+    load_builtin_roles()
+    for n in _builtin_modules():
         importlib.import_module("." + n, package="src.gamemodes")
 
+def register_builtin_modes():
+    """Register the builtin game modes from the manifest, importing each one only once it is first used.
+
+    Falls back to importing every game mode right away if the manifest doesn't match the modules on disk.
+    """
+    try:
+        with open(MANIFEST, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = None
+    if manifest is None or manifest["modules"] != _builtin_modules():
+        _logger.warning("Game mode manifest is missing or out of date, importing every game mode; run genmanifest.py to update it")
+        import_builtin_modes()
+        return
+
+    for name, mode in manifest["modes"].items():
+        # modes which were already imported (such as by custom game modes) registered themselves
+        if "src.gamemodes." + mode["module"] not in sys.modules:
+            GAME_MODES[name] = (_LazyMode(name, mode["module"], mode["doc"]), mode["min"], mode["max"])
+
+def load_builtin_mode(name: str) -> Type[GameMode]:
+    """Import a game mode if it has only been registered from the manifest so far.
+
+    :param name: Name of the game mode
+    :return: The game mode class
+    """
+    mode = GAME_MODES[name][0]
+    if isinstance(mode, _LazyMode):
+        load_builtin_roles()
+        with _lock:
+            importlib.import_module("." + mode.module, package="src.gamemodes")
+        mode = GAME_MODES[name][0]
+        if isinstance(mode, _LazyMode):
+            raise RuntimeError("Game mode manifest is out of date: {0} does not define {1}".format(mode.module, name))
+    return mode
+
+class _LazyMode:
+    """Stand-in for a builtin game mode which has not been imported yet; calling it creates the game mode."""
+    def __init__(self, name: str, module: str, doc: Optional[str]):
+        self.name = name
+        self.module = module
+        self.__doc__ = doc
+
+    def __call__(self, *args) -> GameMode:
+        return load_builtin_mode(self.name)(*args)
+
+def build_manifest() -> dict[str, Any]:
+    """Import every builtin game mode and return their manifest.
+
+    :return: Game mode modules, and the name, player limits and description of each mode they define
+    """
+    import_builtin_modes()
+    modes = {}
+    for name, (cls, minp, maxp) in sorted(GAME_MODES.items()):
+        if cls.__module__.startswith("src.gamemodes."):
+            modes[name] = {"module": cls.__module__.rsplit(".", 1)[1], "min": minp, "max": maxp, "doc": cls.__doc__}
+    return {"modules": _builtin_modules(), "modes": modes}
+
+def write_manifest():
+    with open(MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(build_manifest(), f, indent=2)
+        f.write("\n")
+
 class GameMode:
     name: str
 
     def __init__(self, arg=""):
+        # role modules listen to events dispatched below, such as default_totems
+        load_builtin_roles()
+        # Arguments the mode was created with, so that it can be created the same way again
+        self.arg = arg
         # Default values for the role sets and secondary roles restrictions
         self.ROLE_SETS = {}
         self.SECONDARY_ROLES = {}
@@ -100,6 +100,8 @@ class MaelstromMode(GameMode):
             addroles["cursed villager"] = random.randrange(3)
             addroles["mayor"] = random.randrange(2)
             if random.randrange(100) == 0 and addroles.get("villager", 0) > 0:
+                # blessed villager is a main role, so it takes the place of a villager
+                addroles["villager"] -= 1
                 addroles["blessed villager"] = 1
 
         rolemap = defaultdict(set)
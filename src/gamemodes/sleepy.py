@@ -1,9 +1,10 @@
-from collections import Counter, defaultdict
+from collections import defaultdict
 
 from src.cats import Wolf
 from src.dispatcher import MessageDispatcher
 from src.gamemodes import game_mode, GameMode
 from src.messages import messages
+from src.rolestats import role_index
 from src.containers import UserDict, UserSet
 from src.decorators import command, handle_error
 from src.functions import get_players, change_role, get_main_role
@@ -271,18 +272,24 @@ class SleepyMode(GameMode):
                         # VGs turned into jesters remain spicy
                         var.roles["vengeful ghost"].add(t)
 
-                newstats = set()
-                for rs in var.get_role_stats():
-                    d = Counter(dict(rs))
-                    newstats.add(rs)
-                    if old in d and d[old] >= 1:
-                        for i in range(1, d[old] + 1):
-                            d[old] -= i
-                            d[new] += i
-                            if new == "doomsayer" and "traitor" in d and d["traitor"] >= 1:
-                                d["monster"] += d["traitor"]
-                                d["traitor"] = 0
-                            newstats.add(frozenset(d.items()))
+                old_idx = role_index(old)
+                new_idx = role_index(new)
+                traitor_idx = role_index("traitor")
+                monster_idx = role_index("monster")
+
+                def turn(d: list[int]):
+                    yield d
+                    if d[old_idx] >= 1:
+                        for i in range(1, d[old_idx] + 1):
+                            d[old_idx] -= i
+                            d[new_idx] += i
+                            if new == "doomsayer" and d[traitor_idx] >= 1:
+                                d[monster_idx] += d[traitor_idx]
+                                d[traitor_idx] = 0
+                            yield d
+
+                newstats = var.get_role_stats()
+                newstats.transform(turn)
                 var.set_role_stats(newstats)
 
     def on_remove_protection(self, evt: Event, var: GameState, target: User, attacker: User, attacker_role: str, protector: User, protector_role: str, reason: str):
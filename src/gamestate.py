@@ -2,21 +2,179 @@ from __future__ import annotations
 
 import copy
 import math
-import threading
-from typing import Any, Optional, Callable, ClassVar, TYPE_CHECKING
+from typing import Any, Optional, Callable, ClassVar, Iterable, KeysView, NamedTuple, TYPE_CHECKING
 import time
 
 from src.containers import UserSet, UserDict, UserList
 from src.messages import messages
-from src.cats import All
+from src.cats import All, Category, Wolf_Objective, Vampire_Objective, Village_Objective
+from src.events import Event
+from src.gameloop import GameLoop
+from src.rolestats import RoleStats
 from src import config
 from src.users import User
-from src import channels, random
+from src import channels, latency, random, timers
 
 if TYPE_CHECKING:
     from src.gamemodes import GameMode
 
-__all__ = ["GameState", "PregameState", "set_gamemode"]
+__all__ = ["GameState", "PregameState", "set_gamemode", "PlayerList", "MainRoleDict", "RoleSet", "TeamCounts"]
+
+# The containers below behave exactly like their parents, but call on_change (if set) whenever their
+# contents change, so that GameState can cache player lookups between changes.
+# Every other mutating method of the parent classes is implemented in terms of the ones overridden here.
+# on_change is set after construction, so it is not called while a container is being initially populated.
+
+class PlayerList(UserList):
+    __slots__ = ("on_change",)
+
+    def __init__(self, iterable=()):
+        self.on_change: Optional[Callable[[], None]] = None
+        super().__init__(iterable)
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._changed()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._changed()
+
+    def append(self, item):
+        super().append(item)
+        self._changed()
+
+    def extend(self, iterable):
+        super().extend(iterable)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        self._changed()
+
+    def pop(self, index=-1):
+        item = super().pop(index)
+        self._changed()
+        return item
+
+    def remove(self, item):
+        super().remove(item)
+        self._changed()
+
+class RoleSet(UserSet):
+    __slots__ = ("on_change",)
+
+    def __init__(self, iterable=()):
+        self.on_change: Optional[Callable[[], None]] = None
+        super().__init__(iterable)
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def add(self, item):
+        if item not in self:
+            super().add(item)
+            self._changed()
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def difference_update(self, iterable):
+        super().difference_update(iterable)
+        self._changed()
+
+    def discard(self, item):
+        if item in self:
+            super().discard(item)
+            self._changed()
+
+    def pop(self):
+        item = super().pop()
+        self._changed()
+        return item
+
+    def remove(self, item):
+        super().remove(item)
+        self._changed()
+
+    def update(self, iterable):
+        super().update(iterable)
+        self._changed()
+
+class MainRoleDict(UserDict[User, str]):
+    """ Mapping of player to main role, which also indexes players by their main role. """
+    __slots__ = ("on_change", "_by_role")
+
+    def __init__(self, _it=(), **kwargs):
+        self.on_change: Optional[Callable[[], None]] = None
+        # role -> players with that main role, in the order they were given it
+        self._by_role: dict[str, dict[User, None]] = {}
+        super().__init__(_it, **kwargs)
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def _unindex(self, user: User, role: str):
+        players = self._by_role[role]
+        del players[user]
+        if not players:
+            del self._by_role[role]
+
+    def players_of(self, role: str) -> KeysView[User]:
+        """ Get a read-only view of the players whose main role is role.
+
+        :param role: Role name
+        :return: Players with that main role; the view reflects later changes
+        """
+        return self._by_role.get(role, {}).keys()
+
+    def __setitem__(self, item, value):
+        old = self.get(item)
+        super().__setitem__(item, value)
+        if old != value:
+            if old is not None:
+                self._unindex(item, old)
+            self._by_role.setdefault(value, {})[item] = None
+            self._changed()
+
+    def __delitem__(self, item):
+        if isinstance(item, slice) and item.start is item.step is None and item.stop not in self:
+            return
+        key = item.stop if isinstance(item, slice) else item
+        role = self[key]
+        super().__delitem__(item)
+        self._unindex(key, role)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self._by_role.clear()
+        self._changed()
+
+    def pop(self, key, *default):
+        if key not in self:
+            return super().pop(key, *default)
+        role = super().pop(key)
+        self._unindex(key, role)
+        self._changed()
+        return role
+
+    def popitem(self):
+        key, role = super().popitem()
+        self._unindex(key, role)
+        self._changed()
+        return key, role
 
 def set_gamemode(var: PregameState, arg: str) -> bool:
     from src.gamemodes import GAME_MODES, InvalidModeException
@@ -37,11 +195,29 @@ def set_gamemode(var: PregameState, arg: str) -> bool:
     channels.Main.send(messages["game_mode_not_found"].format(modeargs[0]))
     return False
 
+class TeamCounts(NamedTuple):
+    """Number of players on each side, in the order chk_win listeners are passed them."""
+    players: int
+    wolves: int
+    real_wolves: int
+    vampires: int
+
+def _role_key(roles: Optional[Iterable[str]]) -> Optional[frozenset[str]]:
+    if roles is None or isinstance(roles, frozenset):
+        return roles
+    if isinstance(roles, Category):
+        # frozen when roles are registered, so this hashes once and is reused for every lookup
+        return roles.roles
+    return frozenset(roles)
+
 class PregameState:
-    def __init__(self):
-        self.players = UserList()
+    def __init__(self, loop: Optional[GameLoop] = None):
+        self.players = PlayerList()
         self.current_phase: str = "join"
         self.game_id: float = time.time()
+        # games are played on their channel's loop, or on a loop of their own if they don't have one
+        self.loop = loop if loop is not None else GameLoop(str(self.game_id))
+        self.loop.game_id = self.game_id
         self.next_phase: Optional[str] = None
         # Note: current_mode is None for all but the !start machinery
         self.current_mode: Optional[GameMode] = None
@@ -53,6 +229,7 @@ class PregameState:
     def teardown(self):
         if self.current_mode is not None:
             self.current_mode.teardown()
+        self.loop.end_game()
 
 class GameState:
     _init_fns: ClassVar[list[Callable[[GameState], None]]] = []
@@ -67,18 +244,31 @@ class GameState:
         self.current_mode: GameMode = pregame_state.current_mode
         self.game_settings: dict[str, Any] = {}
         self.game_id: float = pregame_state.game_id
-        self.players = pregame_state.players
+        self.loop: GameLoop = pregame_state.loop
+        # cached results of get_main_role_players and get_role_players, emptied whenever they could change
+        self._main_role_players: dict[Optional[frozenset[str]], tuple[User, ...]] = {}
+        self._role_players: dict[Optional[frozenset[str]], frozenset[User]] = {}
+        # cached results of get_team_counts, keyed by the dying and absent players they were counted with
+        self._team_counts: dict[tuple[frozenset[User], frozenset[User]], TeamCounts] = {}
+        self.players: PlayerList = pregame_state.players
+        self.players.on_change = self._main_roles_changed
         self.roles: UserDict[str, UserSet] = UserDict()
         self._original_roles: UserDict[str, UserSet] = UserDict()
-        self.main_roles: UserDict[User, str] = UserDict()
+        self.main_roles: MainRoleDict = MainRoleDict()
+        self.main_roles.on_change = self._main_roles_changed
         self._original_main_roles: UserDict[User, str] = UserDict()
         self.final_roles: UserDict[User, str] = UserDict()
-        self._rolestats: set[frozenset[tuple[str, int]]] = set()
+        self._rolestats: RoleStats = RoleStats()
         self.current_phase: str = pregame_state.current_phase
         self.next_phase: Optional[str] = None
+        # perf_counter() when the current phase transition began, to time it for the latency module
+        self._phase_transition_began: float = 0.0
         self.night_count: int = 0
         self.day_count: int = 0
+        # number of times win conditions had to be checked again because a chk_win listener changed roles
+        self.win_check_passes: int = 0
         self.rng_seed: bytes = random.get_seed()
+        self.rng_buffer_size: int = config.Main.get("gameplay.rng_buffer_size")
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
@@ -112,7 +302,9 @@ class GameState:
         if self._torndown:
             raise RuntimeError("cannot setup a used-up GameState")
         for role in All:
-            self.roles[role] = UserSet()
+            self.roles[role] = RoleSet()
+            self.roles[role].on_change = self._role_players.clear
+        self._role_players.clear()
         self.setup_started = True
 
     def finish_setup(self):
@@ -131,8 +323,13 @@ class GameState:
         self._original_roles.clear()
         self._original_main_roles.clear()
         self._rolestats.clear()
+        self.players.on_change = None
+        self._main_role_players.clear()
+        self._role_players.clear()
+        self._team_counts.clear()
         self.current_mode.teardown()
         self._torndown = True
+        self.loop.end_game()
 
     def _get_value(self, key: str) -> Any:
         # we don't actually need to complete setup before this can be used
@@ -153,6 +350,7 @@ class GameState:
         if self.next_phase is not None:
             raise RuntimeError("already in phase transition")
         self.next_phase = phase
+        self._phase_transition_began = time.perf_counter()
         # this is a bit convoluted, but this lets external code plug in their own phases
         # for grep: var.day_count and var.night_count get incremented here
         attr = f"{self.next_phase}_count"
@@ -165,7 +363,7 @@ class GameState:
             TIMERS[f"{self.current_phase}_warn"][0].cancel()
             del TIMERS[f"{self.current_phase}_warn"]
 
-    def end_phase_transition(self, time_limit: int = 0, time_warn: int = 0, timer_cb=None, cb_args=()):
+    def end_phase_transition(self, time_limit: int = 0, time_warn: int = 0, timer_cb=None, cb_args=(), phase_id: Optional[float] = None):
         from src.trans import TIMERS
         if self.next_phase is None:
             raise RuntimeError("not in phase transition")
@@ -173,18 +371,16 @@ class GameState:
         assert timer_cb is not None
         self.current_phase = self.next_phase
         self.next_phase = None
+        if config.Main.get("latency.enabled"):
+            latency.observe("phase_transition", time.perf_counter() - self._phase_transition_began)
         if config.Main.get("timers.enabled"):
             if time_limit:
-                timer = threading.Timer(time_limit, timer_cb, ("limit",) + tuple(cb_args))
-                timer.daemon = True
-                timer.start()
-                TIMERS[f"{self.current_phase}_limit"] = (timer, time.time(), time_limit)
+                timer = self.loop.call_later(time_limit, timer_cb, ("limit",) + tuple(cb_args), phase_id=phase_id)
+                TIMERS[f"{self.current_phase}_limit"] = (timer, timers.now(), time_limit)
 
             if time_warn:
-                timer = threading.Timer(time_warn, timer_cb, ("warn",) + tuple(cb_args))
-                timer.daemon = True
-                timer.start()
-                TIMERS[f"{self.current_phase}_warn"] = (timer, time.time(), time_warn)
+                timer = self.loop.call_later(time_warn, timer_cb, ("warn",) + tuple(cb_args), phase_id=phase_id)
+                TIMERS[f"{self.current_phase}_warn"] = (timer, timers.now(), time_warn)
 
     def extend_phase_limit(self, minimum: int = 0):
         """Ensure that the phase limit timer has a minimum amount of seconds remaining."""
@@ -193,12 +389,11 @@ class GameState:
             return
         if config.Main.get("timers.enabled"):
             (timer, started, limit) = TIMERS[f"{self.current_phase}_limit"]
-            elapsed = math.ceil(time.time() - started)
+            elapsed = math.ceil(timers.now() - started)
             if elapsed + minimum > limit:
                 timer.cancel()
-                extended = threading.Timer(minimum, timer.function, timer.args, timer.kwargs)
-                extended.daemon = True
-                extended.start()
+                extended = timers.schedule(minimum, timer.function, timer.args, timer.kwargs,
+                                           game_id=timer.game_id, phase_id=timer.phase_id)
                 TIMERS[f"{self.current_phase}_limit"] = (extended, started, elapsed + minimum)
 
     @property
@@ -302,9 +497,89 @@ class GameState:
         except AttributeError:
             return config.Main.get("timers.night.warn")
 
-    def get_role_stats(self) -> frozenset[frozenset[tuple[str, int]]]:
-        return frozenset(self._rolestats)
-
-    def set_role_stats(self, value) -> None:
-        self._rolestats.clear()
-        self._rolestats.update(value)
+    def get_main_role_players(self, roles: Optional[Iterable[str]] = None) -> tuple[User, ...]:
+        """ Get the players whose main role is one of the given roles, in the order they joined.
+
+        Results are cached until a main role or the player list changes. Dying players are included.
+
+        :param roles: Roles or role category to look for, or None for every player with a main role
+        :return: Matching players
+        """
+        key = _role_key(roles)
+        players = self._main_role_players.get(key)
+        if players is None:
+            if key is None:
+                found = self.main_roles.keys()
+            else:
+                found = {p for role, pl in self.main_roles._by_role.items() if role in key for p in pl}
+            players = self._main_role_players[key] = tuple(p for p in self.players if p in found)
+        return players
+
+    def _main_roles_changed(self):
+        self._main_role_players.clear()
+        self._team_counts.clear()
+
+    def get_team_counts(self, mainroles=None, *, count_absent: bool = True) -> TeamCounts:
+        """ Count the living players on each side, for checking win conditions.
+
+        Counts for the game's own main roles are cached until a main role or the player list changes,
+        or until different players are dying or absent.
+
+        :param mainroles: Main roles to count, if not the game's own (such as roles being considered for a game mode)
+        :param count_absent: Whether absent players are left out of the number of players during the day
+        :return: Number of players, players with a wolf objective, players with a village objective and
+            players with a vampire objective
+        """
+        from src.functions import get_players
+        from src.status import get_absent
+        from src.status.dying import DYING
+        absent = self.current_phase == "day" and count_absent
+        own = mainroles is None or mainroles is self.main_roles
+        if own:
+            key = (frozenset(DYING), frozenset(get_absent(self)) if absent else frozenset())
+            counts = self._team_counts.get(key)
+            if counts is not None:
+                return counts
+
+        if absent:
+            pl = set(get_players(self)) - get_absent(self)
+        else:
+            pl = set(get_players(self, mainroles=mainroles))
+        wolves = set(get_players(self, Wolf_Objective, mainroles=mainroles))
+        vampires = set(get_players(self, Vampire_Objective, mainroles=mainroles))
+        # not limited to pl, so absent village players still count here
+        real_wolves = len(get_players(self, Village_Objective, mainroles=mainroles))
+        counts = TeamCounts(len(pl), len(wolves & pl), real_wolves, len(vampires & pl))
+        if own:
+            self._team_counts[key] = counts
+        return counts
+
+    def get_role_players(self, roles: Optional[Iterable[str]] = None) -> frozenset[User]:
+        """ Get the players who have any of the given roles, main or secondary.
+
+        Results are cached until a player gains or loses a role. Dying players are included.
+
+        :param roles: Roles or role category to look for, or None for every player with any role
+        :return: Matching players
+        """
+        key = _role_key(roles)
+        players = self._role_players.get(key)
+        if players is None:
+            sets = self.roles.values() if key is None else (self.roles[role] for role in key)
+            players = self._role_players[key] = frozenset().union(*sets)
+        return players
+
+    def get_role_stats(self) -> RoleStats:
+        return self._rolestats.copy()
+
+    def set_role_stats(self, value: RoleStats) -> None:
+        self._rolestats = value.copy()
+
+    def reconfigure_role_stats(self, reason: str) -> None:
+        """ Give roles and modes an opportunity to adjust the possible role compositions for !stats.
+
+        :param reason: Why stats are being reconfigured: "start", "howl" or "del_player"
+        """
+        stats = self.get_role_stats()
+        Event("reconfigure_stats", {}).dispatch(self, stats, reason)
+        self.set_role_stats(stats)
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import base64
-import threading
 import subprocess
 import platform
 import time
@@ -11,9 +10,10 @@ import sys
 from typing import Optional
 
 from oyoyo.client import IRCClient
-from src import channels, config, context, decorators, users, history
+from src import channels, config, context, decorators, users, history, timers
 from src.messages import messages
 from src.functions import get_participants, get_all_roles, match_role
+from src.roles import is_builtin_role_command, load_builtin_roles
 from src.dispatcher import MessageDispatcher
 from src.decorators import handle_error, command, hook
 from src.context import Features
@@ -102,6 +102,9 @@ def parse_and_dispatch(wrapper: MessageDispatcher,
     if role:
         role_prefix = role
 
+    if is_builtin_role_command(key):
+        load_builtin_roles()
+
     if not key or key not in decorators.COMMANDS:
         return
 
@@ -260,8 +263,10 @@ def connect_callback(cli: IRCClient):
         event.dispatch(cli)
 
         main_channel = config.Main.get("transports[0].channels.main")
-        channels.Main = channels.add(main_channel["name"], cli, key=main_channel["key"], prefix=main_channel["prefix"])
+        channels.add_game_channel(channels.add(main_channel["name"], cli, key=main_channel["key"], prefix=main_channel["prefix"]), primary=True)
         channels.Dummy = channels.add("*", cli)
+        for channel in config.Main.get("transports[0].channels.games"):
+            channels.add_game_channel(channels.add(channel["name"], cli, key=channel["key"], prefix=channel["prefix"]))
         for channel in config.Main.get("transports[0].channels.alternate"):
             channels.add(channel["name"], cli, key=channel["key"], prefix=channel["prefix"])
 
@@ -271,9 +276,7 @@ def connect_callback(cli: IRCClient):
             def ping_server_timer(cli: IRCClient):
                 ping_server(cli)
 
-                t = threading.Timer(config.Main.get("transports[0].server_ping"), ping_server_timer, args=(cli,))
-                t.daemon = True
-                t.start()
+                timers.schedule(config.Main.get("transports[0].server_ping"), ping_server_timer, (cli,))
 
             ping_server_timer(cli)
 
@@ -0,0 +1,58 @@
+""" Helpers for running games without connecting anywhere, as the benchmark and simulate scripts and the tests do. """
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from typing import Optional
+
+from src import config
+from src.gamemodes import GAME_MODES, GameMode, InvalidModeException
+from src.logger import LogRecord
+from src.random import KEY_SIZE
+
+__all__ = ["configure_headless", "derive_seed", "make_mode"]
+
+def configure_headless() -> None:
+    """ Fill in the configuration a bot without any connections still needs.
+
+    Messages to fake users and channels are logged under the name of the first transport, so one is
+    defined if there are none. The bot's log messages use str.format placeholders, which logger.init()
+    only enables when some logging is configured.
+    """
+    logging.setLogRecordFactory(LogRecord)
+    if config.Main.get("transports"):
+        return
+    config.Main.set("transports", [{
+        "type": "irc",
+        "name": "headless",
+        "module": "solanum",
+        "connection": {"host": "localhost", "port": 6667},
+        "authentication": {"services": {"module": "atheme"}},
+        "user": {"nick": "headless"},
+        "channels": {"main": "headless"},
+    }])
+
+def derive_seed(seed: str, *parts) -> bytes:
+    """ Derive a reproducible game RNG seed.
+
+    :param seed: Seed given on the command line
+    :param parts: Values identifying the game being seeded
+    :return: Seed suitable for GameRNG.seed
+    """
+    data = ":".join(str(x) for x in (seed,) + parts).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=KEY_SIZE).digest()
+
+def make_mode(name: str) -> Optional[GameMode]:
+    """ Create and start up a game mode with its default settings.
+
+    :param name: Name of the mode
+    :return: Game mode, or None if the mode cannot be played without arguments
+    """
+    try:
+        mode = GAME_MODES[name][0]()
+    except InvalidModeException:
+        # modes such as "roles" can't be played without arguments
+        return None
+    mode.startup()
+    return mode
@@ -0,0 +1,397 @@
+""" Append-only binary journal of everything that happens in a game, and a replayer for it.
+
+A journal begins when a game starts, with the players, the game mode and the seed of the game RNG. It then
+records every command run, every player leaving, returning or changing nick, and the phase transitions and
+game timers firing in between, and ends with the winner. Each record is stamped with the number of seconds
+since the game started, as measured by the timer service.
+
+Replaying a journal plays the game again headlessly, with fake users standing in for the players. The game
+RNG is seeded with the recorded seed and the game timers run off a manual clock which is moved forward to
+the time of each record, so a replay runs as fast as the CPU allows. The replay keeps a journal of its own,
+which is compared against the recorded one to find where the two games diverged, if they did. Replays are
+only exact if the bot runs with the same configuration and PYTHONHASHSEED as the recorded game, as some of
+the game logic depends on the order in which sets are iterated.
+"""
+
+from __future__ import annotations
+
+import io
+import struct
+import time
+from enum import IntEnum
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator, Optional, TYPE_CHECKING
+
+from src import config, timers
+from src.events import Event, event_listener
+
+if TYPE_CHECKING:
+    from src.cats import Category
+    from src.decorators import command
+    from src.dispatcher import MessageDispatcher
+    from src.gamestate import GameState, PregameState
+    from src.users import User
+
+__all__ = ["Kind", "Record", "Journal", "ReplayResult", "start", "finish", "record", "record_command",
+           "read", "replay"]
+
+MAGIC = b"WWJ\x01"
+
+# record kind, seconds since the game started, payload length
+_HEADER = struct.Struct("<BdI")
+_DOUBLE = struct.Struct("<d")
+
+class Kind(IntEnum):
+    START = 1 # seed, RNG buffer size, mode name, mode arguments, [[nick, account], ...]
+    COMMAND = 2 # command name, function, nick, whether it was used in the channel, message
+    LEAVE = 3 # what, nick
+    RETURN = 4 # nick, new nick
+    RENAME = 5 # old nick, new nick
+    PHASE = 6 # phase
+    TIMER = 7 # function
+    END = 8 # winner
+
+class Record:
+    __slots__ = ("kind", "time", "fields")
+
+    def __init__(self, kind: Kind, time: float, fields: tuple):
+        self.kind = kind
+        self.time = time
+        self.fields = fields
+
+    def __repr__(self):
+        return f"Record({self.kind.name}, {self.time:.3f}, {self.fields!r})"
+
+    def __eq__(self, other):
+        # the time records happen at is allowed to differ; what happened is what matters
+        if not isinstance(other, Record):
+            return NotImplemented
+        return self.kind == other.kind and self.fields == other.fields
+
+    __hash__ = None # type: ignore[assignment]
+
+class Journal:
+    """ Writes the records of a single game.
+
+    Journals belong to the game loop the game is played on, and are only ever written to from that loop.
+
+    :param file: Binary file to append the records to, or None to only keep them in memory
+    """
+    def __init__(self, file: Optional[BinaryIO] = None):
+        self.file = file
+        self.records: Optional[list[Record]] = [] if file is None else None
+        self.started = timers.now()
+        if file is not None:
+            file.write(MAGIC)
+
+    def write(self, kind: Kind, *fields):
+        offset = timers.now() - self.started
+        if self.records is not None:
+            self.records.append(Record(kind, offset, fields))
+            return
+        payload = io.BytesIO()
+        for value in fields:
+            _pack(payload, value)
+        data = payload.getvalue()
+        self.file.write(_HEADER.pack(kind, offset, len(data)))
+        self.file.write(data)
+        # don't let a crash take the end of the game with it
+        self.file.flush()
+
+    def timer_fired(self, func):
+        self.write(Kind.TIMER, _qualname(func))
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+def start(var: GameState):
+    """ Begin the journal of a game which is starting.
+
+    Must be called right after the game RNG is seeded for the game.
+
+    :param var: Game which is starting
+    """
+    loop = var.loop
+    if loop.journal is None:
+        if not config.Main.get("journal.enabled"):
+            return
+        directory = Path(__file__).parent.parent / config.Main.get("journal.directory")
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime(var.game_id))
+        loop.journal = Journal(open(directory / f"{stamp}-{loop.name}.wwj", "ab"))
+    loop.journal.started = timers.now()
+    players = [[p.nick, p.account] for p in var.players]
+    loop.journal.write(Kind.START, var.rng_seed, var.rng_buffer_size, var.current_mode.name, var.current_mode.arg, players)
+
+def finish(var: Optional[GameState | PregameState], winner: Category):
+    """ End the journal of a game which is over.
+
+    :param var: Game which ended
+    :param winner: Team which won the game
+    """
+    record(var, Kind.END, winner.name)
+    _close(var)
+
+def record(var: Optional[GameState | PregameState], kind: Kind, *fields):
+    """ Record something which happened in a game, if the game is being journaled.
+
+    :param var: Game it happened in
+    :param kind: What happened
+    :param fields: Details of what happened
+    """
+    if var is not None and var.loop.journal is not None:
+        var.loop.journal.write(kind, *fields)
+
+def record_command(var: Optional[GameState | PregameState], cmd: command, wrapper: MessageDispatcher, message: str):
+    """ Record a command which is being run in a game.
+
+    :param var: Game the command is run in
+    :param cmd: Command being run
+    :param wrapper: Who ran the command, and where
+    :param message: Parameters given to the command
+    """
+    if var is not None and var.loop.journal is not None:
+        var.loop.journal.write(Kind.COMMAND, cmd.name, _qualname(cmd.func), wrapper.source.nick, wrapper.public, message)
+
+def read(file: BinaryIO) -> Iterator[Record]:
+    """ Read back the records of a journal.
+
+    :param file: Binary file the journal was written to
+    :return: Iterator over the records, in the order they were written
+    :raises ValueError: If the file is not a journal
+    """
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("not a game journal")
+    while header := file.read(_HEADER.size):
+        if len(header) < _HEADER.size:
+            break # the bot stopped in the middle of writing a record
+        kind, offset, length = _HEADER.unpack(header)
+        data = file.read(length)
+        if len(data) < length:
+            break
+        view = memoryview(data)
+        fields = []
+        pos = 0
+        while pos < length:
+            value, pos = _unpack(view, pos)
+            fields.append(value)
+        yield Record(Kind(kind), offset, tuple(fields))
+
+class ReplayResult:
+    """ Outcome of replaying a journal.
+
+    :ivar records: Records of the replayed game
+    :ivar divergence: Index of the first record where the replayed game differs from the recorded one,
+        or None if the games are identical
+    :ivar elapsed: Number of seconds the replay took
+    """
+    __slots__ = ("records", "divergence", "elapsed")
+
+    def __init__(self, recorded: list[Record], records: list[Record], elapsed: float):
+        self.records = records
+        self.elapsed = elapsed
+        self.divergence: Optional[int] = None
+        for i, (a, b) in enumerate(zip(recorded, records)):
+            if a != b:
+                self.divergence = i
+                break
+        else:
+            if len(recorded) != len(records):
+                self.divergence = min(len(recorded), len(records))
+
+def replay(records: Iterable[Record]) -> ReplayResult:
+    """ Play a recorded game again.
+
+    The replay takes over the timer service with a manual clock, so it must not be run in a bot which is
+    also playing games for real.
+
+    :param records: Records of the game, as returned by read()
+    :return: Outcome of the replay
+    :raises ValueError: If the records do not begin with the start of a game
+    """
+    from src import channels, users
+    from src.dispatcher import MessageDispatcher
+    from src.gamestate import PregameState, set_gamemode
+    from src.pregame import start as start_game
+    from src import random as game_random
+
+    recorded = list(records)
+    if not recorded or recorded[0].kind is not Kind.START:
+        raise ValueError("journal does not begin with the start of a game")
+
+    began = time.perf_counter()
+    timers.set_clock(timers.ManualClock())
+    chan = channels.add("replay", None) # not a channel name, so this is a FakeChannel
+    if chan.loop is None:
+        channels.add_game_channel(chan, primary=not channels.game_channels())
+    if users.Bot is None:
+        users.Bot = users.BotUser(None, "replay", "replay", "localhost", None)
+    journal = chan.loop.journal = Journal()
+
+    seed, buffer_size, mode, arg, players = recorded[0].fields
+    by_nick: dict[str, User] = {}
+    for nick, _ in players:
+        by_nick[nick] = users.FakeUser.from_nick(nick)
+
+    def user(nick: str) -> User:
+        if nick not in by_nick:
+            by_nick[nick] = users.FakeUser.from_nick(nick)
+        return by_nick[nick]
+
+    def begin():
+        pregame = chan.game_state = PregameState(chan.loop)
+        pregame.players.extend(by_nick.values())
+        for player in pregame.players:
+            # so that players can be marked as back after leaving
+            player.channels[chan] = set()
+        set_gamemode(pregame, f"{mode}={arg}" if arg else mode)
+        seed_function = game_random.seed_function
+        game_random.seed_function = lambda size: seed
+        configured_buffer_size = config.Main.get("gameplay.rng_buffer_size")
+        config.Main.set("gameplay.rng_buffer_size", buffer_size)
+        try:
+            start_game(MessageDispatcher(pregame.players[0], chan), forced=True)
+        finally:
+            game_random.seed_function = seed_function
+            config.Main.set("gameplay.rng_buffer_size", configured_buffer_size)
+
+    def apply(rec: Record):
+        from src import decorators, reaper, wolfgame
+        var = chan.game_state
+        if rec.kind is Kind.COMMAND:
+            name, func, nick, public, message = rec.fields
+            for cmd in decorators.COMMANDS.get(name, ()):
+                if _qualname(cmd.func) == func:
+                    cmd._run(MessageDispatcher(user(nick), chan if public else users.Bot), message)
+                    break
+        elif rec.kind is Kind.LEAVE:
+            what, nick = rec.fields
+            wolfgame.leave(var, what, user(nick), chan if what in ("part", "kick") else None)
+        elif rec.kind is Kind.RETURN:
+            nick, new_nick = rec.fields
+            reaper.return_to_village(var, user(nick), show_message=True, new_user=user(new_nick))
+        elif rec.kind is Kind.RENAME:
+            old, new = rec.fields
+            user(old).swap(user(new))
+        # phase transitions, timers and the end of the game are outcomes of the other records
+
+    chan.loop.run(begin)
+    for rec in recorded[1:]:
+        # run every timer which fired before this record, and anything they queued up on the loop
+        due = journal.started + rec.time - timers.now()
+        if due > 0:
+            timers.advance(due)
+        chan.loop.run(apply, rec)
+        if chan.game_state is None or not chan.game_state.in_game:
+            break
+    if chan.loop.journal is journal:
+        chan.loop.journal = None
+    if chan.game_state is not None:
+        # the journal ends before the game did, such as when the bot was restarted mid-game
+        from src.trans import stop_game
+        chan.loop.run(stop_game, chan.game_state, log=False)
+    return ReplayResult(recorded, journal.records, time.perf_counter() - began)
+
+def _close(var: Optional[GameState | PregameState]):
+    if var is not None and var.loop.journal is not None:
+        var.loop.journal.close()
+        var.loop.journal = None
+
+def _qualname(func) -> str:
+    # see through handle_error and the like
+    while not hasattr(func, "__qualname__") and hasattr(func, "func"):
+        func = func.func
+    return f"{func.__module__}.{func.__qualname__}"
+
+def _pack(out: io.BytesIO, value: Any):
+    if value is None:
+        out.write(b"n")
+    elif value is True:
+        out.write(b"t")
+    elif value is False:
+        out.write(b"f")
+    elif isinstance(value, int):
+        # zigzag encoding, so that small negative numbers stay small
+        out.write(b"i")
+        _pack_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+    elif isinstance(value, float):
+        out.write(b"d")
+        out.write(_DOUBLE.pack(value))
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        out.write(b"s")
+        _pack_varint(out, len(data))
+        out.write(data)
+    elif isinstance(value, bytes):
+        out.write(b"b")
+        _pack_varint(out, len(value))
+        out.write(value)
+    elif isinstance(value, (list, tuple)):
+        out.write(b"l")
+        _pack_varint(out, len(value))
+        for item in value:
+            _pack(out, item)
+    else:
+        raise TypeError(f"cannot journal a {type(value).__name__}")
+
+def _pack_varint(out: io.BytesIO, value: int):
+    while value >= 0x80:
+        out.write(bytes(((value & 0x7f) | 0x80,)))
+        value >>= 7
+    out.write(bytes((value,)))
+
+def _unpack_varint(view: memoryview, pos: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = view[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def _unpack(view: memoryview, pos: int) -> tuple[Any, int]:
+    tag = view[pos]
+    pos += 1
+    if tag == ord("n"):
+        return None, pos
+    if tag == ord("t"):
+        return True, pos
+    if tag == ord("f"):
+        return False, pos
+    if tag == ord("i"):
+        value, pos = _unpack_varint(view, pos)
+        return (value >> 1) ^ -(value & 1), pos
+    if tag == ord("d"):
+        return _DOUBLE.unpack_from(view, pos)[0], pos + _DOUBLE.size
+    if tag in (ord("s"), ord("b")):
+        length, pos = _unpack_varint(view, pos)
+        data = bytes(view[pos:pos + length])
+        return (data.decode("utf-8") if tag == ord("s") else data), pos + length
+    if tag == ord("l"):
+        count, pos = _unpack_varint(view, pos)
+        items = []
+        for _ in range(count):
+            item, pos = _unpack(view, pos)
+            items.append(item)
+        return items, pos
+    raise ValueError(f"corrupt journal record (unknown tag {tag:#x})")
+
+@event_listener("transition_day_begin")
+def on_transition_day_begin(evt: Event, var: GameState):
+    record(var, Kind.PHASE, "day")
+
+@event_listener("transition_night_begin")
+def on_transition_night_begin(evt: Event, var: GameState):
+    record(var, Kind.PHASE, "night")
+
+@event_listener("nick_change")
+def on_nick_change(evt: Event, user: User, old_nick: str):
+    var = user.game_state
+    if var is not None and var.in_game and user in var.players:
+        var.loop.post(record, var, Kind.RENAME, old_nick, user.nick)
+
+@event_listener("reset")
+def on_reset(evt: Event, var: Optional[GameState | PregameState]):
+    _close(var)
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from src import config, metrics
+
+__all__ = ["Recording", "timed", "track", "observe", "get_history", "CATEGORIES"]
+
+# what the time of a timed operation is split into; whatever isn't tracked as one of the others counts as "other"
+CATEGORIES = ("events", "messages", "db", "irc", "other")
+
+OPERATION_SECONDS = metrics.histogram("transition_seconds",
+                                      "Time taken by phase transitions and the game logic driving them",
+                                      ("operation",))
+CATEGORY_SECONDS = metrics.histogram("transition_category_seconds",
+                                     "Time taken by phase transitions, split by what the time was spent on",
+                                     ("operation", "category"))
+
+_logger = logging.getLogger("game.latency")
+_local = threading.local()
+_history: deque[Recording] = deque()
+_history_lock = threading.Lock()
+
+class Recording:
+    """Timings of an operation, such as a phase transition, and of everything it did along the way.
+
+    The time taken is split into CATEGORIES by what it was spent on, counting each bit of time once:
+    formatting a message from within an event listener counts as messages rather than events.
+    Timed operations run as part of this one (such as kill_players during transition_day) are timed
+    as a whole in operations, but are not recorded separately.
+    """
+    __slots__ = ("operation", "where", "phase", "started", "total", "categories", "operations", "_stack", "_mark")
+
+    def __init__(self, operation: str, var):
+        self.operation = operation
+        loop = getattr(var, "loop", None)
+        self.where: str = loop.name if loop is not None else ""
+        phase = getattr(var, "current_phase", None)
+        self.phase: str = "{0} {1}".format(phase, getattr(var, f"{phase}_count", 0)) if phase else ""
+        self.started = time.time()
+        self.total = 0.0
+        self.categories = dict.fromkeys(CATEGORIES, 0.0)
+        self.operations: dict[str, float] = {}
+        self._stack: list[str] = ["other"]
+        self._mark = time.perf_counter()
+
+    def push(self, category: str):
+        now = time.perf_counter()
+        self.categories[self._stack[-1]] += now - self._mark
+        self._stack.append(category)
+        self._mark = now
+
+    def pop(self):
+        now = time.perf_counter()
+        self.categories[self._stack.pop()] += now - self._mark
+        self._mark = now
+
+    def _finish(self):
+        self.categories[self._stack[-1]] += time.perf_counter() - self._mark
+        self.total = sum(self.categories.values())
+
+def timed(operation: str, *, history: bool = True):
+    """Decorator for functions taking a game state first, which times every call as the given operation.
+
+    :param operation: Name to record the time under
+    :param history: Whether to keep every call for the ftimings command, rather than only
+        those which ran another timed operation (such as a vote check which ended the day)
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(var, *args, **kwargs):
+            current = getattr(_local, "recording", None)
+            if current is not None or not config.Main.get("latency.enabled"):
+                started = time.perf_counter()
+                try:
+                    return func(var, *args, **kwargs)
+                finally:
+                    if current is not None:
+                        observe(operation, time.perf_counter() - started)
+
+            recording = _local.recording = Recording(operation, var)
+            try:
+                return func(var, *args, **kwargs)
+            finally:
+                _local.recording = None
+                recording._finish()
+                _record(recording, history or bool(recording.operations))
+
+        return wrapper
+
+    return decorator
+
+def track(category: str) -> Optional[Recording]:
+    """Count the time until the returned recording's pop() as spent on the given category.
+
+    Callers should pop() in a finally block. If nothing is being timed, returns None and there is nothing to pop.
+
+    :param category: One of CATEGORIES
+    :return: The recording being timed on this thread, if any
+    """
+    recording = getattr(_local, "recording", None)
+    if recording is not None:
+        recording.push(category)
+    return recording
+
+def observe(operation: str, seconds: float):
+    """Record the time taken by an operation within whatever is being timed on this thread.
+
+    :param operation: Name of the operation
+    :param seconds: Time it took
+    """
+    OPERATION_SECONDS.observe(seconds, operation)
+    recording = getattr(_local, "recording", None)
+    if recording is not None:
+        recording.operations[operation] = recording.operations.get(operation, 0.0) + seconds
+
+def _record(recording: Recording, keep: bool):
+    OPERATION_SECONDS.observe(recording.total, recording.operation)
+    for category, seconds in recording.categories.items():
+        CATEGORY_SECONDS.observe(seconds, recording.operation, category)
+
+    budget = config.Main.get("latency.budget")
+    over_budget = budget and recording.total > budget
+    if keep or over_budget:
+        with _history_lock:
+            _history.append(recording)
+            while len(_history) > config.Main.get("latency.history"):
+                _history.popleft()
+
+    if over_budget:
+        _logger.warning("{0} took {1:.3f}s, over the budget of {2}s ({3})", recording.operation, recording.total, budget,
+                        ", ".join("{0} {1:.3f}s".format(category, seconds) for category, seconds in recording.categories.items()))
+
+def get_history(limit: Optional[int] = None) -> list[Recording]:
+    """Return the most recently timed operations, oldest first.
+
+    :param limit: Maximum number of operations to return
+    :return: Timed operations
+    """
+    with _history_lock:
+        history = list(_history)
+    if limit is not None:
+        history = history[-limit:] if limit > 0 else []
+    return history
@@ -1,7 +1,6 @@
 import threading
 
-__all__ = ["join_timer", "reaper"]
+__all__ = ["join_timer", "wait"]
 
 join_timer = threading.RLock()
-reaper = threading.RLock()
 wait = threading.RLock()
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import atexit
 import collections.abc
+import queue
 import time
 import json
 import logging
@@ -15,7 +17,8 @@ from pathlib import Path
 from src import config
 
 __all__ = ["UnionFilterMixin", "StreamHandler", "FileHandler", "RotatingFileHandler", "TimedRotatingFileHandler",
-           "IRCTransportHandler", "StringFormatter", "StructuredFormatter", "LogRecord", "init"]
+           "IRCTransportHandler", "QueueHandler", "QueueListener", "StringFormatter", "StructuredFormatter",
+           "LogRecord", "init", "shutdown"]
 
 class UnionFilterMixin(logging.Filterer):
     # Change filter logic so that we log as long as one of the provided filters succeeds.
@@ -61,10 +64,22 @@ class IRCTransportHandler(UnionFilterMixin, logging.Handler):
         self.transport = transport
         self.destination = destination
 
+        self.buffer: list[str] = []
+
     def emit(self, record: logging.LogRecord) -> None:
+        # Lines are sent in batches when flushed, which QueueListener does whenever it runs out of records;
+        # this lets a burst of records share messages rather than each waiting its turn in the token bucket
+        self.buffer.append(self.format(record))
+        if len(self.buffer) >= 20:
+            self.flush()
+
+    def flush(self) -> None:
         from src import channels
         from src.context import Features
-        line = self.format(record)
+        with self.lock:
+            lines, self.buffer = self.buffer, []
+        if not lines:
+            return
         prefix = None
         channel = self.destination
         if Features.STATUSMSG and self.destination[0] in Features.PREFIX:
@@ -72,13 +87,73 @@ class IRCTransportHandler(UnionFilterMixin, logging.Handler):
             channel = self.destination[1:]
         chan = channels.get(channel)
         if chan is not None:
-            chan.send(line, prefix=prefix)
+            chan.send(*lines, sep=" | ", prefix=prefix)
 
     def format(self, record: logging.LogRecord) -> str:
         # When sending to IRC, only send the first line
         line = super().format(record)
         return re.split("\r?\n", line)[0]
 
+class QueueHandler(logging.handlers.QueueHandler):
+    """Hands records off to a QueueListener once their message has been formatted.
+
+    Only records which pass the handler's level check get this far. Their message and exception are
+    formatted right away, as log arguments are often live users, game states or containers which may
+    have changed (or be in the middle of changing) by the time the listener's thread gets to them.
+    That thread then only has to filter the record, put it in its final form and write it out.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # both of our queue handlers see the same record, so only format it the first time
+        if hasattr(record, "template"):
+            return record
+        message = record.getMessage()
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exception_formatter.formatException(record.exc_info)
+            # the traceback keeps every frame's locals alive, and the text is all handlers need
+            record.exc_info = None
+        # the template and its arguments are kept for structured logs, with anything other than plain values
+        # turned into text now for the same reason
+        record.template = record.msg
+        if isinstance(record.args, collections.abc.Mapping):
+            record.template_args = {key: _snapshot(value) for key, value in record.args.items()}
+        else:
+            record.template_args = tuple(_snapshot(arg) for arg in record.args or ())
+        record.msg = message
+        record.args = None
+        return record
+
+_exception_formatter = logging.Formatter()
+
+def _snapshot(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+class QueueListener(logging.handlers.QueueListener):
+    """Passes records from a QueueHandler on to the real handlers on a background thread.
+
+    Handlers are flushed whenever the queue runs dry, which is when IRCTransportHandler sends its batch.
+    """
+    def __init__(self, *handlers: logging.Handler):
+        super().__init__(queue.SimpleQueue(), *handlers, respect_handler_level=True)
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+        return super().dequeue(block)
+
+    def stop(self) -> None:
+        super().stop()
+        for handler in self.handlers:
+            handler.flush()
+
+    @property
+    def level(self) -> int:
+        """Lowest level any of our handlers will log."""
+        return min(handler.level for handler in self.handlers)
+
 class StringFormatter(logging.Formatter):
     def __init__(self, tsconfig: dict):
         if tsconfig["enabled"]:
@@ -96,8 +171,8 @@ class StructuredFormatter(StringFormatter):
         obj = {
             "version": 2,
             "message": record.message,
-            "template": record.msg,
-            "args": record.args,
+            "template": getattr(record, "template", record.msg),
+            "args": getattr(record, "template_args", record.args),
             "created": record.created,
             "level": record.levelname,
             "channel": record.name
@@ -150,6 +225,8 @@ class _ThrowingFormatter(string.Formatter):
         if expected_args - found_args or expected_kwargs - found_kwargs:
             raise TypeError("not all arguments converted during string formatting")
 
+_listeners: list[QueueListener] = []
+
 def init():
     gl = config.Main.get("logging.groups")
     groups = {}
@@ -158,6 +235,8 @@ def init():
 
     logs = config.Main.get("logging.logs")
     root_logger = logging.getLogger()
+    local_handlers: list[logging.Handler] = []
+    transport_handlers: list[logging.Handler] = []
     for log in logs:
         # construct our Handler instance
         if log["handler"]["type"] == "file":
@@ -221,12 +300,35 @@ def init():
             raise NotImplementedError("Unknown format {} in logging.logs[].format".format(log["format"]))
         handler.setFormatter(formatter(log["timestamp"]))
 
-        # Register the handler
-        root_logger.addHandler(handler)
-
-        # Ensure that the root logger handles every message;
-        # our handlers will filter appropriately based on level
-        root_logger.setLevel(logging.NOTSET)
-
-        # Configure the record factory so that we support str.format formatting of log messages
-        logging.setLogRecordFactory(LogRecord)
+        # IRC handlers wait on the transport's token bucket, so they get a listener of their own
+        # to avoid holding up the logs written to disk
+        if isinstance(handler, IRCTransportHandler):
+            transport_handlers.append(handler)
+        else:
+            local_handlers.append(handler)
+
+    # Configure the record factory so that we support str.format formatting of log messages
+    logging.setLogRecordFactory(LogRecord)
+
+    # Formatting and I/O happen on the listeners' threads, so that logging never blocks the caller
+    for handlers in (local_handlers, transport_handlers):
+        if handlers:
+            listener = QueueListener(*handlers)
+            queue_handler = QueueHandler(listener.queue)
+            queue_handler.setLevel(listener.level)
+            root_logger.addHandler(queue_handler)
+            _listeners.append(listener)
+            listener.start()
+
+    if _listeners:
+        # Have the root logger drop anything none of our handlers would log before a record is even created
+        root_logger.setLevel(min(listener.level for listener in _listeners))
+        if not config.Main.get("debug.enabled"):
+            # Debug-level game events are only logged in debug mode
+            logging.getLogger("game").setLevel(max(logging.INFO, root_logger.level))
+        atexit.register(shutdown)
+
+def shutdown():
+    """Stop the background logging threads once everything they were given has been logged."""
+    while _listeners:
+        _listeners.pop().stop()
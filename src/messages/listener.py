@@ -8,6 +8,9 @@ class Listener(message_parserListener):
     def __init__(self, message, args, kwargs):
         super().__init__()
         self._value = None
+        # what each node of the tree works out to; kept here rather than on the nodes,
+        # as parse trees are cached and may be walked by several listeners at once
+        self._values = {}
         self.nest_level = 0
         self.used_args = set()
         self.message = message
@@ -28,7 +31,7 @@ class Listener(message_parserListener):
             if isinstance(node, TerminalNode):
                 bits.append(node.getText())
             else:
-                bits.append(node.value)
+                bits.append(self._values[node])
 
         if not enforce_string and len(bits) == 1:
             return bits[0]
@@ -41,23 +44,23 @@ class Listener(message_parserListener):
                 continue
             if isinstance(thing, TerminalNode):
                 return thing.getText()
-            return thing.value
+            return self._values[thing]
 
         return default
 
     def exitMain(self, ctx: message_parser.MainContext):
-        self._value = ctx.string().value
+        self._value = self._values[ctx.string()]
         self.message.formatter.check_unused_args(self.used_args, self.args, self.kwargs)
 
     def exitString(self, ctx: message_parser.StringContext):
-        ctx.value = self._join_fragments(ctx.getChildren(), enforce_string=True)
+        self._values[ctx] = self._join_fragments(ctx.getChildren(), enforce_string=True)
 
     def exitTag(self, ctx: message_parser.TagContext):
         # to resolve a tag, we call the relevant function on our formatter, passing in the
         # parameter (if any) and tag content
-        tag_name, param = ctx.open_tag().value  # param may be None
-        content = ctx.string().value
-        close_name = ctx.close_tag().value
+        tag_name, param = self._values[ctx.open_tag()]  # param may be None
+        content = self._values[ctx.string()]
+        close_name = self._values[ctx.close_tag()]
 
         if tag_name != close_name:
             # mismatch of tag names
@@ -70,19 +73,19 @@ class Listener(message_parserListener):
             raise ValueError("Parse error: {}: Unknown tag {} ({})".format(
                              self.message.key, tag_name, ctx.open_tag().OPEN_TAG().getSymbol().column))
 
-        ctx.value = tag_func(content, param)
+        self._values[ctx] = tag_func(content, param)
 
     def exitOpen_tag(self, ctx: message_parser.Open_tagContext):
-        ctx.value = (ctx.TAG_NAME().getText(), self._coalesce(ctx.tag_param()))
+        self._values[ctx] = (ctx.TAG_NAME().getText(), self._coalesce(ctx.tag_param()))
 
     def exitTag_param(self, ctx: message_parser.Tag_paramContext):
-        ctx.value = self._join_fragments(ctx.tag_param_frag())
+        self._values[ctx] = self._join_fragments(ctx.tag_param_frag())
 
     def exitTag_param_frag(self, ctx: message_parser.Tag_param_fragContext):
-        ctx.value = self._coalesce(ctx.sub(), ctx.TAG_PARAM())
+        self._values[ctx] = self._coalesce(ctx.sub(), ctx.TAG_PARAM())
 
     def exitClose_tag(self, ctx: message_parser.Close_tagContext):
-        ctx.value = ctx.TAG_NAME().getText()
+        self._values[ctx] = ctx.TAG_NAME().getText()
 
     def enterSub(self, ctx: message_parser.SubContext):
         self.nest_level += 1
@@ -91,9 +94,9 @@ class Listener(message_parserListener):
         self.nest_level -= 1
         flatten_lists = self.nest_level == 0
 
-        field_name = ctx.sub_field().value
+        field_name = self._values[ctx.sub_field()]
         convert = self._coalesce(ctx.sub_convert())
-        spec: Optional[dict] = dict(x.value for x in ctx.sub_spec())
+        spec: Optional[dict] = dict(self._values[x] for x in ctx.sub_spec())
         # if spec is empty, change it to None. Makes us more consistent with built in format method
         # (since formatter can be used for both this parse tree as well as normal formatting)
         if not spec:
@@ -108,34 +111,34 @@ class Listener(message_parserListener):
 
         # obj is not necessarily a string here; we support passing objects through until the point where we need
         # to concatenate them with other things (at which point we coerce to string)
-        ctx.value = obj
+        self._values[ctx] = obj
 
     def exitSub_field(self, ctx: message_parser.Sub_fieldContext):
-        ctx.value = self._join_fragments(ctx.sub_field_frag())
+        self._values[ctx] = self._join_fragments(ctx.sub_field_frag())
 
     def exitSub_field_frag(self, ctx: message_parser.Sub_field_fragContext):
-        ctx.value = self._coalesce(ctx.sub(), ctx.SUB_FIELD())
+        self._values[ctx] = self._coalesce(ctx.sub(), ctx.SUB_FIELD())
 
     def exitSub_convert(self, ctx: message_parser.Sub_convertContext):
-        ctx.value = ctx.SUB_IDENTIFIER().getText()
+        self._values[ctx] = ctx.SUB_IDENTIFIER().getText()
 
     def exitSub_spec(self, ctx: message_parser.Sub_specContext):
-        ctx.value = ctx.spec_value().value
+        self._values[ctx] = self._values[ctx.spec_value()]
 
     def exitSpec_value(self, ctx: message_parser.Spec_valueContext):
-        ctx.value = self._coalesce(ctx.spec_func(), ctx.spec_literal())
+        self._values[ctx] = self._coalesce(ctx.spec_func(), ctx.spec_literal())
 
     def exitSpec_literal(self, ctx: message_parser.Spec_literalContext):
-        ctx.value = (self._join_fragments(ctx.spec_literal_frag(), enforce_string=True), None)
+        self._values[ctx] = (self._join_fragments(ctx.spec_literal_frag(), enforce_string=True), None)
 
     def exitSpec_literal_frag(self, ctx: message_parser.Spec_literal_fragContext):
-        ctx.value = self._coalesce(ctx.sub(), ctx.SPEC_VALUE())
+        self._values[ctx] = self._coalesce(ctx.sub(), ctx.SPEC_VALUE())
 
     def exitSpec_func(self, ctx: message_parser.Spec_funcContext):
-        ctx.value = (ctx.SPEC_VALUE().getText(), ctx.spec_func_arg().value)
+        self._values[ctx] = (ctx.SPEC_VALUE().getText(), self._values[ctx.spec_func_arg()])
 
     def exitSpec_func_arg(self, ctx: message_parser.Spec_func_argContext):
-        ctx.value = self._join_fragments(ctx.spec_func_arg_frag())
+        self._values[ctx] = self._join_fragments(ctx.spec_func_arg_frag())
 
     def exitSpec_func_arg_frag(self, ctx: message_parser.Spec_func_arg_fragContext):
-        ctx.value = self._coalesce(ctx.sub(), ctx.ARGLIST_VALUE())
+        self._values[ctx] = self._coalesce(ctx.sub(), ctx.ARGLIST_VALUE())
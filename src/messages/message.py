@@ -1,8 +1,9 @@
+import functools
 import random
 from antlr4 import InputStream, CommonTokenStream, ParseTreeWalker
 from antlr4.error.ErrorListener import ErrorListener
 
-from src import config
+from src import config, latency
 from src.messages import message_formatter
 from src.messages.lexer import Lexer
 from src.messages.parser import Parser
@@ -40,15 +41,9 @@ class Message:
         return other + str(self)
 
     def format(self, *args, **kwargs) -> str:
+        recording = latency.track("messages")
         try:
-            error_listener = MessageErrorListener()
-            input_stream = InputStream(self.value)
-            lexer = Lexer(self.key, input_stream)
-            lexer.addErrorListener(error_listener)
-            token_stream = CommonTokenStream(lexer)
-            parser = Parser(self.key, token_stream)
-            parser.addErrorListener(error_listener)
-            tree = parser.main()
+            tree = _parse(self.key, self.value)
             listener = Listener(self, args, kwargs)
             walker = ParseTreeWalker()
             walker.walk(listener, tree)
@@ -58,6 +53,25 @@ class Message:
                 raise
 
             return "ERROR: {0!s} ({1}: {2!r}, {3!r})".format(e, self.key, args, kwargs)
+        finally:
+            if recording is not None:
+                recording.pop()
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse(key, value):
+    """Parse a message value into a tree for Listener to walk.
+
+    Parsing is most of the cost of formatting a message, so trees are cached and walked again for every format.
+    """
+    error_listener = MessageErrorListener()
+    input_stream = InputStream(value)
+    lexer = Lexer(key, input_stream)
+    lexer.addErrorListener(error_listener)
+    token_stream = CommonTokenStream(lexer)
+    parser = Parser(key, token_stream)
+    parser.addErrorListener(error_listener)
+    return parser.main()
 
 
 class MessageErrorListener(ErrorListener):
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import atexit
+import bisect
+import logging
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from src import config
+
+__all__ = ["Counter", "Gauge", "Histogram", "counter", "gauge", "histogram", "get_metrics", "render", "start", "stop",
+           "enabled", "DEFAULT_BUCKETS", "NAMESPACE"]
+
+# upper bounds of histogram buckets, in seconds; values above the last bound are counted in an implicit +Inf bucket
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# prefixed to the name of every metric when rendering them
+NAMESPACE = "lykos"
+
+# Whether the metrics are being exported. Instrumentation of hot paths (such as every event dispatched
+# or database query made) checks this first, so that it costs next to nothing unless metrics are enabled.
+enabled = False
+
+_logger = logging.getLogger("metrics")
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._series: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _check(self, labels: tuple[str, ...]):
+        if len(labels) != len(self.labels):
+            raise ValueError("{0} {1} takes {2} label(s), got {3}".format(self.type.capitalize(), self.name, len(self.labels), len(labels)))
+
+    def collect(self) -> dict[tuple[str, ...], float]:
+        """Return a snapshot of every series.
+
+        :return: Label values -> value
+        """
+        with self._lock:
+            return dict(self._series)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+class Counter(_Metric):
+    """Value which only ever goes up, such as the number of lines sent.
+
+    A counter has one series per combination of label values. It may be updated from any thread.
+    """
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        """Increase the counter.
+
+        :param labels: Values of the counter's labels, in order
+        :param amount: Amount to increase it by
+        """
+        self._check(labels)
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+class Gauge(_Metric):
+    """Value which may go up and down, such as the number of games being played.
+
+    Gauges can also be given a callback which works out their value whenever they are collected,
+    for values which are already tracked elsewhere. Such gauges have no labels.
+    """
+    type = "gauge"
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = (), callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, description, labels)
+        if callback is not None and self.labels:
+            raise ValueError("Gauges with a callback can't have labels")
+        self.callback = callback
+
+    def set(self, value: float, *labels: str):
+        """Set the gauge to a value.
+
+        :param value: New value
+        :param labels: Values of the gauge's labels, in order
+        """
+        self._check(labels)
+        with self._lock:
+            self._series[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1):
+        """Increase the gauge; pass a negative amount to decrease it.
+
+        :param labels: Values of the gauge's labels, in order
+        :param amount: Amount to increase it by
+        """
+        self._check(labels)
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def collect(self) -> dict[tuple[str, ...], float]:
+        if self.callback is not None:
+            return {(): self.callback()}
+        return super().collect()
+
+class Histogram(_Metric):
+    """Distribution of observed values, counted into buckets the way Prometheus histograms are.
+
+    A histogram has one series per combination of label values. Observations may come from any thread.
+    """
+    type = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (the last one being +Inf), sum of observed values]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        """Record an observation.
+
+        :param value: Value observed
+        :param labels: Values of the histogram's labels, in order
+        """
+        self._check(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def collect(self) -> dict[tuple[str, ...], tuple[list[int], float]]:
+        """Return a snapshot of every series.
+
+        :return: Label values -> (cumulative count per bucket with +Inf last, sum of observed values)
+        """
+        with self._lock:
+            snapshot = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        for labels, (counts, total) in snapshot.items():
+            for i in range(1, len(counts)):
+                counts[i] += counts[i - 1]
+        return snapshot
+
+_METRICS: dict[str, _Metric] = {}
+_metrics_lock = threading.Lock()
+
+def _get(cls, name: str, *args, **kwargs):
+    with _metrics_lock:
+        metric = _METRICS.get(name)
+        if metric is None:
+            metric = _METRICS[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise TypeError("Metric {0} is a {1}, not a {2}".format(name, metric.type, cls.type))
+        return metric
+
+def counter(name: str, description: str, labels: Iterable[str] = ()) -> Counter:
+    """Get the counter with the given name, creating it if it doesn't exist yet.
+
+    :param name: Name of the counter, which should end in _total
+    :param description: What the counter counts
+    :param labels: Names of the labels its series are told apart by
+    :return: The counter
+    """
+    return _get(Counter, name, description, labels)
+
+def gauge(name: str, description: str, labels: Iterable[str] = (), callback: Optional[Callable[[], float]] = None) -> Gauge:
+    """Get the gauge with the given name, creating it if it doesn't exist yet.
+
+    :param name: Name of the gauge
+    :param description: What the gauge measures
+    :param labels: Names of the labels its series are told apart by
+    :param callback: Function returning the gauge's value, called whenever it is collected
+    :return: The gauge
+    """
+    return _get(Gauge, name, description, labels, callback)
+
+def histogram(name: str, description: str, labels: Iterable[str] = (), buckets: Optional[Iterable[float]] = None) -> Histogram:
+    """Get the histogram with the given name, creating it if it doesn't exist yet.
+
+    :param name: Name of the histogram
+    :param description: What the histogram measures
+    :param labels: Names of the labels its series are told apart by
+    :param buckets: Upper bounds of its buckets, defaults to DEFAULT_BUCKETS
+    :return: The histogram
+    """
+    return _get(Histogram, name, description, labels, DEFAULT_BUCKETS if buckets is None else buckets)
+
+def get_metrics() -> list[_Metric]:
+    """Return every metric created so far, in the order they were created."""
+    with _metrics_lock:
+        return list(_METRICS.values())
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace("\"", "\\\"")
+
+def _labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = ",".join("{0}=\"{1}\"".format(name, _escape(str(value))) for name, value in zip(names, values))
+    return "{" + pairs + "}" if pairs else ""
+
+def render() -> str:
+    """Render every metric in the Prometheus text exposition format.
+
+    :return: The metrics, one sample per line
+    """
+    lines = []
+    for metric in get_metrics():
+        name = "{0}_{1}".format(NAMESPACE, metric.name)
+        lines.append("# HELP {0} {1}".format(name, metric.description.replace("\\", "\\\\").replace("\n", "\\n")))
+        lines.append("# TYPE {0} {1}".format(name, metric.type))
+        for labels, value in sorted(metric.collect().items()):
+            if isinstance(metric, Histogram):
+                counts, total = value
+                names = metric.labels + ("le",)
+                for bound, count in zip(metric.buckets + (math.inf,), counts):
+                    lines.append("{0}_bucket{1} {2}".format(name, _labels(names, labels + (_number(bound),)), count))
+                lines.append("{0}_sum{1} {2}".format(name, _labels(metric.labels, labels), _number(total)))
+                lines.append("{0}_count{1} {2}".format(name, _labels(metric.labels, labels), counts[-1]))
+            else:
+                lines.append("{0}{1} {2}".format(name, _labels(metric.labels, labels), _number(value)))
+    return "\n".join(lines) + "\n"
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        _logger.debug("{0} - {1}", self.address_string(), format % args)
+
+_server: Optional[ThreadingHTTPServer] = None
+_dump_timer = None
+
+def start():
+    """Start exporting metrics, if enabled in config.
+
+    Metrics are served over HTTP on the configured port, and/or dumped to the configured file every so often.
+    """
+    global enabled, _server
+    if enabled or not config.Main.get("metrics.enabled"):
+        return
+    enabled = True
+    port = config.Main.get("metrics.port")
+    if port:
+        host = config.Main.get("metrics.host")
+        _server = ThreadingHTTPServer((host, port), _Handler)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        _logger.info("Serving metrics on http://{0}:{1}/metrics", host, _server.server_address[1])
+    if config.Main.get("metrics.file"):
+        _schedule_dump()
+    atexit.register(stop)
+
+def stop():
+    """Stop exporting metrics, writing them out one last time if they are dumped to a file."""
+    global enabled, _server, _dump_timer
+    if not enabled:
+        return
+    enabled = False
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
+    if _dump_timer is not None:
+        _dump_timer.cancel()
+        _dump_timer = None
+        dump()
+
+def dump(path: Optional[str] = None):
+    """Write every metric to a file in the Prometheus text exposition format.
+
+    The file is replaced as a whole, so readers never see a partially written file.
+
+    :param path: File to write to, defaults to the one in config (relative to the bot's root directory)
+    """
+    target = Path(__file__).parent.parent / (path or config.Main.get("metrics.file"))
+    temp = target.with_name(target.name + ".tmp")
+    temp.write_text(render(), encoding="utf-8")
+    os.replace(temp, target)
+
+def _schedule_dump():
+    global _dump_timer
+    from src import timers
+    _dump_timer = timers.schedule(config.Main.get("metrics.interval"), _dump_tick, threaded=True)
+
+def _dump_tick():
+    if not enabled:
+        return
+    try:
+        dump()
+    finally:
+        _schedule_dump()
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Optional, Union
+
+from src.events import Event
+from src.functions import get_main_role, get_reveal_role
+from src.gamestate import GameState
+from src.locations import Location
+from src.messages import messages
+from src.status import is_dying, try_protection, try_lycanthropy
+from src.users import User
+from src.random import random
+
+__all__ = ["Kill", "NightResolution", "resolve_kill", "resolve_night_kills"]
+
+# some type aliases to make things clearer later
+UserOrLocation = Union[User, Location]
+UserOrSpecialTag = Union[User, str]
+
+@dataclass
+class Kill:
+    """ An attack on a victim by one of their killers, resolved to who made it and as which role. """
+    victim: User
+    killer: UserOrSpecialTag
+    attacker: Optional[User]
+    role: str
+    try_protection: bool = True
+    protection_reason: str = "night_death"
+    try_lycanthropy: bool = False
+
+@dataclass
+class NightResolution:
+    """ Outcome of resolving the night's kills, before anyone is actually killed.
+
+    killers holds every victim's remaining killers with the one credited for the kill first;
+    timings holds the seconds each step of resolve_night_kills() took, in the order they ran.
+    """
+    victims: set[User]
+    killers: dict[User, list[UserOrSpecialTag]]
+    dead: set[User]
+    message: dict[UserOrSpecialTag, list[str]]
+    novictmsg: bool
+    howl_count: int
+    rolemap: dict[str, set[User]]
+    mainroles: dict[User, str]
+    timings: dict[str, float] = field(default_factory=dict)
+
+def resolve_kill(var: GameState, victim: User, killer: UserOrSpecialTag, *, mainroles=None) -> Kill:
+    """ Work out who attacked a victim and as which role.
+
+    :param var: Game state
+    :param victim: Player being attacked
+    :param killer: Killer of the victim, either a player or a special tag such as @wolves
+    :param mainroles: Main roles to look the attacker's role up in, defaults to the current main roles
+    :return: The resolved kill
+    """
+    if killer == "@wolves":
+        return Kill(victim, killer, None, "wolf", try_lycanthropy=True)
+    if isinstance(killer, str):
+        kevt = Event("resolve_killer_tag", {
+            "attacker": None,
+            "role": None,
+            "try_protection": True,
+            "protection_reason": "night_death",
+            "try_lycanthropy": False
+        })
+        kevt.dispatch(var, victim, killer)
+        assert kevt.data["role"] is not None
+        return Kill(victim, killer, kevt.data["attacker"], kevt.data["role"], kevt.data["try_protection"],
+                    kevt.data["protection_reason"], kevt.data["try_lycanthropy"])
+    return Kill(victim, killer, killer, get_main_role(var, killer, mainroles=mainroles))
+
+def resolve_night_kills(var: GameState, message: dict[UserOrSpecialTag, list[str]]) -> NightResolution:
+    """ Resolve who dies to the night's kills, taking protections and lycanthropy into account.
+
+    Dispatches the night_kills event to collect the kills, and night_death_message for every victim who dies.
+    Nobody is marked as dying here; that is left to the caller once the resolution has been acted upon.
+
+    :param var: Game state
+    :param message: Messages to send at daybreak, keyed by the victim they are about or "*" for general messages
+    :return: The resolution
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    # Mark people who are dying as a direct result of night actions (i.e. not chained deaths)
+    # We set the variables here first; listeners should mutate, not replace
+    # We don't need to use User containers here, as these don't persist long enough
+    # Kill priorities are used to determine which kill takes precedence over another; default priority is 0,
+    # negative numbers make those kills take precedence, and positive numbers make those kills defer to others.
+    # In default logic, wolf-aligned VG is priority -5, wolf kills (including harlot visiting wolf) are priority +5,
+    # GA/bodyguard guarding a wolf is +10, suicides are +15, and everything else is 0.
+    # Ties in priority are resolved randomly
+    victims: set[UserOrLocation] = set()
+    killers: dict[UserOrLocation, list[UserOrSpecialTag]] = defaultdict(list)
+    kill_priorities: dict[UserOrSpecialTag, int] = defaultdict(int)
+    novictmsg = True
+    howl_count = 0
+
+    evt = Event("night_kills", {
+        "victims": victims,
+        "killers": killers,
+        "kill_priorities": kill_priorities
+        })
+    evt.dispatch(var)
+    started = _lap(timings, "night_kills", started)
+
+    # expand locations to encompass everyone at that location
+    locations = [v for v in victims if isinstance(v, Location)]
+    if locations:
+        # look up everyone's location in one pass rather than once per location attacked
+        present: dict[Location, set[User]] = defaultdict(set)
+        for p, loc in var.current_locations.items():
+            present[loc].add(p)
+        for v in locations:
+            pl = present.get(v, ())
+            # Play the "target not home" message if the wolves attacked an empty location
+            # This also suppresses the "no victims" message if nobody ends up dying tonight
+            if not pl and "@wolves" in killers[v]:
+                message["*"].append(messages["target_not_home"])
+                novictmsg = False
+            for p in pl:
+                victims.add(p)
+                killers[p].extend(killers[v])
+            victims.remove(v)
+            del killers[v]
+    started = _lap(timings, "expand", started)
+
+    # sort every killer once by kill priority, with random jitter drawn up front to break ties;
+    # each victim's killers are then put in that order, which keeps duplicate entries together
+    distinct = list(dict.fromkeys(k for kl in killers.values() for k in kl))
+    jitter = dict(zip(distinct, random.randoms(len(distinct))))
+    distinct.sort(key=lambda k: (kill_priorities[k], jitter[k]))
+    rank = {k: i for i, k in enumerate(distinct)}
+    killers = {u: sorted(kl, key=rank.__getitem__) for u, kl in killers.items()}
+    started = _lap(timings, "sort", started)
+
+    # save a copy of roles so we can credit kills to the roles the players were at night,
+    # before any roleswaps due to night kills (e.g. lycanthropy)
+    rolemap = {role: set(players) for role, players in var.roles.items()}
+    mainroles = dict(var.main_roles)
+    dead: set[User] = set()
+
+    for victim in victims:
+        if not is_dying(var, victim):
+            for killer in list(killers[victim]):
+                kill = resolve_kill(var, victim, killer, mainroles=mainroles)
+                protected = None
+                if kill.try_protection:
+                    protected = try_protection(var, victim, kill.attacker, kill.role, reason=kill.protection_reason)
+                if protected is not None:
+                    message[victim].extend(protected)
+                    killers[victim].remove(killer)
+                    # if there's no particular protection message (e.g. blessed), then we still want no victims message to play
+                    if protected:
+                        novictmsg = False
+                elif kill.try_lycanthropy and try_lycanthropy(var, victim):
+                    howl_count += 1
+                    novictmsg = False
+                    killers[victim].remove(killer)
+
+            if not killers[victim]:
+                continue
+
+        dead.add(victim)
+    started = _lap(timings, "protection", started)
+
+    # Delay messaging until all protections and lycanthropy has been processed for every victim
+    for victim in dead:
+        mevt = Event("night_death_message", {
+            "key": "death" if var.role_reveal in ("on", "team") else "death_no_reveal",
+            "args": [victim, get_reveal_role(var, victim)]
+        }, rolemap=rolemap, mainroles=mainroles)
+        if mevt.dispatch(var, victim, killers[victim][0]):
+            message[victim].append(messages[mevt.data["key"]].format(*mevt.data["args"]))
+    _lap(timings, "death_messages", started)
+
+    return NightResolution(victims, killers, dead, message, novictmsg, howl_count, rolemap, mainroles, timings)
+
+def _lap(timings: dict[str, float], step: str, started: float) -> float:
+    now = time.perf_counter()
+    timings[step] = now - started
+    return now
@@ -3,13 +3,14 @@ from __future__ import annotations
 from collections import defaultdict, Counter
 from datetime import datetime, timedelta
 
-import threading
-import itertools
+import logging
 import time
 import math
 import re
+from typing import TYPE_CHECKING
 
 from src.containers import UserDict, UserSet, DefaultUserDict
+from src.gameloop import GameScoped
 from src.debug import handle_error
 from src.decorators import COMMANDS, command
 from src.gamestate import set_gamemode, GameState, PregameState
@@ -18,21 +19,32 @@ from src.warnings import decrement_stasis
 from src.messages import messages
 from src.events import Event, event_listener
 from src.cats import All
-from src import config, channels, locks, reaper, users, history
+from src.rolestats import RoleBounds, RoleStats, count_compositions
+from src import config, channels, journal, locks, reaper, users, history, timers
 from src.users import User
 from src.dispatcher import MessageDispatcher
 from src.channels import Channel
 from src.locations import Location, set_home
 from src.random import random
 
-WAIT_TOKENS = 0
-WAIT_LAST = 0
+if TYPE_CHECKING:
+    from src.gamemodes import GameMode
 
-LAST_START: UserDict[User, list[datetime | int]] = UserDict()
-LAST_WAIT: UserDict[User, datetime] = UserDict()
-START_VOTES: UserSet = UserSet()
-CAN_START_TIME: datetime = datetime.now()
-FORCE_ROLES: DefaultUserDict[str, UserSet] = DefaultUserDict(UserSet)
+class WaitState:
+    """The !wait token bucket of a game, and when !start may be used in it."""
+    __slots__ = ("tokens", "last", "can_start_time")
+
+    def __init__(self):
+        self.tokens: float = 0
+        self.last: float = 0
+        self.can_start_time: datetime = datetime.now()
+
+WAIT: WaitState = GameScoped(WaitState)
+
+LAST_START: UserDict[User, list[datetime | int]] = GameScoped(UserDict)
+LAST_WAIT: UserDict[User, datetime] = GameScoped(UserDict)
+START_VOTES: UserSet = GameScoped(UserSet)
+FORCE_ROLES: DefaultUserDict[str, UserSet] = GameScoped(lambda: DefaultUserDict(UserSet))
 
 @command("wait", playing=True, phases=("join",))
 def wait(wrapper: MessageDispatcher, message: str):
@@ -41,35 +53,32 @@ def wait(wrapper: MessageDispatcher, message: str):
         return
 
     with locks.wait:
-        global WAIT_TOKENS, WAIT_LAST, CAN_START_TIME
         wait_check_time = time.time()
-        WAIT_TOKENS += (wait_check_time - WAIT_LAST) / config.Main.get("timers.wait.command.tokenbucket.refill")
-        WAIT_LAST = wait_check_time
+        WAIT.tokens += (wait_check_time - WAIT.last) / config.Main.get("timers.wait.command.tokenbucket.refill")
+        WAIT.last = wait_check_time
 
-        WAIT_TOKENS = min(WAIT_TOKENS, config.Main.get("timers.wait.command.tokenbucket.maximum"))
+        WAIT.tokens = min(WAIT.tokens, config.Main.get("timers.wait.command.tokenbucket.maximum"))
 
         now = datetime.now()
         if ((LAST_WAIT and wrapper.source in LAST_WAIT and LAST_WAIT[wrapper.source] +
-                timedelta(seconds=config.Main.get("ratelimits.wait")) > now) or WAIT_TOKENS < 1):
+                timedelta(seconds=config.Main.get("ratelimits.wait")) > now) or WAIT.tokens < 1):
             wrapper.pm(messages["command_ratelimited"])
             return
 
         LAST_WAIT[wrapper.source] = now
-        WAIT_TOKENS -= 1
+        WAIT.tokens -= 1
         wait_amount = config.Main.get("timers.wait.command.amount")
         if not config.Main.get("timers.wait.enabled"):
             wait_amount = 0
-        if now > CAN_START_TIME:
-            CAN_START_TIME = now + timedelta(seconds=wait_amount)
+        if now > WAIT.can_start_time:
+            WAIT.can_start_time = now + timedelta(seconds=wait_amount)
         else:
-            CAN_START_TIME += timedelta(seconds=wait_amount)
+            WAIT.can_start_time += timedelta(seconds=wait_amount)
         wrapper.send(messages["wait_time_increase"].format(wrapper.source, wait_amount))
 
 @command("fwait", flag="w", phases=("join",))
 def fwait(wrapper: MessageDispatcher, message: str):
     """Force an increase (or decrease) in wait time. Can be used with a number of seconds to wait."""
-    global CAN_START_TIME
-
     msg = re.split(" +", message.strip(), 1)[0]
 
     if msg and (msg.isdigit() or (msg[0] == "-" and msg[1:].isdigit())):
@@ -80,10 +89,10 @@ def fwait(wrapper: MessageDispatcher, message: str):
     now = datetime.now()
     extra = max(-900, min(900, extra))
 
-    if now > CAN_START_TIME:
-        CAN_START_TIME = now + timedelta(seconds=extra)
+    if now > WAIT.can_start_time:
+        WAIT.can_start_time = now + timedelta(seconds=extra)
     else:
-        CAN_START_TIME += timedelta(seconds=extra)
+        WAIT.can_start_time += timedelta(seconds=extra)
 
     if extra >= 0:
         wrapper.send(messages["forced_wait_time_increase"].format(wrapper.source, abs(extra)))
@@ -111,7 +120,7 @@ def retract(wrapper: MessageDispatcher, message: str):
     if wrapper.source not in get_players(var) or wrapper.source in reaper.DISCONNECTED:
         return
 
-    with locks.reaper, locks.join_timer:
+    with locks.join_timer:
         if var.current_phase == "join":
             if wrapper.source not in START_VOTES:
                 wrapper.pm(messages["start_novote"])
@@ -149,7 +158,6 @@ def start(wrapper: MessageDispatcher, *, forced: bool = False):
         return
 
     villagers = get_players(pregame_state)
-    vils = set(get_players(pregame_state))
 
     if wrapper.source not in villagers and not forced:
         return
@@ -162,7 +170,7 @@ def start(wrapper: MessageDispatcher, *, forced: bool = False):
         wrapper.send(messages["max_players"].format(wrapper.source, config.Main.get("gameplay.player_limits.maximum")))
         return
 
-    dur = int((CAN_START_TIME - datetime.now()).total_seconds())
+    dur = int((WAIT.can_start_time - datetime.now()).total_seconds())
     if dur > 0 and not forced:
         wrapper.send(messages["please_wait"].format(dur))
         return
@@ -192,10 +200,8 @@ def start(wrapper: MessageDispatcher, *, forced: bool = False):
 
                 # If this was the first vote
                 if len(START_VOTES) == 1:
-                    t = threading.Timer(60, expire_start_votes, (pregame_state, wrapper.target))
-                    TIMERS["start_votes"] = (t, time.time(), 60)
-                    t.daemon = True
-                    t.start()
+                    t = pregame_state.loop.call_later(60, expire_start_votes, (pregame_state, wrapper.target))
+                    TIMERS["start_votes"] = (t, timers.now(), 60)
                 return
 
     if pregame_state.current_mode is None:
@@ -242,50 +248,128 @@ def start(wrapper: MessageDispatcher, *, forced: bool = False):
     # Initial checks passed, game mode has been fully initialized
     # We move from pregame state to in-game state
     channels.Main.game_state = ingame_state = GameState(pregame_state)
-    random.seed(ingame_state.rng_seed)
+    random.seed(ingame_state.rng_seed, buffer_size=ingame_state.rng_buffer_size)
+    journal.start(ingame_state)
+
+    if ADMIN_STOPPED:
+        for decor in (COMMANDS["join"] + COMMANDS["start"]):
+            decor(_command_disabled)
+
+    if not attribute_roles(wrapper, ingame_state, villagers):
+        return
+
+    # set default location for each player to a unique house
+    for i, p in enumerate(get_players(ingame_state)):
+        home_event = Event("player_home", {"home": Location("house_{0}".format(i))})
+        home_event.dispatch(ingame_state, p)
+        set_home(ingame_state, p, home_event.data["home"])
+
+    with locks.join_timer: # cancel timers
+        for name in ("join", "join_pinger", "start_votes"):
+            if name in TIMERS:
+                TIMERS[name][0].cancel()
+                del TIMERS[name]
+
+    for role, players in ingame_state.roles.items():
+        for player in players:
+            evt = Event("new_role", {"messages": [], "role": role, "in_wolfchat": False}, inherit_from=None)
+            evt.dispatch(ingame_state, player, None)
+
+    start_event = Event("start_game", {"custom_game_callback": None})  # defined here to make the linter happy
+    gamemode = ingame_state.current_mode.name
+    start_event.dispatch(ingame_state, gamemode, ingame_state.current_mode)
+
+    # Alert the players to option changes they may not be aware of
+    # All keys begin with gso_* (game start options)
+    options = []
+    custom_settings = ingame_state.current_mode.CUSTOM_SETTINGS
+    if custom_settings.is_customized("role_reveal"):
+        # Keys used here: gso_rr_on, gso_rr_team, gso_rr_off
+        options.append(messages["gso_rr_{0}".format(ingame_state.role_reveal)])
+    if custom_settings.is_customized("stats_type"):
+        # Keys used here: gso_st_default, gso_st_accurate, gso_st_team, gso_st_disabled
+        options.append(messages["gso_st_{0}".format(ingame_state.stats_type)])
+    if custom_settings.is_customized("abstain_enabled") or custom_settings.is_customized("limit_abstain"):
+        if ingame_state.abstain_enabled and ingame_state.limit_abstain:
+            options.append(messages["gso_abs_rest"])
+        elif ingame_state.abstain_enabled:
+            options.append(messages["gso_abs_unrest"])
+        else:
+            options.append(messages["gso_abs_none"])
+
+    key = "welcome_simple"
+    if options:
+        key = "welcome_options"
+    wrapper.send(messages[key].format(villagers, gamemode, options))
+    wrapper.target.mode("+m")
+
+    if start_event.data["custom_game_callback"]:
+        start_event.data["custom_game_callback"](ingame_state)
+    elif not ingame_state.start_with_day:
+        from src.trans import transition_night
+        transition_night(ingame_state)
+    else:
+        # send role messages
+        evt = Event("send_role", {})
+        evt.dispatch(ingame_state)
+        from src.trans import transition_day
+        transition_day(ingame_state)
+
+    decrement_stasis()
+
+    # Game is starting, finalize setup
+    ingame_state.finish_setup()
+
+    if config.Main.get("reaper.enabled"):
+        # DEATH TO IDLERS!
+        from src.reaper import start_reaper
+        start_reaper(ingame_state)
+
+def attribute_roles(wrapper: MessageDispatcher, ingame_state: GameState, villagers: list[User]) -> bool:
+    """ Decide the roles in play and which player gets each of them, and set up !stats to match.
+
+    This performs all of the randomized parts of starting a game, using the game's RNG, but
+    does not notify anyone of their role or start the game.
+
+    :param wrapper: Where to report problems preventing the game from starting
+    :param ingame_state: Game state to attribute roles in; must not have begun setup yet
+    :param villagers: Players in the game
+    :return: True if roles were attributed, False if the game could not be started and was stopped
+    """
+    from src.trans import stop_game
+    vils = set(villagers)
 
     event = Event("role_attribution", {"addroles": Counter()})
     if event.dispatch(ingame_state, villagers):
         addroles = event.data["addroles"]
-        strip = lambda x: re.sub(r"\(.*\)", "", x)
         lv = len(villagers)
-        roles = []
-        for num, rolelist in ingame_state.current_mode.ROLE_GUIDE.items():
-            if num <= lv:
-                roles.extend(rolelist)
-        defroles = Counter(strip(x) for x in roles)
-        for role, count in list(defroles.items()):
-            if role[0] == "-":
-                srole = role[1:]
-                defroles[srole] -= count
-                del defroles[role]
-                if defroles[srole] == 0:
-                    del defroles[srole]
+        defroles = get_guide_roles(ingame_state.current_mode, lv)
         if not defroles:
             wrapper.send(messages["no_settings_defined"].format(wrapper.source, lv))
             stop_game(ingame_state, abort=True, log=False)
-            return
+            return False
         for role, num in defroles.items():
             # if an event defined this role, use that number. Otherwise use the number from ROLE_GUIDE
             addroles[role] = addroles.get(role, num)
         if sum([addroles[r] for r in addroles if r not in ingame_state.current_mode.SECONDARY_ROLES]) > lv:
             wrapper.send(messages["too_many_roles"])
             stop_game(ingame_state, abort=True, log=False)
-            return
+            return False
         for role in All:
             addroles.setdefault(role, 0)
     else:
         addroles = event.data["addroles"]
 
     # convert roleset aliases into the appropriate roles
-    possible_rolesets = [Counter()]
+    # the roles known to be in the game, plus how many roles were drawn from each active roleset
+    fixed_roles = Counter()
+    drawn_rolesets: list[tuple[Counter, int]] = []
     roleset_roles = defaultdict(int)
     ingame_state.current_mode.ACTIVE_ROLE_SETS = {}
     for role, amt in list(addroles.items()):
         # not a roleset? add a fixed amount of them
         if role not in ingame_state.current_mode.ROLE_SETS:
-            for pr in possible_rolesets:
-                pr[role] += amt
+            fixed_roles[role] += amt
             continue
         # if a roleset, ensure we don't try to expose the roleset name in !stats or future attribution
         # but do keep track of the sets in use so we can have !stats reflect proper information
@@ -295,26 +379,12 @@ def start(wrapper: MessageDispatcher, *, forced: bool = False):
         # across every possible roleset so that !stats works right
         rs = Counter(ingame_state.current_mode.ROLE_SETS[role])
         for r in rs:
-            for pr in possible_rolesets:
-                pr[r] += 0
+            fixed_roles[r] += 0
         toadd = random.sample(list(rs.elements()), amt)
         for r in toadd:
             addroles[r] += 1
             roleset_roles[r] += 1
-        add_rolesets = []
-        temp_rolesets = []
-        for c in itertools.combinations(rs.elements(), amt):
-            add_rolesets.append(Counter(c))
-        for pr in possible_rolesets:
-            for ar in add_rolesets:
-                temp = Counter(pr)
-                temp.update(ar)
-                temp_rolesets.append(temp)
-        possible_rolesets = temp_rolesets
-
-    if ADMIN_STOPPED:
-        for decor in (COMMANDS["join"] + COMMANDS["start"]):
-            decor(_command_disabled)
+        drawn_rolesets.append((rs, amt))
 
     # Second round of check is done: Initialize the various variables that we need
     ingame_state.begin_setup()
@@ -362,20 +432,18 @@ def start(wrapper: MessageDispatcher, *, forced: bool = False):
     for x in vils:
         ingame_state.main_roles[x] = ingame_state.default_role
     if vils:
-        for pr in possible_rolesets:
-            pr[ingame_state.default_role] += len(vils)
-
-    # Collapse possible_rolesets into global role stats
-    # which is a frozenset[frozenset[tuple[str, int]]]
-    possible_rolesets_set = set()
-    event = Event("reconfigure_stats", {"new": []})
-    for pr in possible_rolesets:
-        event.data["new"] = [pr]
-        event.dispatch(ingame_state, pr, "start")
-        for v in event.data["new"]:
-            if min(v.values()) >= 0:
-                possible_rolesets_set.add(frozenset(v.items()))
-    ingame_state.set_role_stats(possible_rolesets_set)
+        fixed_roles[ingame_state.default_role] += len(vils)
+
+    # Expand the rolesets into every role composition the game could have for !stats
+    # unless there are too many to track, in which case only track how many players each role could have
+    compositions = count_compositions(drawn_rolesets)
+    if compositions > config.Main.get("gameplay.stats.max_compositions"):
+        logging.getLogger("game.pregame").warning("Game has {0} possible role compositions, only tracking role bounds for !stats",
+                                                  compositions)
+        ingame_state.set_role_stats(RoleBounds.from_role_sets(fixed_roles, drawn_rolesets))
+    else:
+        ingame_state.set_role_stats(RoleStats.from_role_sets(fixed_roles, drawn_rolesets))
+    ingame_state.reconfigure_role_stats("start")
 
     # Now for the secondary roles
     for role, dfn in ingame_state.current_mode.SECONDARY_ROLES.items():
@@ -397,7 +465,7 @@ def start(wrapper: MessageDispatcher, *, forced: bool = False):
         if len(possible) < count:
             wrapper.send(messages["not_enough_targets"].format(role))
             stop_game(ingame_state, abort=True, log=False)
-            return
+            return False
         ingame_state.roles[role].update(x for x in random.sample(possible, count))
 
     # Give game modes the ability to customize who was assigned which role after everything's been set
@@ -435,74 +503,29 @@ def start(wrapper: MessageDispatcher, *, forced: bool = False):
         else:
             raise KeyError("Invalid action for role_attribution_end")
 
-    # set default location for each player to a unique house
-    for i, p in enumerate(get_players(ingame_state)):
-        home_event = Event("player_home", {"home": Location("house_{0}".format(i))})
-        home_event.dispatch(ingame_state, p)
-        set_home(ingame_state, p, home_event.data["home"])
-
-    with locks.join_timer: # cancel timers
-        for name in ("join", "join_pinger", "start_votes"):
-            if name in TIMERS:
-                TIMERS[name][0].cancel()
-                del TIMERS[name]
-
-    for role, players in ingame_state.roles.items():
-        for player in players:
-            evt = Event("new_role", {"messages": [], "role": role, "in_wolfchat": False}, inherit_from=None)
-            evt.dispatch(ingame_state, player, None)
-
-    start_event = Event("start_game", {"custom_game_callback": None})  # defined here to make the linter happy
-    gamemode = ingame_state.current_mode.name
-    start_event.dispatch(ingame_state, gamemode, ingame_state.current_mode)
-
-    # Alert the players to option changes they may not be aware of
-    # All keys begin with gso_* (game start options)
-    options = []
-    custom_settings = ingame_state.current_mode.CUSTOM_SETTINGS
-    if custom_settings.is_customized("role_reveal"):
-        # Keys used here: gso_rr_on, gso_rr_team, gso_rr_off
-        options.append(messages["gso_rr_{0}".format(ingame_state.role_reveal)])
-    if custom_settings.is_customized("stats_type"):
-        # Keys used here: gso_st_default, gso_st_accurate, gso_st_team, gso_st_disabled
-        options.append(messages["gso_st_{0}".format(ingame_state.stats_type)])
-    if custom_settings.is_customized("abstain_enabled") or custom_settings.is_customized("limit_abstain"):
-        if ingame_state.abstain_enabled and ingame_state.limit_abstain:
-            options.append(messages["gso_abs_rest"])
-        elif ingame_state.abstain_enabled:
-            options.append(messages["gso_abs_unrest"])
-        else:
-            options.append(messages["gso_abs_none"])
-
-    key = "welcome_simple"
-    if options:
-        key = "welcome_options"
-    wrapper.send(messages[key].format(villagers, gamemode, options))
-    wrapper.target.mode("+m")
-
-    if start_event.data["custom_game_callback"]:
-        start_event.data["custom_game_callback"](ingame_state)
-    elif not ingame_state.start_with_day:
-        from src.trans import transition_night
-        transition_night(ingame_state)
-    else:
-        # send role messages
-        evt = Event("send_role", {})
-        evt.dispatch(ingame_state)
-        from src.trans import transition_day
-        transition_day(ingame_state)
-
-    decrement_stasis()
-
-    # Game is starting, finalize setup
-    ingame_state.finish_setup()
-
-    if config.Main.get("reaper.enabled"):
-        # DEATH TO IDLERS!
-        from src.reaper import reaper
-        reapertimer = threading.Thread(None, reaper, args=(ingame_state, ingame_state.game_id))
-        reapertimer.daemon = True
-        reapertimer.start()
+    return True
+
+def get_guide_roles(mode: GameMode, num_players: int) -> Counter[str]:
+    """ Get the roles a game mode's ROLE_GUIDE calls for at a given player count.
+
+    :param mode: Game mode
+    :param num_players: Number of players in the game
+    :return: Mapping of role (or roleset) name to how many of it the guide calls for
+    """
+    strip = lambda x: re.sub(r"\(.*\)", "", x)
+    roles = []
+    for num, rolelist in mode.ROLE_GUIDE.items():
+        if num <= num_players:
+            roles.extend(rolelist)
+    defroles = Counter(strip(x) for x in roles)
+    for role, count in list(defroles.items()):
+        if role[0] == "-":
+            srole = role[1:]
+            defroles[srole] -= count
+            del defroles[role]
+            if defroles[srole] == 0:
+                del defroles[srole]
+    return defroles
 
 def _command_disabled(wrapper: MessageDispatcher, message: str):
     wrapper.send(messages["command_disabled_admin"])
@@ -543,11 +566,10 @@ def frole(wrapper: MessageDispatcher, message: str):
 
 @event_listener("reset")
 def on_reset(evt: Event, var: GameState):
-    global WAIT_TOKENS, WAIT_LAST, CAN_START_TIME
     LAST_START.clear()
     LAST_WAIT.clear()
     START_VOTES.clear()
     FORCE_ROLES.clear()
-    WAIT_TOKENS = 0
-    WAIT_LAST = 0
-    CAN_START_TIME = datetime.now()
+    WAIT.tokens = 0
+    WAIT.last = 0
+    WAIT.can_start_time = datetime.now()
@@ -1,4 +1,6 @@
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms
+from collections.abc import Sequence
+from math import ceil as _ceil, log as _log
 import os
 import random as py_random
 from typing import Optional
@@ -11,6 +13,7 @@ seed_function = os.urandom
 KEY_SIZE = 32
 NONCE_SIZE = 16
 BUFFER_SIZE = 1024
+RECIP_BPF = 2 ** -53
 
 def get_seed():
     """Retrieve a seed suitable for passing to random.seed()."""
@@ -24,34 +27,49 @@ class GameRNG(py_random.Random):
     via random.SEED_FUNCTION, which can be set to an arbitrary callback in
     custom hooks.py to override default seeding behavior (os.urandom).
 
+    The keystream is generated buffer_size bytes at a time; the first KEY_SIZE bytes
+    of every buffer key the next one. The buffer size is therefore part of what a seed
+    means: the same seed produces the same numbers only with the same buffer size.
+
+    Besides the usual API, randoms() and randbelows() draw many numbers from a single
+    pull of the keystream. They return exactly what as many calls to random() or
+    randrange() would have, as do shuffle() and sample(), which are built on them.
+
     This is not secure for any sort of cryptographic use; it is purely to
     provide a better RNG for gameplay purposes.
     """
-    def __init__(self, seed=None):
+    def __init__(self, seed=None, *, buffer_size: int = BUFFER_SIZE):
         self._cur: bytes = b""
         self._next: bytes = b""
         self._buffer: bytes = b""
+        self._view: memoryview = memoryview(b"")
         self._offset: int = 0
+        self.buffer_size: int = buffer_size
         super().__init__(seed)
 
     def getstate(self):
-        return self._cur, self._offset
+        return self._cur, self._offset, self.buffer_size
 
     def setstate(self, state):
-        key, offset, reseed_count = state
+        key, offset, buffer_size = state
         if not isinstance(key, bytes) or len(key) != KEY_SIZE:
             raise TypeError("Invalid key state")
-        if not isinstance(offset, int) or offset < KEY_SIZE or offset >= BUFFER_SIZE:
+        if not isinstance(buffer_size, int) or buffer_size <= KEY_SIZE:
+            raise TypeError("Invalid buffer size state")
+        if not isinstance(offset, int) or offset < KEY_SIZE or offset >= buffer_size:
             raise TypeError("Invalid offset state")
 
-        cipher = Cipher(algorithms.ChaCha20(key, b"\x00" * NONCE_SIZE), None)
-        enc = cipher.encryptor()
-        self._cur = key
-        self._buffer = enc.update(b"\x00" * BUFFER_SIZE)
-        self._next = self._buffer[0:KEY_SIZE]
+        self.buffer_size = buffer_size
+        self._next = key
+        self._reseed()
         self._offset = offset
 
-    def seed(self, a: Optional[bytes] = None, version: int = 2) -> None:
+    def seed(self, a: Optional[bytes] = None, version: int = 2, *, buffer_size: Optional[int] = None) -> None:
+        if buffer_size is not None:
+            if buffer_size <= KEY_SIZE:
+                raise ValueError(f"buffer size must be greater than {KEY_SIZE} bytes, got {buffer_size} instead")
+            self.buffer_size = buffer_size
+
         if a is None:
             self._cur = self._next = seed_function(KEY_SIZE)
         elif not isinstance(a, bytes):
@@ -70,7 +88,7 @@ class GameRNG(py_random.Random):
             raise ValueError("Number of bits must be non-negative")
 
         numbytes = (k + 7) // 8  # bits / 8 and rounded up
-        x = int.from_bytes(self.randbytes(numbytes))
+        x = int.from_bytes(self._read(numbytes))
         return x >> (numbytes * 8 - k)  # trim excess bits
 
     def random(self) -> float:
@@ -78,35 +96,133 @@ class GameRNG(py_random.Random):
         # and updated to use self.randbytes instead of urandom
         # python floats are doubles, and doubles have 53 bits for the significand
         # we don't want to populate exponent with any random data or else we massively bias results
-        return (int.from_bytes(self.randbytes(7)) >> 3) * (2 ** -53)
+        offset = self._offset
+        if offset + 7 < self.buffer_size:
+            self._offset = offset + 7
+            return (int.from_bytes(self._view[offset:offset + 7]) >> 3) * RECIP_BPF
+        return (int.from_bytes(self._read(7)) >> 3) * RECIP_BPF
+
+    def randoms(self, k: int) -> list[float]:
+        """Return k random floats in the range [0.0, 1.0).
+
+        :param k: Number of floats to return
+        :return: The same floats as k calls to random() would have
+        """
+        if k < 0:
+            raise ValueError("Number of floats must be non-negative")
+        data = self._read(7 * k)
+        return [(int.from_bytes(data[i:i + 7]) >> 3) * RECIP_BPF for i in range(0, 7 * k, 7)]
+
+    def randbelows(self, n: int, k: int) -> list[int]:
+        """Return k random ints in the range [0, n).
+
+        :param n: Exclusive upper bound of the returned ints
+        :param k: Number of ints to return
+        :return: The same ints as k calls to randrange(n) would have
+        """
+        if n <= 0:
+            raise ValueError("empty range for randbelows()")
+        if k < 0:
+            raise ValueError("Number of ints must be non-negative")
+        return self._randbelows([n] * k)
 
     def randbytes(self, n) -> bytes:
         if n < 0:
             raise ValueError("Number of bytes must be non-negative")
-        elif n == 0:
-            return b""
-
-        buf = bytearray(n)
+        return bytes(self._read(n))
+
+    def shuffle(self, x):
+        # same algorithm as random.shuffle, drawing every swap index from one pull of the keystream
+        n = len(x)
+        for i, j in zip(range(n - 1, 0, -1), self._randbelows(range(n, 1, -1))):
+            x[i], x[j] = x[j], x[i]
+
+    def sample(self, population, k, *, counts=None):
+        # mirrors the pool branch of random.sample, which is the one role attribution hits;
+        # everything else (including every error case) is left to the base implementation
+        if counts is not None or not isinstance(population, Sequence):
+            return super().sample(population, k, counts=counts)
+        n = len(population)
+        setsize = 21  # size of a small set minus size of an empty list
+        if k > 5:
+            setsize += 4 ** _ceil(_log(k * 3, 4))  # table size for big sets
+        if not 0 <= k <= n or n > setsize:
+            return super().sample(population, k)
+        result = [None] * k
+        pool = list(population)
+        for i, j in enumerate(self._randbelows(range(n, n - k, -1))):
+            result[i] = pool[j]
+            pool[j] = pool[n - i - 1]
+        return result
+
+    def _randbelow(self, n: int) -> int:
+        # the same rejection sampling as random.Random._randbelow_with_getrandbits,
+        # pinned here so that results do not depend on the python version
+        k = n.bit_length()
+        numbytes = (k + 7) // 8
+        shift = numbytes * 8 - k
+        r = int.from_bytes(self._read(numbytes)) >> shift
+        while r >= n:
+            r = int.from_bytes(self._read(numbytes)) >> shift
+        return r
+
+    def _randbelows(self, bounds: Sequence[int]) -> list[int]:
+        """Return a random int below each of bounds, as _randbelow() would one at a time.
+
+        The keystream is read in as few pulls as possible: enough bytes for every bound is read
+        up front, and only rejected draws need another (smaller) pull.
+        """
+        sizes = [((n.bit_length() + 7) // 8, (-n.bit_length()) % 8) for n in bounds]
+        result = []
+        count = len(sizes)
         i = 0
-        while n > 0:
-            remaining = BUFFER_SIZE - self._offset
-            if remaining > n:
-                buf[i:i + n] = self._buffer[self._offset:self._offset + n]
-                self._offset += n
-                break
-            else:
-                buf[i:i + remaining] = self._buffer[self._offset:]
-                n -= remaining
-                i += remaining
-                self._reseed()
-
-        return bytes(buf)
+        data = b""
+        pos = 0
+        while i < count:
+            # keep what is left of the last pull, as it is where the next draw starts
+            data = bytes(data[pos:]) + bytes(self._read(sum(size for size, _ in sizes[i:]) - (len(data) - pos)))
+            view = memoryview(data)
+            end = len(data)
+            pos = 0
+            while i < count:
+                numbytes, shift = sizes[i]
+                if pos + numbytes > end:
+                    break
+                r = int.from_bytes(view[pos:pos + numbytes]) >> shift
+                pos += numbytes
+                if r < bounds[i]:
+                    result.append(r)
+                    i += 1
+        return result
+
+    def _read(self, n: int) -> memoryview | bytes:
+        """Consume n bytes of the keystream.
+
+        Reads which fit within the current buffer return a view of it rather than a copy.
+        """
+        offset = self._offset
+        end = offset + n
+        if end < self.buffer_size:
+            self._offset = end
+            return self._view[offset:end]
+
+        parts = [self._view[offset:]]
+        n -= self.buffer_size - offset
+        self._reseed()
+        while n >= self.buffer_size - KEY_SIZE:
+            parts.append(self._view[KEY_SIZE:])
+            n -= self.buffer_size - KEY_SIZE
+            self._reseed()
+        parts.append(self._view[KEY_SIZE:KEY_SIZE + n])
+        self._offset = KEY_SIZE + n
+        return b"".join(parts)
 
     def _reseed(self) -> None:
         cipher = Cipher(algorithms.ChaCha20(self._next, b"\x00" * NONCE_SIZE), None)
         enc = cipher.encryptor()
         self._cur = self._next
-        self._buffer = enc.update(b"\x00" * BUFFER_SIZE)
+        self._buffer = enc.update(b"\x00" * self.buffer_size)
+        self._view = memoryview(self._buffer)
         self._next = self._buffer[0:KEY_SIZE]
         self._offset = KEY_SIZE
 
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-import time
-from datetime import datetime, timedelta
+import heapq
+from datetime import datetime
 from typing import Optional
 
 from src.decorators import command
 from src.dispatcher import MessageDispatcher
 from src.containers import UserDict, UserSet
+from src.gameloop import GameScoped
 from src.gamestate import GameState
 from src.functions import get_players, get_reveal_role
 from src.warnings import add_warning
@@ -15,126 +16,258 @@ from src.status import add_dying, kill_players
 from src.events import Event, event_listener
 from src.debug import handle_error
 from src.users import User
-from src import config, locks, users, channels
+from src.gameloop import on_game_loop
+from src import config, users, channels, journal, timers
 
-LAST_SAID_TIME = UserDict()
-DISCONNECTED: UserDict[User, tuple[datetime, str]] = UserDict()
-IDLE_WARNED = UserSet()
-IDLE_WARNED_PM = UserSet()
-DCED_LOSERS = UserSet()
-NIGHT_IDLED = UserSet()
+# last said times are read from the idle clock (see _Scheduler) rather than wall time
+LAST_SAID_TIME: UserDict[User, float] = GameScoped(UserDict)
+DISCONNECTED: UserDict[User, tuple[datetime, str]] = GameScoped(UserDict)
+IDLE_WARNED = GameScoped(UserSet)
+IDLE_WARNED_PM = GameScoped(UserSet)
+DCED_LOSERS = GameScoped(UserSet)
+NIGHT_IDLED = GameScoped(UserSet)
+
+class _ReaperState:
+    """ Scheduler of the game being played on the loop, if it has started. """
+    __slots__ = ("scheduler",)
+
+    def __init__(self):
+        self.scheduler: Optional[_Scheduler] = None
+
+_STATE: _ReaperState = GameScoped(_ReaperState)
+
+class _Scheduler:
+    """ Per-player deadlines for the reaper of a single game.
+
+    Idle deadlines are kept on an idle clock which is paused whenever idling doesn't count
+    (at night, unless nightchat is enabled), so excluding night only shifts a single offset.
+    Disconnect deadlines use the timers clock directly, as the grace period for those includes night.
+    Heap entries refer to players by slot so that they follow players across swaps.
+    Everything here runs on the game's loop, which is also where the reaper's timer posts to.
+    """
+    def __init__(self, var: GameState):
+        self.game_id = var.game_id
+        self.timer: Optional[timers.Timer] = None
+        self.offset = 0.0
+        self.paused_at: Optional[float] = None
+        self.start = self.idle_time()
+        self.slots: UserDict[User, int] = UserDict()
+        self.players: UserDict[int, User] = UserDict()
+        self.idle: list[tuple[float, int]] = []
+        self.idle_due: dict[int, float] = {}
+        self.dced: list[tuple[float, int]] = []
+        self.dced_due: dict[int, float] = {}
+
+    def idle_time(self) -> float:
+        """ Return the current time on the idle clock. """
+        if self.paused_at is not None:
+            return self.paused_at - self.offset
+        return timers.now() - self.offset
+
+    def pause(self):
+        if self.paused_at is None:
+            self.paused_at = timers.now()
+
+    def resume(self):
+        if self.paused_at is not None:
+            self.offset += timers.now() - self.paused_at
+            self.paused_at = None
+
+    def slot(self, user: User) -> int:
+        if user not in self.slots:
+            slot = len(self.players)
+            self.slots[user] = slot
+            self.players[slot] = user
+        return self.slots[user]
+
+    def schedule_idle(self, user: User):
+        """ Schedule the next idle check for user, based on when they last spoke and what they were warned about. """
+        slot = self.slot(user)
+        last = LAST_SAID_TIME.get(user, self.start)
+        if config.Main.get("reaper.idle.warn.channel") and user not in IDLE_WARNED:
+            due = last + config.Main.get("reaper.idle.warn.channel")
+        elif config.Main.get("reaper.idle.warn.private") and user not in IDLE_WARNED_PM:
+            due = last + config.Main.get("reaper.idle.warn.private")
+        elif config.Main.get("reaper.idle.grace"):
+            due = last + config.Main.get("reaper.idle.grace")
+        else:
+            self.idle_due.pop(slot, None)
+            return
+        self.idle_due[slot] = due
+        heapq.heappush(self.idle, (due, slot))
+
+    def schedule_dced(self, user: User, grace: float):
+        slot = self.slot(user)
+        due = timers.now() + grace
+        self.dced_due[slot] = due
+        heapq.heappush(self.dced, (due, slot))
+
+    def timeout(self) -> Optional[float]:
+        """ Return how long to sleep until the next deadline, or None if there is nothing to wait for. """
+        due = []
+        if self.dced:
+            due.append(self.dced[0][0])
+        if self.idle and self.paused_at is None:
+            due.append(self.idle[0][0] + self.offset)
+        if not due:
+            return None
+        return max(0.0, min(due) - timers.now())
+
+    def rearm(self, var: GameState):
+        """ Make sure the reaper runs once the next deadline is due. """
+        if self.timer is not None:
+            self.timer.cancel()
+        timeout = self.timeout()
+        self.timer = None if timeout is None else var.loop.call_later(timeout, _reap, (var, self))
+
+    def pop_dced(self) -> list[User]:
+        """ Return the disconnected players whose grace period has run out. """
+        now = timers.now()
+        expired = []
+        while self.dced and self.dced[0][0] <= now:
+            due, slot = heapq.heappop(self.dced)
+            if self.dced_due.get(slot) != due:
+                continue # superseded by a later disconnect
+            del self.dced_due[slot]
+            user = self.players.get(slot)
+            if user is not None and user in DISCONNECTED:
+                expired.append(user)
+        return expired
+
+    def pop_idle(self) -> list[User]:
+        """ Return the players whose idle deadline is due. """
+        now = self.idle_time()
+        expired = []
+        while self.idle and self.idle[0][0] <= now:
+            due, slot = heapq.heappop(self.idle)
+            if self.idle_due.get(slot) != due:
+                continue
+            del self.idle_due[slot]
+            user = self.players.get(slot)
+            if user is not None:
+                expired.append(user)
+        return expired
+
+def start_reaper(var: GameState):
+    """ Schedule idle checks for everyone in the game which just started.
+
+    :param var: Game state
+    """
+    _STATE.scheduler = scheduler = _Scheduler(var)
+    if var.current_phase == "night" and not config.Main.get("gameplay.nightchat"):
+        scheduler.pause()
+    if config.Main.get("reaper.idle.enabled"):
+        for user in get_players(var):
+            if not user.is_fake:
+                scheduler.schedule_idle(user)
+    scheduler.rearm(var)
+
+def add_disconnected(var: GameState, user: User, what: str):
+    """ Mark user as disconnected, killing them once the grace period for what runs out.
+
+    :param var: Game state
+    :param user: User who disconnected
+    :param what: How they disconnected: "quit", "part" or "account"
+    """
+    DISCONNECTED[user] = (datetime.now(), what)
+    scheduler = _STATE.scheduler
+    if scheduler is not None and scheduler.game_id == var.game_id and config.Main.get(f"reaper.{what}.enabled"):
+        scheduler.schedule_dced(user, config.Main.get(f"reaper.{what}.grace"))
+        scheduler.rearm(var)
 
 @handle_error
-def reaper(var: GameState, gameid: int):
-    # check to see if idlers need to be killed.
-    game_start_time = datetime.now()
-    last_day_id = var.day_count
-    num_night_iters = 0
-    short = False
-
-    while var.in_game and gameid == var.game_id:
-        skip = False
-        time.sleep(1 if short else 10)
-        short = False
-        with locks.reaper:
-            # Terminate reaper when game ends
-            if not var.in_game:
-                return
-            if var.in_phase_transition:
-                # in a phase transition, so don't run the reaper here or else things may break
-                # flag to re-run sooner than usual though
-                short = True
+def _reap(var: GameState, scheduler: _Scheduler):
+    if scheduler is not _STATE.scheduler or not var.in_game:
+        return # game is over
+    if var.in_phase_transition:
+        # in a phase transition, so don't run the reaper here or else things may break
+        # check again shortly though
+        scheduler.timer = var.loop.call_later(1, _reap, (var, scheduler))
+        return
+
+    reveal = "_no_reveal"
+    if var.role_reveal in ("on", "team"):
+        reveal = ""
+
+    for dcedplayer in scheduler.pop_dced():
+        timeofdc, what = DISCONNECTED[dcedplayer]
+        revealrole = get_reveal_role(var, dcedplayer)
+        # config used: reaper.quit.grace, reaper.quit.points, reaper.quit.expiration,
+        # reaper.part.grace, reaper.part.points, reaper.part.expiration,
+        # reaper.account.grace, reaper.account.points, reaper.account.expiration
+        # message keys used: quit_death, quit_death_no_reveal, quit_warning,
+        # part_death, part_death_no_reveal, part_warning
+        # account_death, account_death_no_reveal, account_warning
+        channels.Main.send(messages[f"{what}_death{reveal}"].format(dcedplayer, revealrole))
+        if config.Main.get("reaper.autowarn") and var.current_phase != "join":
+            NIGHT_IDLED.discard(dcedplayer) # don't double-dip if they idled out night as well
+            add_warning(dcedplayer,
+                        config.Main.get(f"reaper.{what}.points"),
+                        users.Bot,
+                        messages[f"{what}_warning"],
+                        expires=config.Main.get(f"reaper.{what}.expiration"))
+        if var.in_game:
+            DCED_LOSERS.add(dcedplayer)
+        add_dying(var, dcedplayer, "bot", what, death_triggers=False)
+
+    if config.Main.get("reaper.idle.enabled"):  # only if enabled
+        to_warn:    set[User] = set()
+        to_warn_pm: set[User] = set()
+        to_kill:    set[User] = set()
+        pl = get_players(var)
+        now = scheduler.idle_time()
+        for user in scheduler.pop_idle():
+            if user not in pl:
+                continue
+            idle = now - LAST_SAID_TIME.get(user, scheduler.start)
+            if (config.Main.get("reaper.idle.warn.channel") and
+                    idle >= config.Main.get("reaper.idle.warn.channel") and
+                    user not in IDLE_WARNED):
+                to_warn.add(user)
+                IDLE_WARNED.add(user)
+            elif (config.Main.get("reaper.idle.warn.private") and
+                    idle >= config.Main.get("reaper.idle.warn.private") and
+                    user not in IDLE_WARNED_PM):
+                to_warn_pm.add(user)
+                IDLE_WARNED_PM.add(user)
+            elif (config.Main.get("reaper.idle.grace") and
+                    idle >= config.Main.get("reaper.idle.grace") and
+                    (not config.Main.get("reaper.idle.warn.channel") or user in IDLE_WARNED) and
+                    (not config.Main.get("reaper.idle.warn.private") or user in IDLE_WARNED_PM)):
+                to_kill.add(user)
                 continue
-            elif not config.Main.get("gameplay.nightchat"):
-                if var.current_phase == "night":
-                    # don't count nighttime towards idling
-                    # this doesn't do an exact count, but is good enough
-                    num_night_iters += 1
-                    skip = True
-                elif var.current_phase == "day" and var.day_count != last_day_id:
-                    last_day_id = var.day_count
-                    num_night_iters += 1
-                    for user in LAST_SAID_TIME:
-                        LAST_SAID_TIME[user] += timedelta(seconds=10 * num_night_iters)
-                    num_night_iters = 0
-
-            reveal = "_no_reveal"
-            if var.role_reveal in ("on", "team"):
-                reveal = ""
-
-            for dcedplayer, (timeofdc, what) in list(DISCONNECTED.items()):
-                revealrole = get_reveal_role(var, dcedplayer)
-                if not config.Main.get(f"reaper.{what}.enabled"):
-                    continue
-                if datetime.now() - timeofdc <= timedelta(seconds=config.Main.get(f"reaper.{what}.grace")):
-                    continue
-                # config used: reaper.quit.grace, reaper.quit.points, reaper.quit.expiration,
-                # reaper.part.grace, reaper.part.points, reaper.part.expiration,
-                # reaper.account.grace, reaper.account.points, reaper.account.expiration
-                # message keys used: quit_death, quit_death_no_reveal, quit_warning,
-                # part_death, part_death_no_reveal, part_warning
-                # account_death, account_death_no_reveal, account_warning
-                channels.Main.send(messages[f"{what}_death{reveal}"].format(dcedplayer, revealrole))
-                if config.Main.get("reaper.autowarn") and var.current_phase != "join":
-                    NIGHT_IDLED.discard(dcedplayer) # don't double-dip if they idled out night as well
-                    add_warning(dcedplayer,
-                                config.Main.get(f"reaper.{what}.points"),
-                                users.Bot,
-                                messages[f"{what}_warning"],
-                                expires=config.Main.get(f"reaper.{what}.expiration"))
-                if var.in_game:
-                    DCED_LOSERS.add(dcedplayer)
-                add_dying(var, dcedplayer, "bot", what, death_triggers=False)
-
-            if not skip and config.Main.get("reaper.idle.enabled"):  # only if enabled
-                to_warn:    set[User] = set()
-                to_warn_pm: set[User] = set()
-                to_kill:    set[User] = set()
-                for user in get_players(var):
-                    if user.is_fake:
-                        continue
-                    lst = LAST_SAID_TIME.get(user, game_start_time)
-                    tdiff = datetime.now() - lst
-                    if (config.Main.get("reaper.idle.warn.channel") and
-                            tdiff > timedelta(seconds=config.Main.get("reaper.idle.warn.channel")) and
-                            user not in IDLE_WARNED):
-                        to_warn.add(user)
-                        IDLE_WARNED.add(user)
-                        LAST_SAID_TIME[user] = (datetime.now() - timedelta(seconds=config.Main.get("reaper.idle.warn.channel")))  # Give them a chance
-                    elif (config.Main.get("reaper.idle.warn.private") and
-                            tdiff > timedelta(seconds=config.Main.get("reaper.idle.warn.private")) and
-                            user not in IDLE_WARNED_PM):
-                        to_warn_pm.add(user)
-                        IDLE_WARNED_PM.add(user)
-                        LAST_SAID_TIME[user] = (datetime.now() - timedelta(seconds=config.Main.get("reaper.idle.warn.private")))
-                    elif (config.Main.get("reaper.idle.grace") and
-                            tdiff > timedelta(seconds=config.Main.get("reaper.idle.grace")) and
-                            (not config.Main.get("reaper.idle.warn.channel") or user in IDLE_WARNED) and
-                            (not config.Main.get("reaper.idle.warn.private") or user in IDLE_WARNED_PM)):
-                        to_kill.add(user)
-                    elif tdiff < timedelta(seconds=config.Main.get("reaper.idle.warn.channel")) and (user in IDLE_WARNED or user in IDLE_WARNED_PM):
-                        IDLE_WARNED.discard(user)  # player saved themselves from death
-                        IDLE_WARNED_PM.discard(user)
-                for user in to_kill:
-                    # keys used: idle_death, idle_death_no_reveal
-                    channels.Main.send(messages[f"idle_death{reveal}"].format(user, get_reveal_role(var, user)))
-                    if var.in_game:
-                        DCED_LOSERS.add(user)
-                    if config.Main.get("reaper.autowarn") and config.Main.get("reaper.idle.enabled"):
-                        NIGHT_IDLED.discard(user) # don't double-dip if they idled out night as well
-                        add_warning(user, config.Main.get("reaper.idle.points"), users.Bot, messages["idle_warning"], expires=config.Main.get("reaper.idle.expiration"))
-                    add_dying(var, user, "bot", "idle", death_triggers=False)
-                pl = get_players(var)
-                x = [a for a in to_warn if a in pl]
-                if x:
-                    channels.Main.send(messages["channel_idle_warning"].format(x))
-                msg_targets = [p for p in to_warn_pm if p in pl]
-                for p in msg_targets:
-                    p.queue_message(messages["player_idle_warning"].format(channels.Main))
-                if msg_targets:
-                    User.send_messages()
-
-            kill_players(var)
+            scheduler.schedule_idle(user)
+        for user in to_kill:
+            # keys used: idle_death, idle_death_no_reveal
+            channels.Main.send(messages[f"idle_death{reveal}"].format(user, get_reveal_role(var, user)))
+            if var.in_game:
+                DCED_LOSERS.add(user)
+            if config.Main.get("reaper.autowarn") and config.Main.get("reaper.idle.enabled"):
+                NIGHT_IDLED.discard(user) # don't double-dip if they idled out night as well
+                add_warning(user, config.Main.get("reaper.idle.points"), users.Bot, messages["idle_warning"], expires=config.Main.get("reaper.idle.expiration"))
+            add_dying(var, user, "bot", "idle", death_triggers=False)
+        pl = get_players(var)
+        x = [a for a in to_warn if a in pl]
+        if x:
+            channels.Main.send(messages["channel_idle_warning"].format(x))
+        msg_targets = [p for p in to_warn_pm if p in pl]
+        for p in msg_targets:
+            p.queue_message(messages["player_idle_warning"].format(channels.Main))
+        if msg_targets:
+            User.send_messages()
+
+    kill_players(var)
+    if scheduler is _STATE.scheduler:
+        scheduler.rearm(var)
+
+def _spoke(user: User):
+    """ Restart user's idle countdown; their pending deadline picks up the change when it fires. """
+    scheduler = _STATE.scheduler
+    if scheduler is not None:
+        LAST_SAID_TIME[user] = scheduler.idle_time()
+    # player saved themselves from death
+    IDLE_WARNED.discard(user)
+    IDLE_WARNED_PM.discard(user)
 
 @command("")  # update last said
 def update_last_said(wrapper: MessageDispatcher, message: str):
@@ -144,57 +277,73 @@ def update_last_said(wrapper: MessageDispatcher, message: str):
     if not config.Main.get("reaper.enabled"):
         return
 
-    if wrapper.game_state.in_game:
-        LAST_SAID_TIME[wrapper.source] = datetime.now()
-
     if wrapper.private and wrapper.source in get_players(wrapper.game_state) and wrapper.source in IDLE_WARNED_PM:
         wrapper.pm(messages["privmsg_idle_warning"].format(channels.Main))
 
+    if wrapper.game_state.in_game:
+        _spoke(wrapper.source)
+
 @handle_error
+@on_game_loop
 def return_to_village(var: GameState, target: User, *, show_message: bool, new_user: Optional[User] = None):
-    with locks.reaper:
-        from src.trans import ORIGINAL_ACCOUNTS
-        if channels.Main not in target.channels:
-            # managed to leave the channel in between the time return_to_village was scheduled and called
-            return
+    from src.trans import ORIGINAL_ACCOUNTS
+    if channels.Main not in target.channels:
+        # managed to leave the channel in between the time return_to_village was scheduled and called
+        return
 
-        if target.account not in ORIGINAL_ACCOUNTS.values():
-            return
+    if target.account not in ORIGINAL_ACCOUNTS.values():
+        return
 
-        if target in DISCONNECTED:
-            del DISCONNECTED[target]
-            if new_user is None:
-                new_user = target
-
-            LAST_SAID_TIME[target] = datetime.now()
-            DCED_LOSERS.discard(target)
-
-            if new_user is not target:
-                # different users, perform a swap. This will clean up disconnected users.
-                target.swap(new_user)
-
-            if show_message:
-                if config.Main.get("gameplay.nightchat") or var.current_phase != "night":
-                    channels.Main.mode(("+v", new_user))
-                if target.nick == new_user.nick:
-                    channels.Main.send(messages["player_return"].format(new_user))
-                else:
-                    channels.Main.send(messages["player_return_nickchange"].format(new_user, target))
-        else:
-            # this particular user doesn't exist in DISCONNECTED, but that doesn't
-            # mean that they aren't dced. They may have rejoined as a different nick,
-            # for example, and we want to mark them as back without requiring them to do
-            # a !swap.
-            userlist = users.get(account=target.account, allow_multiple=True, allow_ghosts=True)
-            userlist = [u for u in userlist if u in DISCONNECTED]
-            if len(userlist) == 1:
-                return_to_village(var, userlist[0], show_message=show_message, new_user=target)
+    if target in DISCONNECTED:
+        del DISCONNECTED[target]
+        if new_user is None:
+            new_user = target
+
+        journal.record(var, journal.Kind.RETURN, target.nick, new_user.nick)
+        _spoke(target)
+        DCED_LOSERS.discard(target)
+
+        if new_user is not target:
+            # different users, perform a swap. This will clean up disconnected users.
+            target.swap(new_user)
+
+        if show_message:
+            if config.Main.get("gameplay.nightchat") or var.current_phase != "night":
+                channels.Main.mode(("+v", new_user))
+            if target.nick == new_user.nick:
+                channels.Main.send(messages["player_return"].format(new_user))
+            else:
+                channels.Main.send(messages["player_return_nickchange"].format(new_user, target))
+    else:
+        # this particular user doesn't exist in DISCONNECTED, but that doesn't
+        # mean that they aren't dced. They may have rejoined as a different nick,
+        # for example, and we want to mark them as back without requiring them to do
+        # a !swap.
+        userlist = users.get(account=target.account, allow_multiple=True, allow_ghosts=True)
+        userlist = [u for u in userlist if u in DISCONNECTED]
+        if len(userlist) == 1:
+            return_to_village(var, userlist[0], show_message=show_message, new_user=target)
 
 @event_listener("del_player")
 def on_del_player(evt: Event, var: GameState, player: User, all_roles: set[str], death_triggers: bool):
     if var.in_game: # remove the player from variables if they're in there
         DISCONNECTED.pop(player, None)
 
+@event_listener("transition_night_begin")
+def on_transition_night_begin(evt: Event, var: GameState):
+    scheduler = _STATE.scheduler
+    if not config.Main.get("gameplay.nightchat") and scheduler is not None:
+        # don't count nighttime towards idling
+        scheduler.pause()
+        scheduler.rearm(var)
+
+@event_listener("transition_day_begin")
+def on_transition_day_begin(evt: Event, var: GameState):
+    scheduler = _STATE.scheduler
+    if scheduler is not None:
+        scheduler.resume()
+        scheduler.rearm(var)
+
 @event_listener("reset")
 def on_reset(evt: Event, var: GameState):
     # Add warnings for people that idled out night
@@ -210,3 +359,7 @@ def on_reset(evt: Event, var: GameState):
     IDLE_WARNED_PM.clear()
     DCED_LOSERS.clear()
     NIGHT_IDLED.clear()
+    scheduler = _STATE.scheduler
+    if scheduler is not None and scheduler.timer is not None:
+        scheduler.timer.cancel()
+    _STATE.scheduler = None
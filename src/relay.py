@@ -5,6 +5,7 @@ import sys
 from src.events import event_listener
 from src.decorators import command
 from src.containers import UserSet
+from src.gameloop import GameScoped
 from src.functions import get_players, get_participants
 from src.messages import messages
 from src.events import Event
@@ -14,10 +15,10 @@ from src import config, channels, db
 from src.dispatcher import MessageDispatcher
 from src.gamestate import GameState
 
-DEADCHAT_PLAYERS: UserSet = UserSet()
-DEADCHAT_SPECTATE: UserSet = UserSet()
-WOLFCHAT_SPECTATE: UserSet = UserSet()
-VAMPCHAT_SPECTATE: UserSet = UserSet()
+DEADCHAT_PLAYERS: UserSet = GameScoped(UserSet)
+DEADCHAT_SPECTATE: UserSet = GameScoped(UserSet)
+WOLFCHAT_SPECTATE: UserSet = GameScoped(UserSet)
+VAMPCHAT_SPECTATE: UserSet = GameScoped(UserSet)
 
 @command("", chan=False, pm=True)
 def relay_wolfchat(wrapper: MessageDispatcher, message: str):
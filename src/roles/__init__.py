@@ -1,17 +1,136 @@
+from __future__ import annotations
+
 import os.path
 import glob
 import importlib
+import json
+import logging
+import sys
+import threading
+from typing import Any
 
-__all__ = ["import_builtin_roles"]
+from src import cats
+from src.events import Event, EventListener
 
-# Imports all role definitions
-def import_builtin_roles():
+__all__ = ["import_builtin_roles", "register_builtin_roles", "load_builtin_roles", "is_builtin_role_command",
+           "build_manifest", "write_manifest", "MANIFEST"]
+
+# Metadata of the builtin roles, so that they can be registered without importing them; see genmanifest.py
+MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "manifest.json")
+# get_role_metadata kinds which are dispatched without a game, and so can be answered from the manifest
+STATIC_KINDS = ("team_categories", "role_categories", "special_keys")
+
+_logger = logging.getLogger("roles")
+_lock = threading.Lock()
+_manifest: dict[str, Any] = {}
+_metadata_listener: EventListener | None = None
+_loaded = False
+
+def _builtin_modules() -> list[str]:
     path = os.path.dirname(os.path.abspath(__file__))
     search = os.path.join(path, "*.py")
 
+    modules = []
     for f in glob.iglob(search):
         f = os.path.basename(f)
         n, _ = os.path.splitext(f)
         if f.startswith("_"):
             continue
+        modules.append(n)
+    return sorted(modules)
+
+# Imports all role definitions
+def import_builtin_roles():
+    global _loaded
+    for n in _builtin_modules():
         importlib.import_module("." + n, package="src.roles")
+    _loaded = True
+
+def register_builtin_roles():
+    """Register the builtin roles from the manifest, importing them only once they are needed.
+
+    Role categories are established from the manifest, and role modules are imported all at once
+    by load_builtin_roles() when the first game mode is created or a role command is first used.
+    Falls back to importing every role right away if the manifest doesn't match the role modules on disk.
+    """
+    global _manifest, _metadata_listener
+    try:
+        with open(MANIFEST, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = None
+    if manifest is None or manifest["modules"] != _builtin_modules():
+        _logger.warning("Role manifest is missing or out of date, importing every role; run genmanifest.py to update it")
+        import_builtin_roles()
+        return
+
+    _manifest = manifest
+    _manifest["commands"] = frozenset(manifest["commands"])
+    for name in manifest["categories"]:
+        # custom roles may have imported a builtin role, which then defined its categories already
+        if name not in cats.ROLE_CATS:
+            cats.defer(name)
+    _metadata_listener = EventListener(_on_get_role_metadata, listener_id="roles.manifest", priority=1)
+    _metadata_listener.install("get_role_metadata")
+
+def _on_get_role_metadata(evt: Event, var, kind: str):
+    if var is None and kind in _manifest["metadata"]:
+        for key, values in _manifest["metadata"][kind].items():
+            evt.data[key] = set(values)
+
+def load_builtin_roles():
+    """Import the builtin roles if they have only been registered from the manifest so far."""
+    global _metadata_listener
+    if _loaded:
+        return
+    with _lock:
+        if _loaded or _metadata_listener is None:
+            return
+        import_builtin_roles()
+        _metadata_listener.remove("get_role_metadata")
+        _metadata_listener = None
+
+    # role categories were frozen from the manifest, so any difference with the roles themselves goes unnoticed otherwise
+    for kind in STATIC_KINDS:
+        if _collect(kind) != _manifest["metadata"][kind]:
+            _logger.error("Role manifest does not match the {0} of the roles; run genmanifest.py to update it", kind)
+
+def is_builtin_role_command(name: str) -> bool:
+    """Return True if a builtin role which has not been imported yet defines a command by that name."""
+    return not _loaded and name in _manifest.get("commands", ())
+
+def _collect(kind: str) -> dict[str, list[str]]:
+    data: dict[str, Any] = {"teams": {"Wolfteam", "Vampire Team", "Village", "Neutral", "Hidden"}} if kind == "team_categories" else {}
+    evt = Event("get_role_metadata", data)
+    evt.dispatch(None, kind)
+    return {key: sorted(values) for key, values in sorted(evt.data.items())}
+
+def build_manifest() -> dict[str, Any]:
+    """Import every builtin role and return their manifest.
+
+    :return: Role modules, the commands and categories they define, and their metadata
+    """
+    from src.decorators import COMMANDS
+    load_builtin_roles()
+    commands = set()
+    for name, functions in COMMANDS.items():
+        if any(fn.func.__module__.startswith("src.roles.") for fn in functions):
+            commands.add(name)
+    builtin = {value.name for value in vars(cats).values() if isinstance(value, cats.Category)}
+    categories = set()
+    for module_name, module in list(sys.modules.items()):
+        if module_name.startswith("src.roles."):
+            for value in vars(module).values():
+                if isinstance(value, cats.Category) and cats.ROLE_CATS.get(value.name) is value and value.name not in builtin:
+                    categories.add(value.name)
+    return {
+        "modules": _builtin_modules(),
+        "commands": sorted(commands),
+        "categories": sorted(categories),
+        "metadata": {kind: _collect(kind) for kind in STATIC_KINDS},
+    }
+
+def write_manifest():
+    with open(MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(build_manifest(), f, indent=2)
+        f.write("\n")
@@ -5,6 +5,7 @@ from typing import Optional
 
 from src.cats import Wolf, All
 from src.containers import UserSet, UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.events import Event, event_listener
 from src.functions import get_players, get_all_players, get_target
@@ -19,8 +20,8 @@ from src.locations import get_home
 register_wolf("alpha wolf")
 
 ENABLED = False
-ALPHAS = UserSet()
-BITTEN: UserDict[User, User] = UserDict()
+ALPHAS = GameScoped(UserSet)
+BITTEN: UserDict[User, User] = GameScoped(UserDict)
 
 @command("bite", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("alpha wolf",))
 def observe(wrapper: MessageDispatcher, message: str):
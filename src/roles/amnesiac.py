@@ -5,6 +5,7 @@ from typing import Optional
 from src import users, config
 from src.cats import role_order, Win_Stealer, Hidden_Eligible, all_teams, Neutral
 from src.containers import UserDict
+from src.gameloop import GameScoped
 from src.events import Event, event_listener
 from src.functions import get_all_players, change_role
 from src.messages import messages
@@ -14,7 +15,7 @@ from src.random import random
 
 __all__ = ["get_blacklist", "get_stats_flag"]
 
-ROLES: UserDict[users.User, str] = UserDict()
+ROLES: UserDict[users.User, str] = GameScoped(UserDict)
 STATS_FLAG = False # if True, we begin accounting for amnesiac in update_stats
 
 def get_blacklist(var: GameState):
@@ -7,6 +7,7 @@ from src import config
 from src import users
 from src.cats import Wolf
 from src.containers import UserSet, UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.dispatcher import MessageDispatcher
 from src.events import Event, event_listener
@@ -17,9 +18,9 @@ from src.status import try_misdirection, try_exchange, add_protection, add_dying
 from src.users import User
 from src.random import random
 
-GUARDED: UserDict[users.User, users.User] = UserDict()
-LASTGUARDED: UserDict[users.User, users.User] = UserDict()
-PASSED = UserSet()
+GUARDED: UserDict[users.User, users.User] = GameScoped(UserDict)
+LASTGUARDED: UserDict[users.User, users.User] = GameScoped(UserDict)
+PASSED = GameScoped(UserSet)
 
 @command("guard", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("guardian angel",))
 def guard(wrapper: MessageDispatcher, message: str):
@@ -5,6 +5,7 @@ from typing import Optional
 
 from src import channels, users
 from src.containers import UserSet, UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.dispatcher import MessageDispatcher
 from src.events import Event, event_listener
@@ -15,8 +16,8 @@ from src.status import try_misdirection, try_exchange, try_protection, add_dying
 from src.users import User
 from src.random import random
 
-TARGETED: UserDict[users.User, users.User] = UserDict()
-PREV_ACTED = UserSet()
+TARGETED: UserDict[users.User, users.User] = GameScoped(UserDict)
+PREV_ACTED = GameScoped(UserSet)
 
 @command("target", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("assassin",))
 def target_cmd(wrapper: MessageDispatcher, message: str):
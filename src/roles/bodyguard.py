@@ -6,6 +6,7 @@ from typing import Optional, Union
 from src import config
 from src.cats import Wolf
 from src.containers import UserSet, UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.events import Event, event_listener
 from src.functions import get_players, get_all_players, get_target, get_main_role
@@ -16,9 +17,9 @@ from src.dispatcher import MessageDispatcher
 from src.gamestate import GameState
 from src.random import random
 
-GUARDED: UserDict[User, User] = UserDict()
-PASSED = UserSet()
-DYING = UserSet()
+GUARDED: UserDict[User, User] = GameScoped(UserDict)
+PASSED = GameScoped(UserSet)
+DYING = GameScoped(UserSet)
 
 @command("guard", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("bodyguard",))
 def guard(wrapper: MessageDispatcher, message: str):
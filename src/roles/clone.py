@@ -5,6 +5,7 @@ from typing import Optional
 
 from src import users, config
 from src.containers import UserSet, UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.dispatcher import MessageDispatcher
 from src.events import Event, event_listener
@@ -15,9 +16,9 @@ from src.trans import NIGHT_IDLE_EXEMPT
 from src.users import User
 from src.random import random
 
-CLONED: UserDict[users.User, users.User] = UserDict()
-CAN_ACT = UserSet()
-ACTED = UserSet()
+CLONED: UserDict[users.User, users.User] = GameScoped(UserDict)
+CAN_ACT = GameScoped(UserSet)
+ACTED = GameScoped(UserSet)
 CLONE_ENABLED = False # becomes True if at least one person died and there are clones
 
 @command("clone", chan=False, pm=True, playing=True, phases=("night",), roles=("clone",))
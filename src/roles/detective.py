@@ -6,6 +6,7 @@ from typing import Optional
 from src import config
 from src.cats import Safe, Wolfteam
 from src.containers import UserSet
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.events import Event, event_listener
 from src.functions import get_players, get_main_role, get_target
@@ -17,7 +18,7 @@ from src.gamestate import GameState
 from src.users import User
 from src.random import random
 
-INVESTIGATED = UserSet()
+INVESTIGATED = GameScoped(UserSet)
 
 @command("id", chan=False, pm=True, playing=True, silenced=True, phases=("day",), roles=("detective",))
 def investigate(wrapper: MessageDispatcher, message: str):
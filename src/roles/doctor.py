@@ -6,6 +6,7 @@ from typing import Optional
 
 from src import config, users
 from src.containers import UserSet, UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.dispatcher import MessageDispatcher
 from src.events import Event, event_listener
@@ -16,8 +17,8 @@ from src.status import try_misdirection, try_exchange, remove_lycanthropy, remov
 from src.users import User
 from src.random import random
 
-IMMUNIZED = UserSet()
-DOCTORS: UserDict[users.User, int] = UserDict()
+IMMUNIZED = GameScoped(UserSet)
+DOCTORS: UserDict[users.User, int] = GameScoped(UserDict)
 
 @command("immunize", chan=False, pm=True, playing=True, silenced=True, phases=("day",), roles=("doctor",))
 def immunize(wrapper: MessageDispatcher, message: str):
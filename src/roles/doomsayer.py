@@ -6,6 +6,7 @@ from typing import Optional
 from src import status
 from src.cats import All
 from src.containers import UserSet, UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.events import Event, event_listener
 from src.functions import get_all_players, get_target
@@ -19,11 +20,11 @@ from src.random import random
 
 register_wolf("doomsayer")
 
-SEEN = UserSet()
-LASTSEEN: UserDict[User, User] = UserDict()
-KILLS: UserDict[User, User] = UserDict()
-SICK: UserDict[User, User] = UserDict()
-LYCANS: UserDict[User, User] = UserDict()
+SEEN = GameScoped(UserSet)
+LASTSEEN: UserDict[User, User] = GameScoped(UserDict)
+KILLS: UserDict[User, User] = GameScoped(UserDict)
+SICK: UserDict[User, User] = GameScoped(UserDict)
+LYCANS: UserDict[User, User] = GameScoped(UserDict)
 
 _mappings = ("death", KILLS), ("lycan", LYCANS), ("sick", SICK)
 
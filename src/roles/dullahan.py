@@ -7,6 +7,7 @@ from typing import Optional
 from src import users, channels
 from src.cats import Category
 from src.containers import UserSet, UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.dispatcher import MessageDispatcher
 from src.events import Event, event_listener
@@ -17,8 +18,8 @@ from src.status import try_misdirection, try_exchange, try_protection, add_dying
 from src.users import User
 from src.random import random
 
-KILLS: UserDict[users.User, users.User] = UserDict()
-TARGETS: UserDict[users.User, UserSet] = UserDict()
+KILLS: UserDict[users.User, users.User] = GameScoped(UserDict)
+TARGETS: UserDict[users.User, UserSet] = GameScoped(UserDict)
 
 @command("kill", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("dullahan",))
 def dullahan_kill(wrapper: MessageDispatcher, message: str):
@@ -4,6 +4,7 @@ import re
 
 from src import users
 from src.containers import UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.events import Event, event_listener
 from src.functions import get_all_players, get_target
@@ -18,8 +19,8 @@ from typing import Optional
 
 register_wolf("hag")
 
-HEXED: UserDict[users.User, users.User] = UserDict()
-LASTHEXED: UserDict[users.User, users.User] = UserDict()
+HEXED: UserDict[users.User, users.User] = GameScoped(UserDict)
+LASTHEXED: UserDict[users.User, users.User] = GameScoped(UserDict)
 
 @command("hex", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("hag",))
 def hex_cmd(wrapper: MessageDispatcher, message: str):
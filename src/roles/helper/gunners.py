@@ -9,6 +9,7 @@ from src.cats import Wolf, Killer
 from src.containers import UserDict
 from src.decorators import command
 from src.events import Event, event_listener
+from src.gameloop import GameScoped
 from src.functions import get_players, get_all_players, get_target, get_main_role, get_reveal_role
 from src.messages import messages
 from src.status import try_misdirection, try_exchange, add_dying, kill_players, add_absent, try_protection, is_dying
@@ -22,7 +23,7 @@ from src.random import random
 _rolestate: dict[str, dict[str, Any]] = {}
 
 def setup_variables(rolename: str, *, hit: float, headshot: float, explode: float, multiplier: float):
-    GUNNERS: UserDict[User, int] = UserDict()
+    GUNNERS: UserDict[User, int] = GameScoped(UserDict)
     _rolestate[rolename] = {
         "GUNNERS": GUNNERS
     }
@@ -5,6 +5,7 @@ from typing import Iterable
 from src import cats
 from src.containers import UserDict
 from src.events import Event, event_listener
+from src.gameloop import GameScoped
 from src.functions import get_players, get_all_players
 from src.messages import messages
 from src.gamestate import GameState
@@ -15,7 +16,7 @@ from src.users import User
 # mystic_notify, wolf_mystic_notify
 
 def register_mystic(rolename: str, *, send_role: bool, types: Iterable[str]):
-    LAST_COUNT: UserDict[User, list[tuple[str, int]]] = UserDict()
+    LAST_COUNT: UserDict[User, list[tuple[str, int]]] = GameScoped(UserDict)
 
     role = rolename.replace(" ", "_")
 
@@ -4,6 +4,7 @@ from typing import Optional
 
 from src.containers import UserSet
 from src.events import Event, event_listener
+from src.gameloop import GameScoped
 from src.functions import get_players, get_all_players
 from src.messages import messages
 from src.gamestate import GameState
@@ -11,7 +12,7 @@ from src.users import User
 from src.random import random
 
 def setup_variables(rolename):
-    SEEN = UserSet()
+    SEEN = GameScoped(UserSet)
 
     @event_listener("del_player", listener_id="<{}>.on_del_player".format(rolename))
     def on_del_player(evt: Event, var: GameState, player: User, all_roles: set[str], death_triggers: bool):
@@ -8,6 +8,7 @@ from typing import Any, Optional
 from src import channels, users, status
 from src.cats import All, Wolf, Killer
 from src.containers import UserList, UserSet, UserDict, DefaultUserDict
+from src.gameloop import GameScoped
 from src.events import Event, event_listener
 from src.functions import (get_players, get_all_players, get_main_role, get_all_roles, get_reveal_role, get_target,
                            match_totem)
@@ -64,26 +65,26 @@ from src.random import random
 # It is generally unneeded to modify this file to add new totems or shaman roles    #
 #####################################################################################
 
-DEATH: UserDict[users.User, UserList] = UserDict()
-REVEALING = UserSet()
-NARCOLEPSY = UserSet()
-SILENCE = UserSet()
-DESPERATION = UserSet()
-IMPATIENCE = UserList()
-PACIFISM = UserList()
-INFLUENCE = UserSet()
-EXCHANGE = UserSet()
-LYCANTHROPY = UserSet()
-LUCK = UserSet()
-PESTILENCE = UserSet()
-RETRIBUTION = UserSet()
-MISDIRECTION = UserSet()
-DECEIT = UserSet()
+DEATH: UserDict[users.User, UserList] = GameScoped(UserDict)
+REVEALING = GameScoped(UserSet)
+NARCOLEPSY = GameScoped(UserSet)
+SILENCE = GameScoped(UserSet)
+DESPERATION = GameScoped(UserSet)
+IMPATIENCE = GameScoped(UserList)
+PACIFISM = GameScoped(UserList)
+INFLUENCE = GameScoped(UserSet)
+EXCHANGE = GameScoped(UserSet)
+LYCANTHROPY = GameScoped(UserSet)
+LUCK = GameScoped(UserSet)
+PESTILENCE = GameScoped(UserSet)
+RETRIBUTION = GameScoped(UserSet)
+MISDIRECTION = GameScoped(UserSet)
+DECEIT = GameScoped(UserSet)
 
 # holding vars that don't persist long enough to need special attention in
 # reset/exchange/nickchange
-havetotem: list[users.User] = []
-brokentotem: set[users.User] = set()
+havetotem: list[users.User] = GameScoped(list)
+brokentotem: set[users.User] = GameScoped(set)
 
 # holds mapping of shaman roles to their state vars, for debugging
 # and unit testing purposes
@@ -106,11 +107,11 @@ def setup_variables(rolename, *, knows_totem):
         # Analogue of ulf() but for UserDicts
         return DefaultUserDict(UserDict)
 
-    TOTEMS: DefaultUserDict[users.User, dict[str, int]] = DefaultUserDict(dict)
-    LASTGIVEN: DefaultUserDict[users.User, DefaultUserDict[str, UserList]] = DefaultUserDict(ulf)
-    SHAMANS: DefaultUserDict[users.User, DefaultUserDict[str, UserList]] = DefaultUserDict(ulf)
-    RETARGET: DefaultUserDict[users.User, UserDict[users.User, users.User]] = DefaultUserDict(UserDict)
-    ORIG_TARGET_MAP: DefaultUserDict[users.User, DefaultUserDict[str, UserDict[users.User, users.User]]] = DefaultUserDict(udf)
+    TOTEMS: DefaultUserDict[users.User, dict[str, int]] = GameScoped(lambda: DefaultUserDict(dict))
+    LASTGIVEN: DefaultUserDict[users.User, DefaultUserDict[str, UserList]] = GameScoped(lambda: DefaultUserDict(ulf))
+    SHAMANS: DefaultUserDict[users.User, DefaultUserDict[str, UserList]] = GameScoped(lambda: DefaultUserDict(ulf))
+    RETARGET: DefaultUserDict[users.User, UserDict[users.User, users.User]] = GameScoped(lambda: DefaultUserDict(UserDict))
+    ORIG_TARGET_MAP: DefaultUserDict[users.User, DefaultUserDict[str, UserDict[users.User, users.User]]] = GameScoped(lambda: DefaultUserDict(udf))
     _rolestate[rolename] = {
         "TOTEMS": TOTEMS,
         "LASTGIVEN": LASTGIVEN,
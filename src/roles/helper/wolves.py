@@ -7,6 +7,7 @@ from typing import Optional, Iterable
 from src import users, config, relay
 from src.cats import Wolf, Wolfchat, Wolfteam, Killer, Hidden, All
 from src.containers import UserList, UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.events import Event, event_listener
 from src.functions import get_main_role, get_players, get_all_roles, get_all_players, get_target
@@ -18,7 +19,7 @@ from src.users import User
 from src.locations import get_home
 from src.random import random
 
-KILLS: UserDict[users.User, UserList] = UserDict()
+KILLS: UserDict[users.User, UserList] = GameScoped(UserDict)
 
 def register_wolf(rolename):
     @event_listener("send_role", listener_id="wolves.<{}>.on_send_role".format(rolename))
@@ -5,6 +5,7 @@ from typing import Optional
 
 from src import users
 from src.containers import UserSet, UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.events import Event, event_listener
 from src.functions import get_players, get_all_players, get_target
@@ -15,9 +16,9 @@ from src.gamestate import GameState
 from src.users import User
 from src.random import random
 
-KILLS: UserDict[users.User, users.User] = UserDict()
-HUNTERS = UserSet()
-PASSED = UserSet()
+KILLS: UserDict[users.User, users.User] = GameScoped(UserDict)
+HUNTERS = GameScoped(UserSet)
+PASSED = GameScoped(UserSet)
 
 @command("kill", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("hunter",))
 def hunter_kill(wrapper: MessageDispatcher, message: str):
@@ -5,6 +5,7 @@ from typing import Optional
 
 from src.cats import get_team
 from src.containers import UserSet
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.dispatcher import MessageDispatcher
 from src.events import Event, event_listener
@@ -15,7 +16,7 @@ from src.status import try_misdirection, try_exchange
 from src.users import User
 from src.random import random
 
-INVESTIGATED = UserSet()
+INVESTIGATED = GameScoped(UserSet)
 
 @command("id", chan=False, pm=True, playing=True, silenced=True, phases=("day",), roles=("investigator",))
 def investigate(wrapper: MessageDispatcher, message: str):
@@ -4,13 +4,14 @@ from typing import Optional
 
 from src.cats import Category
 from src.containers import UserSet
+from src.gameloop import GameScoped
 from src.events import Event, event_listener
 from src.functions import get_all_players
 from src.messages import messages
 from src.gamestate import GameState
 from src.users import User
 
-JESTERS = UserSet()
+JESTERS = GameScoped(UserSet)
 
 @event_listener("day_vote")
 def on_day_vote(evt: Event, var: GameState, votee, voters):
@@ -5,6 +5,7 @@ from typing import Optional
 
 from src.cats import Category
 from src.containers import UserSet, UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.dispatcher import MessageDispatcher
 from src.events import Event, event_listener
@@ -14,8 +15,8 @@ from src.messages import messages
 from src.random import random
 from src.users import User
 
-ACTED = UserSet()
-SWAPS: UserDict[User, tuple[int, int]] = UserDict()
+ACTED = GameScoped(UserSet)
+SWAPS: UserDict[User, tuple[int, int]] = GameScoped(UserDict)
 
 @command("choose", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("master of teleportation",))
 def choose(wrapper: MessageDispatcher, message: str):
@@ -2,6 +2,7 @@ from typing import Optional
 
 from src import channels
 from src.containers import UserSet
+from src.gameloop import GameScoped
 from src.events import Event, event_listener
 from src.functions import get_all_players
 from src.gamestate import GameState
@@ -9,7 +10,7 @@ from src.messages import messages
 from src.status import add_day_vote_immunity
 from src.users import User
 
-REVEALED_MAYORS = UserSet()
+REVEALED_MAYORS = GameScoped(UserSet)
 
 @event_listener("transition_day_begin")
 def on_transition_day_begin(evt: Event, var: GameState):
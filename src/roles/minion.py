@@ -4,6 +4,7 @@ from typing import Optional
 
 from src.cats import Wolf
 from src.containers import UserSet
+from src.gameloop import GameScoped
 from src.events import Event, event_listener
 from src.functions import get_all_players
 from src.gamestate import GameState
@@ -11,8 +12,8 @@ from src.messages import messages
 from src.users import User
 from src.random import random
 
-RECEIVED_INFO = UserSet()
-KNOWS_MINIONS = UserSet()
+RECEIVED_INFO = GameScoped(UserSet)
+KNOWS_MINIONS = GameScoped(UserSet)
 
 def wolf_list(var: GameState):
     wolves = [wolf.nick for wolf in get_all_players(var, Wolf)]
@@ -7,6 +7,7 @@ from typing import Optional
 from src import users
 from src.cats import Category
 from src.containers import UserSet, UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.dispatcher import MessageDispatcher
 from src.events import Event, event_listener
@@ -17,9 +18,9 @@ from src.status import try_misdirection, try_exchange
 from src.users import User
 from src.random import random
 
-TOBECHARMED: UserDict[users.User, UserSet] = UserDict()
-CHARMED = UserSet()
-PASSED = UserSet()
+TOBECHARMED: UserDict[users.User, UserSet] = GameScoped(UserDict)
+CHARMED = GameScoped(UserSet)
+PASSED = GameScoped(UserSet)
 
 Pipers = Category("Pipers")
 
@@ -5,6 +5,7 @@ from typing import Optional
 
 from src import users
 from src.containers import UserSet
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.events import Event, event_listener
 from src.functions import get_players, get_all_players, get_target
@@ -15,7 +16,7 @@ from src.dispatcher import MessageDispatcher
 from src.gamestate import GameState
 from src.locations import move_player, Graveyard
 
-PRIESTS = UserSet()
+PRIESTS = GameScoped(UserSet)
 
 @command("bless", chan=False, pm=True, playing=True, silenced=True, phases=("day",), roles=("priest",))
 def bless(wrapper: MessageDispatcher, message: str):
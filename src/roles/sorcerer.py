@@ -5,6 +5,7 @@ from typing import Optional
 
 from src.cats import Spy
 from src.containers import UserSet
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.events import Event, event_listener
 from src.functions import get_all_players, get_all_roles, get_target
@@ -17,7 +18,7 @@ from src.users import User
 
 register_wolf("sorcerer")
 
-OBSERVED = UserSet()
+OBSERVED = GameScoped(UserSet)
 
 @command("observe", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("sorcerer",))
 def observe(wrapper: MessageDispatcher, message: str):
@@ -6,6 +6,7 @@ from typing import Optional, Union
 from src import users
 from src.cats import Category
 from src.containers import UserSet, UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.dispatcher import MessageDispatcher
 from src.events import Event, event_listener
@@ -17,10 +18,10 @@ from src.users import User
 from src.locations import move_player, get_home
 from src.random import random
 
-ENTRANCED = UserSet()
-VISITED: UserDict[users.User, users.User] = UserDict()
-PASSED = UserSet()
-FORCE_PASSED = UserSet()
+ENTRANCED = GameScoped(UserSet)
+VISITED: UserDict[users.User, users.User] = GameScoped(UserDict)
+PASSED = GameScoped(UserSet)
+FORCE_PASSED = GameScoped(UserSet)
 ALL_SUCC_IDLE = True
 
 Succubi = Category("Succubi")
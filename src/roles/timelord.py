@@ -1,10 +1,8 @@
 from __future__ import annotations
 
-import threading
-import time
 from typing import Optional
 
-from src import channels
+from src import channels, timers
 from src.events import event_listener, Event
 from src.gamestate import GameState
 from src.messages import messages
@@ -38,42 +36,40 @@ def on_del_player(evt: Event, var: GameState, player: User, all_roles: set[str],
     values = dict(TIME_ATTRIBUTES)
     channels.Main.send(messages["time_lord_dead"].format(values["day_time_limit"], values["night_time_limit"]))
 
-    from src.trans import hurry_up, night_timeout, DAY_ID, NIGHT_ID, TIMERS
+    from src.trans import hurry_up, night_timeout, PHASES, TIMERS
     if var.current_phase == "day":
         time_limit = var.day_time_limit
         cb = hurry_up
-        limit_args = ["limit", var, DAY_ID]
+        limit_args = ["limit", var, PHASES.day_id]
         time_warn = var.day_time_warn
-        warn_args = ["warn", var, DAY_ID, False]
+        warn_args = ["warn", var, PHASES.day_id, False]
         timer_name = "day_warn"
     elif var.current_phase == "night":
         time_limit = var.night_time_limit
         cb = night_timeout
-        limit_args = [var, NIGHT_ID]
+        limit_args = [var, PHASES.night_id]
         time_warn = var.night_time_warn
-        warn_args = [var, NIGHT_ID]
+        warn_args = [var, PHASES.night_id]
         timer_name = "night_warn"
     else:
         return
 
     if f"{var.current_phase}_limit" in TIMERS:
-        time_left = int((TIMERS[f"{var.current_phase}_limit"][1] + TIMERS[f"{var.current_phase}_limit"][2]) - time.time())
+        time_left = int((TIMERS[f"{var.current_phase}_limit"][1] + TIMERS[f"{var.current_phase}_limit"][2]) - timers.now())
+        phase_id = limit_args[-1]
 
         if time_left > time_limit > 0:
-            t = threading.Timer(time_limit, cb, limit_args)
-            TIMERS[f"{var.current_phase}_limit"] = (t, time.time(), time_limit)
-            t.daemon = True
-            t.start()
+            TIMERS[f"{var.current_phase}_limit"][0].cancel()
+            t = var.loop.call_later(time_limit, cb, limit_args, phase_id=phase_id)
+            TIMERS[f"{var.current_phase}_limit"] = (t, timers.now(), time_limit)
 
             # Don't duplicate warnings, i.e. only set the warning timer if a warning was not already given
             if timer_name in TIMERS and time_warn > 0:
                 timer = TIMERS[timer_name][0]
-                if not timer.finished.is_set():
+                if not timer.done:
                     timer.cancel()
-                    t = threading.Timer(time_warn, cb, warn_args)
-                    TIMERS[timer_name] = (t, time.time(), time_warn)
-                    t.daemon = True
-                    t.start()
+                    t = var.loop.call_later(time_warn, cb, warn_args, phase_id=phase_id)
+                    TIMERS[timer_name] = (t, timers.now(), time_warn)
 
 @event_listener("night_idled")
 def on_night_idled(evt: Event, var: GameState, player: User):
@@ -3,6 +3,7 @@ from typing import Optional
 from src import channels
 from src.messages import messages
 from src.containers import UserSet
+from src.gameloop import GameScoped
 from src.gamestate import GameState
 from src.functions import get_all_players, get_all_roles
 from src.status import add_day_vote_immunity
@@ -10,7 +11,7 @@ from src.users import User
 from src.events import Event, event_listener
 from src.roles.helper.wolves import register_wolf
 
-ACTIVATED = UserSet()
+ACTIVATED = GameScoped(UserSet)
 
 register_wolf("tough wolf")
 
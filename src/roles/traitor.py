@@ -8,6 +8,7 @@ from src.cats import All, Wolf
 from src.events import Event, event_listener
 from src.gamestate import GameState
 from src.messages import messages
+from src.rolestats import role_index
 from src.roles.helper.wolves import register_wolf, get_wolfchat_roles
 from src.status import in_misdirection_scope
 from src.users import User
@@ -93,25 +94,30 @@ def on_chk_win(evt: Event, var: GameState, rolemap: dict[str, set[User]], mainro
         if var.in_game:
             channels.Main.send(messages["traitor_turn_channel"])
             # fix !stats to show that traitor turned as well
-            newstats = set()
-            for rs in var.get_role_stats():
-                d = dict(rs)
+            # if amnesiac is loaded and they have turned, there may be extra traitors not normally accounted for
+            amnesiacs = False
+            if "src.roles.amnesiac" in sys.modules:
+                from src.roles.amnesiac import get_blacklist, get_stats_flag
+                amnesiacs = get_stats_flag(var) and "traitor" not in get_blacklist(var)
+            traitor_idx = role_index("traitor")
+            wolf_idx = role_index("wolf")
+            amnesiac_idx = role_index("amnesiac")
+
+            def turn_traitors(d: list[int]):
                 # traitor count of 0 is not possible since we for-sure turned traitors into wolves earlier
                 # as such, exclude such cases from newstats entirely.
-                if d["traitor"] >= 1:
-                    d["wolf"] = d.get("wolf", 0) + d["traitor"]
-                    d["traitor"] = 0
-                    newstats.add(frozenset(d.items()))
-                # if amnesiac is loaded and they have turned, there may be extra traitors not normally accounted for
-                if "src.roles.amnesiac" in sys.modules:
-                    from src.roles.amnesiac import get_blacklist, get_stats_flag
-                    if get_stats_flag(var) and "traitor" not in get_blacklist(var) and d["amnesiac"] >= 1:
-                        iter_end = d["amnesiac"] + 1
-                        for i in range(1, iter_end):
-                            d["wolf"] = d.get("wolf", 0) + 1
-                            d["amnesiac"] -= 1
-                            newstats.add(frozenset(d.items()))
+                if d[traitor_idx] >= 1:
+                    d[wolf_idx] += d[traitor_idx]
+                    d[traitor_idx] = 0
+                    yield d
+                if amnesiacs and d[amnesiac_idx] >= 1:
+                    for i in range(d[amnesiac_idx]):
+                        d[wolf_idx] += 1
+                        d[amnesiac_idx] -= 1
+                        yield d
 
+            newstats = var.get_role_stats()
+            newstats.transform(turn_traitors)
             var.set_role_stats(newstats)
 
         evt.prevent_default = True
@@ -6,6 +6,7 @@ from typing import Optional
 from src import users
 from src.cats import Category, Village, Wolfteam, Vampire_Team, get_team
 from src.containers import UserSet, UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.events import Event, event_listener
 from src.functions import get_players, get_all_players, match_role
@@ -14,8 +15,8 @@ from src.dispatcher import MessageDispatcher
 from src.gamestate import GameState
 from src.users import User
 
-TURNCOATS: UserDict[users.User, tuple[str, int]] = UserDict()
-PASSED = UserSet()
+TURNCOATS: UserDict[users.User, tuple[str, int]] = GameScoped(UserDict)
+PASSED = GameScoped(UserSet)
 
 @command("side", chan=False, pm=True, playing=True, phases=("night",), roles=("turncoat",))
 def change_sides(wrapper: MessageDispatcher, message: str, sendmsg=True): # is sendmsg useful at all?
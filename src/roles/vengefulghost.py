@@ -6,6 +6,7 @@ from typing import Optional
 from src import users
 from src.cats import All, Wolfteam, Vampire_Team, Win_Stealer, get_team, Category
 from src.containers import UserDict, UserSet
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.events import Event, event_listener
 from src.functions import get_players, get_target, get_all_roles
@@ -16,12 +17,12 @@ from src.gamestate import GameState
 from src.users import User
 from src.random import random
 
-KILLS: UserDict[users.User, users.User] = UserDict()
-GHOSTS: UserDict[users.User, str] = UserDict()
-TARGETS: UserDict[users.User, UserSet] = UserDict()
+KILLS: UserDict[users.User, users.User] = GameScoped(UserDict)
+GHOSTS: UserDict[users.User, str] = GameScoped(UserDict)
+TARGETS: UserDict[users.User, UserSet] = GameScoped(UserDict)
 
 # temporary holding variable, only non-empty during transition_day
-drivenoff: UserDict[users.User, str] = UserDict()
+drivenoff: UserDict[users.User, str] = GameScoped(UserDict)
 
 @command("kill", chan=False, pm=True, playing=False, silenced=True, phases=("night",), users=GHOSTS)
 def vg_kill(wrapper: MessageDispatcher, message: str):
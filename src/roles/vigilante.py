@@ -6,6 +6,7 @@ from typing import Optional
 from src import users
 from src.cats import Vampire, Wolf, Win_Stealer
 from src.containers import UserSet, UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.events import Event, event_listener
 from src.functions import get_players, get_all_players, get_main_role, get_target
@@ -16,8 +17,8 @@ from src.gamestate import GameState
 from src.users import User
 from src.random import random
 
-KILLS: UserDict[users.User, users.User] = UserDict()
-PASSED = UserSet()
+KILLS: UserDict[users.User, users.User] = GameScoped(UserDict)
+PASSED = GameScoped(UserSet)
 
 @command("kill", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("vigilante",))
 def vigilante_kill(wrapper: MessageDispatcher, message: str):
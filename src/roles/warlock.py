@@ -4,6 +4,7 @@ import re
 from typing import Optional
 
 from src.containers import UserSet, UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.events import Event, event_listener
 from src.functions import get_players, get_all_players, get_main_role, get_target
@@ -17,8 +18,8 @@ from src.gamestate import GameState
 
 register_wolf("warlock")
 
-CURSED: UserDict[User, User] = UserDict()
-PASSED: UserSet = UserSet()
+CURSED: UserDict[User, User] = GameScoped(UserDict)
+PASSED: UserSet = GameScoped(UserSet)
 
 @command("curse", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("warlock",))
 def curse(wrapper: MessageDispatcher, message: str):
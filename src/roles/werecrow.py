@@ -5,6 +5,7 @@ from typing import Optional
 
 from src import users
 from src.containers import UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.events import Event, event_listener
 from src.functions import get_all_players, get_target
@@ -18,7 +19,7 @@ from src.users import User
 
 register_wolf("werecrow")
 
-OBSERVED: UserDict[users.User, users.User] = UserDict()
+OBSERVED: UserDict[users.User, users.User] = GameScoped(UserDict)
 
 @command("observe", chan=False, pm=True, playing=True, silenced=True, phases=("night",), roles=("werecrow",))
 def observe(wrapper: MessageDispatcher, message: str):
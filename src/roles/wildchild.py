@@ -5,6 +5,7 @@ from typing import Optional
 
 from src.cats import Category, Village, Wolfteam
 from src.containers import UserSet, UserDict
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.events import Event, event_listener
 from src.functions import get_players, get_all_players, get_main_role, get_all_roles, get_target, change_role
@@ -16,9 +17,9 @@ from src.gamestate import GameState
 from src.trans import NIGHT_IDLE_EXEMPT
 from src.random import random
 
-IDOLS: UserDict[User, User] = UserDict()
-CAN_ACT = UserSet()
-ACTED = UserSet()
+IDOLS: UserDict[User, User] = GameScoped(UserDict)
+CAN_ACT = GameScoped(UserSet)
+ACTED = GameScoped(UserSet)
 
 # this is populated only during stop_game to track which wild children turned for the endgame readout
 _turned: set[User] = set()
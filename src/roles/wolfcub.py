@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-from collections import Counter
 from typing import Optional
 
 from src import users, trans
@@ -8,6 +7,7 @@ from src.cats import Wolf, Killer
 from src.events import Event, event_listener
 from src.functions import get_players
 from src.messages import messages
+from src.rolestats import RoleStats, role_index
 from src.roles.helper.wolves import wolf_can_kill, register_wolf, is_known_wolf_ally
 from src.gamestate import GameState
 from src.users import User
@@ -73,16 +73,22 @@ def on_chk_win(evt: Event,
         evt.stop_processing = True
 
 @event_listener("reconfigure_stats")
-def on_reconfigure_stats(evt: Event, var: GameState, roleset: Counter, reason: str):
-    # if we're making new wolves or there aren't cubs, nothing to do here
-    if reason == "howl" or roleset["wolf cub"] == 0:
+def on_reconfigure_stats(evt: Event, var: GameState, stats: RoleStats, reason: str):
+    # if we're making new wolves, nothing to do here
+    if reason == "howl":
         return
-    for role in Wolf & Killer:
-        if roleset[role] > 0:
-            break
-    else:
-        roleset["wolf"] = roleset["wolf cub"]
-        roleset["wolf cub"] = 0
+    cub = role_index("wolf cub")
+    wolf = role_index("wolf")
+    killers = [role_index(role) for role in Wolf & Killer]
+
+    def grow_up(roleset: list[int]):
+        # cubs grow up once there are no other wolves left that can kill
+        if roleset[cub] > 0 and not any(roleset[k] > 0 for k in killers):
+            roleset[wolf] = roleset[cub]
+            roleset[cub] = 0
+        return (roleset,)
+
+    stats.transform(grow_up)
 
 @event_listener("transition_day_resolve")
 def on_transition_day_resolve(evt: Event, var: GameState, dead, killers):
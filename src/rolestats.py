@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import math
+import threading
+from collections import Counter
+from typing import Callable, Iterable, Iterator, Mapping, Optional
+
+__all__ = ["RoleStats", "RoleBounds", "role_index", "multiset_combinations", "count_multiset_combinations",
+           "multiset_bounds", "count_compositions"]
+
+# Interned role names; a role's position in this list is its column in every count vector.
+# Persisted between games and only ever appended to, so existing vectors remain valid as it grows
+_ROLES: list[str] = []
+_INDEX: dict[str, int] = {}
+_INDEX_LOCK = threading.Lock()
+
+def role_index(role: str) -> int:
+    """ Get the column used for a role in role count vectors, interning the role if it is new.
+
+    :param role: Role name
+    :return: Index of the role's count in every vector passed to RoleStats.transform
+    """
+    index = _INDEX.get(role)
+    if index is None:
+        with _INDEX_LOCK:
+            index = _INDEX.get(role)
+            if index is None:
+                index = len(_ROLES)
+                _ROLES.append(role)
+                _INDEX[role] = index
+    return index
+
+def multiset_combinations(counts: Mapping[str, int], k: int) -> Iterator[dict[str, int]]:
+    """ Generate every distinct way of drawing k roles from a role set.
+
+    Unlike itertools.combinations over the set's elements, each sub-multiset is produced exactly once,
+    so a set such as {"wolf": 3, "traitor": 1} drawn twice gives 2 results rather than 6.
+
+    :param counts: Mapping of role name to the number of copies of it in the set
+    :param k: Number of roles to draw
+    :return: Iterator of mappings from role name to the number of copies drawn, omitting roles not drawn
+    """
+    items = [(role, count) for role, count in counts.items() if count > 0]
+    # remaining[i] is the number of roles left to draw from at items[i:], used to prune dead branches
+    remaining = [0] * (len(items) + 1)
+    for i in range(len(items) - 1, -1, -1):
+        remaining[i] = remaining[i + 1] + items[i][1]
+
+    chosen: dict[str, int] = {}
+
+    def draw(i: int, k: int) -> Iterator[dict[str, int]]:
+        if k == 0:
+            yield dict(chosen)
+            return
+        if remaining[i] < k:
+            return
+        role, count = items[i]
+        for n in range(min(count, k), 0, -1):
+            chosen[role] = n
+            yield from draw(i + 1, k - n)
+        del chosen[role]
+        yield from draw(i + 1, k)
+
+    if 0 <= k <= remaining[0]:
+        yield from draw(0, k)
+
+def count_multiset_combinations(counts: Mapping[str, int], k: int) -> int:
+    """ Count the results of multiset_combinations(counts, k) without generating them.
+
+    :param counts: Mapping of role name to the number of copies of it in the set
+    :param k: Number of roles to draw
+    :return: Number of distinct ways to draw k roles from the set
+    """
+    if k < 0:
+        return 0
+    # ways[j] is the number of ways to draw j roles from the roles considered so far
+    ways = [1] + [0] * k
+    for count in counts.values():
+        if count <= 0:
+            continue
+        prefix = [0]
+        for w in ways:
+            prefix.append(prefix[-1] + w)
+        ways = [prefix[j + 1] - prefix[max(0, j - count)] for j in range(k + 1)]
+    return ways[k]
+
+def multiset_bounds(counts: Mapping[str, int], k: int) -> dict[str, tuple[int, int]]:
+    """ Get the fewest and most copies of each role that drawing k roles from a role set can give.
+
+    :param counts: Mapping of role name to the number of copies of it in the set
+    :param k: Number of roles to draw
+    :return: Mapping of role name to its (min, max) count across all draws
+    """
+    total = sum(counts.values())
+    return {role: (max(0, k - (total - count)), min(count, k)) for role, count in counts.items()}
+
+def count_compositions(role_sets: Iterable[tuple[Mapping[str, int], int]]) -> int:
+    """ Get an upper bound on the number of compositions RoleStats.from_role_sets would produce.
+
+    Draws from different role sets may coincide, in which case fewer distinct compositions remain.
+
+    :param role_sets: Pairs of (role set counts, number of roles drawn from it)
+    :return: Product of the number of distinct draws from each role set
+    """
+    return math.prod(count_multiset_combinations(counts, k) for counts, k in role_sets)
+
+def _encode(counts: list[int]) -> Optional[bytes]:
+    if counts and min(counts) < 0:
+        # a negative count means this composition is impossible
+        return None
+    # trailing zeros are stripped so that equal compositions compare equal
+    # regardless of how many roles had been interned when each was made
+    return bytes(counts).rstrip(b"\0")
+
+class RoleStats:
+    """ The role compositions a game could currently have, used to answer !stats.
+
+    Each composition is a vector of role counts indexed by role_index(), stored as bytes
+    (one unsigned byte per role) so that duplicates collapse in a set and the whole collection
+    can be reduced column by column. Listeners for the reconfigure_stats event receive this object
+    and should update it with transform() or remove_player() rather than one composition at a time.
+    """
+    __slots__ = ("_rows",)
+
+    def __init__(self, rolesets: Iterable[Mapping[str, int]] = ()):
+        self._rows: set[bytes] = set()
+        for roleset in rolesets:
+            self.add(roleset)
+
+    @classmethod
+    def from_role_sets(cls, fixed: Mapping[str, int], role_sets: Iterable[tuple[Mapping[str, int], int]]) -> RoleStats:
+        """ Build every composition made of the fixed roles plus a number of roles drawn from each role set.
+
+        Check count_compositions() first if the role sets may be large.
+
+        :param fixed: Mapping of role name to the number of players certain to have that role
+        :param role_sets: Pairs of (role set counts, number of roles drawn from it)
+        :return: Deduplicated compositions
+        """
+        stats = cls([fixed])
+        for counts, k in role_sets:
+            draws = [[(role_index(role), n) for role, n in draw.items()] for draw in multiset_combinations(counts, k)]
+
+            def expand(roleset: list[int]):
+                for draw in draws:
+                    new = roleset.copy()
+                    for i, n in draw:
+                        new[i] += n
+                    yield new
+
+            stats.transform(expand)
+        return stats
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __bool__(self) -> bool:
+        return bool(self._rows)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, RoleStats):
+            return NotImplemented
+        return self._rows == other._rows
+
+    def __iter__(self) -> Iterator[Counter[str]]:
+        roles = list(_ROLES)
+        for row in self._rows:
+            yield Counter({roles[i]: count for i, count in enumerate(row)})
+
+    def copy(self) -> RoleStats:
+        stats = RoleStats()
+        stats._rows = set(self._rows)
+        return stats
+
+    def clear(self) -> None:
+        self._rows.clear()
+
+    def add(self, roleset: Mapping[str, int]) -> None:
+        """ Add a possible role composition.
+
+        :param roleset: Mapping of role name to the number of players with that role
+        """
+        row = []
+        for role, count in roleset.items():
+            i = role_index(role)
+            if i >= len(row):
+                row.extend([0] * (i + 1 - len(row)))
+            row[i] = count
+        encoded = _encode(row)
+        if encoded is not None:
+            self._rows.add(encoded)
+
+    def bounds(self) -> dict[str, tuple[int, int]]:
+        """ Get the minimum and maximum number of players that could have each role.
+
+        :return: Mapping of every interned role name to its (min, max) count across all compositions,
+            or an empty dict if there are no possible compositions
+        """
+        if not self._rows:
+            return {}
+        roles = list(_ROLES)
+        width = len(roles)
+        columns = zip(*(row.ljust(width, b"\0") for row in self._rows))
+        return {role: (min(column), max(column)) for role, column in zip(roles, columns)}
+
+    def transform(self, fn: Callable[[list[int]], Iterable[list[int]]]) -> None:
+        """ Replace every composition with the compositions fn returns for it.
+
+        fn is called once per composition with a list of counts indexed by role_index(); any role it
+        needs must therefore be interned before calling transform. It may modify that list in place
+        and return or yield it (and other lists) to keep it, or return nothing to discard it. Results
+        are copied as soon as they are yielded, so a generator may keep modifying the same list.
+        Compositions with negative counts are impossible and are discarded.
+
+        :param fn: Function mapping one composition to the compositions which replace it
+        """
+        width = len(_ROLES)
+        rows: set[bytes] = set()
+        for row in self._rows:
+            counts = list(row)
+            counts.extend([0] * (width - len(counts)))
+            for new in fn(counts) or ():
+                encoded = _encode(new)
+                if encoded is not None:
+                    rows.add(encoded)
+        self._rows = rows
+
+    def remove_player(self, roles: Iterable[str]) -> None:
+        """ Account for a player leaving the game whose role was one of the given roles.
+
+        Every composition is replaced by one with a single player removed from each of those roles it
+        has; compositions without any of them are no longer possible and are discarded.
+
+        :param roles: Roles the player could have had
+        """
+        columns = [role_index(role) for role in roles]
+        rows: set[bytes] = set()
+        for row in self._rows:
+            for i in columns:
+                if i < len(row) and row[i]:
+                    new = bytearray(row)
+                    new[i] -= 1
+                    rows.add(bytes(new).rstrip(b"\0"))
+        self._rows = rows
+
+class RoleBounds(RoleStats):
+    """ Stand-in for RoleStats when a game could have too many role compositions to track them all.
+
+    Only the fewest and most players each role could have are kept, which is all !stats shows. They are
+    held as two compositions, one with every role at its minimum and one with every role at its maximum,
+    which transform() runs through fn like any other before collapsing its results back into two.
+    For listeners which move players from one role to another, that can make the bounds wider than
+    the true ones, but never narrower.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_role_sets(cls, fixed: Mapping[str, int], role_sets: Iterable[tuple[Mapping[str, int], int]]) -> RoleBounds:
+        """ Get the bounds of every composition made of the fixed roles plus a number of roles drawn from each role set.
+
+        Draws from different role sets are independent, so their bounds add up.
+
+        :param fixed: Mapping of role name to the number of players certain to have that role
+        :param role_sets: Pairs of (role set counts, number of roles drawn from it)
+        :return: Per-role bounds of those compositions
+        """
+        low, high = Counter(fixed), Counter(fixed)
+        for counts, k in role_sets:
+            for role, (fewest, most) in multiset_bounds(counts, k).items():
+                low[role] += fewest
+                high[role] += most
+        return cls([low, high])
+
+    def copy(self) -> RoleBounds:
+        stats = RoleBounds()
+        stats._rows = set(self._rows)
+        return stats
+
+    def _extremes(self) -> tuple[list[int], list[int]]:
+        width = len(_ROLES)
+        columns = list(zip(*(row.ljust(width, b"\0") for row in self._rows)))
+        return [min(column) for column in columns], [max(column) for column in columns]
+
+    def _set_extremes(self, low: list[int], high: list[int]) -> None:
+        self._rows = {bytes(low).rstrip(b"\0"), bytes(high).rstrip(b"\0")}
+
+    def transform(self, fn: Callable[[list[int]], Iterable[list[int]]]) -> None:
+        if not self._rows:
+            return
+        rows = self._rows
+        super().transform(fn)
+        if not self._rows:
+            # fn ruled out both extremes, which says nothing about the compositions in between
+            self._rows = rows
+            return
+        self._set_extremes(*self._extremes())
+
+    def remove_player(self, roles: Iterable[str]) -> None:
+        columns = [role_index(role) for role in roles]
+        if not self._rows or not columns:
+            return
+        low, high = self._extremes()
+        for i in columns:
+            # any of the roles may have been theirs, so each could now have one fewer player;
+            # only when it can only have been one of them does that role certainly have one fewer
+            low[i] = max(0, low[i] - 1)
+            if len(columns) == 1:
+                high[i] = max(0, high[i] - 1)
+        self._set_extremes(low, high)
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from src.events import Event, event_listener
 from src.containers import UserDict
+from src.gameloop import GameScoped
 from src.functions import get_players
 from src.messages import messages
 from src.gamestate import GameState
@@ -9,7 +10,7 @@ from src.users import User
 
 __all__ = ["add_absent", "try_absent", "get_absent"]
 
-ABSENT: UserDict[User, str] = UserDict()
+ABSENT: UserDict[User, str] = GameScoped(UserDict)
 
 def add_absent(var: GameState, target: User, reason: str):
     if target not in get_players(var):
@@ -24,6 +25,7 @@ def add_absent(var: GameState, target: User, reason: str):
             if not voters:
                 del VOTES[votee]
             break
+    Event("vote_status_change", {}).dispatch(var, target)
 
 def try_absent(var: GameState, user: User):
     if user in ABSENT:
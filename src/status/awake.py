@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from src.events import Event, event_listener
 from src.containers import UserSet
+from src.gameloop import GameScoped
 from src.cats import Nocturnal
 from src.functions import get_all_roles
 from src.gamestate import GameState
@@ -9,8 +10,8 @@ from src.users import User
 
 __all__ = ["add_awake", "add_asleep", "is_awake"]
 
-AWAKE = UserSet()
-ASLEEP = UserSet()
+AWAKE = GameScoped(UserSet)
+ASLEEP = GameScoped(UserSet)
 
 # marking someone awake overrides asleep and non-Nocturnal roles
 def add_awake(var: GameState, player: User):
@@ -2,6 +2,7 @@ from __future__ import annotations
 from typing import Union
 
 from src.containers import UserSet
+from src.gameloop import GameScoped
 from src.gamestate import GameState
 from src.functions import get_players
 from src.events import Event, event_listener
@@ -9,7 +10,7 @@ from src.users import User
 
 __all__ = ["add_disease", "remove_disease", "wolves_diseased"]
 
-DISEASED = UserSet()
+DISEASED = GameScoped(UserSet)
 DISEASED_WOLVES = False
 
 def add_disease(var: GameState, target: User):
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from src import config
 from src.containers import UserSet
+from src.gameloop import GameScoped
 from src.functions import get_main_role, change_role, get_players
 from src.messages import messages
 from src.events import Event, event_listener
@@ -10,7 +11,7 @@ from src.users import User
 
 __all__ = ["add_exchange", "try_exchange"]
 
-EXCHANGE = UserSet()
+EXCHANGE = GameScoped(UserSet)
 
 def add_exchange(var: GameState, user: User):
     if user not in get_players(var):
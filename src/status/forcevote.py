@@ -3,13 +3,15 @@ from __future__ import annotations
 from typing import Iterable
 
 from src.containers import UserDict, UserSet
+from src.gameloop import GameScoped
 from src.functions import get_players
 from src.messages import messages
 from src.events import Event, event_listener
 from src.gamestate import GameState
 from src.users import User
 
-__all__ = ["add_force_vote", "add_force_abstain", "can_vote", "can_abstain", "get_forced_votes", "get_all_forced_votes", "get_forced_abstains"]
+__all__ = ["add_force_vote", "add_force_abstain", "can_vote", "can_abstain", "is_vote_forced",
+           "get_forced_votes", "get_all_forced_votes", "get_forced_abstains"]
 
 # FORCED_COUNTS is incremented whenever we're forcing someone to vote for someone else
 # A positive number indicates that their vote is being forced towards any number of targets
@@ -18,8 +20,8 @@ __all__ = ["add_force_vote", "add_force_abstain", "can_vote", "can_abstain", "ge
 # FORCED_TARGETS is used to see which targets are being force-voted for.
 # If multiple calls to force_vote() force different targets, the union of all of those targets is taken.
 
-FORCED_COUNTS: UserDict[User, int] = UserDict()
-FORCED_TARGETS: UserDict[User, UserSet] = UserDict()
+FORCED_COUNTS: UserDict[User, int] = GameScoped(UserDict)
+FORCED_TARGETS: UserDict[User, UserSet] = GameScoped(UserDict)
 
 def _add_count(var: GameState, votee: User, amount: int) -> None:
     FORCED_COUNTS[votee] = FORCED_COUNTS.get(votee, 0) + amount
@@ -34,12 +36,14 @@ def add_force_vote(var: GameState, votee: User, targets: Iterable[User]) -> None
         return
     _add_count(var, votee, 1)
     FORCED_TARGETS.setdefault(votee, UserSet()).update(targets)
+    Event("vote_status_change", {}).dispatch(var, votee)
 
 def add_force_abstain(var: GameState, votee: User) -> None:
     """Force votee to abstain."""
     if votee not in get_players(var):
         return
     _add_count(var, votee, -1)
+    Event("vote_status_change", {}).dispatch(var, votee)
 
 def can_vote(var: GameState, votee: User, target: User) -> bool:
     """Check whether the votee can vote the target."""
@@ -54,6 +58,10 @@ def can_abstain(var: GameState, votee: User) -> bool:
     """Check whether the votee can abstain."""
     return FORCED_COUNTS.get(votee, 0) <= 0
 
+def is_vote_forced(var: GameState, votee: User) -> bool:
+    """Check whether the votee's vote may count for someone other than who they voted."""
+    return votee in FORCED_COUNTS or votee in FORCED_TARGETS
+
 def get_forced_votes(var: GameState, target: User) -> set[User]:
     """Retrieve the players who are being forced to vote target."""
     return {votee for votee, targets in FORCED_TARGETS.items() if target in targets}
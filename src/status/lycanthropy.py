@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from collections import Counter
 
 from src.containers import UserDict
+from src.gameloop import GameScoped
 from src.functions import get_players, get_main_role, change_role
 from src.messages import messages
+from src.rolestats import RoleStats, role_index
 from src.events import Event, event_listener
 from src.cats import Wolf, Category
 from src.gamestate import GameState
@@ -12,7 +13,7 @@ from src.users import User
 
 __all__ = ["add_lycanthropy", "remove_lycanthropy", "add_lycanthropy_scope", "try_lycanthropy"]
 
-LYCANTHROPES: UserDict[User, str] = UserDict()
+LYCANTHROPES: UserDict[User, str] = GameScoped(UserDict)
 SCOPE = set()
 
 # To handle non-standard lycanthropy behavior, you will need to implement the get_role_metadata event
@@ -86,7 +87,7 @@ def try_lycanthropy(var: GameState, target: User) -> bool:
     return True
 
 @event_listener("reconfigure_stats")
-def on_reconfigure_stats(evt: Event, var: GameState, roleset: Counter, reason: str):
+def on_reconfigure_stats(evt: Event, var: GameState, stats: RoleStats, reason: str):
     from src.roles.helper.wolves import get_wolfchat_roles
     if reason != "howl" or not SCOPE:
         return
@@ -94,28 +95,36 @@ def on_reconfigure_stats(evt: Event, var: GameState, roleset: Counter, reason: s
     evt2 = Event("get_role_metadata", {})
     evt2.dispatch(var, "lycanthropy_role")
 
-    roles = {}
+    # role index -> indices of the roles it may turn into
+    turns: dict[int, list[int]] = {}
 
     wolfchat = get_wolfchat_roles()
-    for role, count in roleset.items():
-        if role in wolfchat or count == 0 or role not in SCOPE:
+    for role in SCOPE:
+        if role in wolfchat:
             continue
         if role in evt2.data and "role" in evt2.data[role]:
-            roles[role] = evt2.data[role]["role"]
+            new_roles = evt2.data[role]["role"]
         else:
-            roles[role] = "wolf"
-
-    if roles and roleset in evt.data["new"]:
-        evt.data["new"].remove(roleset)
-
-    for role, new_roles in roles.items():
+            new_roles = "wolf"
         if isinstance(new_roles, str):
             new_roles = [new_roles]
-        for new_role in new_roles:
-            rs = roleset.copy()
-            rs[role] -= 1
-            rs[new_role] = rs.get(new_role, 0) + 1
-            evt.data["new"].append(rs)
+        turns[role_index(role)] = [role_index(new_role) for new_role in new_roles]
+
+    def howl(roleset: list[int]):
+        turned = False
+        for role, new_roles in turns.items():
+            if roleset[role] == 0:
+                continue
+            turned = True
+            for new_role in new_roles:
+                rs = roleset.copy()
+                rs[role] -= 1
+                rs[new_role] += 1
+                yield rs
+        if not turned:
+            yield roleset
+
+    stats.transform(howl)
 
 @event_listener("del_player")
 def on_del_player(evt: Event, var: GameState, player: User, all_roles: set[str], death_triggers: bool):
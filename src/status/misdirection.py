@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from src.events import Event, event_listener
 from src.containers import UserSet
+from src.gameloop import GameScoped
 from src.gamestate import GameState
 from src.functions import get_players
 from src.messages import messages
@@ -11,8 +12,8 @@ from src.random import random
 
 __all__ = ["add_misdirection", "try_misdirection", "add_misdirection_scope", "in_misdirection_scope"]
 
-AS_ACTOR = UserSet()
-AS_TARGET = UserSet()
+AS_ACTOR = GameScoped(UserSet)
+AS_TARGET = GameScoped(UserSet)
 ACTOR_SCOPE = set()
 TARGET_SCOPE = set()
 
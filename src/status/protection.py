@@ -4,6 +4,7 @@ from typing import Optional
 from dataclasses import dataclass
 
 from src.containers import DefaultUserDict
+from src.gameloop import GameScoped
 from src.functions import get_players
 from src.messages import messages
 from src.events import Event, event_listener
@@ -20,7 +21,7 @@ class ProtectionEntry:
     protector_role: str
     priority: int
 
-PROTECTIONS: DefaultUserDict[User, DefaultUserDict[Optional[User], list[ProtectionEntry]]] = DefaultUserDict(lambda: DefaultUserDict(list))
+PROTECTIONS: DefaultUserDict[User, DefaultUserDict[Optional[User], list[ProtectionEntry]]] = GameScoped(lambda: DefaultUserDict(lambda: DefaultUserDict(list)))
 
 def add_protection(var: GameState,
                    target: User,
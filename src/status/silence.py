@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from src.containers import UserSet
+from src.gameloop import GameScoped
 from src.gamestate import GameState
 from src.events import Event, event_listener
 from src.messages import messages
@@ -8,8 +9,8 @@ from src.users import User
 
 __all__ = ["add_silent", "is_silent"]
 
-SILENT = UserSet()
-PENDING = UserSet()
+SILENT = GameScoped(UserSet)
+PENDING = GameScoped(UserSet)
 
 def add_silent(var: GameState, user: User):
     """Silence the target, preventing them from using actions for a day."""
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from src.containers import DefaultUserDict
+from src.gameloop import GameScoped
 from src.functions import get_players
 from src.messages import messages
 from src.events import Event, event_listener
@@ -9,7 +10,7 @@ from src.users import User
 
 __all__ = ["add_day_vote_immunity", "try_day_vote_immunity"]
 
-IMMUNITY: DefaultUserDict[User, set[str]] = DefaultUserDict(set)
+IMMUNITY: DefaultUserDict[User, set[str]] = GameScoped(lambda: DefaultUserDict(set))
 
 def add_day_vote_immunity(var: GameState, user: User, reason: str):
     """Make user immune to being killed by a vote for one day."""
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from src.events import Event, event_listener
 from src.containers import UserDict
+from src.gameloop import GameScoped
 from src.gamestate import GameState
 from src.functions import get_players
 from src.messages import messages
@@ -9,7 +10,7 @@ from src.users import User
 
 __all__ = ["add_vote_weight", "remove_vote_weight", "get_vote_weight"]
 
-WEIGHT: UserDict[User, int] = UserDict()
+WEIGHT: UserDict[User, int] = GameScoped(UserDict)
 
 def add_vote_weight(var: GameState, target: User, amount: int = 1) -> None:
     """Make the target's votes as having more weight."""
@@ -19,6 +20,7 @@ def add_vote_weight(var: GameState, target: User, amount: int = 1) -> None:
     WEIGHT[target] = WEIGHT.get(target, 1) + amount
     if WEIGHT[target] == 1:
         del WEIGHT[target]
+    Event("vote_status_change", {}).dispatch(var, target)
 
 def remove_vote_weight(var, target: User, amount: int = 1) -> None:
     """Make the target's votes as having less weight."""
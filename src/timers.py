@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+__all__ = ["Timer", "Clock", "ManualClock", "schedule", "cancel", "now", "set_clock", "advance", "next_due"]
+
+class Clock:
+    """Monotonic clock driving the timer service."""
+    def now(self) -> float:
+        return time.monotonic()
+
+class ManualClock(Clock):
+    """Clock which only moves when advanced, for deterministic tests.
+
+    While a manual clock is in use, timers do not fire on their own; call advance() to
+    move the clock forward and run every timer that became due, on the calling thread.
+    """
+    def __init__(self, start: float = 0.0):
+        self._now = start
+
+    def now(self) -> float:
+        return self._now
+
+    def advance(self, seconds: float):
+        self._now += seconds
+
+class Timer:
+    """Handle for a scheduled callback.
+
+    Timers are created through schedule(). The game_id and phase_id they were created with
+    let cancel() drop every timer belonging to a game or phase at once.
+    """
+    __slots__ = ("function", "args", "kwargs", "interval", "due", "game_id", "phase_id", "threaded", "_state")
+
+    def __init__(self, interval: float, function: Callable, args, kwargs, game_id, phase_id, threaded: bool):
+        self.function = function
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs)
+        self.interval = interval
+        self.due = _clock.now() + interval
+        self.game_id = game_id
+        self.phase_id = phase_id
+        self.threaded = threaded
+        self._state = "pending"
+
+    def __repr__(self):
+        return f"Timer({self.function.__qualname__}, due={self.due:.3f}, {self._state})"
+
+    def cancel(self):
+        """Stop the timer from firing, if it hasn't already."""
+        with _lock:
+            if self._state == "pending":
+                self._state = "cancelled"
+
+    @property
+    def done(self) -> bool:
+        """Whether the timer has fired or been cancelled."""
+        return self._state != "pending"
+
+    @property
+    def remaining(self) -> float:
+        """Number of seconds until the timer fires."""
+        return max(0.0, self.due - _clock.now())
+
+# timers are kept in a heap ordered by due time; cancelled timers stay in it until they reach the top
+_heap: list[tuple[float, int, Timer]] = []
+_seq = itertools.count()
+_lock = threading.Lock()
+_wakeup = threading.Condition(_lock)
+_clock: Clock = Clock()
+_worker: Optional[threading.Thread] = None
+
+def now() -> float:
+    """Return the current time of the clock timers are scheduled against."""
+    return _clock.now()
+
+def schedule(interval: float, function: Callable, args=(), kwargs: Optional[dict[str, Any]] = None, *,
+             game_id: Optional[float] = None, phase_id: Optional[float] = None, threaded: bool = False) -> Timer:
+    """Run function(*args, **kwargs) after interval seconds.
+
+    Callbacks run one at a time on the timer thread, so they should not block. Callbacks which may take
+    a while (such as ones that wait on the network) should pass threaded=True, which runs them
+    on a thread of their own once they are due.
+
+    :param interval: Number of seconds to wait before calling function
+    :param function: Callback to run
+    :param args: Positional arguments to pass to function
+    :param kwargs: Keyword arguments to pass to function
+    :param game_id: Game the timer belongs to, for cancel()
+    :param phase_id: Phase the timer belongs to, for cancel()
+    :param threaded: Whether to run function on its own thread
+    :return: Handle which can be used to cancel the timer
+    """
+    timer = Timer(interval, function, args, kwargs or {}, game_id, phase_id, threaded)
+    with _wakeup:
+        heapq.heappush(_heap, (timer.due, next(_seq), timer))
+        if not isinstance(_clock, ManualClock):
+            _start_worker()
+            _wakeup.notify()
+    return timer
+
+def cancel(*, game_id: Optional[float] = None, phase_id: Optional[float] = None):
+    """Cancel every pending timer for the given game and/or phase.
+
+    :param game_id: Cancel timers belonging to this game
+    :param phase_id: Cancel timers belonging to this phase
+    """
+    if game_id is None and phase_id is None:
+        raise ValueError("a game_id or phase_id is required")
+    with _lock:
+        for _, _, timer in _heap:
+            if (game_id is None or timer.game_id == game_id) and (phase_id is None or timer.phase_id == phase_id):
+                if timer._state == "pending":
+                    timer._state = "cancelled"
+
+def set_clock(clock: Clock):
+    """Change the clock timers are scheduled against.
+
+    Pending timers are discarded, as their due times are meaningless on the new clock.
+
+    :param clock: New clock; pass a ManualClock to drive timers by hand with advance()
+    """
+    global _clock
+    with _wakeup:
+        for _, _, timer in _heap:
+            timer._state = "cancelled"
+        _heap.clear()
+        _clock = clock
+        _wakeup.notify()
+
+def advance(seconds: float):
+    """Move a manual clock forward, running every timer that becomes due.
+
+    :param seconds: Number of seconds to advance the clock by
+    :raises TypeError: If the timer service isn't using a ManualClock
+    """
+    if not isinstance(_clock, ManualClock):
+        raise TypeError("advance() requires a ManualClock")
+    _clock.advance(seconds)
+    while (timer := _pop_due()) is not None:
+        _fire(timer)
+
+def next_due() -> Optional[float]:
+    """Return the number of seconds until the next pending timer is due.
+
+    Together with advance(), this lets a manual clock skip straight to the next thing that happens.
+
+    :return: Seconds until the earliest pending timer is due, or None if no timer is pending
+    """
+    with _lock:
+        # drop cancelled timers off the top of the heap so the earliest entry is a pending one
+        while _heap and _heap[0][2]._state != "pending":
+            heapq.heappop(_heap)
+        if not _heap:
+            return None
+        return max(0.0, _heap[0][0] - _clock.now())
+
+def _pop_due() -> Optional[Timer]:
+    with _lock:
+        while _heap and _heap[0][0] <= _clock.now():
+            timer = heapq.heappop(_heap)[2]
+            if timer._state == "pending":
+                timer._state = "fired"
+                return timer
+    return None
+
+def _fire(timer: Timer):
+    if timer.threaded:
+        threading.Thread(target=_run, args=(timer,), daemon=True).start()
+    else:
+        _run(timer)
+
+def _run(timer: Timer):
+    try:
+        timer.function(*timer.args, **timer.kwargs)
+    except Exception as e:
+        logging.getLogger("exception.{}".format(type(e).__name__)).exception("Timer callback {} failed", timer.function.__qualname__)
+
+def _start_worker():
+    # must be called with _lock held
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        _worker = threading.Thread(target=_worker_loop, name="timers", daemon=True)
+        _worker.start()
+
+def _worker_loop():
+    while True:
+        with _wakeup:
+            # manual clocks are advanced by hand, so there's nothing to wait for
+            while isinstance(_clock, ManualClock) or not _heap or _heap[0][0] > _clock.now():
+                timeout = None
+                if _heap and not isinstance(_clock, ManualClock):
+                    timeout = _heap[0][0] - _clock.now()
+                _wakeup.wait(timeout)
+        timer = _pop_due()
+        if timer is not None:
+            _fire(timer)
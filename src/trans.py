@@ -2,55 +2,61 @@ from __future__ import annotations
 
 from collections import Counter, defaultdict
 from datetime import datetime, timedelta
-from typing import Optional, Callable, Union
-import threading
+from typing import Optional, Callable
+import logging
 import time
 
 from src.transport.irc import get_ircd
 from src.decorators import command, handle_error
 from src.containers import UserSet, UserDict, UserList
-from src.functions import get_players, get_main_role, get_reveal_role
-from src.locations import Location, VillageSquare, get_players_in_location, move_player, move_player_home
+from src.gameloop import GameScoped
+from src.functions import get_players
+from src.locations import VillageSquare, move_player, move_player_home
 from src.warnings import expire_tempbans
 from src.messages import messages
-from src.status import is_silent, is_dying, try_protection, add_dying, kill_players, get_absent, try_lycanthropy
+from src.status import is_silent, is_dying, add_dying, kill_players, get_absent
 from src.users import User
 from src.events import Event, event_listener
 from src.votes import chk_decision
-from src.cats import Win_Stealer, Wolf_Objective, Vampire_Objective, Village_Objective, role_order, get_team, All, \
-    Category, Nobody, Hidden
-from src import channels, users, locks, config, db, reaper, relay
+from src.cats import Win_Stealer, role_order, get_team, All, Category, Nobody, Hidden
+from src import channels, users, locks, config, db, journal, latency, reaper, relay, timers
 from src.agent_manager import agent_manager
 from src.dispatcher import MessageDispatcher
 from src.gamestate import GameState, PregameState
-from src.random import random
+from src.nightkills import UserOrSpecialTag, resolve_kill, resolve_night_kills
 
-# some type aliases to make things clearer later
-UserOrLocation = Union[User, Location]
-UserOrSpecialTag = Union[User, str]
+_logger = logging.getLogger("game.trans")
 
-NIGHT_IDLE_EXEMPT = UserSet()
-TIMERS: dict[str, tuple[threading.Timer, float | int, int]] = {}
+# chk_win listeners which change roles have win conditions checked again; this bounds how often that can happen
+MAX_WIN_CHECK_PASSES = 10
 
-DAY_ID: float | int = 0
-DAY_TIMEDELTA: timedelta = timedelta(0)
-DAY_START_TIME: Optional[datetime] = None
+NIGHT_IDLE_EXEMPT = GameScoped(UserSet)
+# name -> (timer, time on the timers clock it counts from, length in seconds)
+TIMERS: dict[str, tuple[timers.Timer, float, int]] = GameScoped(dict)
 
-NIGHT_ID: float | int = 0
-NIGHT_TIMEDELTA: timedelta = timedelta(0)
-NIGHT_START_TIME: Optional[datetime] = None
+class PhaseState:
+    """When the current day and night of a game began, how long they have lasted so far, and what to run once it ends."""
+    __slots__ = ("day_id", "day_timedelta", "day_start_time", "night_id", "night_timedelta", "night_start_time", "endgame_command")
 
-ENDGAME_COMMAND: Optional[Callable] = None
-ADMIN_STOPPED = UserList() # this shouldn't hold more than one user at any point, but we need to keep track of it
+    def __init__(self):
+        self.day_id: float | int = 0
+        self.day_timedelta: timedelta = timedelta(0)
+        self.day_start_time: Optional[datetime] = None
+        self.night_id: float | int = 0
+        self.night_timedelta: timedelta = timedelta(0)
+        self.night_start_time: Optional[datetime] = None
+        self.endgame_command: Optional[Callable] = None
 
-ORIGINAL_ACCOUNTS: UserDict[User, str] = UserDict()
+PHASES: PhaseState = GameScoped(PhaseState)
+ADMIN_STOPPED = GameScoped(UserList) # this shouldn't hold more than one user at any point, but we need to keep track of it
+
+ORIGINAL_ACCOUNTS: UserDict[User, str] = GameScoped(UserDict)
 
 @handle_error
 def hurry_up(timer_type: str, var: GameState, phase_id: float, *, admin_forced: bool = False):
-    global DAY_ID
     if var.current_phase != "day" or var.in_phase_transition:
         return
-    if phase_id and phase_id != DAY_ID:
+    if phase_id and phase_id != PHASES.day_id:
         return
 
     if timer_type == "warn":
@@ -59,7 +65,7 @@ def hurry_up(timer_type: str, var: GameState, phase_id: float, *, admin_forced:
         channels.Main.send(messages[event.data["message"]])
         return
 
-    DAY_ID = 0
+    PHASES.day_id = 0
     chk_decision(var, timeout=True, admin_forced=admin_forced)
 
 @command("fnight", flag="N")
@@ -79,8 +85,7 @@ def fday(wrapper: MessageDispatcher, message: str):
         transition_day(wrapper.game_state)
 
 def begin_day(var: GameState):
-    global DAY_ID
-    DAY_ID = time.time()
+    PHASES.day_id = time.time()
     pl = get_players(var)
 
     if config.Main.get("timers.shortday.enabled") and len(pl) <= config.Main.get("timers.shortday.players"):
@@ -93,8 +98,8 @@ def begin_day(var: GameState):
         warn = 0
         limit = 0
 
-    var.end_phase_transition(limit, warn, hurry_up, (var, DAY_ID))
-    agent_manager.start_speaking()
+    var.end_phase_transition(limit, warn, hurry_up, (var, PHASES.day_id), phase_id=PHASES.day_id)
+    agent_manager.start_speaking(var)
     if not config.Main.get("gameplay.nightchat"):
         modes = []
         for player in pl:
@@ -146,7 +151,7 @@ def _night_warn(var: GameState):
 
 @handle_error
 def night_timeout(timer_type: str, var: GameState, phase_id: int):
-    if phase_id != NIGHT_ID or var.current_phase != "night" or var.in_phase_transition:
+    if phase_id != PHASES.night_id or var.current_phase != "night" or var.in_phase_transition:
         return
 
     if timer_type == "warn":
@@ -186,19 +191,19 @@ def on_night_idled(evt: Event, var: GameState, player):
         evt.prevent_default = True
 
 @handle_error
+@latency.timed("transition_day")
 def transition_day(var: GameState, game_id: int = 0):
-    global DAY_START_TIME, NIGHT_ID, NIGHT_TIMEDELTA, NIGHT_START_TIME
-    if game_id and game_id != NIGHT_ID:
+    if game_id and game_id != PHASES.night_id:
         return
 
-    NIGHT_ID = 0
+    PHASES.night_id = 0
 
     if var.current_phase == "day":
         return
 
     var.begin_phase_transition("day")
     # var.day_count gets increased by 1 in begin_phase_transition
-    DAY_START_TIME = datetime.now()
+    PHASES.day_start_time = datetime.now()
 
     event_begin = Event("transition_day_begin", {})
     event_begin.dispatch(var)
@@ -207,107 +212,21 @@ def transition_day(var: GameState, game_id: int = 0):
         begin_day(var)
         return
 
-    assert isinstance(DAY_START_TIME, datetime) and isinstance(NIGHT_START_TIME, datetime)
-    td = DAY_START_TIME - NIGHT_START_TIME
-    NIGHT_START_TIME = None
-    NIGHT_TIMEDELTA += td
+    day_start_time, night_start_time = PHASES.day_start_time, PHASES.night_start_time
+    assert isinstance(day_start_time, datetime) and isinstance(night_start_time, datetime)
+    td = day_start_time - night_start_time
+    PHASES.night_start_time = None
+    PHASES.night_timedelta += td
     minimum, sec = td.seconds // 60, td.seconds % 60
 
-    # Mark people who are dying as a direct result of night actions (i.e. not chained deaths)
-    # We set the variables here first; listeners should mutate, not replace
-    # We don't need to use User containers here, as these don't persist long enough
-    # Kill priorities are used to determine which kill takes precedence over another; default priority is 0,
-    # negative numbers make those kills take precedence, and positive numbers make those kills defer to others.
-    # In default logic, wolf-aligned VG is priority -5, wolf kills (including harlot visiting wolf) are priority +5,
-    # GA/bodyguard guarding a wolf is +10, suicides are +15, and everything else is 0.
-    # Ties in priority are resolved randomly
-    victims: set[UserOrLocation] = set()
-    killers: dict[UserOrLocation, list[UserOrSpecialTag]] = defaultdict(list)
-    kill_priorities: dict[UserOrSpecialTag, int] = defaultdict(int)
     message: dict[UserOrSpecialTag, list[str]] = defaultdict(list)
     message["*"].append(messages["sunrise"].format(minimum, sec, var.day_count))
-    dead: set[User] = set()
-    novictmsg = True
-    howl_count = 0
-
-    evt = Event("night_kills", {
-        "victims": victims,
-        "killers": killers,
-        "kill_priorities": kill_priorities
-        })
-    evt.dispatch(var)
-
-    # expand locations to encompass everyone at that location
-    for v in set(victims):
-        if isinstance(v, Location):
-            pl = get_players_in_location(var, v)
-            # Play the "target not home" message if the wolves attacked an empty location
-            # This also suppresses the "no victims" message if nobody ends up dying tonight
-            if not pl and "@wolves" in killers[v]:
-                message["*"].append(messages["target_not_home"])
-                novictmsg = False
-            for p in pl:
-                victims.add(p)
-                killers[p].extend(killers[v])
-            victims.remove(v)
-            del killers[v]
-
-    # sort the killers dict by kill priority, adding random jitter to break ties
-    get_kill_priority = lambda x: kill_priorities[x] + random.random()
-    killers = {u: sorted(kl, key=get_kill_priority) for u, kl in killers.items()}
-
-    # save a copy of roles so we can credit kills to the roles the players were at night,
-    # before any roleswaps due to night kills (e.g. lycanthropy)
-    rolemap = {role: set(players) for role, players in var.roles.items()}
-    mainroles = dict(var.main_roles)
-
-    for victim in victims:
-        if not is_dying(var, victim):
-            for killer in list(killers[victim]):
-                kdata = {
-                    "attacker": None,
-                    "role": None,
-                    "try_protection": True,
-                    "protection_reason": "night_death",
-                    "try_lycanthropy": False
-                }
-                if killer == "@wolves":
-                    kdata["role"] = "wolf"
-                    kdata["try_lycanthropy"] = True
-                elif isinstance(killer, str):
-                    kevt = Event("resolve_killer_tag", kdata)
-                    kevt.dispatch(var, victim, killer)
-                    assert kdata["role"] is not None
-                else:
-                    kdata["attacker"] = killer
-                    kdata["role"] = get_main_role(var, killer, mainroles=mainroles)
-                protected = None
-                if kdata["try_protection"]:
-                    protected = try_protection(var, victim, kdata["attacker"], kdata["role"], reason=kdata["protection_reason"])
-                if protected is not None:
-                    message[victim].extend(protected)
-                    killers[victim].remove(killer)
-                    # if there's no particular protection message (e.g. blessed), then we still want no victims message to play
-                    if protected:
-                        novictmsg = False
-                elif kdata["try_lycanthropy"] and try_lycanthropy(var, victim):
-                    howl_count += 1
-                    novictmsg = False
-                    killers[victim].remove(killer)
-
-            if not killers[victim]:
-                continue
-
-        dead.add(victim)
-
-    # Delay messaging until all protections and lycanthropy has been processed for every victim
-    for victim in dead:
-        mevt = Event("night_death_message", {
-            "key": "death" if var.role_reveal in ("on", "team") else "death_no_reveal",
-            "args": [victim, get_reveal_role(var, victim)]
-        }, rolemap=rolemap, mainroles=mainroles)
-        if mevt.dispatch(var, victim, killers[victim][0]):
-            message[victim].append(messages[mevt.data["key"]].format(*mevt.data["args"]))
+    night = resolve_night_kills(var, message)
+    victims, killers, dead = night.victims, night.killers, night.dead
+    rolemap, mainroles = night.rolemap, night.mainroles
+    if _logger.isEnabledFor(logging.DEBUG):
+        _logger.debug("Resolved night kills in {0}", ", ".join("{0} {1:.2f}ms".format(step, seconds * 1000)
+                                                               for step, seconds in night.timings.items()))
 
     # Offer a chance for game modes and roles to inspect the fully-resolved state and act upon it.
     # The victims, dead, and killers collections should not be mutated in this event, use earlier events
@@ -315,8 +234,8 @@ def transition_day(var: GameState, game_id: int = 0):
     # of chained deaths.
     evt = Event("transition_day_resolve", {
         "message": message,
-        "novictmsg": novictmsg,
-        "howl": howl_count,
+        "novictmsg": night.novictmsg,
+        "howl": night.howl_count,
         }, victims=victims, rolemap=rolemap, mainroles=mainroles)
     evt.dispatch(var, dead, {v: k[0] for v, k in killers.items() if v in dead})
 
@@ -336,41 +255,17 @@ def transition_day(var: GameState, game_id: int = 0):
 
     # chilling howl message was played, give roles the opportunity to update !stats
     # to account for this
-    revt = Event("reconfigure_stats", {"new": []})
     for i in range(evt.data["howl"]):
-        newstats = set()
-        for rs in var.get_role_stats():
-            d = Counter(dict(rs))
-            revt.data["new"] = [d]
-            revt.dispatch(var, d, "howl")
-            for new_set in revt.data["new"]: # type: Counter[str]
-                if min(new_set.values()) >= 0:
-                    newstats.add(frozenset(new_set.items()))
-        var.set_role_stats(newstats)
+        var.reconfigure_role_stats("howl")
 
     killer_role = {}
     for deadperson in dead:
         if is_dying(var, deadperson):
             continue
 
-        killer = killers[deadperson][0]
-        if killer == "@wolves":
-            killer = None
-            killer_role[deadperson] = "wolf"
-        elif isinstance(killer, str):
-            kevt = Event("resolve_killer_tag", {
-                "attacker": None,
-                "role": None,
-                "try_protection": True,
-                "protection_reason": "night_death",
-                "try_lycanthropy": False
-            })
-            kevt.dispatch(var, deadperson, killer)
-            assert kevt.data["role"] is not None
-            killer = kevt.data["attacker"]
-            killer_role[deadperson] = kevt.data["role"]
-        else:
-            killer_role[deadperson] = get_main_role(var, killer)
+        kill = resolve_kill(var, deadperson, killers[deadperson][0])
+        killer = kill.attacker
+        killer_role[deadperson] = kill.role
 
         add_dying(var, deadperson, killer_role[deadperson], "night_kill", killer=killer)
 
@@ -386,14 +281,14 @@ def transition_day(var: GameState, game_id: int = 0):
     event_end.data["begin_day"](var)
 
 @handle_error
+@latency.timed("transition_night")
 def transition_night(var: GameState):
     if var.current_phase == "night":
         return
-    global NIGHT_ID, NIGHT_START_TIME, DAY_START_TIME, DAY_TIMEDELTA
     var.begin_phase_transition("night")
     # var.night_count gets increased by 1 in begin_phase_transition
 
-    NIGHT_START_TIME = datetime.now()
+    PHASES.night_start_time = datetime.now()
 
     # move everyone back to their house
     pl = get_players(var)
@@ -416,12 +311,13 @@ def transition_night(var: GameState):
 
     dmsg = []
 
-    NIGHT_ID = time.time()
-    if NIGHT_TIMEDELTA or var.start_with_day:  # transition from day
-        assert isinstance(DAY_START_TIME, datetime) and isinstance(NIGHT_START_TIME, datetime)
-        td = NIGHT_START_TIME - DAY_START_TIME
-        DAY_START_TIME = None
-        DAY_TIMEDELTA += td
+    PHASES.night_id = time.time()
+    if PHASES.night_timedelta or var.start_with_day:  # transition from day
+        day_start_time, night_start_time = PHASES.day_start_time, PHASES.night_start_time
+        assert isinstance(day_start_time, datetime) and isinstance(night_start_time, datetime)
+        td = night_start_time - day_start_time
+        PHASES.day_start_time = None
+        PHASES.day_timedelta += td
         min, sec = td.seconds // 60, td.seconds % 60
         dmsg.append(messages["day_lasted"].format(min, sec))
 
@@ -445,7 +341,7 @@ def transition_night(var: GameState):
         warn = 0
         limit = 0
 
-    var.end_phase_transition(limit, warn, night_timeout, (var, NIGHT_ID))
+    var.end_phase_transition(limit, warn, night_timeout, (var, PHASES.night_id), phase_id=PHASES.night_id)
 
     event_night = Event("begin_night", {"messages": []})
     event_night.dispatch(var)
@@ -468,25 +364,26 @@ def chk_nightdone(var: GameState):
     if var.current_phase == "night" and actedcount >= len(nightroles):
         event.data["transition_day"](var)
 
+@latency.timed("stop_game")
 def stop_game(var: Optional[GameState | PregameState], winner: Category = Nobody, abort=False, additional_winners=None, log=True):
     agent_manager.stop_speaking()
-    global DAY_TIMEDELTA, NIGHT_TIMEDELTA, ENDGAME_COMMAND
     if abort:
         channels.Main.send(messages["role_attribution_failed"])
     elif var is None: # game already ended
         return
-    if DAY_START_TIME:
+    if PHASES.day_start_time:
         now = datetime.now()
-        td = now - DAY_START_TIME
-        DAY_TIMEDELTA += td
-    if NIGHT_START_TIME:
+        td = now - PHASES.day_start_time
+        PHASES.day_timedelta += td
+    if PHASES.night_start_time:
         now = datetime.now()
-        td = now - NIGHT_START_TIME
-        NIGHT_TIMEDELTA += td
+        td = now - PHASES.night_start_time
+        PHASES.night_timedelta += td
 
-    daymin, daysec = DAY_TIMEDELTA.seconds // 60, DAY_TIMEDELTA.seconds % 60
-    nitemin, nitesec = NIGHT_TIMEDELTA.seconds // 60, NIGHT_TIMEDELTA.seconds % 60
-    total: timedelta = DAY_TIMEDELTA + NIGHT_TIMEDELTA
+    day_timedelta, night_timedelta = PHASES.day_timedelta, PHASES.night_timedelta
+    daymin, daysec = day_timedelta.seconds // 60, day_timedelta.seconds % 60
+    nitemin, nitesec = night_timedelta.seconds // 60, night_timedelta.seconds % 60
+    total: timedelta = day_timedelta + night_timedelta
     tmin, tsec = total.seconds // 60, total.seconds % 60
     gameend_msg = messages["endgame_stats"].format(tmin, tsec, daymin, daysec, nitemin, nitesec)
 
@@ -627,13 +524,15 @@ def stop_game(var: Optional[GameState | PregameState], winner: Category = Nobody
                 if len(pl) > 0:
                     game_options["roles"][role] = len(pl)
 
-            db.add_game(var.current_mode.name,
-                        len(get_players(var)) + len(DEAD),
-                        time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(var.game_id)),
-                        time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),
-                        winner,
-                        player_list,
-                        game_options)
+            # games played entirely by fake users (such as replayed journals) would only skew the stats
+            if player_list:
+                db.add_game(var.current_mode.name,
+                            len(get_players(var)) + len(DEAD),
+                            time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(var.game_id)),
+                            time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),
+                            winner,
+                            player_list,
+                            game_options)
 
             # spit out the list of winners
             if winners:
@@ -648,20 +547,20 @@ def stop_game(var: Optional[GameState | PregameState], winner: Category = Nobody
 
     User.send_messages()
 
+    journal.finish(var, winner)
     reset(var)
     expire_tempbans()
 
     # This must be after reset()
-    if ENDGAME_COMMAND is not None:
-        ENDGAME_COMMAND()
-        ENDGAME_COMMAND = None
+    if PHASES.endgame_command is not None:
+        PHASES.endgame_command()
+        PHASES.endgame_command = None
     if ADMIN_STOPPED: # It was an flastgame
         channels.Main.send(messages["fstop_ping"].format(ADMIN_STOPPED))
         ADMIN_STOPPED.clear()
 
 def chk_win(var: GameState, *, end_game=True, winner=None, count_absent=True):
     """ Returns True if someone won """
-    global ENDGAME_COMMAND
     lpl = len(get_players(var))
 
     if var.current_phase == "join":
@@ -669,9 +568,9 @@ def chk_win(var: GameState, *, end_game=True, winner=None, count_absent=True):
             reset(var)
 
             # This must be after reset()
-            if ENDGAME_COMMAND is not None:
-                ENDGAME_COMMAND()
-                ENDGAME_COMMAND = None
+            if PHASES.endgame_command is not None:
+                PHASES.endgame_command()
+                PHASES.endgame_command = None
             if ADMIN_STOPPED:  # It was an flastgame
                 channels.Main.send(messages["fstop_ping"].format(ADMIN_STOPPED))
                 ADMIN_STOPPED.clear()
@@ -690,19 +589,8 @@ def chk_win_conditions(var: GameState,
                        winner=None,
                        count_absent=True):
     """Internal handler for the chk_win function."""
-    with locks.reaper:
-        if var.current_phase == "day" and count_absent:
-            pl = set(get_players(var)) - get_absent(var)
-            lpl = len(pl)
-        else:
-            pl = set(get_players(var, mainroles=mainroles))
-            lpl = len(pl)
-
-        wolves = set(get_players(var, Wolf_Objective, mainroles=mainroles))
-        vampires = set(get_players(var, Vampire_Objective, mainroles=mainroles))
-        num_wolves = len(wolves & pl)
-        num_vampires = len(vampires & pl)
-        num_real_wolves = len(get_players(var, Village_Objective, mainroles=mainroles))
+    for passes in range(1, MAX_WIN_CHECK_PASSES + 1):
+        lpl, num_wolves, num_real_wolves, num_vampires = var.get_team_counts(mainroles, count_absent=count_absent)
 
         message = ""
         if lpl < 1:
@@ -724,18 +612,27 @@ def chk_win_conditions(var: GameState,
         #     (monster's message changes based on who would have otherwise won)
         # 5 = gamemode-specific win conditions
         event = Event("chk_win", {"winner": winner, "message": message, "additional_winners": None})
-        if not event.dispatch(var, rolemap, mainroles, lpl, num_wolves, num_real_wolves, num_vampires):
-            return chk_win_conditions(var, rolemap, mainroles, end_game, winner)
-        winner = event.data["winner"]
-        message = event.data["message"]
+        if event.dispatch(var, rolemap, mainroles, lpl, num_wolves, num_real_wolves, num_vampires):
+            break
+        # a listener changed roles (such as traitors turning into wolves), so count again;
+        # these later passes have always counted absent players out
+        count_absent = True
+    else:
+        _logger.warning("Gave up checking win conditions after {0} passes", MAX_WIN_CHECK_PASSES)
+        return False
+    if passes > 1:
+        var.win_check_passes += passes - 1
+        _logger.debug("Checking win conditions took {0} passes", passes)
+    winner = event.data["winner"]
+    message = event.data["message"]
 
-        if winner is None:
-            return False
+    if winner is None:
+        return False
 
-        if end_game:
-            channels.Main.send(message)
-            stop_game(var, winner, additional_winners=event.data["additional_winners"])
-        return True
+    if end_game:
+        channels.Main.send(message)
+        stop_game(var, winner, additional_winners=event.data["additional_winners"])
+    return True
 
 @command("fstop", flag="S")
 def reset_game(wrapper: MessageDispatcher, message: str):
@@ -757,9 +654,10 @@ def reset(var: Optional[GameState | PregameState]):
     # Reset game timers
     if var is not None:
         with locks.join_timer: # make sure it isn't being used by the ping join handler
-            for timers in TIMERS.values():
-                timers[0].cancel()
+            for timer, _, _ in TIMERS.values():
+                timer.cancel()
             TIMERS.clear()
+            timers.cancel(game_id=var.game_id)
 
         # Reset modes
         cmodes = []
@@ -793,12 +691,12 @@ def on_transition_night_begin(evt: Event, var: GameState):
 
 @event_listener("reset")
 def on_reset(evt: Event, var: GameState):
-    global DAY_ID, DAY_TIMEDELTA, DAY_START_TIME, NIGHT_ID, NIGHT_TIMEDELTA, NIGHT_START_TIME
-    DAY_ID = 0
-    DAY_TIMEDELTA = timedelta(0)
-    DAY_START_TIME = None
-    NIGHT_ID = 0
-    NIGHT_TIMEDELTA = timedelta(0)
-    NIGHT_START_TIME = None
+    # endgame_command is kept, as it runs once the reset is done
+    PHASES.day_id = 0
+    PHASES.day_timedelta = timedelta(0)
+    PHASES.day_start_time = None
+    PHASES.night_id = 0
+    PHASES.night_timedelta = timedelta(0)
+    PHASES.night_start_time = None
     NIGHT_IDLE_EXEMPT.clear()
     ORIGINAL_ACCOUNTS.clear()
@@ -3,7 +3,7 @@ from __future__ import annotations
 import fnmatch
 import time
 import re
-from typing import Callable, Optional, Iterable, TYPE_CHECKING
+from typing import Callable, Generic, Optional, Iterable, Iterator, TypeVar, TYPE_CHECKING
 
 from src.context import IRCContext, Features, NotLoggedIn, lower
 from src import config, db
@@ -26,6 +26,38 @@ _users: CheckedSet[User] = CheckedSet("users._users")
 _ghosts: CheckedSet[User] = CheckedSet("users._ghosts")
 _pending_account_updates: CheckedDict[User, CheckedDict[str, Callable]] = CheckedDict("users._pending_account_updates")
 
+C = TypeVar("C")
+
+class ContainerRefs(Generic[C]):
+    """Set of the user containers holding a user, compared by identity.
+
+    Containers are not hashable, so they are keyed by id; each one stays referenced here
+    (and therefore keeps its id) until it removes itself.
+    """
+
+    __slots__ = ("_refs",)
+
+    def __init__(self):
+        self._refs: dict[int, C] = {}
+
+    def __contains__(self, container) -> bool:
+        return id(container) in self._refs
+
+    def __iter__(self) -> Iterator[C]:
+        return iter(self._refs.values())
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    def add(self, container: C) -> None:
+        self._refs[id(container)] = container
+
+    def discard(self, container: C) -> None:
+        self._refs.pop(id(container), None)
+
+    def remove(self, container: C) -> None:
+        del self._refs[id(container)]
+
 _arg_msg = "(user={0:for_tb_verbose}, allow_bot={1})"
 
 # This is used to tell if this is a fake nick or not. If this function
@@ -257,10 +289,10 @@ class User(IRCContext):
     timestamp: float
     account_timestamp: float
 
-    sets: list[UserSet]
-    lists: list[UserList]
-    dict_keys: list[UserDict]
-    dict_values: list[UserDict]
+    sets: ContainerRefs[UserSet]
+    lists: ContainerRefs[UserList]
+    dict_keys: ContainerRefs[UserDict]
+    dict_values: ContainerRefs[UserDict]
 
     def __init__(self, cli, nick, ident, host, account):
         """Make linters happy."""
@@ -277,10 +309,10 @@ class User(IRCContext):
         self._account = account
         self.channels = CheckedDict("users.User.channels")
         self.timestamp = time.time()
-        self.sets = []
-        self.lists = []
-        self.dict_keys = []
-        self.dict_values = []
+        self.sets = ContainerRefs()
+        self.lists = ContainerRefs()
+        self.dict_keys = ContainerRefs()
+        self.dict_values = ContainerRefs()
         self.account_timestamp = time.time()
 
         if Bot is not None and nick is not None and Bot.nick.rstrip("_") == nick.rstrip("_") and None in {Bot.ident, Bot.host}:
@@ -442,18 +474,18 @@ class User(IRCContext):
         if not self.channels or same_user:
             _users.discard(self) # Goodbye, my old friend
 
-        for lst in self.lists[:]:
+        for lst in list(self.lists):
             while self in lst:
                 lst[lst.index(self)] = new
 
-        for s in self.sets[:]:
+        for s in list(self.sets):
             s.remove(self)
             s.add(new)
 
-        for dk in self.dict_keys[:]:
+        for dk in list(self.dict_keys):
             dk[new] = dk.pop(self)
 
-        for dv in self.dict_values[:]:
+        for dv in list(self.dict_values):
             for key in dv:
                 if dv[key] is self:
                     dv[key] = new
@@ -700,11 +732,12 @@ class User(IRCContext):
 
     @property
     def game_state(self):
-        # There's only ever one game for now, but if/when the bot supports
-        # running multiple games simultaneously, we can use this to fetch
-        # which game the user is currently playing in (assuming that a
-        # user can only belong to one game at a time)
+        # the game the user is playing in (a user can only belong to one game at a time),
+        # falling back to the game in the current game channel
         from src import channels
+        for chan in channels.game_channels():
+            if chan.game_state is not None and self in chan.game_state.players:
+                return chan.game_state
         return channels.Main.game_state
 
 class FakeUser(User):
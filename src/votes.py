@@ -4,25 +4,105 @@ from collections import Counter
 from datetime import datetime, timedelta
 import math
 import re
+from typing import Optional
 
 from src.containers import UserDict, UserList, UserSet
+from src.gameloop import GameScoped
 from src.decorators import command
 from src.functions import get_players, get_target, get_reveal_role
 from src.messages import messages
 from src.status import (try_absent, get_absent, get_forced_votes, get_all_forced_votes, get_forced_abstains,
-                        get_vote_weight, try_day_vote_immunity, add_dying, kill_players)
+                        is_vote_forced, get_vote_weight, try_day_vote_immunity, add_dying, kill_players)
 from src.events import Event, event_listener
-from src import channels, pregame, reaper, locks, config
+from src import channels, pregame, reaper, locks, config, latency
 from src.users import User
 from src.dispatcher import MessageDispatcher
 from src.gamestate import GameState
 
-VOTES: UserDict[User, UserList] = UserDict()
-GAMEMODE_VOTES: UserDict[User, str] = UserDict()
-ABSTAINS: UserSet = UserSet()
-ABSTAINED = False
-LAST_VOTES = None
-VOTED: int = 0
+class VoteTally:
+    """Weighted number of votes on every player in VOTES, kept up to date as votes come and go.
+
+    A player's votes count as voted, plus anyone forced to vote for them, minus anyone forced to abstain,
+    with each voter counting as much as their vote weight. Ordinary votes only change the counts of the
+    players voted for and against; anything else which affects the counts (players dying or becoming absent,
+    forced votes and vote weights changing) invalidates the tally, which is then counted from scratch the
+    next time it is needed.
+    """
+    __slots__ = ("_counts", "_available", "_valid")
+
+    def __init__(self):
+        self._counts: UserDict[User, int] = UserDict()
+        self._available = 0
+        self._valid = False
+
+    def invalidate(self):
+        self._valid = False
+
+    def counts(self, var: GameState) -> UserDict[User, int]:
+        """Return the number of votes on every player in VOTES."""
+        self._validate(var)
+        return self._counts
+
+    def available(self, var: GameState) -> int:
+        """Return the number of players able to vote."""
+        self._validate(var)
+        return self._available
+
+    def moved(self, var: GameState, voter: User, old: Optional[User], new: Optional[User]):
+        """Update the tally after voter's vote moved in VOTES.
+
+        :param var: Game state
+        :param voter: Player whose vote changed
+        :param old: Player they were voting for, if any
+        :param new: Player they are now voting for, if any
+        """
+        if not self._valid:
+            return
+        if is_vote_forced(var, voter):
+            # their vote counts wherever they are forced to vote, no matter where they put it
+            self._valid = False
+            return
+        weight = get_vote_weight(var, voter)
+        if old is not None:
+            if old in VOTES:
+                self._counts[old] -= weight
+            else:
+                del self._counts[old]
+        if new is not None:
+            if new in self._counts:
+                self._counts[new] += weight
+            else:
+                self._counts[new] = self._count(var, new)
+
+    def _validate(self, var: GameState):
+        if self._valid:
+            return
+        self._counts.clear()
+        for votee in VOTES:
+            self._counts[votee] = self._count(var, votee)
+        self._available = len(set(get_players(var)) - get_absent(var))
+        self._valid = True
+
+    @staticmethod
+    def _count(var: GameState, votee: User) -> int:
+        votes = (set(VOTES[votee]) | get_forced_votes(var, votee)) - get_forced_abstains(var)
+        return sum(get_vote_weight(var, x) for x in votes)
+
+VOTES: UserDict[User, UserList] = GameScoped(UserDict)
+VOTE_TALLY: VoteTally = GameScoped(VoteTally)
+GAMEMODE_VOTES: UserDict[User, str] = GameScoped(UserDict)
+ABSTAINS: UserSet = GameScoped(UserSet)
+
+class VoteState:
+    """Whether the village has abstained yet, when !votes was last shown, and how many players were voted out today."""
+    __slots__ = ("abstained", "last_votes", "voted")
+
+    def __init__(self):
+        self.abstained = False
+        self.last_votes: Optional[datetime] = None
+        self.voted = 0
+
+VOTE_STATE: VoteState = GameScoped(VoteState)
 
 @command("vote", playing=True, pm=True, phases=("day",))
 def day_vote(wrapper: MessageDispatcher, message: str):
@@ -47,6 +127,7 @@ def day_vote(wrapper: MessageDispatcher, message: str):
 
     ABSTAINS.discard(wrapper.source)
 
+    previous = None
     for votee in list(VOTES):  # remove previous vote
         if votee is voted and wrapper.source in VOTES[votee]:
             break
@@ -54,16 +135,17 @@ def day_vote(wrapper: MessageDispatcher, message: str):
             VOTES[votee].remove(wrapper.source)
             if not VOTES.get(votee) and votee is not voted:
                 del VOTES[votee]
+            previous = votee
             break
 
     if voted not in VOTES:
         VOTES[voted] = UserList()
     if wrapper.source not in VOTES[voted]:
         VOTES[voted].append(wrapper.source)
+        VOTE_TALLY.moved(var, wrapper.source, previous, voted)
         channels.Main.send(messages["player_vote"].format(wrapper.source, voted))
 
-    global LAST_VOTES
-    LAST_VOTES = None # reset
+    VOTE_STATE.last_votes = None # reset
 
     chk_decision(var)
 
@@ -74,7 +156,7 @@ def abstain(wrapper: MessageDispatcher, message: str):
     if not var.abstain_enabled:
         wrapper.pm(messages["command_disabled"])
         return
-    elif var.limit_abstain and ABSTAINED:
+    elif var.limit_abstain and VOTE_STATE.abstained:
         wrapper.pm(messages["exhausted_abstain"])
         return
     elif var.limit_abstain and var.day_count == 1:
@@ -87,6 +169,7 @@ def abstain(wrapper: MessageDispatcher, message: str):
             VOTES[voter].remove(wrapper.source)
             if not VOTES[voter]:
                 del VOTES[voter]
+            VOTE_TALLY.moved(var, wrapper.source, voter, None)
     ABSTAINS.add(wrapper.source)
     channels.Main.send(messages["player_abstain"].format(wrapper.source))
 
@@ -99,12 +182,10 @@ def retract(wrapper: MessageDispatcher, message: str):
     if wrapper.source not in get_players(var) or wrapper.source in reaper.DISCONNECTED or var.current_phase != "day":
         return
 
-    global LAST_VOTES
-
     if wrapper.source in ABSTAINS:
         ABSTAINS.remove(wrapper.source)
         wrapper.send(messages["retracted_vote"].format(wrapper.source))
-        LAST_VOTES = None # reset
+        VOTE_STATE.last_votes = None # reset
         return
 
     for votee in list(VOTES):
@@ -112,8 +193,9 @@ def retract(wrapper: MessageDispatcher, message: str):
             VOTES[votee].remove(wrapper.source)
             if not VOTES[votee]:
                 del VOTES[votee]
+            VOTE_TALLY.moved(var, wrapper.source, votee, None)
             wrapper.send(messages["retracted_vote"].format(wrapper.source))
-            LAST_VOTES = None # reset
+            VOTE_STATE.last_votes = None # reset
             break
     else:
         wrapper.pm(messages["pending_vote"])
@@ -156,19 +238,19 @@ def show_votes(wrapper: MessageDispatcher, message: str):
         wrapper.send(msg)
         return
 
-    global LAST_VOTES
-    if config.Main.get("ratelimits.votes") and wrapper.public and LAST_VOTES is not None:
-        if LAST_VOTES + timedelta(seconds=config.Main.get("ratelimits.votes")) > datetime.now():
+    last_votes = VOTE_STATE.last_votes
+    if config.Main.get("ratelimits.votes") and wrapper.public and last_votes is not None:
+        if last_votes + timedelta(seconds=config.Main.get("ratelimits.votes")) > datetime.now():
             wrapper.pm(messages["command_ratelimited"])
             return
 
     if wrapper.public and wrapper.source in pl:
-        LAST_VOTES = datetime.now()
+        VOTE_STATE.last_votes = datetime.now()
 
     if not VOTES:
         msg = messages["no_votes"]
         if wrapper.source in pl:
-            LAST_VOTES = None # reset
+            VOTE_STATE.last_votes = None # reset
 
     else:
         votelist = []
@@ -178,7 +260,7 @@ def show_votes(wrapper: MessageDispatcher, message: str):
 
     wrapper.reply(msg, prefix_nick=True)
 
-    avail = len(pl) - len(get_absent(var))
+    avail = VOTE_TALLY.available(var)
     votesneeded = avail // 2 + 1
     abstaining = len(ABSTAINS)
     if abstaining == 1: # *i18n* hardcoded English
@@ -202,110 +284,109 @@ def vote(wrapper: MessageDispatcher, message: str):
 
 # Specify timeout=True to force a vote and end of day even if there is no majority
 # admin_forced=True will make it not count towards villages' abstain limit if nobody is voted
+@latency.timed("chk_decision", history=False)
 def chk_decision(var: GameState, *, timeout=False, admin_forced=False):
     from src.trans import chk_win
-    with locks.reaper:
-        players = set(get_players(var)) - get_absent(var)
-        avail = len(players)
-        needed = avail // 2 + 1
-
-        to_vote = []
-        plurality = []
-        max_count = 0
-
-        for votee, voters in VOTES.items():
-            votes = (set(voters) | get_forced_votes(var, votee)) - get_forced_abstains(var)
-            count = sum(get_vote_weight(var, x) for x in votes)
-            if count > max_count:
-                max_count = count
-                plurality = [votee]
-            elif count == max_count:
-                plurality.append(votee)
-
-        if max_count >= needed:
-            assert len(plurality) == 1
-            to_vote = plurality
-
-        behaviour_evt = Event("day_vote_behaviour", {"num_votes": 1, "kill_ties": False, "force": timeout}, votes=VOTES, players=avail)
-        behaviour_evt.dispatch(var)
-
-        num_votes = behaviour_evt.data["num_votes"]
-        kill_ties = behaviour_evt.data["kill_ties"]
-        force = behaviour_evt.data["force"]
-
-        abstaining = False
-        if not to_vote:
-            if len((ABSTAINS | get_forced_abstains(var)) - get_all_forced_votes(var)) >= avail / 2:
-                abstaining = True
-            elif force:
-                if len(plurality) == 1:
-                    to_vote = plurality
-                elif plurality and kill_ties:
-                    if set(plurality) == set(get_players(var)): # killing everyone off? have you considered not doing that
-                        abstaining = True
-                    else:
-                        to_vote.extend(plurality)
-                elif not timeout:
-                    # fnight counts as a timeout, so we want sunset instead of village_abstain
+    counts = VOTE_TALLY.counts(var)
+    avail = VOTE_TALLY.available(var)
+    needed = avail // 2 + 1
+
+    to_vote = []
+    plurality = []
+    max_count = 0
+
+    for votee in VOTES:
+        count = counts[votee]
+        if count > max_count:
+            max_count = count
+            plurality = [votee]
+        elif count == max_count:
+            plurality.append(votee)
+
+    if max_count >= needed:
+        assert len(plurality) == 1
+        to_vote = plurality
+
+    behaviour_evt = Event("day_vote_behaviour", {"num_votes": 1, "kill_ties": False, "force": timeout}, votes=VOTES, players=avail)
+    behaviour_evt.dispatch(var)
+
+    num_votes = behaviour_evt.data["num_votes"]
+    kill_ties = behaviour_evt.data["kill_ties"]
+    force = behaviour_evt.data["force"]
+
+    abstaining = False
+    if not to_vote:
+        if len((ABSTAINS | get_forced_abstains(var)) - get_all_forced_votes(var)) >= avail / 2:
+            abstaining = True
+        elif force:
+            if len(plurality) == 1:
+                to_vote = plurality
+            elif plurality and kill_ties:
+                if set(plurality) == set(get_players(var)): # killing everyone off? have you considered not doing that
                     abstaining = True
+                else:
+                    to_vote.extend(plurality)
+            elif not timeout:
+                # fnight counts as a timeout, so we want sunset instead of village_abstain
+                abstaining = True
 
-        if abstaining:
-            for forced_abstainer in get_forced_abstains(var):
-                if forced_abstainer not in ABSTAINS: # did not explicitly abstain
-                    channels.Main.send(messages["player_meek_abstain"].format(forced_abstainer))
+    if abstaining:
+        for forced_abstainer in get_forced_abstains(var):
+            if forced_abstainer not in ABSTAINS: # did not explicitly abstain
+                channels.Main.send(messages["player_meek_abstain"].format(forced_abstainer))
 
-            abstain_evt = Event("abstain", {})
-            abstain_evt.dispatch(var, (ABSTAINS | get_forced_abstains(var)) - get_all_forced_votes(var))
+        abstain_evt = Event("abstain", {})
+        abstain_evt.dispatch(var, (ABSTAINS | get_forced_abstains(var)) - get_all_forced_votes(var))
 
-            if not admin_forced:
-                # if this is an admin-forced abstain that isn't also a timeout (currently doesn't exist in the bot),
-                # then don't count the abstention against the village
-                global ABSTAINED
-                ABSTAINED = True
-            channels.Main.send(messages["village_abstain"])
+        if not admin_forced:
+            # if this is an admin-forced abstain that isn't also a timeout (currently doesn't exist in the bot),
+            # then don't count the abstention against the village
+            VOTE_STATE.abstained = True
+        channels.Main.send(messages["village_abstain"])
 
-            from src.trans import transition_night
-            transition_night(var)
-            return
+        from src.trans import transition_night
+        transition_night(var)
+        return
 
-        if to_vote:
-            global VOTED
-            VOTED += len(to_vote) # track how many people we've killed today
+    if to_vote:
+        VOTE_STATE.voted += len(to_vote) # track how many people we've killed today
 
-            if timeout:
-                channels.Main.send(messages["sunset_vote"])
+        if timeout:
+            channels.Main.send(messages["sunset_vote"])
 
-            for votee in to_vote:
-                voters = list(VOTES[votee])
-                for forced_voter in get_forced_votes(var, votee):
-                    if forced_voter not in voters: # did not explicitly vote
-                        channels.Main.send(messages["impatient_vote"].format(forced_voter, votee))
-                        voters.append(forced_voter) # they need to be counted as voting for them still
+        for votee in to_vote:
+            voters = list(VOTES[votee])
+            for forced_voter in get_forced_votes(var, votee):
+                if forced_voter not in voters: # did not explicitly vote
+                    channels.Main.send(messages["impatient_vote"].format(forced_voter, votee))
+                    voters.append(forced_voter) # they need to be counted as voting for them still
 
-                if not try_day_vote_immunity(var, votee):
-                    vote_evt = Event("day_vote", {}, players=avail)
-                    if vote_evt.dispatch(var, votee, voters):
-                        to_send = "day_vote_no_reveal"
-                        if var.role_reveal in ("on", "team"):
-                            to_send = "day_vote_reveal"
-                        lmsg = messages[to_send].format(votee, get_reveal_role(var, votee))
-                        channels.Main.send(lmsg)
-                        add_dying(var, votee, "villager", "day_vote")
+            if not try_day_vote_immunity(var, votee):
+                vote_evt = Event("day_vote", {}, players=avail)
+                if vote_evt.dispatch(var, votee, voters):
+                    to_send = "day_vote_no_reveal"
+                    if var.role_reveal in ("on", "team"):
+                        to_send = "day_vote_reveal"
+                    lmsg = messages[to_send].format(votee, get_reveal_role(var, votee))
+                    channels.Main.send(lmsg)
+                    add_dying(var, votee, "villager", "day_vote")
 
-            kill_players(var, end_game=False)
+        kill_players(var, end_game=False)
 
-        elif timeout:
-            channels.Main.send(messages["sunset"])
+    elif timeout:
+        channels.Main.send(messages["sunset"])
 
-        if timeout or VOTED >= num_votes:
-            if chk_win(var, count_absent=False):
-                return
+    if timeout or VOTE_STATE.voted >= num_votes:
+        if chk_win(var, count_absent=False):
+            return
 
-            from src.trans import transition_night
-            transition_night(var)
+        from src.trans import transition_night
+        transition_night(var)
 
 @event_listener("del_player")
 def on_del_player(evt: Event, var: GameState, player: User, allroles: set[str], death_triggers: bool):
+    # their death also drops any forced votes and vote weight involving them, so count afresh
+    VOTE_TALLY.invalidate()
     if var.current_phase == "day":
         if player in VOTES:
             del VOTES[player] # Delete other people's votes on the player
@@ -321,20 +402,24 @@ def on_del_player(evt: Event, var: GameState, player: User, allroles: set[str],
     elif var.current_phase == "join":
         del GAMEMODE_VOTES[:player:]
 
+@event_listener("vote_status_change")
+def on_vote_status_change(evt: Event, var: GameState, player: User):
+    VOTE_TALLY.invalidate()
+
 @event_listener("transition_day_begin")
 def on_transition_day_begin(evt: Event, var: GameState):
-    global LAST_VOTES, VOTED
-    LAST_VOTES = None
-    VOTED = 0
+    VOTE_STATE.last_votes = None
+    VOTE_STATE.voted = 0
     ABSTAINS.clear()
     VOTES.clear()
+    VOTE_TALLY.invalidate()
 
 @event_listener("reset")
 def on_reset(evt: Event, var: GameState):
-    global ABSTAINED, LAST_VOTES, VOTED
-    ABSTAINED = False
-    LAST_VOTES = None
-    VOTED = 0
+    VOTE_STATE.abstained = False
+    VOTE_STATE.last_votes = None
+    VOTE_STATE.voted = 0
     ABSTAINS.clear()
     VOTES.clear()
+    VOTE_TALLY.invalidate()
     GAMEMODE_VOTES.clear()
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta
 from typing import Optional
+import functools
 import logging
 import re
 
@@ -23,14 +24,24 @@ def decrement_stasis(user=None):
         db.decrement_stasis()
     # Also expire any expired stasis and tempbans and update our tracking vars
     db.expire_stasis()
-    db.init_vars()
+    db.refresh_sanctions()
 
 def expire_tempbans():
-    acclist = db.expire_tempbans()
+    # this is called at the end of every game, so lift the bans once the db catches up rather than waiting on it
+    db.expire_tempbans().add_done_callback(functools.partial(_lift_tempbans, channels.Main))
+
+def _lift_tempbans(channel, fut):
+    # this runs on the db writer thread, so the modes are set from the channel's game loop instead
+    if fut.exception() is not None:
+        return # already logged by the db writer
     cmodes = []
-    for acc in acclist:
+    for acc in fut.result():
         cmodes.append(("-b", "{0}{1}".format(get_ircd().account_prefix, acc)))
-    channels.Main.mode(*cmodes)
+    if cmodes:
+        if channel.loop is not None:
+            channel.loop.post(channel.mode, *cmodes)
+        else:
+            channel.mode(*cmodes)
 
 def _get_auto_sanctions(sanctions, prev, cur):
     for sanc in config.Main.get("warnings.sanctions"):
@@ -112,7 +123,7 @@ def add_warning(target: str | users.User, amount: int, actor: users.User, reason
     if amount > 0:
         _get_auto_sanctions(sanctions, prev, cur)
 
-    sid = db.add_warning(tacc, sacc, amount, reason, notes, expires)
+    sid = db.add_warning(tacc, sacc, amount, reason, notes, expires).result()
     if "stasis" in sanctions:
         db.add_warning_sanction(sid, "stasis", sanctions["stasis"])
     if "deny" in sanctions:
@@ -120,7 +131,7 @@ def add_warning(target: str | users.User, amount: int, actor: users.User, reason
             db.add_warning_sanction(sid, "deny command", cmd)
     if "tempban" in sanctions:
         # this inserts into the bantrack table too
-        acclist = db.add_warning_sanction(sid, "tempban", sanctions["tempban"])
+        acclist = db.add_warning_sanction(sid, "tempban", sanctions["tempban"]).result()
         cmodes = []
         for acc in acclist:
             cmodes.append(("+b", "{0}{1}".format(get_ircd().account_prefix, acc)))
@@ -130,7 +141,7 @@ def add_warning(target: str | users.User, amount: int, actor: users.User, reason
                 channels.Main.kick(user, messages["tempban_kick"].format(nick=user, botnick=users.Bot.nick, reason=reason))
 
     # Update any tracking vars that may have changed due to this
-    db.init_vars()
+    db.refresh_account(tacc)
 
     return sid
 
@@ -182,7 +193,7 @@ def fstasis(wrapper: MessageDispatcher, message: str):
                 return
 
             db.set_stasis(amt, acc)
-            db.init_vars()
+            db.refresh_account(acc)
             if amt > 0:
                 wrapper.reply(messages["fstasis_account_add"].format(data[0], acc, amt))
             else:
@@ -308,7 +319,7 @@ def warn_ack(wrapper: MessageDispatcher, args):
     # only add stasis if this is the first time this warning is being acknowledged
     if not warning["ack"] and warning["sanctions"].get("stasis", 0) > 0:
         db.set_stasis(warning["sanctions"]["stasis"], acc, relative=True)
-        db.init_vars()
+        db.refresh_account(acc)
 
     db.acknowledge_warning(args.id)
     wrapper.reply(messages["fwarn_done"])
@@ -414,7 +425,7 @@ def fwarn_del(wrapper: MessageDispatcher, args):
 
     warning["deleted_by"] = wrapper.source
     db.del_warning(args.id, wrapper.source.account)
-    db.init_vars()
+    db.refresh_account(warning["target"])
     wrapper.reply(messages["fwarn_done"])
 
     logger = logging.getLogger("commands.fwarn.del")
@@ -34,11 +34,10 @@ import urllib.request
 import urllib.error
 
 from collections import Counter, defaultdict
-from datetime import datetime
 from typing import Optional
 
 import src
-from src import db, config, locks, dispatcher, channels, users, hooks, handler, trans, reaper, context, relay, votes
+from src import db, config, locks, dispatcher, channels, users, hooks, handler, trans, reaper, context, relay, votes, journal, latency
 from src.channels import Channel
 from src.users import User
 from src.random import random
@@ -48,7 +47,9 @@ from src.transport.irc import get_ircd
 from src.decorators import command, hook, COMMANDS
 from src.dispatcher import MessageDispatcher
 from src.gamestate import GameState, PregameState
+from src.gameloop import on_game_loop
 from src.gamemodes import GameMode
+from src.roles import load_builtin_roles
 from src.messages import messages, LocalMode
 from src.warnings import expire_tempbans
 from src.context import IRCContext
@@ -196,10 +197,23 @@ def sync_modes():
 
 @command("refreshdb", flag="m", pm=True)
 def refreshdb(wrapper: MessageDispatcher, message: str):
-    """Updates our tracking vars to the current db state."""
+    """Updates our tracking vars to the current db state.
+
+    Pass an account to only refresh that account, or "stats" to also verify the stats tables.
+    """
+    arg = message.strip()
+    if arg and arg.lower() != "stats":
+        db.refresh_account(arg)
+        wrapper.reply("Done.")
+        return
     db.expire_stasis()
     db.init_vars()
     expire_tempbans()
+    if arg.lower() == "stats":
+        stale = db.check_stats()
+        if stale:
+            db.rebuild_stats()
+            wrapper.reply("Rebuilt out of sync stats tables: {0}".format(", ".join(stale)))
     wrapper.reply("Done.")
 
 @command("fdie", flag="F", pm=True)
@@ -244,6 +258,9 @@ def _restart_program(mode=None):
     args = []
     if (mode != "normal" and config.Main.get("debug.enabled")) or mode == "debug":
         args.append("--debug")
+    # exec doesn't run atexit handlers, so make sure pending writes land and close out the db ourselves
+    db.flush()
+    db.close()
     os.execl(python, python, sys.argv[0], *args)
 
 @command("frestart", flag="D", pm=True)
@@ -401,13 +418,13 @@ def replace(wrapper: MessageDispatcher, message: str):
 
 @event_listener("chan_kick")
 def kicked_modes(evt, chan: Channel, actor, target, reason):
-    if target is users.Bot and chan is channels.Main:
+    if target is users.Bot and chan.loop is not None:
         chan.join()
     channels.Main.old_modes.pop(target, None)
 
 @event_listener("chan_part")
 def parted_modes(evt, chan: Channel, user, reason):
-    if user is users.Bot and chan is channels.Main:
+    if user is users.Bot and chan.loop is not None:
         chan.join()
     channels.Main.old_modes.pop(user, None)
 
@@ -434,16 +451,11 @@ def on_del_player(evt: Event, var: GameState, player: User, all_roles: set[str],
         possible = {evt.params.main_role}
     else:
         possible = set(event.data["possible"])
-    newstats = set()
     # For every possible role this person is, try to deduct 1 from that role's count in our stat sets
     # if a stat set doesn't contain the role, then that would lead to an impossible condition and therefore
-    # that set is not added to newstats to indicate that set is no longer possible
-    for p in possible:
-        for rs in var.get_role_stats():
-            d = Counter(dict(rs))
-            if p in d and d[p] >= 1:
-                d[p] -= 1
-                newstats.add(frozenset(d.items()))
+    # that set is dropped to indicate that set is no longer possible
+    newstats = var.get_role_stats()
+    newstats.remove_player(possible)
     var.set_role_stats(newstats)
 
 # FIXME: get rid of the priority once we move state transitions into the main event loop instead of having it here
@@ -501,16 +513,20 @@ def on_kill_players(evt: Event, var: GameState, players: set[User]):
 def on_join(evt, chan, user: User):
     if user is users.Bot:
         logging.getLogger("transport.{}".format(config.Main.get("transports[0].name"))).info("Joined {0}".format(chan))
-    if chan is not channels.Main:
-        return
-    user.update_account_data("<chan_join>", lambda new_user: reaper.return_to_village(channels.Main.game_state, new_user, show_message=True))
+    if chan.loop is None:
+        return # not a game channel
+    user.update_account_data("<chan_join>", lambda new_user: reaper.return_to_village(chan.game_state, new_user, show_message=True))
 
 @event_listener("account_change")
-def account_change(evt, user: User, old_account): # FIXME: This uses var
-    if user not in channels.Main.users or not channels.Main.game_state:
-        return # We only care about game-related changes in this function
+def account_change(evt, user: User, old_account):
+    for chan in channels.game_channels():
+        if user in chan.users and chan.game_state:
+            _account_change(chan.game_state, user)
 
-    var = channels.Main.game_state
+@on_game_loop
+def _account_change(var: GameState | PregameState, user: User):
+    if var is not channels.Main.game_state:
+        return # game ended in the meantime
 
     pl = get_participants(var)
     if user in pl and user.account not in trans.ORIGINAL_ACCOUNTS.values() and user not in reaper.DISCONNECTED:
@@ -530,15 +546,20 @@ def channel_kicked(evt, chan: Channel, actor, user, reason):
     leave(chan.game_state, "kick", user, chan)
 
 @event_listener("server_quit")
-def quit_server(evt, user, reason): # FIXME: This uses var
-    leave(channels.Main.game_state, "quit", user, reason)
+def quit_server(evt, user, reason):
+    for chan in channels.game_channels():
+        leave(chan.game_state, "quit", user, reason)
 
+@on_game_loop
 def leave(var: Optional[GameState | PregameState], what: str, user: User, why=None):
     if what in ("part", "kick") and why is not channels.Main:
         return
     if var is None:
         return
 
+    if var.loop.journal is not None and user in get_participants(var):
+        journal.record(var, journal.Kind.LEAVE, what, user.nick)
+
     ps = get_players(var)
     num_remaining = len(ps) - 1
     # Only mark living players as disconnected, unless they were kicked
@@ -610,7 +631,7 @@ def leave(var: Optional[GameState | PregameState], what: str, user: User, why=No
         add_dying(var, user, "bot", what, death_triggers=False)
         kill_players(var)
     else:
-        reaper.DISCONNECTED[user] = (datetime.now(), what)
+        reaper.add_disconnected(var, user, what)
 
     if not var.in_game and num_remaining <= 0:
         # chk_win handles ending game at 0 players if a game is running, don't need to do so here
@@ -688,7 +709,7 @@ def ftemplate(wrapper: MessageDispatcher, message: str):
                 wrapper.reply(messages["template_deleted"].format(name))
 
         # re-init db.FLAGS since it may have changed
-        db.init_vars()
+        db.refresh_access()
 
 @command("fflags", flag="F", pm=True)
 def fflags(wrapper: MessageDispatcher, message: str):
@@ -795,8 +816,8 @@ def fflags(wrapper: MessageDispatcher, message: str):
             db.set_access(acc, flags=None)
             wrapper.reply(messages["access_deleted_account"].format(acc))
 
-        # re-init db.FLAGS since it may have changed
-        db.init_vars()
+    # re-init db.FLAGS since it may have changed
+    db.refresh_account(acc)
 
 @command("rules", pm=True)
 def show_rules(wrapper: MessageDispatcher, message: str):
@@ -811,6 +832,8 @@ def show_rules(wrapper: MessageDispatcher, message: str):
 @command("help", pm=True)
 def get_help(wrapper: MessageDispatcher, message: str):
     """Gets help."""
+    # list role commands even if no game has needed the roles yet
+    load_builtin_roles()
     commands = set()
     for name, functions in COMMANDS.items():
         if not name:
@@ -1149,7 +1172,7 @@ def aftergame(wrapper: MessageDispatcher, message: str):
         return
 
     channels.Main.send(messages["command_scheduled"].format(" ".join([cmd] + args), wrapper.source))
-    trans.ENDGAME_COMMAND = do_action
+    trans.PHASES.endgame_command = do_action
 
 def _command_disabled(wrapper: MessageDispatcher, message: str):
     wrapper.send(messages["command_disabled_admin"])
@@ -1161,11 +1184,31 @@ def flastgame(wrapper: MessageDispatcher, message: str):
         cmdcls.func = _command_disabled
 
     channels.Main.send(messages["disable_new_games"].format(wrapper.source))
-    trans.ADMIN_STOPPED.append(wrapper.source)
+    # this may come in by PM without a game, but the next game to end in the channel is the one to ping about
+    if channels.Main.loop is not None:
+        channels.Main.loop.run(trans.ADMIN_STOPPED.append, wrapper.source)
+    else:
+        trans.ADMIN_STOPPED.append(wrapper.source)
 
     if message.strip():
         aftergame.func(wrapper, message)
 
+@command("ftimings", flag="D", pm=True)
+def ftimings(wrapper: MessageDispatcher, message: str):
+    """Show how long the most recent phase transitions took, and what the time was spent on."""
+    msg = message.split()
+    limit = int(msg[0]) if msg and msg[0].isdigit() else 5
+    history = latency.get_history(limit)
+    if not history:
+        wrapper.pm(messages["ftimings_none"])
+        return
+
+    for recording in history:
+        categories = [messages["ftimings_part"].format(category, seconds * 1000) for category, seconds in recording.categories.items()]
+        operations = [messages["ftimings_part"].format(operation, seconds * 1000) for operation, seconds in recording.operations.items()]
+        wrapper.pm(messages["ftimings_entry"].format(recording.where, recording.operation, recording.phase,
+                                                     recording.total * 1000, categories, operations))
+
 @command("whoami", pm=True)
 def whoami(wrapper: MessageDispatcher, message: str):
     if wrapper.source.account:
@@ -0,0 +1,35 @@
+from unittest import TestCase
+from src import cats
+from src.cats import All, Nobody, Wolf, Wolfchat, Village, Team_Switcher, Win_Stealer
+
+class TestCategoryMasks(TestCase):
+    """Check that bitmask-backed category algebra agrees with plain set algebra."""
+    def test_combinations(self):
+        categories = list(cats.all_cats().values())
+        for a in categories:
+            self.assertEqual(set(~a), set(All) - set(a))
+            for b in categories:
+                self.assertEqual(set(a | b), set(a) | set(b))
+                self.assertEqual(set(a + b), set(a) | set(b))
+                self.assertEqual(set(a & b), set(a) & set(b))
+                self.assertEqual(set(a ^ b), set(a) ^ set(b))
+                self.assertEqual(set(a - b), set(a) - set(b))
+                self.assertEqual(a == b, set(a) == set(b))
+
+    def test_mixed_operands(self):
+        combined = All - Team_Switcher - Win_Stealer + {"traitor"}
+        self.assertIn("traitor", combined)
+        self.assertEqual(set(combined), (set(All) - set(Team_Switcher) - set(Win_Stealer)) | {"traitor"})
+        self.assertEqual(set({"wolf", "villager"} - Wolf), {"villager"})
+        self.assertEqual(set(Wolfchat & All.roles), set(Wolfchat))
+        # equal categories hash alike, and like the equivalent frozenset
+        self.assertEqual(hash(Wolf | Nobody), hash(Wolf))
+        self.assertEqual(hash(Wolf | Nobody), hash(frozenset(Wolf)))
+        with self.assertRaises(ValueError):
+            Village | {"not a role"}
+
+    def test_role_order(self):
+        order = list(cats.role_order())
+        self.assertEqual(sorted(order), sorted(All))
+        self.assertEqual(order[0], "wolf")
+        self.assertEqual(list(cats.role_order()), order)
@@ -0,0 +1,98 @@
+import os
+import sqlite3
+from unittest import TestCase
+from src import config, db
+
+class TestAccountCache(TestCase):
+    """Check that account lookups and preferences are cached and refreshed per account."""
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        with open(os.path.join(os.path.dirname(db.__file__), "db.sql"), "rt") as f:
+            self.conn.executescript(f.read())
+        self._orig_conn = db._ts.conn
+        db._ts.conn = self.conn
+        self._write_behind = config.Main.get("database.write_behind")
+        config.Main.set("database.write_behind", False)
+        db.init_vars()
+        self.statements = []
+        self.conn.set_trace_callback(self.statements.append)
+
+    def tearDown(self):
+        self.conn.set_trace_callback(None)
+        config.Main.set("database.write_behind", self._write_behind)
+        db._ts.conn = self._orig_conn
+        db.init_vars()
+        self.conn.close()
+
+    def player_lookups(self):
+        return [sql for sql in self.statements if "FROM player pl" in sql and "pl.account_lower_" in sql]
+
+    def test_ids_are_memoized(self):
+        ids = db._get_ids("alice", add=True)
+        self.assertIsNotNone(ids[0])
+        self.statements.clear()
+        self.assertEqual(db._get_ids("alice"), ids)
+        self.assertEqual(self.player_lookups(), [])
+
+    def test_case_change_normalizes(self):
+        ids = db._get_ids("alice", add=True)
+        db.set_stasis(2, "alice")
+        db.refresh_account("alice")
+        self.assertEqual(db._get_ids("Alice"), ids)
+        self.assertEqual(db._get_display_name(ids[0]), "Alice")
+        # the old spelling is looked up again so that it normalizes back
+        self.statements.clear()
+        self.assertEqual(db._get_ids("alice"), ids)
+        self.assertNotEqual(self.player_lookups(), [])
+        self.assertEqual(db._get_display_name(ids[0]), "alice")
+        self.assertEqual(db.STASISED["alice"], 2)
+
+    def test_refresh_account(self):
+        db.set_pingif(5, "alice")
+        db.set_stasis(3, "bob")
+        db.toggle_notice("bob")
+        db.init_vars()
+        self.assertEqual(db.PING_IF_PREFS["alice"], 5)
+        self.assertEqual(db.STASISED["bob"], 3)
+
+        db.set_pingif(7, "alice")
+        db.set_stasis(0, "bob")
+        self.statements.clear()
+        db.refresh_account("alice")
+        self.assertEqual(db.PING_IF_PREFS["alice"], 7)
+        self.assertNotIn("alice", db.PING_IF_NUMS[5])
+        self.assertIn("alice", db.PING_IF_NUMS[7])
+        # bob is left alone until that account is refreshed as well
+        self.assertEqual(db.STASISED["bob"], 3)
+        self.assertTrue(all("AND pe.id = " in sql for sql in self.statements if "FROM person pe" in sql))
+
+        db.refresh_account("bob")
+        self.assertNotIn("bob", db.STASISED)
+        self.assertIn("bob", db.PREFER_NOTICE)
+
+    def test_refresh_sanctions_and_access(self):
+        db.set_stasis(2, "alice")
+        db.set_access("bob", flags="A")
+        db.refresh_sanctions()
+        db.refresh_access()
+        self.assertEqual(db.STASISED["alice"], 2)
+        self.assertEqual(db.FLAGS["bob"], "A")
+
+        db.decrement_stasis()
+        db.set_access("bob", flags=None)
+        db.refresh_sanctions()
+        db.refresh_access()
+        self.assertEqual(db.STASISED["alice"], 1)
+        self.assertNotIn("bob", db.FLAGS)
+
+    def test_refresh_swaps_prefs(self):
+        db.set_pingif(5, "alice")
+        db.init_vars()
+        prefs, nums = db.PING_IF_PREFS, db.PING_IF_NUMS
+        db.set_pingif(7, "alice")
+        db.refresh_account("alice")
+        # anyone still holding the old preferences sees them as they were rather than half refreshed
+        self.assertIsNot(db.PING_IF_PREFS, prefs)
+        self.assertEqual(prefs["alice"], 5)
+        self.assertIn("alice", nums[5])
+        self.assertEqual(db.PING_IF_PREFS["alice"], 7)
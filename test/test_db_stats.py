@@ -0,0 +1,172 @@
+import os
+import re
+import sqlite3
+from unittest import TestCase
+from src import config, db
+
+# a plan step that walks an entire table rather than an index
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+# summary tables whose size depends only on the number of modes, sizes and roles, not on history
+BOUNDED_TABLES = ("game_stats", "role_stats")
+# a plan step that searches an index but then has to visit the table for more columns
+TABLE_LOOKUP = re.compile(r"^SEARCH (\w+)(?: AS \w+)? USING INDEX ")
+
+class TestStatsQueryPlans(TestCase):
+    """Run EXPLAIN QUERY PLAN over every query issued by the stats functions.
+
+    The database is populated with enough synthetic games that the planner's choices mirror
+    what a long-running bot would see.
+    """
+    GAMES = 2000
+    PLAYERS = 200
+    MODES = ("default", "foolish", "mad", "maelstrom")
+    ROLES = ("villager", "seer", "wolf", "cursed villager", "harlot", "wolf cub", "fool", "traitor")
+
+    @classmethod
+    def setUpClass(cls):
+        cls.conn = sqlite3.connect(":memory:")
+        with open(os.path.join(os.path.dirname(db.__file__), "db.sql"), "rt") as f:
+            cls.conn.executescript(f.read())
+        c = cls.conn.cursor()
+        c.executemany("""INSERT INTO player (id, person, account_display, account_lower_ascii,
+                                             account_lower_rfc1459, account_lower_rfc1459_strict)
+                         VALUES (?, ?, ?, ?, ?, ?)""",
+                      [(i, i, f"acc{i}", f"acc{i}", f"acc{i}", f"acc{i}") for i in range(1, cls.PLAYERS + 1)])
+        c.executemany("INSERT INTO person (id, primary_player) VALUES (?, ?)",
+                      [(i, i) for i in range(1, cls.PLAYERS + 1)])
+        gpid = 0
+        for game in range(1, cls.GAMES + 1):
+            size = 4 + game % 20
+            c.execute("""INSERT INTO game (id, gamemode, options, started, finished, gamesize, winner)
+                         VALUES (?, ?, '{}', '2020-01-01 00:00:00', '2020-01-01 00:10:00', ?, ?)""",
+                      (game, cls.MODES[game % len(cls.MODES)], size, "Village" if game % 3 else "Wolfteam"))
+            for i in range(size):
+                gpid += 1
+                player = (game * 7 + i) % cls.PLAYERS + 1
+                c.execute("""INSERT INTO game_player (id, game, player, team_win, indiv_win, dced, count_game)
+                             VALUES (?, ?, ?, ?, 0, 0, 1)""", (gpid, game, player, (game + i) % 2))
+                c.execute("INSERT INTO game_player_role (game_player, role, special) VALUES (?, ?, 0)",
+                          (gpid, cls.ROLES[(game + i) % len(cls.ROLES)]))
+                if i == 0:
+                    c.execute("INSERT INTO game_player_role (game_player, role, special) VALUES (?, 'lover', 1)", (gpid,))
+        db._rebuild_stats(c)
+        cls.conn.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+
+    def setUp(self):
+        self._orig_conn = db._ts.conn
+        db._ts.conn = self.conn
+        db._IDS.clear()
+        self.statements = []
+        self.conn.set_trace_callback(self.statements.append)
+
+    def tearDown(self):
+        self.conn.set_trace_callback(None)
+        db._ts.conn = self._orig_conn
+        db._IDS.clear()
+
+    def assertIndexedPlans(self):
+        self.conn.set_trace_callback(None)
+        self.assertTrue(self.statements)
+        for sql in self.statements:
+            plan = [row[3] for row in self.conn.execute("EXPLAIN QUERY PLAN " + sql)]
+            with self.subTest(sql=" ".join(sql.split())):
+                for step in plan:
+                    match = FULL_SCAN.match(step)
+                    if match:
+                        self.assertIn(match.group(1), BOUNDED_TABLES, "full table scan")
+                    match = TABLE_LOOKUP.match(step)
+                    if match:
+                        self.assertNotIn(match.group(1), ("gp", "gpr", "game_player", "game_player_role"),
+                                         "stats queries should be covered by game_player indexes")
+
+    def test_player_stats(self):
+        db.get_player_stats("acc1", "seer")
+        self.assertIndexedPlans()
+
+    def test_player_totals(self):
+        db.get_player_totals("acc1")
+        self.assertIndexedPlans()
+
+    def test_game_stats(self):
+        db.get_game_stats("*", 10)
+        db.get_game_stats("default", 10)
+        self.assertIndexedPlans()
+
+    def test_game_totals(self):
+        db.get_game_totals("*")
+        db.get_game_totals("default")
+        self.assertIndexedPlans()
+
+    def test_role_stats(self):
+        db.get_role_stats("seer")
+        db.get_role_stats("seer", "default")
+        self.assertIndexedPlans()
+
+    def test_role_totals(self):
+        db.get_role_totals()
+        db.get_role_totals("default")
+        self.assertIndexedPlans()
+
+class TestStatsSummary(TestCase):
+    """Check that add_game keeps the stats summary tables in step with the game tables."""
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        with open(os.path.join(os.path.dirname(db.__file__), "db.sql"), "rt") as f:
+            self.conn.executescript(f.read())
+        self._orig_conn = db._ts.conn
+        db._ts.conn = self.conn
+        db._IDS.clear()
+        # run writes on this thread so they go to our connection
+        self._write_behind = config.Main.get("database.write_behind")
+        config.Main.set("database.write_behind", False)
+
+    def tearDown(self):
+        config.Main.set("database.write_behind", self._write_behind)
+        db._ts.conn = self._orig_conn
+        db._IDS.clear()
+        self.conn.close()
+
+    @staticmethod
+    def player(account, roles, special=(), team_win=False, individual_win=False, count_game=True):
+        return {"account": account, "all_roles": list(roles), "special": list(special), "team_win": team_win,
+                "individual_win": individual_win, "dced": False, "count_game": count_game}
+
+    def add_games(self):
+        db.add_game("default", 3, "2020-01-01 00:00:00", "2020-01-01 00:10:00", "Village",
+                    [self.player("alice", ["seer"], ["lover"], team_win=True),
+                     self.player("bob", ["wolf"]),
+                     self.player("carol", ["villager"], team_win=True, count_game=False)], {})
+        db.add_game("foolish", 3, "2020-01-02 00:00:00", "2020-01-02 00:10:00", "Wolfteam",
+                    [self.player("alice", ["wolf", "cursed villager"], team_win=True),
+                     self.player("bob", ["fool"], individual_win=True),
+                     self.player("carol", ["villager"])], {})
+
+    def test_add_game_consistent(self):
+        self.add_games()
+        self.assertEqual(db.check_stats(), [])
+
+    def test_check_stats_detects_drift(self):
+        self.add_games()
+        self.conn.execute("UPDATE role_stats SET total = total + 1 WHERE role = 'wolf' AND gamemode = 'default'")
+        self.conn.execute("DELETE FROM person_stats")
+        self.assertEqual(sorted(db.check_stats()), ["person_stats", "role_stats"])
+        db.rebuild_stats()
+        self.assertEqual(db.check_stats(), [])
+
+    def test_totals(self):
+        self.add_games()
+        c = self.conn.cursor()
+        c.execute("SELECT gamemode, gamesize, winner, games FROM game_stats ORDER BY gamemode")
+        self.assertEqual(c.fetchall(), [("default", 3, "Village", 1), ("foolish", 3, "Wolfteam", 1)])
+        c.execute("""SELECT ps.games, ps.counted_games, ps.won_games
+                     FROM person_stats ps
+                     JOIN player pl
+                       ON pl.person = ps.person
+                     WHERE pl.account_display = 'carol'""")
+        self.assertEqual(c.fetchone(), (2, 1, 0))
+        c.execute("SELECT SUM(total) FROM role_stats WHERE role = 'wolf'")
+        self.assertEqual(c.fetchone()[0], 2)
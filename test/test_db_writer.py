@@ -0,0 +1,133 @@
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+from unittest import TestCase
+from src import config, db
+
+class TestWriteBehind(TestCase):
+    def setUp(self):
+        self._write_behind = config.Main.get("database.write_behind")
+        config.Main.set("database.write_behind", True)
+
+    def tearDown(self):
+        db.flush()
+        conn = db._conn()
+        conn.execute("DELETE FROM access_template WHERE name LIKE 'test-writer-%'")
+        conn.execute("DELETE FROM person WHERE primary_player IN (SELECT id FROM player WHERE account_display LIKE 'test-writer-%')")
+        conn.execute("DELETE FROM player WHERE account_display LIKE 'test-writer-%'")
+        conn.commit()
+        config.Main.set("database.write_behind", self._write_behind)
+
+    def test_runs_on_writer_thread(self):
+        threads = []
+
+        @db._write
+        def job():
+            threads.append(threading.current_thread())
+            return 42
+
+        self.assertEqual(job().result(timeout=5), 42)
+        self.assertEqual(threads, [db._writer])
+        self.assertIsNot(db._writer, threading.current_thread())
+
+    def test_read_your_writes(self):
+        db.update_template("test-writer-a", "Aa")
+        # no explicit wait; reading from this thread must see the write queued above
+        self.assertEqual(db.get_template("test-writer-a")[1], "Aa")
+
+    def test_failed_write_is_isolated(self):
+        @db._write
+        def insert(name):
+            db._conn().execute("INSERT INTO access_template (name, flags) VALUES (?, 'A')", (name,))
+
+        @db._write
+        def insert_and_fail(name):
+            insert(name)
+            raise RuntimeError("boom")
+
+        # hold up the writer until all three are queued so that they share a transaction
+        gate = threading.Event()
+        db._write(gate.wait)(5)
+        first = insert("test-writer-1")
+        failed = insert_and_fail("test-writer-2")
+        last = insert("test-writer-3")
+        gate.set()
+
+        self.assertIsNone(first.result(timeout=5))
+        self.assertIsInstance(failed.exception(timeout=5), RuntimeError)
+        self.assertIsNone(last.result(timeout=5))
+        self.assertEqual([name for name, _ in db.get_templates() if name.startswith("test-writer-")],
+                         ["test-writer-1", "test-writer-3"])
+
+    def test_write_behind_disabled(self):
+        config.Main.set("database.write_behind", False)
+        fut = db.update_template("test-writer-b", "Aa")
+        self.assertTrue(fut.done())
+        self.assertEqual(db.get_template("test-writer-b")[1], "Aa")
+
+    def test_account_added_by_writer(self):
+        gate = threading.Event()
+        db._write(gate.wait)(5)
+        ids = []
+        lookup = threading.Thread(target=lambda: ids.append(db._get_ids("test-writer-acc", add=True)))
+        lookup.start()
+        # the new account is only inserted once the writer gets to it
+        lookup.join(0.2)
+        self.assertTrue(lookup.is_alive())
+        gate.set()
+        lookup.join(5)
+        self.assertIsNotNone(ids[0][0])
+        db._IDS.pop("test-writer-acc", None)
+        self.assertEqual(db._get_ids("test-writer-acc"), ids[0])
+
+class TestClose(TestCase):
+    def test_optimize_fails(self):
+        closed = []
+
+        class LockedConnection:
+            def execute(self, sql):
+                raise sqlite3.OperationalError("database is locked")
+
+            def close(self):
+                closed.append(self)
+
+        orig = getattr(db._ts, "conn", None)
+        db._ts.conn = conn = LockedConnection()
+        try:
+            db.close()
+        finally:
+            if orig is not None:
+                db._ts.conn = orig
+        self.assertEqual(closed, [conn])
+
+class TestUpgradeRestore(TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._dir = tempfile.TemporaryDirectory()
+        os.chdir(self._dir.name)
+        self._orig = getattr(db._ts, "conn", None)
+        if self._orig is not None:
+            del db._ts.conn
+
+    def tearDown(self):
+        db.close()
+        if self._orig is not None:
+            db._ts.conn = self._orig
+        os.chdir(self._cwd)
+        self._dir.cleanup()
+
+    def test_wal_discarded(self):
+        conn = db._conn()
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("CREATE TABLE game (gamemode TEXT, gamesize INTEGER, winner TEXT)")
+        conn.execute("CREATE INDEX game_idx ON game (gamemode)")
+        conn.commit()
+        # upgrade13.sql replaces game_idx before failing on an index this database doesn't have
+        with self.assertRaises(sqlite3.Error), contextlib.redirect_stderr(io.StringIO()):
+            db._upgrade(12)
+        self.assertFalse(os.path.exists("data.sqlite3-wal"))
+        sql = db._conn().execute("SELECT sql FROM sqlite_master WHERE name = 'game_idx'").fetchone()[0]
+        self.assertEqual(sql, "CREATE INDEX game_idx ON game (gamemode)")
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+from src import channels, config, pregame, timers, trans, users
+from src.dispatcher import MessageDispatcher
+from src.gamejoin import join_player
+from src.headless import configure_headless
+from src.users import FakeUser
+
+class TestJoinChannels(TestCase):
+    """Check that joining games in two channels keeps the games apart."""
+    def setUp(self):
+        configure_headless()
+        wait_enabled = config.Main.get("timers.wait.enabled")
+        config.Main.set("timers.wait.enabled", True)
+        self.addCleanup(config.Main.set, "timers.wait.enabled", wait_enabled)
+        timers.set_clock(timers.ManualClock())
+        self.addCleanup(timers.set_clock, timers.Clock())
+        if users.Bot is None:
+            users.Bot = users.BotUser(None, "gamejoin", "gamejoin", "localhost", None)
+        self.channels = []
+        for i in range(2):
+            chan = channels.add(f"joining{i}", None) # not a channel name, so this is a FakeChannel
+            channels.add_game_channel(chan)
+            self.channels.append(chan)
+            self.addCleanup(chan.loop.run, self.end, chan)
+
+    @staticmethod
+    def end(chan):
+        if chan.game_state is not None:
+            trans.reset(chan.game_state)
+
+    @staticmethod
+    def join(chan, user):
+        join_player(MessageDispatcher(user, chan))
+        return list(chan.game_state.players) if chan.game_state is not None else []
+
+    def test_wait_per_game(self):
+        first, second = self.channels
+        first.loop.run(self.join, first, FakeUser.from_nick("joining0player0"))
+        can_start = datetime.now() + timedelta(hours=1)
+        first.loop.run(setattr, pregame.WAIT, "can_start_time", can_start)
+        # opening a game in another channel must not reset the !start delay of this one
+        second.loop.run(self.join, second, FakeUser.from_nick("joining1player0"))
+        self.assertEqual(first.loop.run(lambda: pregame.WAIT.can_start_time), can_start)
+        self.assertLess(second.loop.run(lambda: pregame.WAIT.can_start_time), can_start)
+
+    def test_one_game_per_user(self):
+        first, second = self.channels
+        player = FakeUser.from_nick("joining0player0")
+        self.assertEqual(first.loop.run(self.join, first, player), [player])
+        # neither joining an open game nor starting a new one in another channel is allowed
+        self.assertEqual(second.loop.run(self.join, second, player), [])
+        other = FakeUser.from_nick("joining1player0")
+        second.loop.run(self.join, second, other)
+        self.assertEqual(second.loop.run(self.join, second, player), [other])
+        self.assertIs(player.game_state, first.game_state)
@@ -0,0 +1,83 @@
+import threading
+from unittest import TestCase
+from src.gameloop import GameLoop, GameScoped, on_game_loop
+from src.gamestate import PregameState
+
+class TestGameLoop(TestCase):
+    """Check that work submitted to a game loop runs in order on a single thread."""
+    def setUp(self):
+        self.loop = GameLoop("test")
+        self.addCleanup(self.loop.stop)
+
+    def test_order(self):
+        ran = []
+        threads = set()
+
+        def work(n):
+            ran.append(n)
+            threads.add(threading.current_thread())
+
+        for n in range(50):
+            self.loop.post(work, n)
+        self.loop.run(work, 50)
+        self.assertEqual(ran, list(range(51)))
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads.pop(), threading.current_thread())
+
+    def test_reentrant(self):
+        def outer():
+            self.assertTrue(self.loop.in_loop())
+            return self.loop.run(lambda: "inner")
+
+        self.assertFalse(self.loop.in_loop())
+        self.assertEqual(self.loop.run(outer), "inner")
+
+    def test_errors(self):
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            self.loop.run(fail)
+        self.assertEqual(self.loop.run(lambda: 1), 1)
+
+    def test_stopped(self):
+        self.loop.run(lambda: None)
+        self.loop.stop()
+        self.assertEqual(self.loop.run(threading.current_thread), threading.current_thread())
+        self.assertEqual(self.loop.post(lambda: 2).result(), 2)
+
+    def test_decorator(self):
+        var = PregameState()
+        self.addCleanup(var.loop.stop)
+
+        @on_game_loop
+        def where(var, *, extra):
+            return var.loop.in_loop() if var else None, extra
+
+        self.assertEqual(where(var, extra=1), (True, 1))
+        self.assertEqual(where(None, extra=2), (None, 2))
+
+class TestGameScoped(TestCase):
+    """Check that every game loop sees its own instance of a scoped container."""
+    def test_per_loop(self):
+        scoped = GameScoped(set)
+        loops = [GameLoop(f"scoped{i}") for i in range(2)]
+        for i, loop in enumerate(loops):
+            self.addCleanup(loop.stop)
+            loop.run(lambda: scoped.add(i))
+        self.assertEqual(loops[0].run(lambda: set(scoped)), {0})
+        self.assertEqual(loops[1].run(lambda: set(scoped)), {1})
+        self.assertFalse(scoped)
+        scoped.add(2)
+        self.assertEqual(loops[0].run(lambda: {0, 5} - scoped), {5})
+        self.assertEqual({2, 3} & scoped, {2})
+        self.assertIsInstance(scoped, set)
+
+    def test_attributes(self):
+        scoped = GameScoped(lambda: type("State", (), {"value": 0})())
+        loop = GameLoop("attributes")
+        self.addCleanup(loop.stop)
+        loop.run(setattr, scoped, "value", 1)
+        scoped.value = 2
+        self.assertEqual(loop.run(lambda: scoped.value), 1)
+        self.assertEqual(scoped.value, 2)
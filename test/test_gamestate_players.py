@@ -0,0 +1,101 @@
+from unittest import TestCase
+from src.cats import Wolfchat, Wolf, Wolf_Objective, Village_Objective, Vampire_Objective
+from src.functions import get_players, get_all_players
+from src.gamestate import GameState, PregameState
+from src.status.dying import DYING
+from src.users import FakeUser
+
+class TestPlayerIndex(TestCase):
+    """Check that cached player lookups match a full scan as roles and players change."""
+    def setUp(self):
+        pregame = PregameState()
+        self.players = [FakeUser.from_nick(f"player{i}") for i in range(8)]
+        pregame.players.extend(self.players)
+        self.var = GameState(pregame)
+        self.var.begin_setup()
+        for player, role in zip(self.players, ("wolf", "seer", "villager", "traitor",
+                                               "villager", "werecrow", "harlot", "villager")):
+            self.var.main_roles[player] = role
+            self.var.roles[role].add(player)
+
+    def tearDown(self):
+        DYING.clear()
+        self.var.roles.clear()
+        self.var.main_roles.clear()
+        self.var.players.clear()
+
+    def scan(self, roles=None):
+        if roles is None:
+            roles = set(self.var.main_roles.values())
+        return [p for p in self.var.players if self.var.main_roles.get(p) in roles and p not in DYING]
+
+    def scan_all(self, roles):
+        return {p for role in roles for p in self.var.roles[role] if p not in DYING}
+
+    def check(self):
+        for roles in (None, Wolfchat, Wolf, ("villager",), ["seer", "harlot"], ("priest",)):
+            self.assertEqual(get_players(self.var, roles), self.scan(roles))
+        for roles in (Wolfchat, ("villager", "gunner"), ("priest",)):
+            self.assertEqual(get_all_players(self.var, roles), self.scan_all(roles))
+
+    def test_join_order(self):
+        self.check()
+        self.assertEqual(get_players(self.var, ("villager",)), [self.players[2], self.players[4], self.players[7]])
+
+    def test_cached(self):
+        first = self.var.get_main_role_players(Wolfchat)
+        self.assertIs(self.var.get_main_role_players(Wolfchat), first)
+        # callers may modify what they get back without affecting the cache
+        get_players(self.var, Wolfchat).clear()
+        self.assertEqual(get_players(self.var, Wolfchat), list(first))
+
+    def test_role_changes(self):
+        self.check()
+        self.var.main_roles[self.players[3]] = "wolf" # traitor turning
+        self.var.roles["traitor"].remove(self.players[3])
+        self.var.roles["wolf"].add(self.players[3])
+        self.check()
+        del self.var.main_roles[self.players[0]]
+        self.var.roles["wolf"].discard(self.players[0])
+        self.var.roles["gunner"].add(self.players[2])
+        self.check()
+        self.assertEqual(self.var.main_roles.pop(self.players[1]), "seer")
+        self.check()
+        self.var.roles["villager"].clear()
+        self.check()
+
+    def test_dying(self):
+        self.check()
+        DYING[self.players[5]] = ("wolf", "night_kill", True, None)
+        self.check()
+        self.assertNotIn(self.players[5], get_players(self.var, Wolfchat))
+        DYING.clear()
+        self.assertIn(self.players[5], get_players(self.var, Wolfchat))
+
+    def check_team_counts(self):
+        counts = self.var.get_team_counts()
+        self.assertEqual(counts, (len(self.scan()), len(self.scan(Wolf_Objective)),
+                                  len(self.scan(Village_Objective)), len(self.scan(Vampire_Objective))))
+        self.assertIs(self.var.get_team_counts(), counts)
+
+    def test_team_counts(self):
+        self.check_team_counts()
+        self.assertEqual(self.var.get_team_counts().wolves, 3)
+        DYING[self.players[0]] = ("wolf", "day_vote", True, None)
+        self.check_team_counts()
+        DYING.clear()
+        self.var.main_roles[self.players[2]] = "wolf"
+        self.check_team_counts()
+        self.assertEqual(self.var.get_team_counts().wolves, 4)
+        # counts for other main roles are worked out without touching the cache
+        self.assertEqual(self.var.get_team_counts({self.players[0]: "wolf"}), (1, 1, 1, 0))
+        self.check_team_counts()
+
+    def test_swap(self):
+        self.check()
+        new = FakeUser.from_nick("replacement")
+        self.players[5].swap(new)
+        self.assertIn(new, get_players(self.var, Wolfchat))
+        self.assertIn(new, get_all_players(self.var, Wolfchat))
+        self.check()
+        self.assertEqual(list(self.var.main_roles.players_of("werecrow")), [new])
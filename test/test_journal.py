@@ -0,0 +1,83 @@
+import io
+from unittest import TestCase
+from src import channels, handler, journal, timers, users
+from src.dispatcher import MessageDispatcher
+from src.gamestate import PregameState, set_gamemode
+from src.headless import configure_headless
+from src.pregame import start
+from src.trans import stop_game
+from src.users import FakeUser
+
+class _File(io.BytesIO):
+    # keep the contents around once the journal is closed
+    def close(self):
+        pass
+
+class TestJournal(TestCase):
+    """Check that journals read back what was written, and that recorded games replay identically."""
+    def setUp(self):
+        timers.set_clock(timers.ManualClock())
+
+    def tearDown(self):
+        timers.set_clock(timers.Clock())
+
+    def test_round_trip(self):
+        file = _File()
+        writer = journal.Journal(file)
+        fields = (None, True, False, 0, -1, 2**70, -300, 1.5, "", "ünïcode", b"\x00\xff", [["a", None], []])
+        writer.write(journal.Kind.START, *fields)
+        timers.advance(2.5)
+        writer.write(journal.Kind.TIMER, "src.trans.night_timeout")
+        file.seek(0)
+        records = list(journal.read(file))
+        self.assertEqual([r.kind for r in records], [journal.Kind.START, journal.Kind.TIMER])
+        self.assertEqual(records[0].fields, tuple(list(x) if isinstance(x, list) else x for x in fields))
+        self.assertEqual(records[1].time, 2.5)
+        # a record cut off halfway is dropped
+        file.truncate(len(file.getvalue()) - 3)
+        file.seek(0)
+        self.assertEqual(len(list(journal.read(file))), 1)
+        with self.assertRaises(ValueError):
+            list(journal.read(io.BytesIO(b"not a journal")))
+
+    def test_replay(self):
+        configure_headless()
+        if users.Bot is None:
+            users.Bot = users.BotUser(None, "journal", "journal", "localhost", None)
+        chan = channels.add("journaled", None)
+        if chan.loop is None:
+            channels.add_game_channel(chan)
+        file = _File()
+        chan.loop.journal = journal.Journal(file)
+        players = [FakeUser.from_nick(f"player{i}") for i in range(8)]
+
+        def begin():
+            pregame = chan.game_state = PregameState(chan.loop)
+            pregame.players.extend(players)
+            set_gamemode(pregame, "default")
+            start(MessageDispatcher(players[0], chan), forced=True)
+            return chan.game_state
+
+        var = chan.loop.run(begin)
+        wolf = next(p for p, role in var.main_roles.items() if role == "wolf")
+        victim = next(p for p, role in var.main_roles.items() if role == "villager")
+        chan.loop.run(handler.parse_and_dispatch, MessageDispatcher(wolf, users.Bot), "kill", victim.nick)
+        for _ in range(10):
+            timers.advance(60)
+            chan.loop.run(lambda: None)
+        if chan.game_state is not None:
+            chan.loop.run(stop_game, chan.game_state, log=False)
+        self.assertIsNone(chan.loop.journal)
+
+        file.seek(0)
+        recorded = list(journal.read(file))
+        kinds = [r.kind for r in recorded]
+        self.assertEqual(kinds[:2], [journal.Kind.START, journal.Kind.PHASE])
+        self.assertIn(journal.Kind.COMMAND, kinds)
+        self.assertIn(journal.Kind.TIMER, kinds)
+        self.assertEqual(kinds[-1], journal.Kind.END)
+
+        result = journal.replay(recorded)
+        # stopping the game by hand isn't something the journal knows about, so the replay never ends it
+        self.assertEqual(result.records, recorded[:-1])
+        self.assertEqual(result.divergence, len(recorded) - 1)
@@ -0,0 +1,72 @@
+import time
+from unittest import TestCase
+from src import config, latency
+
+class _Game:
+    current_phase = "night"
+    night_count = 2
+    loop = None
+
+@latency.timed("test_inner")
+def inner(var):
+    recording = latency.track("messages")
+    try:
+        time.sleep(0.01)
+    finally:
+        recording.pop()
+
+@latency.timed("test_outer")
+def outer(var):
+    recording = latency.track("events")
+    try:
+        time.sleep(0.01)
+        inner(var)
+    finally:
+        recording.pop()
+
+@latency.timed("test_check", history=False)
+def check(var, run_inner):
+    if run_inner:
+        inner(var)
+
+class TestLatency(TestCase):
+    def setUp(self):
+        self._budget = config.Main.get("latency.budget")
+        config.Main.set("latency.budget", 0)
+
+    def tearDown(self):
+        config.Main.set("latency.budget", self._budget)
+
+    def test_untimed(self):
+        self.assertIsNone(latency.track("events"))
+
+    def test_recording(self):
+        started = time.perf_counter()
+        outer(_Game())
+        elapsed = time.perf_counter() - started
+        recording = latency.get_history(1)[0]
+        self.assertEqual(recording.operation, "test_outer")
+        self.assertEqual(recording.phase, "night 2")
+        self.assertEqual(list(recording.categories), list(latency.CATEGORIES))
+        # time spent formatting from within the event counts towards messages only
+        self.assertGreaterEqual(recording.categories["events"], 0.01)
+        self.assertGreaterEqual(recording.categories["messages"], 0.01)
+        self.assertAlmostEqual(recording.total, sum(recording.categories.values()))
+        self.assertLessEqual(recording.total, elapsed)
+        self.assertGreaterEqual(recording.operations["test_inner"], 0.01)
+        self.assertLessEqual(recording.operations["test_inner"], recording.total)
+        # nested operations are part of the outer recording rather than recordings of their own
+        self.assertNotIn("test_inner", [r.operation for r in latency.get_history()])
+
+    def test_history(self):
+        outer(_Game())
+        check(_Game(), False)
+        self.assertEqual(latency.get_history(1)[0].operation, "test_outer")
+        check(_Game(), True)
+        self.assertEqual(latency.get_history(1)[0].operation, "test_check")
+
+    def test_budget(self):
+        config.Main.set("latency.budget", 0.001)
+        with self.assertLogs("game.latency", "WARNING") as cm:
+            outer(_Game())
+        self.assertEqual(cm.records[0].args[0], "test_outer")
@@ -0,0 +1,93 @@
+import logging
+import threading
+from unittest import TestCase
+from src import channels
+from src.logger import IRCTransportHandler, LogRecord, QueueHandler, QueueListener
+
+class _Collector(logging.Handler):
+    def __init__(self, level):
+        super().__init__(level)
+        self.lines = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+        self.threads.add(threading.current_thread())
+
+class _Channel:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, *lines, sep=None, prefix=None):
+        self.sent.append(lines)
+
+class TestQueueLogging(TestCase):
+    """Check that records are filtered, formatted and emitted off the logging thread."""
+    def setUp(self):
+        self.logger = logging.getLogger("test.logger")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+        self.addCleanup(self.logger.setLevel, logging.NOTSET)
+        self.addCleanup(setattr, self.logger, "propagate", True)
+        factory = logging.getLogRecordFactory()
+        logging.setLogRecordFactory(LogRecord)
+        self.addCleanup(logging.setLogRecordFactory, factory)
+
+    def attach(self, *handlers):
+        listener = QueueListener(*handlers)
+        handler = QueueHandler(listener.queue)
+        handler.setLevel(listener.level)
+        self.logger.addHandler(handler)
+        self.addCleanup(self.logger.removeHandler, handler)
+        listener.start()
+        return listener
+
+    def test_listener(self):
+        info = _Collector(logging.INFO)
+        warning = _Collector(logging.WARNING)
+        listener = self.attach(info, warning)
+        self.assertEqual(listener.level, logging.INFO)
+        self.logger.debug("dropped {0}", 1)
+        self.logger.info("kept {0}", 2)
+        self.logger.warning("kept %s", 3)
+        listener.stop()
+        self.assertEqual(info.lines, ["kept 2", "kept 3"])
+        self.assertEqual(warning.lines, ["kept 3"])
+        self.assertNotIn(threading.current_thread(), info.threads)
+
+    def test_formatted_when_logged(self):
+        gate = threading.Event()
+        blocker = _Collector(logging.INFO)
+        blocker.emit = lambda record: gate.wait()
+        collector = _Collector(logging.INFO)
+        listener = self.attach(blocker, collector)
+        players = ["alice"]
+        self.logger.info("players: {0}", players)
+        players.append("bob")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            self.logger.exception("failed")
+        gate.set()
+        listener.stop()
+        self.assertEqual(collector.lines[0], "players: ['alice']")
+        self.assertTrue(collector.lines[1].startswith("failed\nTraceback"))
+        self.assertIn("ValueError: boom", collector.lines[1])
+
+    def test_transport_batching(self):
+        chan = _Channel()
+        original = channels.get
+        channels.get = lambda name: chan
+        self.addCleanup(setattr, channels, "get", original)
+        handler = IRCTransportHandler("test", "#logs")
+        handler.setLevel(logging.INFO)
+        handler.addFilter(logging.Filter("test"))
+        gate = threading.Event()
+        blocker = _Collector(logging.INFO)
+        blocker.emit = lambda record: gate.wait()
+        listener = self.attach(blocker, handler)
+        for n in range(5):
+            self.logger.info("line {0}\nsecond line", n)
+        gate.set()
+        listener.stop()
+        self.assertEqual(chan.sent, [tuple(f"line {n}" for n in range(5))])
@@ -0,0 +1,35 @@
+import json
+from unittest import TestCase
+from src import cats, gamemodes, roles
+from src.gamemodes import GAME_MODES, GameMode, load_builtin_mode
+
+class TestManifest(TestCase):
+    """Check that the manifests the bot starts from match the builtin roles and game modes."""
+    def test_roles_manifest(self):
+        with open(roles.MANIFEST, encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.assertEqual(roles.build_manifest(), manifest, "Role manifest is out of date; run genmanifest.py")
+
+    def test_gamemodes_manifest(self):
+        with open(gamemodes.MANIFEST, encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.assertEqual(gamemodes.build_manifest(), manifest, "Game mode manifest is out of date; run genmanifest.py")
+
+    def test_deferred_categories(self):
+        roles.load_builtin_roles()
+        from src.roles.fool import Fools
+        from src.roles.matchmaker import Lovers
+        # role modules get the categories registered from the manifest rather than defining new ones
+        self.assertIs(Fools, cats.get("Fools"))
+        self.assertIs(Lovers, cats.get("Lovers"))
+        self.assertEqual(set(Fools), {"fool"})
+        self.assertIn("Lovers", cats.all_cats())
+
+    def test_load_builtin_mode(self):
+        with open(gamemodes.MANIFEST, encoding="utf-8") as f:
+            manifest = json.load(f)
+        cls = load_builtin_mode("default")
+        self.assertTrue(issubclass(cls, GameMode))
+        self.assertIs(GAME_MODES["default"][0], cls)
+        self.assertEqual(cls.__doc__, manifest["modes"]["default"]["doc"])
+        self.assertEqual(GAME_MODES["default"][1:], (manifest["modes"]["default"]["min"], manifest["modes"]["default"]["max"]))
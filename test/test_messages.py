@@ -0,0 +1,34 @@
+import threading
+from unittest import TestCase
+from src.messages.message import Message
+
+class _Nested:
+    def __init__(self, message):
+        self.message = message
+
+    def __format__(self, spec):
+        return self.message.format("x", "y")
+
+    def __str__(self):
+        return format(self)
+
+class TestMessageFormat(TestCase):
+    """Check that a cached message tree can be walked by several formats at once."""
+    def test_reentrant(self):
+        message = Message("test_reentrant", "{0}-{1}")
+        self.assertEqual(message.format("a", _Nested(message)), "a-x-y")
+
+    def test_threads(self):
+        message = Message("test_threads", "{0} [b]{1}[/b] {2}")
+        results = {}
+
+        def work(n):
+            results[n] = [message.format(n, n * 2, n * 3) for _ in range(200)]
+
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for n, values in results.items():
+            self.assertEqual(set(values), {"{0} \u0002{1}\u0002 {2}".format(n, n * 2, n * 3)})
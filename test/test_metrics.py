@@ -0,0 +1,80 @@
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from unittest import TestCase
+from src import metrics
+from src.metrics import Counter, Gauge, Histogram
+
+class TestMetrics(TestCase):
+    def test_counter(self):
+        counter = Counter("test_total", "Test counter", ("direction",))
+        counter.inc("in")
+        counter.inc("in", amount=2)
+        counter.inc("out")
+        self.assertEqual(counter.collect(), {("in",): 3, ("out",): 1})
+        with self.assertRaises(ValueError):
+            counter.inc()
+
+    def test_gauge(self):
+        gauge = Gauge("test", "Test gauge")
+        gauge.set(5)
+        gauge.inc(amount=-2)
+        self.assertEqual(gauge.collect(), {(): 3})
+        values = iter((1, 2))
+        gauge = Gauge("test_callback", "Test gauge", callback=lambda: next(values))
+        self.assertEqual(gauge.collect(), {(): 1})
+        self.assertEqual(gauge.collect(), {(): 2})
+        with self.assertRaises(ValueError):
+            Gauge("test_labels", "Test gauge", ("label",), callback=lambda: 0)
+
+    def test_get_or_create(self):
+        counter = metrics.counter("test_registry_total", "Test counter")
+        self.assertIs(metrics.counter("test_registry_total", "Test counter"), counter)
+        self.assertIn(counter, metrics.get_metrics())
+        with self.assertRaises(TypeError):
+            metrics.gauge("test_registry_total", "Test gauge")
+
+    def test_render(self):
+        counter = metrics.counter("test_render_total", "Test \\ counter", ("event",))
+        counter.inc('say "hi"\n')
+        histogram = metrics.histogram("test_render_seconds", "Test histogram", buckets=(0.1, 1.0))
+        histogram.observe(0.5)
+        histogram.observe(2.5)
+        lines = metrics.render().splitlines()
+        self.assertIn("# HELP lykos_test_render_total Test \\\\ counter", lines)
+        self.assertIn("# TYPE lykos_test_render_total counter", lines)
+        self.assertIn('lykos_test_render_total{event="say \\"hi\\"\\n"} 1', lines)
+        self.assertIn("# TYPE lykos_test_render_seconds histogram", lines)
+        self.assertIn('lykos_test_render_seconds_bucket{le="0.1"} 0', lines)
+        self.assertIn('lykos_test_render_seconds_bucket{le="1"} 1', lines)
+        self.assertIn('lykos_test_render_seconds_bucket{le="+Inf"} 2', lines)
+        self.assertIn("lykos_test_render_seconds_sum 3", lines)
+        self.assertIn("lykos_test_render_seconds_count 2", lines)
+
+    def test_serve(self):
+        metrics.counter("test_serve_total", "Test counter").inc()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), metrics._Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = "http://127.0.0.1:{0}".format(server.server_address[1])
+            with urllib.request.urlopen(url + "/metrics") as response:
+                self.assertTrue(response.headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+                self.assertIn("lykos_test_serve_total 1", response.read().decode("utf-8").splitlines())
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(url + "/elsewhere")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+class TestHistogram(TestCase):
+    def test_observe(self):
+        histogram = Histogram("test", "Test histogram", ("operation",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(value, "a")
+        histogram.observe(0.5, "b")
+        series = histogram.collect()
+        self.assertEqual(series[("a",)], ([2, 3, 4], 5.65))
+        self.assertEqual(series[("b",)], ([0, 1, 1], 0.5))
+        with self.assertRaises(ValueError):
+            histogram.observe(1.0)
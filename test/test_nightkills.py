@@ -0,0 +1,75 @@
+from collections import defaultdict
+from unittest import TestCase
+from src.events import EventListener
+from src.gamestate import GameState, PregameState, set_gamemode
+from src.locations import Location, move_player
+from src.nightkills import resolve_kill, resolve_night_kills
+from src.users import FakeUser
+
+class TestNightKills(TestCase):
+    def setUp(self):
+        pregame = PregameState()
+        self.players = [FakeUser.from_nick(f"player{i}") for i in range(6)]
+        pregame.players.extend(self.players)
+        set_gamemode(pregame, "default")
+        self.var = GameState(pregame)
+        self.var.begin_setup()
+        for player in self.players:
+            self.var.main_roles[player] = "villager"
+            self.var.roles["villager"].add(player)
+        self.var.main_roles[self.players[1]] = "vigilante"
+        self.var.roles["villager"].remove(self.players[1])
+        self.var.roles["vigilante"].add(self.players[1])
+        self.var.finish_setup()
+        self.var.current_phase = "night"
+        self.kills = EventListener(self.on_night_kills, listener_id="test_nightkills")
+        self.kills.install("night_kills")
+
+    def tearDown(self):
+        self.kills.remove("night_kills")
+        self.var.current_mode.teardown()
+        self.var.roles.clear()
+        self.var.main_roles.clear()
+        self.var.players.clear()
+
+    def on_night_kills(self, evt, var):
+        a, b, c, d, e, f = self.players
+        house = Location("test_house")
+        empty = Location("test_empty")
+        move_player(var, d, house)
+        move_player(var, e, house)
+        evt.data["kill_priorities"]["@wolves"] = 5
+        evt.data["kill_priorities"][b] = -5
+        evt.data["victims"].update({a, house, empty})
+        evt.data["killers"][a].extend([c, "@wolves", b])
+        evt.data["killers"][house].append(b)
+        evt.data["killers"][empty].append("@wolves")
+
+    def test_resolve_night_kills(self):
+        a, b, c, d, e, f = self.players
+        message = defaultdict(list)
+        night = resolve_night_kills(self.var, message)
+        self.assertEqual(night.victims, {a, d, e})
+        self.assertEqual(night.dead, {a, d, e})
+        # killers are ordered by priority, so the vigilante is credited ahead of the wolves
+        self.assertEqual(night.killers[a], [b, c, "@wolves"])
+        self.assertEqual(night.killers[d], [b])
+        self.assertEqual(night.killers[e], [b])
+        # the wolves attacking the empty house
+        self.assertEqual(len(message["*"]), 1)
+        self.assertFalse(night.novictmsg)
+        self.assertEqual(night.howl_count, 0)
+        self.assertEqual(list(night.timings), ["night_kills", "expand", "sort", "protection", "death_messages"])
+
+    def test_resolve_kill(self):
+        a, b, c, d, e, f = self.players
+        kill = resolve_kill(self.var, a, "@wolves")
+        self.assertIsNone(kill.attacker)
+        self.assertEqual(kill.role, "wolf")
+        self.assertTrue(kill.try_lycanthropy)
+        kill = resolve_kill(self.var, a, b)
+        self.assertIs(kill.attacker, b)
+        self.assertEqual(kill.role, "vigilante")
+        self.assertFalse(kill.try_lycanthropy)
+        kill = resolve_kill(self.var, a, b, mainroles={b: "wolf"})
+        self.assertEqual(kill.role, "wolf")
@@ -0,0 +1,44 @@
+from unittest import TestCase
+from src.random import GameRNG
+
+SEED = bytes(range(32))
+
+class TestGameRNG(TestCase):
+    """Check that the bulk APIs draw exactly what the one-at-a-time APIs would."""
+    def test_bulk_matches_sequential(self):
+        bulk, single = GameRNG(SEED), GameRNG(SEED)
+        # enough draws to cross several buffers, with rejected draws along the way
+        self.assertEqual(bulk.randoms(500), [single.random() for _ in range(500)])
+        self.assertEqual(bulk.randbelows(1000, 700), [single.randrange(1000) for _ in range(700)])
+        self.assertEqual(bulk.randbytes(3000), single.randbytes(3000))
+        self.assertEqual(bulk.random(), single.random())
+
+    def test_shuffle_and_sample(self):
+        rng, reference = GameRNG(SEED), GameRNG(SEED)
+        items = list(range(50))
+        expected = items[:]
+        for i in reversed(range(1, len(expected))):
+            j = reference.randrange(i + 1)
+            expected[i], expected[j] = expected[j], expected[i]
+        rng.shuffle(items)
+        self.assertEqual(items, expected)
+
+        pool = list(range(30))
+        expected = []
+        for i in range(10):
+            j = reference.randrange(30 - i)
+            expected.append(pool[j])
+            pool[j] = pool[30 - i - 1]
+        self.assertEqual(rng.sample(range(30), 10), expected)
+
+    def test_buffer_size(self):
+        small, large = GameRNG(SEED), GameRNG(SEED, buffer_size=4096)
+        # the first buffer's keystream is shared; later buffers are keyed from differently sized ones
+        self.assertEqual(small.randbytes(900), large.randbytes(900))
+        self.assertNotEqual(small.randbytes(2000), large.randbytes(2000))
+        state = large.getstate()
+        draws = large.randoms(1000)
+        large.setstate(state)
+        self.assertEqual(large.randoms(1000), draws)
+        with self.assertRaises(ValueError):
+            large.seed(SEED, buffer_size=16)
@@ -0,0 +1,87 @@
+from unittest import TestCase
+from src import reaper, timers
+from src.gamestate import GameState, PregameState
+from src.users import FakeUser
+
+class TestReaperSchedule(TestCase):
+    """Check that reaper deadlines follow the idle clock and players."""
+    def setUp(self):
+        self.clock = timers.ManualClock(1000.0)
+        timers.set_clock(self.clock)
+        self.addCleanup(timers.set_clock, timers.Clock())
+        pregame = PregameState()
+        self.players = [FakeUser.from_nick(f"player{i}") for i in range(3)]
+        pregame.players.extend(self.players)
+        self.scheduler = reaper._Scheduler(GameState(pregame))
+
+    def tearDown(self):
+        reaper.LAST_SAID_TIME.clear()
+        reaper.IDLE_WARNED.clear()
+        reaper.IDLE_WARNED_PM.clear()
+        reaper.DISCONNECTED.clear()
+
+    def test_night_excluded(self):
+        self.scheduler.schedule_idle(self.players[0])
+        self.clock.advance(100)
+        self.scheduler.pause()
+        self.clock.advance(500)
+        self.assertIsNone(self.scheduler.timeout())
+        self.assertEqual(self.scheduler.pop_idle(), [])
+        self.scheduler.resume()
+        self.assertEqual(self.scheduler.timeout(), 80.0) # warn.channel is 180s by default
+        self.clock.advance(80)
+        self.assertEqual(self.scheduler.pop_idle(), [self.players[0]])
+
+    def test_deadline_order(self):
+        reaper.LAST_SAID_TIME[self.players[1]] = self.scheduler.idle_time() - 50
+        for player in self.players:
+            self.scheduler.schedule_idle(player)
+        self.clock.advance(130)
+        self.assertEqual(self.scheduler.pop_idle(), [self.players[1]])
+        reaper.IDLE_WARNED.add(self.players[1])
+        self.scheduler.schedule_idle(self.players[1])
+        self.assertEqual(self.scheduler.timeout(), 50.0)
+        self.clock.advance(50)
+        self.assertEqual(self.scheduler.pop_idle(), [self.players[0], self.players[2]])
+        self.assertEqual(self.scheduler.timeout(), 10.0) # warn.private for players[1]
+
+    def test_swap(self):
+        self.scheduler.schedule_idle(self.players[0])
+        reaper.DISCONNECTED[self.players[2]] = (None, "quit")
+        self.scheduler.schedule_dced(self.players[2], 30)
+        new = FakeUser.from_nick("replacement")
+        self.players[0].swap(new)
+        self.clock.advance(180)
+        self.assertEqual(self.scheduler.pop_idle(), [new])
+        self.assertEqual(self.scheduler.pop_dced(), [self.players[2]])
+
+    def test_reconnect(self):
+        reaper.DISCONNECTED[self.players[1]] = (None, "part")
+        self.scheduler.schedule_dced(self.players[1], 30)
+        del reaper.DISCONNECTED[self.players[1]]
+        self.clock.advance(20)
+        reaper.DISCONNECTED[self.players[1]] = (None, "part")
+        self.scheduler.schedule_dced(self.players[1], 30)
+        self.clock.advance(20)
+        self.assertEqual(self.scheduler.pop_dced(), [])
+        self.clock.advance(10)
+        self.assertEqual(self.scheduler.pop_dced(), [self.players[1]])
+
+class TestReaperPerGame(TestCase):
+    """Check that every game keeps its own reaper scheduler."""
+    def test_per_game(self):
+        games = []
+        for i in range(2):
+            pregame = PregameState()
+            pregame.players.extend(FakeUser.from_nick(f"game{i}player{j}") for j in range(3))
+            var = GameState(pregame)
+            self.addCleanup(var.loop.stop)
+            var.loop.run(reaper.start_reaper, var)
+            games.append(var)
+        first, second = (var.loop.run(lambda: reaper._STATE.scheduler) for var in games)
+        self.assertIsNot(first, second)
+        self.assertEqual(first.game_id, games[0].game_id)
+        self.assertIsNone(reaper._STATE.scheduler)
+        games[1].loop.run(reaper.on_reset, None, games[1])
+        self.assertIs(games[0].loop.run(lambda: reaper._STATE.scheduler), first)
+        self.assertIsNone(games[1].loop.run(lambda: reaper._STATE.scheduler))
@@ -0,0 +1,161 @@
+import itertools
+from collections import Counter
+from unittest import TestCase
+from src.rolestats import (RoleStats, RoleBounds, role_index, multiset_combinations, count_multiset_combinations,
+                           multiset_bounds, count_compositions)
+
+def reference_bounds(rolesets):
+    bounds = {}
+    for rs in rolesets:
+        for r, a in rs.items():
+            mn, mx = bounds.get(r, (a, a))
+            bounds[r] = (min(mn, a), max(mx, a))
+    return bounds
+
+def reference_remove(rolesets, possible):
+    new = set()
+    for p in possible:
+        for rs in rolesets:
+            d = Counter(dict(rs))
+            if d[p] >= 1:
+                d[p] -= 1
+                new.add(frozenset((r, a) for r, a in d.items() if a))
+    return new
+
+def as_sets(stats):
+    return {frozenset((r, a) for r, a in rs.items() if a) for rs in stats}
+
+class TestRoleStats(TestCase):
+    ROLES = ("wolf", "traitor", "seer", "harlot", "cursed villager", "villager")
+
+    def rolesets(self):
+        # every way of picking 2 of 4 role set members, on top of a fixed base composition;
+        # like pregame, every role has a key even when its count is 0
+        base = Counter(dict.fromkeys(self.ROLES, 0))
+        base.update({"wolf": 1, "seer": 1, "villager": 4})
+        for combo in itertools.combinations(("traitor", "harlot", "cursed villager", "wolf"), 2):
+            rs = Counter(base)
+            rs.update(combo)
+            yield rs
+
+    def test_duplicates_collapse(self):
+        stats = RoleStats([{"wolf": 2, "villager": 3}, {"villager": 3, "wolf": 2, "seer": 0}])
+        self.assertEqual(len(stats), 1)
+        # interning new roles later must not change equality of existing compositions
+        role_index("test-role-interned-later")
+        stats.add({"wolf": 2, "villager": 3, "test-role-interned-later": 0})
+        self.assertEqual(len(stats), 1)
+
+    def test_bounds(self):
+        rolesets = list(self.rolesets())
+        bounds = RoleStats(rolesets).bounds()
+        for role, expected in reference_bounds(rolesets).items():
+            self.assertEqual(bounds[role], expected)
+        self.assertEqual(RoleStats().bounds(), {})
+
+    def test_remove_player(self):
+        rolesets = list(self.rolesets())
+        for possible in ({"wolf"}, {"traitor", "villager"}, {"harlot"}, {"seer", "cursed villager"}):
+            stats = RoleStats(rolesets)
+            stats.remove_player(possible)
+            self.assertEqual(as_sets(stats), reference_remove(rolesets, possible))
+
+    def test_transform(self):
+        traitor = role_index("traitor")
+        wolf = role_index("wolf")
+
+        def turn(roleset):
+            if roleset[traitor] >= 1:
+                roleset[wolf] += roleset[traitor]
+                roleset[traitor] = 0
+                yield roleset
+
+        stats = RoleStats(self.rolesets())
+        stats.transform(turn)
+        self.assertEqual(stats.bounds()["traitor"], (0, 0))
+        self.assertEqual(stats.bounds()["wolf"], (2, 3))
+        self.assertEqual(len(stats), 3)
+
+        stats.transform(lambda roleset: [[c - 1 for c in roleset]])
+        self.assertFalse(stats)
+
+class TestMultisetCombinations(TestCase):
+    SETS = (
+        ({"wolf": 3, "traitor": 1}, 2),
+        ({"gunner": 4, "sharpshooter": 1}, 1),
+        ({"seer": 2, "oracle": 2, "augur": 1}, 3),
+        ({"wolf": 5, "werecrow": 4, "wolf cub": 3, "sorcerer": 2}, 6),
+        ({"wolf": 2, "traitor": 0, "hag": 3}, 0),
+    )
+
+    def test_matches_itertools(self):
+        for counts, k in self.SETS:
+            draws = [frozenset(d.items()) for d in multiset_combinations(counts, k)]
+            expected = {frozenset(Counter(c).items()) for c in itertools.combinations(Counter(counts).elements(), k)}
+            self.assertEqual(len(draws), len(set(draws)), "duplicate draws")
+            self.assertEqual(set(draws), expected)
+            self.assertEqual(count_multiset_combinations(counts, k), len(expected))
+
+    def test_bounds(self):
+        for counts, k in self.SETS:
+            bounds = multiset_bounds(counts, k)
+            for role in counts:
+                drawn = [d.get(role, 0) for d in multiset_combinations(counts, k)]
+                self.assertEqual(bounds[role], (min(drawn), max(drawn)))
+
+    def test_too_many(self):
+        self.assertEqual(list(multiset_combinations({"wolf": 1, "traitor": 1}, 3)), [])
+        self.assertEqual(count_multiset_combinations({"wolf": 1, "traitor": 1}, 3), 0)
+
+    def test_from_role_sets(self):
+        fixed = Counter({"villager": 5, "seer": 1})
+        role_sets = [self.SETS[0], self.SETS[1], (self.SETS[0][0], 1)]
+        # the expansion pregame used to perform, with duplicates
+        expected = [Counter(fixed)]
+        for counts, k in role_sets:
+            expected = [pr + Counter(c) for pr in expected
+                        for c in itertools.combinations(Counter(counts).elements(), k)]
+        stats = RoleStats.from_role_sets(fixed, role_sets)
+        self.assertEqual(stats, RoleStats(expected))
+        self.assertLessEqual(len(stats), count_compositions(role_sets))
+
+class TestRoleBounds(TestCase):
+    """Check that role bounds start out exact and only ever widen compared to tracking every composition."""
+    FIXED = Counter({"villager": 4, "seer": 1})
+    SETS = [({"wolf": 3, "traitor": 1}, 2), ({"wolf": 5, "werecrow": 4, "wolf cub": 3, "sorcerer": 2}, 6)]
+
+    def assertWithin(self, stats, bounds):
+        full = stats.bounds()
+        for role, (low, high) in full.items():
+            if (low, high) == (0, 0):
+                continue
+            self.assertLessEqual(bounds.bounds()[role][0], low, role)
+            self.assertGreaterEqual(bounds.bounds()[role][1], high, role)
+
+    def test_from_role_sets(self):
+        stats = RoleStats.from_role_sets(self.FIXED, self.SETS)
+        bounds = RoleBounds.from_role_sets(self.FIXED, self.SETS)
+        expected = {role: value for role, value in stats.bounds().items() if value != (0, 0)}
+        self.assertEqual({role: value for role, value in bounds.bounds().items() if value != (0, 0)}, expected)
+        self.assertEqual(len(bounds), 2)
+
+    def test_updates(self):
+        stats = RoleStats.from_role_sets(self.FIXED, self.SETS)
+        bounds = RoleBounds.from_role_sets(self.FIXED, self.SETS)
+        wolf, traitor = role_index("wolf"), role_index("traitor")
+
+        def turn_traitors(d):
+            d[wolf] += d[traitor]
+            d[traitor] = 0
+            yield d
+
+        for update in (lambda s: s.remove_player({"wolf", "werecrow"}), lambda s: s.remove_player({"villager"}),
+                       lambda s: s.transform(turn_traitors), lambda s: s.remove_player({"wolf"})):
+            update(stats)
+            copy = bounds.copy()
+            update(copy)
+            self.assertIsInstance(copy, RoleBounds)
+            self.assertWithin(stats, copy)
+            bounds = copy
+        self.assertEqual(bounds.bounds()["traitor"], (0, 0))
+        self.assertEqual(bounds.bounds()["villager"], (3, 3))
@@ -0,0 +1,84 @@
+from unittest import TestCase
+from src import timers, trans
+from src.gamestate import GameState, PregameState
+
+class TestTimerService(TestCase):
+    """Drive the timer service with a manual clock."""
+    def setUp(self):
+        timers.set_clock(timers.ManualClock())
+        self.fired = []
+
+    def tearDown(self):
+        timers.set_clock(timers.Clock())
+        trans.TIMERS.clear()
+
+    def record(self, *args):
+        self.fired.append(args)
+
+    def test_order(self):
+        timers.schedule(20, self.record, ("b",))
+        timers.schedule(10, self.record, ("a",))
+        timers.schedule(20, self.record, ("c",))
+        timers.advance(9.5)
+        self.assertEqual(self.fired, [])
+        timers.advance(0.5)
+        self.assertEqual(self.fired, [("a",)])
+        timers.advance(30)
+        self.assertEqual(self.fired, [("a",), ("b",), ("c",)])
+
+    def test_cancel(self):
+        timer = timers.schedule(10, self.record, ("a",))
+        timers.schedule(10, self.record, ("b",), game_id=1, phase_id=1)
+        timers.schedule(10, self.record, ("c",), game_id=1, phase_id=2)
+        timers.schedule(10, self.record, ("d",), game_id=2, phase_id=1)
+        self.assertEqual(timer.remaining, 10)
+        timer.cancel()
+        self.assertTrue(timer.done)
+        timers.cancel(game_id=1, phase_id=1)
+        timers.cancel(game_id=2)
+        timers.advance(10)
+        self.assertEqual(self.fired, [("c",)])
+        with self.assertRaises(ValueError):
+            timers.cancel()
+
+    def test_next_due(self):
+        self.assertIsNone(timers.next_due())
+        first = timers.schedule(5, self.record, ("a",))
+        timers.schedule(12, self.record, ("b",))
+        self.assertEqual(timers.next_due(), 5)
+        first.cancel()
+        self.assertEqual(timers.next_due(), 12)
+        timers.advance(timers.next_due())
+        self.assertEqual(self.fired, [("b",)])
+        self.assertIsNone(timers.next_due())
+
+    def test_rescheduled_from_callback(self):
+        def tick(n):
+            self.fired.append(n)
+            if n < 3:
+                timers.schedule(5, tick, (n + 1,))
+        timers.schedule(5, tick, (1,))
+        timers.advance(5)
+        timers.advance(5)
+        self.assertEqual(self.fired, [1, 2])
+        timers.advance(5)
+        self.assertEqual(self.fired, [1, 2, 3])
+
+    def test_phase_limit(self):
+        var = GameState(PregameState())
+        var.current_phase = "join"
+        var.begin_phase_transition("day")
+        var.end_phase_transition(60, 45, self.record, ("phase",), phase_id=1)
+        # phase timers post to the game loop, so wait for it to catch up before checking
+        timers.advance(45)
+        var.loop.run(lambda: None)
+        self.assertEqual(self.fired, [("warn", "phase")])
+        var.extend_phase_limit(30)
+        timers.advance(15)
+        var.loop.run(lambda: None)
+        self.assertEqual(self.fired, [("warn", "phase")])
+        self.assertEqual(trans.TIMERS["day_limit"][2], 75)
+        timers.advance(15)
+        var.loop.run(lambda: None)
+        self.assertEqual(self.fired, [("warn", "phase"), ("limit", "phase")])
+        var.loop.stop()
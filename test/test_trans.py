@@ -0,0 +1,87 @@
+from unittest import TestCase
+import src
+from src import channels, config, timers, trans, users
+from src.dispatcher import MessageDispatcher
+from src.gamestate import PregameState, set_gamemode
+from src.headless import configure_headless
+from src.pregame import start
+from src.users import FakeUser
+
+class TestConcurrentGames(TestCase):
+    """Check that games in two channels move through their phases without affecting each other."""
+    def setUp(self):
+        configure_headless()
+        reaper_enabled = config.Main.get("reaper.enabled")
+        config.Main.set("reaper.enabled", False)
+        self.addCleanup(config.Main.set, "reaper.enabled", reaper_enabled)
+        timers.set_clock(timers.ManualClock())
+        self.addCleanup(timers.set_clock, timers.Clock())
+        if users.Bot is None:
+            users.Bot = users.BotUser(None, "trans", "trans", "localhost", None)
+        self.channels = []
+        for i in range(2):
+            chan = channels.add(f"concurrent{i}", None) # not a channel name, so this is a FakeChannel
+            channels.add_game_channel(chan)
+            self.channels.append(chan)
+            chan.loop.run(self.begin, chan)
+            self.addCleanup(chan.loop.run, self.end, chan)
+
+    @staticmethod
+    def begin(chan):
+        players = [FakeUser.from_nick(f"{chan.name}player{i}") for i in range(8)]
+        pregame = chan.game_state = PregameState(chan.loop)
+        pregame.players.extend(players)
+        set_gamemode(pregame, "default")
+        start(MessageDispatcher(players[0], chan), forced=True)
+
+    @staticmethod
+    def end(chan):
+        if chan.game_state is not None:
+            trans.stop_game(chan.game_state, log=False)
+
+    def phases(self):
+        return [(chan.game_state.current_phase, chan.game_state.day_count, chan.game_state.night_count) for chan in self.channels]
+
+    def advance_until(self, phase):
+        for _ in range(20):
+            if all(chan.game_state.current_phase == phase for chan in self.channels):
+                return
+            timers.advance(timers.next_due())
+            # let the loops run whatever the timers posted to them
+            for chan in self.channels:
+                chan.loop.run(lambda: None)
+        self.fail("Games did not reach {0}: {1}".format(phase, self.phases()))
+
+    def test_phases(self):
+        self.assertEqual(self.phases(), [("night", 0, 1)] * 2)
+        night_ids = [chan.loop.run(lambda: trans.PHASES.night_id) for chan in self.channels]
+        self.assertNotEqual(night_ids[0], night_ids[1])
+        # both night timers must still fire, even though the second game began its night last
+        self.advance_until("day")
+        self.assertEqual(self.phases(), [("day", 1, 1)] * 2)
+        self.advance_until("night")
+        self.assertEqual(self.phases(), [("night", 1, 2)] * 2)
+        self.advance_until("day")
+        self.assertEqual(self.phases(), [("day", 2, 2)] * 2)
+
+    def test_role_state(self):
+        from src.roles import gunner, seer
+        from src.roles.helper import shamans
+
+        def mark(chan):
+            player = chan.game_state.players[0]
+            seer.SEEN.add(player)
+            gunner.GUNNERS[player] = 2
+            shamans.IMPATIENCE.append(player)
+            shamans.havetotem.append(player)
+            return player
+
+        marked = [chan.loop.run(mark, chan) for chan in self.channels]
+        # the end of one game must leave the role state of the other alone
+        self.channels[1].loop.run(self.end, self.channels[1])
+        first = self.channels[0]
+        self.assertIn(marked[0], first.loop.run(lambda: set(seer.SEEN)))
+        self.assertEqual(first.loop.run(lambda: dict(gunner.GUNNERS)).get(marked[0]), 2)
+        self.assertEqual(first.loop.run(lambda: list(shamans.IMPATIENCE)), [marked[0]])
+        self.assertEqual(first.loop.run(lambda: list(shamans.havetotem)), [marked[0]])
+        self.assertNotIn(marked[1], first.loop.run(lambda: set(seer.SEEN)))
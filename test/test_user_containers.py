@@ -83,3 +83,42 @@ class TestUserContainers(TestCase):
         self.assertIn(value, user1.sets)
         self.assertNotIn(value, user2.sets)
         self.assertEqual(str(value), "UserSet(1)")
+
+    def test_set_update_exclusive(self):
+        user = FakeUser.from_nick("1")
+        value = UserSet()
+        with self.assertRaises(TypeError):
+            value.update([user, 2])
+        # nothing is added if any item is invalid
+        self.assertEqual(str(value), "UserSet()")
+        self.assertNotIn(value, user.sets)
+
+    def test_set_intersection_update(self):
+        user1 = FakeUser.from_nick("1")
+        user2 = FakeUser.from_nick("2")
+        value = UserSet([user1, user2])
+        value.intersection_update(iter([user1]))
+        self.assertIn(value, user1.sets)
+        self.assertNotIn(value, user2.sets)
+        self.assertEqual(str(value), "UserSet(1)")
+
+    def test_list_extend(self):
+        user1 = FakeUser.from_nick("1")
+        user2 = FakeUser.from_nick("2")
+        value = UserList()
+        value.extend(iter([user1, user2, user1]))
+        self.assertEqual(str(value), "UserList(1, 2, 1)")
+        self.assertIn(value, user1.lists)
+        value.remove(user1)
+        self.assertIn(value, user1.lists)
+        value.clear()
+        self.assertNotIn(value, user1.lists)
+        self.assertNotIn(value, user2.lists)
+        with self.assertRaises(TypeError):
+            value.extend([user1, 2])
+        self.assertEqual(str(value), "UserList()")
+
+    def test_slots(self):
+        for value in (UserSet(), UserList(), UserDict(), DefaultUserDict(UserSet)):
+            with self.assertRaises(AttributeError):
+                value.attribute = None
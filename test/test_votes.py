@@ -0,0 +1,79 @@
+from unittest import TestCase
+from src import status
+from src.status import absent, forcevote, voteweight
+from src.containers import UserList
+from src.gamestate import GameState, PregameState
+from src.users import FakeUser
+from src.votes import VOTES, VOTE_TALLY, VoteTally
+
+class TestVoteTally(TestCase):
+    """Check that the incrementally maintained vote tally agrees with counting every vote afresh."""
+    def setUp(self):
+        pregame = PregameState()
+        self.players = [FakeUser.from_nick(f"player{i}") for i in range(7)]
+        pregame.players.extend(self.players)
+        self.var = GameState(pregame)
+        self.var.begin_setup()
+        for player in self.players:
+            self.var.main_roles[player] = "villager"
+            self.var.roles["villager"].add(player)
+        self.var.current_phase = "day"
+
+    def tearDown(self):
+        absent.ABSENT.clear()
+        forcevote.FORCED_COUNTS.clear()
+        forcevote.FORCED_TARGETS.clear()
+        voteweight.WEIGHT.clear()
+        VOTES.clear()
+        VOTE_TALLY.invalidate()
+        self.var.roles.clear()
+        self.var.main_roles.clear()
+        self.var.players.clear()
+
+    def vote(self, voter, target):
+        previous = next((votee for votee, voters in VOTES.items() if voter in voters), None)
+        if previous is target:
+            return
+        if previous is not None:
+            VOTES[previous].remove(voter)
+            if not VOTES[previous]:
+                del VOTES[previous]
+        if target is not None:
+            VOTES.setdefault(target, UserList()).append(voter)
+        VOTE_TALLY.moved(self.var, voter, previous, target)
+
+    def check(self):
+        fresh = VoteTally()
+        self.assertEqual(dict(VOTE_TALLY.counts(self.var)), dict(fresh.counts(self.var)))
+        self.assertEqual(VOTE_TALLY.available(self.var), fresh.available(self.var))
+
+    def test_tally(self):
+        a, b, c, d, e, f, g = self.players
+        self.check()
+        self.vote(a, b)
+        self.vote(c, b)
+        self.vote(d, e)
+        self.check()
+        self.assertEqual(VOTE_TALLY.counts(self.var)[b], 2)
+        self.vote(c, e)
+        self.vote(a, None)
+        self.check()
+        self.assertNotIn(b, VOTE_TALLY.counts(self.var))
+
+        status.add_vote_weight(self.var, d, 2)
+        self.check()
+        self.assertEqual(VOTE_TALLY.counts(self.var)[e], 4)
+        self.vote(d, f)
+        self.check()
+
+        status.add_force_vote(self.var, g, [e, f])
+        self.check()
+        self.vote(g, e)
+        self.vote(a, e)
+        self.check()
+        status.add_force_abstain(self.var, a)
+        self.check()
+        self.vote(b, f)
+        status.add_absent(self.var, b, "totem")
+        self.check()
+        self.assertEqual(VOTE_TALLY.available(self.var), 6)
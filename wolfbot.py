@@ -69,7 +69,7 @@ if args.config:
 
 from oyoyo.client import IRCClient, TokenBucket
 
-from src import handler, config
+from src import handler, config, metrics
 
 def main():
     # fetch IRC transport
@@ -110,14 +110,26 @@ def main():
         "": handler.unhandled
     }
 
-    def stream_handler(msg, level="info"):
-        level_map = {
-            "debug": logging.DEBUG,
-            "info": logging.INFO,
-            "warning": logging.WARNING,
-            "error": logging.ERROR
-        }
-        transport_logger.log(level_map[level], msg)
+    level_map = {
+        "debug": logging.DEBUG,
+        "info": logging.INFO,
+        "warning": logging.WARNING,
+        "error": logging.ERROR
+    }
+
+    lines_total = metrics.counter("irc_lines_total", "IRC lines sent and received", ("direction",))
+    flood_wait_seconds = metrics.histogram("irc_flood_wait_seconds", "Time lines waited on flood protection before being sent")
+
+    def stream_handler(msg, *args, level="info"):
+        if metrics.enabled:
+            if msg.startswith("---> "):
+                lines_total.inc("out")
+            elif msg.startswith("<--- "):
+                lines_total.inc("in")
+        # msg is only formatted with args if the level is being logged
+        transport_logger.log(level_map[level], msg, *args)
+
+    metrics.start()
 
     cli = IRCClient(
         cmd_handler,
@@ -143,6 +155,7 @@ def main():
             init=config.Main.get("transports[0].flood.initial_burst")),
         connect_cb=handler.connect_callback,
         stream_handler=stream_handler,
+        throttle_handler=flood_wait_seconds.observe,
     )
     cli.mainLoop()
 